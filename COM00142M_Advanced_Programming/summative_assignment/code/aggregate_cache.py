@@ -0,0 +1,184 @@
+"""
+Cache for analysis aggregates, invalidated by per-table version counters.
+
+Every write path that changes table rows (``replace_table_data``, CSV import,
+cleanup apply) bumps that table's counter in ``table_versions`` (see
+:func:`database.bump_table_versions`). An aggregate is cached together with
+the counters of the tables it reads; while those are unchanged the cached
+value is returned without touching the data, so re-opening a dialog is
+instant. Entries live in process memory and, once :func:`set_persistent` is
+enabled, also in an ``aggregate_cache`` table in the same SQLite file so they
+survive a restart.
+
+Persisted values are JSON (the database file is whatever the user picked, so
+nothing in it is unpickled): lists, tuples, dicts, numbers, strings and
+dataclasses of those. Entries are stamped with :data:`PAYLOAD_FORMAT` and the
+aggregate's own ``version``, so a change to either recomputes them.
+"""
+from __future__ import annotations
+
+import dataclasses
+import json
+import sqlite3
+import threading
+from collections.abc import Callable
+from typing import Any
+from typing import TypeVar
+
+from audit_log import get_audit_logger
+from database import table_versions
+from schema_catalogue import database_file
+
+T = TypeVar('T')
+
+_AGGREGATE_CACHE_DDL = '''
+    CREATE TABLE IF NOT EXISTS aggregate_cache (
+        name TEXT NOT NULL,
+        params TEXT NOT NULL,
+        versions TEXT NOT NULL,
+        payload BLOB NOT NULL,
+        PRIMARY KEY (name, params)
+    )
+'''
+
+# bump when the persisted payload encoding changes
+PAYLOAD_FORMAT = 1
+
+_lock = threading.Lock()
+# (database file, name, params) -> (stamp, value)
+_memory: dict[tuple[str, str, str], tuple[tuple[object, ...], object]] = {}
+_persistent = False
+
+
+def set_persistent(enabled: bool) -> None:
+    """Also store aggregates in the database file (off by default)."""
+    global _persistent
+    _persistent = enabled
+
+
+def clear() -> None:
+    """Forget every in-memory entry (persisted entries are left alone)."""
+    with _lock:
+        _memory.clear()
+
+
+def _to_json(value: object) -> Any:
+    """``value`` as JSON-ready data; tuples and dicts are tagged so they come back as such."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_to_json(v) for v in value]
+    if isinstance(value, tuple):
+        return {'tuple': [_to_json(v) for v in value]}
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        value = {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {'dict': {k: _to_json(v) for k, v in value.items()}}
+    raise TypeError(f'cannot persist {type(value).__name__} values')
+
+
+def _from_json(data: Any) -> object:
+    if isinstance(data, list):
+        return [_from_json(v) for v in data]
+    if isinstance(data, dict):
+        if 'tuple' in data:
+            return tuple(_from_json(v) for v in data['tuple'])
+        return {k: _from_json(v) for k, v in data['dict'].items()}
+    return data
+
+
+def _load_persisted(
+        conn: sqlite3.Connection,
+        *,
+        name: str,
+        params: str,
+        stamp: tuple[object, ...],
+) -> tuple[bool, object]:
+    try:
+        row = conn.execute(
+            'SELECT versions, payload FROM aggregate_cache WHERE name = ? AND params = ?',
+            (name, params),
+        ).fetchone()
+    except sqlite3.OperationalError:  # no cache table yet
+        return False, None
+    if row is None or row[0] != repr(stamp):
+        return False, None
+    try:
+        return True, _from_json(json.loads(row[1]))
+    except (ValueError, TypeError, KeyError):
+        get_audit_logger().warning('Aggregate cache: unreadable entry for %s, recomputing', name)
+        return False, None
+
+
+def _store_persisted(
+        conn: sqlite3.Connection,
+        *,
+        name: str,
+        params: str,
+        stamp: tuple[object, ...],
+        value: object,
+) -> None:
+    # never commit on behalf of a caller that has its own transaction open
+    if conn.in_transaction:
+        return
+    try:
+        payload = json.dumps(_to_json(value), separators=(',', ':'))
+    except TypeError as e:
+        get_audit_logger().warning('Aggregate cache: could not persist %s: %s', name, e)
+        return
+    try:
+        with conn:
+            conn.execute(_AGGREGATE_CACHE_DDL)
+            conn.execute(
+                'INSERT OR REPLACE INTO aggregate_cache (name, params, versions, payload) '
+                'VALUES (?, ?, ?, ?)',
+                (name, params, repr(stamp), payload),
+            )
+    except sqlite3.Error as e:  # e.g. read-only or locked database: cache in memory only
+        get_audit_logger().warning('Aggregate cache: could not persist %s: %s', name, e)
+
+
+def cached_aggregate(
+        conn: sqlite3.Connection,
+        *,
+        name: str,
+        tables: tuple[str, ...],
+        params: tuple[object, ...] = (),
+        compute: Callable[[], T],
+        version: int = 1,
+        decode: Callable[[Any], T] | None = None,
+) -> T:
+    """
+    Return ``compute()``, reusing a cached value while ``tables`` are unchanged.
+
+    ``name`` and ``params`` identify the aggregate; ``tables`` lists every
+    table it reads. Bump ``version`` when ``compute`` starts returning
+    something different for the same data. ``decode`` rebuilds a persisted
+    value whose JSON form is not the value itself (a dataclass comes back as
+    a dict of its fields). In-memory databases are never cached.
+    """
+    db_file = database_file(conn)
+    if not db_file:
+        return compute()
+    stamp = (PAYLOAD_FORMAT, version, table_versions(conn, tables))
+    key = (db_file, name, repr(params))
+    with _lock:
+        hit = _memory.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]  # type: ignore[return-value]
+
+    if _persistent:
+        found, value = _load_persisted(conn, name=name, params=key[2], stamp=stamp)
+        if found:
+            if decode is not None:
+                value = decode(value)
+            with _lock:
+                _memory[key] = (stamp, value)
+            return value  # type: ignore[return-value]
+
+    value = compute()
+    with _lock:
+        _memory[key] = (stamp, value)
+    if _persistent:
+        _store_persisted(conn, name=name, params=key[2], stamp=stamp, value=value)
+    return value
@@ -2,24 +2,35 @@
 from __future__ import annotations
 
 import sqlite3
+from collections.abc import Callable
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 import numpy as np
 import pandas as pd
 from matplotlib.figure import Figure
 
+from database import rollup_current
 from database import sql_exclude_bot_users
+from database import sql_rollup_authors
+from snapshot import Snapshot
 
 if TYPE_CHECKING:
     from matplotlib.axes import Axes
+    from matplotlib.collections import PolyCollection
+
+
+# the ``timestamp`` text of rows whose ``ts_epoch`` SQLite could not parse
+# (see database._TIMESTAMP_ISO_SQL); frame_datetimes parses it in Python
+_UNPARSED_TIMESTAMP_SQL = 'CASE WHEN {0}ts_epoch IS NULL THEN {0}timestamp END AS timestamp'
 
 
 def _posts_timebase_sql(*, human_only: bool) -> str:
     if not human_only:
-        return 'SELECT post_id, timestamp FROM posts'
+        return f"SELECT post_id, ts_epoch, {_UNPARSED_TIMESTAMP_SQL.format('')} FROM posts"
     pred = sql_exclude_bot_users(users_table_alias='u')
     return f'''
-        SELECT p.post_id, p.timestamp
+        SELECT p.post_id, p.ts_epoch, {_UNPARSED_TIMESTAMP_SQL.format('p.')}
         FROM posts p
         INNER JOIN users u ON p.user_id = u.user_id
         WHERE {pred}
@@ -27,36 +38,267 @@ def _posts_timebase_sql(*, human_only: bool) -> str:
 
 
 def fetch_posts_timestamps_df(
-        conn: sqlite3.Connection,
+        conn: sqlite3.Connection | Snapshot,
         *,
         human_only: bool,
 ) -> pd.DataFrame:
-    """Posts with raw ``timestamp`` text for time-based charts."""
+    """
+    Posts with their pre-parsed ``ts_epoch`` for time-based charts, plus the
+    ``timestamp`` text where ``ts_epoch`` is NULL.
+
+    From a :class:`snapshot.Snapshot` the columns are memory-mapped and the
+    frame also carries the parsed ``ts_datetime``.
+    """
+    if isinstance(conn, Snapshot):
+        return conn.frame('posts', ('post_id', 'ts_epoch', 'ts_datetime'), human_only=human_only)
     return pd.read_sql_query(_posts_timebase_sql(human_only=human_only), conn)
 
 
+# layouts of ``timestamp`` text (``/`` or ``-`` dates, ``T`` or space before
+# the time), each parsed in bulk with its explicit format once normalised
+_TIMESTAMP_LAYOUTS: tuple[tuple[str, str], ...] = (
+    (r'\d{4}[-/]\d{2}[-/]\d{2}[ T]\d{2}:\d{2}:\d{2}', '%Y-%m-%d %H:%M:%S'),
+    (r'\d{4}[-/]\d{2}[-/]\d{2}[ T]\d{2}:\d{2}', '%Y-%m-%d %H:%M'),
+    (r'\d{4}[-/]\d{2}[-/]\d{2}', '%Y-%m-%d'),
+)
+
+
+def _parse_distinct_timestamps(texts: pd.Series) -> pd.Series:
+    s = texts.str.strip()
+    out = pd.Series(pd.NaT, index=s.index, dtype='datetime64[us]')
+    pending = ~s.isin(('', 'nan', 'None'))
+    for pattern, fmt in _TIMESTAMP_LAYOUTS:
+        matched = pending & s.str.fullmatch(pattern)
+        if matched.any():
+            layout = s[matched].str.replace('/', '-', regex=False).str.replace('T', ' ', regex=False)
+            out[matched] = pd.to_datetime(layout, format=fmt, errors='coerce')
+            pending &= ~matched
+    if pending.any():
+        # anything else (fractional seconds, weekday names, UTC offsets, ...):
+        # best effort on the text as written; offsets are converted to UTC and
+        # dropped, as SQLite reads them for ts_epoch
+        parsed = pd.to_datetime(s[pending], format='mixed', errors='coerce', utc=True)
+        out[pending] = parsed.dt.tz_localize(None)
+    return out
+
+
 def normalize_sqlite_timestamp_series(raw: pd.Series) -> pd.Series:
     """
     Best-effort parse of stored post/interaction timestamps.
 
     Demo data mixes ``YYYY/MM/DD`` and ``YYYY-MM-DD`` (see import filters in
-    ``ui``); normalise slashes before parsing.
+    ``ui``), with or without ``HH:MM[:SS]`` and a ``T`` separator. Timestamps
+    repeat heavily, so each distinct string is parsed once: the known layouts
+    with an explicit ``format=`` each, anything else with ``format='mixed'``.
+    """
+    codes, distinct = pd.factorize(raw, use_na_sentinel=True)
+    parsed = _parse_distinct_timestamps(pd.Series(distinct, dtype=str)).to_numpy()
+    # missing values have code -1, which picks the trailing NaT
+    values = np.append(parsed, np.datetime64('NaT', 'us'))[codes]
+    return pd.Series(values, index=raw.index, name=raw.name)
+
 
-    Pandas 2+ may infer a single datetime format from the first row; a leading
-    ``... 00:00`` value can make later ``... HH:MM:SS`` rows parse as NaT without
-    ``format='mixed'``.
+def frame_datetimes(df: pd.DataFrame) -> pd.Series:
     """
-    s = raw.astype(str).str.strip()
-    s = s.replace({'': pd.NA, 'nan': pd.NA, 'None': pd.NA})
-    s = s.str.replace('/', '-', regex=False)
-    return pd.to_datetime(s, format='mixed', errors='coerce', utc=False)
+    Row datetimes for a time-base frame: a snapshot's ``ts_datetime`` as is,
+    the ``ts_epoch`` column parsed at import, else (frames built by hand) by
+    parsing the ``timestamp`` text.
+
+    Rows with a NULL ``ts_epoch`` and a ``timestamp`` (text outside the
+    formats SQLite parses) are parsed in Python.
+    """
+    if 'ts_datetime' in df.columns:
+        return df['ts_datetime']
+    if 'ts_epoch' not in df.columns:
+        return normalize_sqlite_timestamp_series(df['timestamp'])
+    dt = pd.to_datetime(df['ts_epoch'], unit='s', errors='coerce').astype('datetime64[us]')
+    if 'timestamp' in df.columns:
+        unparsed = dt.isna() & df['timestamp'].notna()
+        if unparsed.any():
+            dt[unparsed] = normalize_sqlite_timestamp_series(df.loc[unparsed, 'timestamp'])
+    return dt
+
+
+# level of detail for the daily charts: the finest resolution that shows at
+# most _LOD_MAX_POINTS buckets across the visible date range
+_LOD_MAX_POINTS = 400
+# (name, resample rule, days per bucket)
+_LOD_RESOLUTIONS = (('day', 'D', 1.0), ('week', 'W-MON', 7.0), ('month', 'MS', 30.4))
+
+
+@dataclass(frozen=True)
+class _DailyLevel:
+    """Daily counts at one resolution: bucket starts and per-day means, min and max."""
+    name: str
+    days_per_bucket: float
+    x: np.ndarray
+    series: np.ndarray
+    """Mean per day of each input column, shape (columns, buckets)."""
+    mean: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+
+
+def _daily_counts(dt: pd.Series) -> pd.Series:
+    """Rows per calendar day, every day of the range present (0 when none)."""
+    days = dt.dropna().to_numpy().astype('datetime64[D]')
+    if not len(days):
+        return pd.Series([], index=pd.DatetimeIndex([], freq='D'), dtype=np.int64)
+    first = days.min()
+    counts = np.bincount((days - first).astype(np.int64))
+    return pd.Series(counts, index=pd.date_range(first, periods=len(counts), freq='D'))
+
+
+def _daily_posts_sql(*, human_only: bool, rollup: bool) -> str:
+    if rollup:
+        authors = f' AND {sql_rollup_authors(human_only=True, table_alias=None)}' if human_only else ''
+        return f'''
+            SELECT ts_day, SUM(row_count)
+            FROM agg_posts_day
+            WHERE ts_day IS NOT NULL{authors}
+            GROUP BY ts_day
+            HAVING SUM(row_count) > 0
+        '''
+    if not human_only:
+        return 'SELECT ts_day, COUNT(*) FROM posts WHERE ts_day IS NOT NULL GROUP BY ts_day'
+    pred = sql_exclude_bot_users(users_table_alias='u')
+    return f'''
+        SELECT p.ts_day, COUNT(*)
+        FROM posts p
+        INNER JOIN users u ON p.user_id = u.user_id
+        WHERE p.ts_day IS NOT NULL AND {pred}
+        GROUP BY p.ts_day
+    '''
 
 
-def _plot_daily_post_counts(ax: Axes, df_posts: pd.DataFrame) -> None:
-    """Line plot: number of posts per calendar day."""
-    dt = normalize_sqlite_timestamp_series(df_posts['timestamp'])
-    valid = dt.dropna()
-    if valid.empty:
+def _unparsed_timestamps_sql(table: str, columns: str, *, human_only: bool) -> str:
+    """
+    ``columns`` of the ``table`` rows whose ``timestamp`` text SQLite could not
+    parse (NULL ``ts_epoch``); ``table`` is aliased by its first letter.
+    """
+    alias = table[0]
+    where = f'{alias}.ts_epoch IS NULL AND {alias}.timestamp IS NOT NULL'
+    if not human_only:
+        return f'SELECT {columns} FROM {table} {alias} WHERE {where}'
+    pred = sql_exclude_bot_users(users_table_alias='u')
+    return f'''
+        SELECT {columns}
+        FROM {table} {alias}
+        INNER JOIN users u ON {alias}.user_id = u.user_id
+        WHERE {where} AND {pred}
+    '''
+
+
+def _parsed_epoch_days(texts: list[object]) -> tuple[np.ndarray, np.ndarray]:
+    """``texts`` parsed in Python as days since the epoch, and the mask of the ones that parsed."""
+    days = normalize_sqlite_timestamp_series(pd.Series(texts, dtype=object)).to_numpy().astype('datetime64[D]')
+    valid = ~np.isnat(days)
+    return days[valid].astype(np.int64), valid
+
+
+def fetch_daily_post_counts(
+        conn: sqlite3.Connection | Snapshot,
+        *,
+        human_only: bool,
+) -> pd.Series:
+    """
+    Posts per calendar day, every day of the range present (0 when none).
+
+    Read from the ``agg_posts_day`` rollup while it is current, else counted
+    by ``ts_day``; from a snapshot, counted over its parsed timestamps. Posts
+    whose ``timestamp`` SQLite could not parse are counted in Python.
+    """
+    if isinstance(conn, Snapshot):
+        return _daily_counts(frame_datetimes(fetch_posts_timestamps_df(conn, human_only=human_only)))
+    sql = _daily_posts_sql(human_only=human_only, rollup=rollup_current(conn, 'agg_posts_day'))
+    rows = conn.execute(sql).fetchall()
+    unparsed = conn.execute(_unparsed_timestamps_sql('posts', 'p.timestamp', human_only=human_only)).fetchall()
+    if unparsed:
+        days, _ = _parsed_epoch_days([r[0] for r in unparsed])
+        rows += [(day, 1) for day in days.tolist()]
+    if not rows:
+        return _daily_counts(pd.Series([], dtype='datetime64[s]'))
+    days = pd.DatetimeIndex(np.array([r[0] for r in rows], dtype=np.int64).astype('datetime64[D]'))
+    counts = pd.Series(np.array([r[1] for r in rows], dtype=np.int64), index=days)
+    return counts.groupby(level=0).sum().asfreq('D', fill_value=0)
+
+
+def _daily_levels(daily: pd.DataFrame) -> list[_DailyLevel]:
+    """
+    ``daily`` (one row per calendar day, one column per series) summed across
+    columns and pre-aggregated at every resolution of ``_LOD_RESOLUTIONS``.
+    """
+    daily = daily.astype(float)
+    total = daily.sum(axis=1)
+    levels = []
+    for name, rule, days_per_bucket in _LOD_RESOLUTIONS:
+        if rule == 'D':
+            y = total.to_numpy()
+            levels.append(_DailyLevel(name, days_per_bucket, total.index.to_numpy(), daily.to_numpy().T, y, y, y))
+            continue
+        per_column = daily.resample(rule, label='left', closed='left').mean()
+        buckets = total.resample(rule, label='left', closed='left')
+        levels.append(_DailyLevel(
+            name,
+            days_per_bucket,
+            per_column.index.to_numpy(),
+            per_column.to_numpy().T,
+            buckets.mean().to_numpy(),
+            buckets.min().to_numpy(),
+            buckets.max().to_numpy(),
+        ))
+    return levels
+
+
+def _lod_level_for_span(levels: list[_DailyLevel], span_days: float) -> _DailyLevel:
+    for level in levels:
+        if span_days / level.days_per_bucket <= _LOD_MAX_POINTS:
+            return level
+    return levels[-1]
+
+
+def _connect_level_of_detail(
+        ax: Axes,
+        levels: list[_DailyLevel],
+        show: Callable[[_DailyLevel], None],
+) -> None:
+    """
+    Draw the level suited to the full date range now, and switch levels as
+    the toolbar zooms or pans (``show`` must not change the x limits).
+    """
+    shown: list[_DailyLevel] = []
+
+    def on_xlim_changed(axes: Axes) -> None:
+        lo, hi = axes.get_xlim()
+        level = _lod_level_for_span(levels, hi - lo)
+        if shown and shown[-1] is level:
+            return
+        shown[:] = [level]
+        show(level)
+
+    first = levels[0].x
+    span = (first[-1] - first[0]) / np.timedelta64(1, 'D') + 1
+    level = _lod_level_for_span(levels, float(span))
+    shown.append(level)
+    show(level)
+    ax.set_xlim(first[0] - np.timedelta64(12, 'h'), first[-1] + np.timedelta64(12, 'h'))
+    ax.callbacks.connect('xlim_changed', on_xlim_changed)
+
+
+def _moving_average(y: np.ndarray, window: int) -> np.ndarray:
+    """Mean of every ``window`` consecutive values (like ``np.convolve(..., 'valid')``), in O(n)."""
+    c = np.cumsum(np.concatenate(([0.0], y)))
+    return (c[window:] - c[:-window]) / window
+
+
+def _plot_daily_post_counts(ax: Axes, counts: pd.Series) -> None:
+    """
+    Line plot of :func:`fetch_daily_post_counts`, with a 7-day moving average.
+
+    Long ranges are drawn at week or month resolution (mean posts per day,
+    daily min / max shaded) until the toolbar zooms in far enough for days.
+    """
+    if counts.empty:
         ax.text(
             0.5,
             0.5,
@@ -68,45 +310,82 @@ def _plot_daily_post_counts(ax: Axes, df_posts: pd.DataFrame) -> None:
         ax.set_axis_off()
         return
 
-    day = valid.dt.normalize()
-    counts = day.value_counts().sort_index()
-    x = counts.index.to_numpy()
-    y = counts.to_numpy(dtype=float)
+    levels = _daily_levels(counts.to_frame())
+    x = levels[0].x
+    y = levels[0].mean
 
-    ax.plot(x, y, color='tab:blue', linewidth=1.2, marker='o', markersize=3)
-    ax.set_title('Posts per calendar day')
+    (line,) = ax.plot(x, y, color='tab:blue', linewidth=1.2, marker='o', markersize=3)
     ax.set_xlabel('Date')
     ax.set_ylabel('Post count')
     ax.tick_params(axis='x', rotation=35)
     ax.grid(True, alpha=0.25)
 
-    # Light smoothing for readability on noisy daily counts (optional).
+    # Light smoothing for readability on noisy daily counts (day level only).
+    smooth_line = None
+    smooth_label = ''
     if len(y) >= 7:
         window = min(7, len(y) // 2 * 2 + 1)
         if window >= 3:
-            kernel = np.ones(window) / window
-            smooth = np.convolve(y, kernel, mode='valid')
+            smooth = _moving_average(y, window)
+            smooth_label = f'{window}-day moving average'
             start = (window - 1) // 2
-            ax.plot(
+            (smooth_line,) = ax.plot(
                 x[start: start + len(smooth)],
                 smooth,
                 color='tab:orange',
                 linewidth=1.5,
                 alpha=0.85,
-                label=f'{window}-day moving average',
+                label=smooth_label,
             )
-            ax.legend(loc='upper right', fontsize=8)
+    envelope: list[PolyCollection] = []
+
+    def show(level: _DailyLevel) -> None:
+        for artist in envelope:
+            artist.remove()
+        envelope.clear()
+        line.set_data(level.x, level.mean)
+        if level.name == 'day':
+            ax.set_title('Posts per calendar day')
+            line.set_marker('o')
+            line.set_label('_nolegend_')
+        else:
+            ax.set_title(f'Posts per calendar day (mean per {level.name})')
+            line.set_marker('')
+            line.set_label(f'mean per {level.name}')
+            envelope.append(ax.fill_between(
+                level.x,
+                level.low,
+                level.high,
+                step='post',
+                color='tab:blue',
+                alpha=0.18,
+                linewidth=0,
+                label=f'daily min–max per {level.name}',
+            ))
+        if smooth_line is not None:
+            smooth_line.set_visible(level.name == 'day')
+            smooth_line.set_label(smooth_label if level.name == 'day' else '_nolegend_')
+        handles = [
+            a for a in (line, smooth_line, *envelope)
+            if a is not None and not a.get_label().startswith('_')
+        ]
+        if handles:
+            ax.legend(handles=handles, loc='upper right', fontsize=8)
+        elif ax.get_legend() is not None:
+            ax.get_legend().remove()
+
+    _connect_level_of_detail(ax, levels, show)
 
 
 def _interactions_timebase_sql(*, human_only: bool) -> str:
     if not human_only:
-        return '''
-            SELECT interaction_id, interaction_type, timestamp
+        return f'''
+            SELECT interaction_id, interaction_type, ts_epoch, {_UNPARSED_TIMESTAMP_SQL.format('')}
             FROM interactions
         '''
     pred = sql_exclude_bot_users(users_table_alias='u')
     return f'''
-        SELECT i.interaction_id, i.interaction_type, i.timestamp
+        SELECT i.interaction_id, i.interaction_type, i.ts_epoch, {_UNPARSED_TIMESTAMP_SQL.format('i.')}
         FROM interactions i
         INNER JOIN users u ON i.user_id = u.user_id
         WHERE {pred}
@@ -114,11 +393,20 @@ def _interactions_timebase_sql(*, human_only: bool) -> str:
 
 
 def fetch_interactions_timestamps_df(
-        conn: sqlite3.Connection,
+        conn: sqlite3.Connection | Snapshot,
         *,
         human_only: bool,
 ) -> pd.DataFrame:
-    """Interactions with types and timestamps for time-series / breakdown charts."""
+    """
+    Interactions with types and timestamps for time-series / breakdown charts
+    (``timestamp`` text only where ``ts_epoch`` is NULL, as for posts).
+    """
+    if isinstance(conn, Snapshot):
+        return conn.frame(
+            'interactions',
+            ('interaction_id', 'interaction_type', 'ts_epoch', 'ts_datetime'),
+            human_only=human_only,
+        )
     return pd.read_sql_query(
         _interactions_timebase_sql(human_only=human_only),
         conn,
@@ -126,38 +414,134 @@ def fetch_interactions_timestamps_df(
 
 
 def _normalize_interaction_type_labels(raw: pd.Series) -> pd.Series:
-    s = raw.astype(str).str.strip().str.lower()
+    s = raw.fillna('').astype(str).str.strip().str.lower()
     return s.replace({'': '(none)', 'nan': '(none)', 'none': '(none)'})
 
 
-def _plot_daily_interactions(ax: Axes, df_interactions: pd.DataFrame) -> None:
-    """Stacked area: interaction counts per calendar day by interaction_type (top types + other)."""
-    if df_interactions.empty or 'timestamp' not in df_interactions.columns:
-        ax.text(
-            0.5,
-            0.5,
-            'No interaction rows',
-            ha='center',
-            va='center',
-            transform=ax.transAxes,
-        )
-        ax.set_axis_off()
-        return
+def _daily_interactions_sql(*, human_only: bool, rollup: bool) -> str:
+    if rollup:
+        authors = f' AND {sql_rollup_authors(human_only=True, table_alias=None)}' if human_only else ''
+        return f'''
+            SELECT ts_day, interaction_type, SUM(row_count)
+            FROM agg_interactions_day_type
+            WHERE ts_day IS NOT NULL{authors}
+            GROUP BY ts_day, interaction_type
+            HAVING SUM(row_count) > 0
+        '''
+    if not human_only:
+        return '''
+            SELECT ts_day, interaction_type, COUNT(*)
+            FROM interactions
+            WHERE ts_day IS NOT NULL
+            GROUP BY ts_day, interaction_type
+        '''
+    pred = sql_exclude_bot_users(users_table_alias='u')
+    return f'''
+        SELECT i.ts_day, i.interaction_type, COUNT(*)
+        FROM interactions i
+        INNER JOIN users u ON i.user_id = u.user_id
+        WHERE i.ts_day IS NOT NULL AND {pred}
+        GROUP BY i.ts_day, i.interaction_type
+    '''
 
-    dt = normalize_sqlite_timestamp_series(df_interactions['timestamp'])
-    itype_col = (
-        df_interactions['interaction_type']
-        if 'interaction_type' in df_interactions.columns
-        else pd.Series(['(none)'] * len(df_interactions))
-    )
-    itype = _normalize_interaction_type_labels(itype_col)
-    frame = pd.DataFrame({'day': dt.dt.normalize(), 'itype': itype})
-    frame = frame.dropna(subset=['day'])
-    if frame.empty:
+
+def _snapshot_daily_interactions(
+        source: Snapshot,
+        *,
+        human_only: bool,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(day, raw interaction_type, count) per non-empty cell, as the SQL query returns them."""
+    frame = source.frame('interactions', ('ts_datetime', 'interaction_type'), human_only=human_only)
+    days = frame['ts_datetime'].to_numpy().astype('datetime64[D]')
+    valid = ~np.isnat(days)
+    days = days[valid].astype(np.int64)
+    if not len(days):
+        return days, np.array([], dtype=object), days
+    codes, kinds = pd.factorize(frame['interaction_type'].to_numpy()[valid])
+    first = days.min()
+    cells = np.bincount((days - first) * len(kinds) + codes)
+    nonzero = np.flatnonzero(cells)
+    return first + nonzero // len(kinds), kinds[nonzero % len(kinds)], cells[nonzero]
+
+
+def _daily_interaction_matrix(
+        days: np.ndarray,
+        kinds: np.ndarray,
+        counts: np.ndarray,
+        *,
+        top_n: int,
+) -> pd.DataFrame:
+    """Pivot (day since the epoch, interaction_type, count) cells to days x labelled types."""
+    cells = pd.DataFrame({
+        'day': np.asarray(days, dtype=np.int64).astype('datetime64[D]'),
+        'itype': _normalize_interaction_type_labels(pd.Series(kinds, dtype=object)),
+        'n': np.asarray(counts, dtype=np.int64),
+    })
+    if cells.empty:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='day', freq='D'))
+
+    counts_mat = cells.groupby(['day', 'itype'])['n'].sum().unstack(fill_value=0)
+    counts_mat = counts_mat.sort_index().asfreq('D', fill_value=0)
+    col_totals = counts_mat.sum(axis=0).sort_values(ascending=False)
+    top_cols = [c for c in col_totals.head(top_n).index if str(c)]
+    rest_cols = [c for c in counts_mat.columns if c not in top_cols]
+
+    plot_mat = counts_mat[top_cols].copy()
+    if rest_cols:
+        plot_mat['(other types)'] = counts_mat[rest_cols].sum(axis=1)
+    return plot_mat
+
+
+def fetch_daily_interaction_counts(
+        conn: sqlite3.Connection | Snapshot,
+        *,
+        human_only: bool,
+        top_n: int = 6,
+) -> pd.DataFrame:
+    """
+    Interactions per calendar day by type, ready to plot: one row per day of
+    the range (0 when none) and one column per type, the ``top_n`` most
+    frequent plus ``'(other types)'``.
+
+    Read from the ``agg_interactions_day_type`` rollup while it is current,
+    else counted in SQLite by the ``ts_day`` column (from a snapshot, by its
+    parsed timestamps), so only one row per day and type leaves the database.
+    Interactions whose ``timestamp`` SQLite could not parse are counted in
+    Python, one cell each.
+    """
+    if isinstance(conn, Snapshot):
+        days, kinds, counts = _snapshot_daily_interactions(conn, human_only=human_only)
+    else:
+        sql = _daily_interactions_sql(
+            human_only=human_only,
+            rollup=rollup_current(conn, 'agg_interactions_day_type'),
+        )
+        rows = conn.execute(sql).fetchall()
+        unparsed = conn.execute(_unparsed_timestamps_sql(
+            'interactions',
+            'i.timestamp, i.interaction_type',
+            human_only=human_only,
+        )).fetchall()
+        if unparsed:
+            days, valid = _parsed_epoch_days([r[0] for r in unparsed])
+            kinds = [r[1] for r, ok in zip(unparsed, valid) if ok]
+            rows += [(day, kind, 1) for day, kind in zip(days.tolist(), kinds)]
+        days = np.array([r[0] for r in rows], dtype=np.int64)
+        kinds = np.array([r[1] for r in rows], dtype=object)
+        counts = np.array([r[2] for r in rows], dtype=np.int64)
+    return _daily_interaction_matrix(days, kinds, counts, top_n=top_n)
+
+
+def _plot_daily_interactions(ax: Axes, plot_mat: pd.DataFrame) -> None:
+    """
+    Stacked area of :func:`fetch_daily_interaction_counts`; long ranges at
+    week / month resolution as for posts.
+    """
+    if plot_mat.empty:
         ax.text(
             0.5,
             0.5,
-            'No parseable interaction timestamps',
+            'No interactions with a parseable timestamp',
             ha='center',
             va='center',
             transform=ax.transAxes,
@@ -165,49 +549,48 @@ def _plot_daily_interactions(ax: Axes, df_interactions: pd.DataFrame) -> None:
         ax.set_axis_off()
         return
 
-    counts = frame.groupby(['day', 'itype']).size().unstack(fill_value=0)
-    counts = counts.sort_index()
-    col_totals = counts.sum(axis=0).sort_values(ascending=False)
-    top_n = 6
-    top_cols = [c for c in col_totals.head(top_n).index if str(c)]
-    rest_cols = [c for c in counts.columns if c not in top_cols]
-
-    plot_mat = counts[top_cols].copy()
-    if rest_cols:
-        plot_mat['(other types)'] = counts[rest_cols].sum(axis=1)
-
-    days = plot_mat.index.to_numpy()
-    series_list = [plot_mat[c].to_numpy(dtype=float) for c in plot_mat.columns]
     labels = [str(c)[:22] + ('…' if len(str(c)) > 22 else '') for c in plot_mat.columns]
+    colors = [f'C{i}' for i in range(len(labels))]
+    levels = _daily_levels(plot_mat)
 
-    ax.stackplot(days, *series_list, labels=labels, alpha=0.88)
-    ax.set_title('Interactions per calendar day by type (stacked)')
     ax.set_xlabel('Date')
     ax.set_ylabel('Interaction count')
     ax.tick_params(axis='x', rotation=35)
     ax.grid(True, axis='y', alpha=0.22)
     ncol = 2 if len(labels) > 5 else 1
-    ax.legend(loc='upper left', fontsize=7, ncol=ncol, framealpha=0.9)
+    stack: list[PolyCollection] = []
+
+    def show(level: _DailyLevel) -> None:
+        for artist in stack:
+            artist.remove()
+        stack[:] = ax.stackplot(level.x, *level.series, labels=labels, colors=colors, alpha=0.88)
+        if level.name == 'day':
+            ax.set_title('Interactions per calendar day by type (stacked)')
+        else:
+            ax.set_title(f'Interactions per calendar day by type (stacked, mean per {level.name})')
+        ax.legend(loc='upper left', fontsize=7, ncol=ncol, framealpha=0.9)
+
+    _connect_level_of_detail(ax, levels, show)
 
 
 def build_analysis_figure(
-        conn: sqlite3.Connection,
+        conn: sqlite3.Connection | Snapshot,
         *,
         human_only: bool,
 ) -> Figure:
     """
     Two panels: daily post volume (with optional moving average) and stacked
-    daily interaction counts by ``interaction_type``. Timestamps are parsed
-    naively (no time-zone offsets).
+    daily interaction counts by ``interaction_type``. Days come from the
+    ``ts_day`` columns parsed at import (naive, no time-zone offsets), via the
+    rollups while they are current; ``conn`` may be an exported
+    :class:`snapshot.Snapshot` instead.
     """
     fig = Figure(figsize=(10, 7.5), dpi=100)
     ax0 = fig.add_subplot(2, 1, 1)
-    df_posts = fetch_posts_timestamps_df(conn, human_only=human_only)
-    _plot_daily_post_counts(ax0, df_posts)
+    _plot_daily_post_counts(ax0, fetch_daily_post_counts(conn, human_only=human_only))
 
     ax1 = fig.add_subplot(2, 1, 2)
-    df_int = fetch_interactions_timestamps_df(conn, human_only=human_only)
-    _plot_daily_interactions(ax1, df_int)
+    _plot_daily_interactions(ax1, fetch_daily_interaction_counts(conn, human_only=human_only))
 
     fig.subplots_adjust(hspace=0.28, left=0.08, right=0.98, top=0.95, bottom=0.1)
     return fig
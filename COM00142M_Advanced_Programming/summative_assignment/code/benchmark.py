@@ -0,0 +1,1324 @@
+"""
+Performance harness for the import / cleanup / analysis paths.
+
+Data sets are built by replicating the demo CSVs ``scale`` times with suffixed
+keys, so every copy keeps the demo's foreign-key relationships. Each
+measurement is a subcommand; run ``python benchmark.py --help`` for the list.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import functools
+import gc
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from typing import TypeVar
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import aggregate_cache
+import analysis
+import categorical_analysis
+import database
+import figure_cache
+import hour_topic_pivot
+import moderation_effectiveness
+import snapshot
+import ui
+import utilities
+
+_T = TypeVar('_T')
+
+DEMO_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..',
+    'AP_OL4_25_26_Summative_Assessment_data_set',
+)
+
+# Columns holding (own or parent) keys; these get the per-copy suffix.
+_KEY_COLUMNS: dict[str, tuple[str, ...]] = {
+    'topics': ('topic_id',),
+    'users': ('user_id', 'username'),
+    'posts': ('post_id', 'user_id', 'topic_id'),
+    'interactions': ('interaction_id', 'post_id', 'user_id'),
+}
+
+
+def _without_orphans(
+        table_name: str,
+        headers: list[str],
+        rows: list[tuple[str, ...]],
+        known_keys: dict[str, set[str]],
+) -> list[tuple[str, ...]]:
+    # drop rows with a missing required parent, blank missing optional ones
+    checks = [
+        (headers.index(col), parent, required)
+        for col, parent, _key, required in database._RELATIONAL_FOREIGN_KEYS.get(table_name, ())
+    ]
+    out = []
+    for row in rows:
+        values = list(row)
+        keep = True
+        for i, parent, required in checks:
+            value = values[i].strip() if i < len(values) else ''
+            if value in known_keys[parent]:
+                continue
+            if required:
+                keep = False
+                break
+            if i < len(values):
+                values[i] = ''
+        if keep:
+            out.append(tuple(values))
+    return out
+
+
+def write_scaled_demo_csvs(
+        dest_dir: str,
+        *,
+        scale: int,
+        first_copy: int = 0,
+        drop_orphans: bool = False,
+        source_dir: str = DEMO_DATA_DIR,
+) -> list[str]:
+    """
+    Write ``<table>.csv`` files with every demo row repeated ``scale`` times.
+
+    Copies are numbered from ``first_copy``, so a later call can write rows
+    that extend an earlier data set rather than repeat it. ``drop_orphans``
+    leaves out rows whose parent is missing (the demo has some), giving data
+    that passes a strict foreign key check.
+    """
+    paths = []
+    known_keys: dict[str, set[str]] = {}
+    for table_name in database._RELATIONAL_TABLE_ORDER:
+        src = os.path.join(source_dir, f'{table_name.upper()}.csv')
+        headers, rows = database.read_csv_rows(src)
+        if drop_orphans:
+            rows = _without_orphans(table_name, headers, rows, known_keys)
+        pk = database._RELATIONAL_INSERT_COLUMNS[table_name][0]
+        known_keys[table_name] = {row[headers.index(pk)].strip() for row in rows}
+        key_idx = [i for i, h in enumerate(headers) if h in _KEY_COLUMNS[table_name]]
+        dest = os.path.join(dest_dir, f'{table_name}.csv')
+        with open(dest, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            for copy in range(first_copy, first_copy + scale):
+                for row in rows:
+                    out = list(row)
+                    for i in key_idx:
+                        if i < len(out) and out[i].strip():
+                            out[i] = f'{out[i]}_{copy}'
+                    writer.writerow(out)
+        paths.append(dest)
+    return paths
+
+
+def _peak_rss_kib() -> int:
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _import_child(mode: str, db_path: str, csv_path: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    if mode == 'eager':
+        database.replace_table_data_from_csv(db_path, csv_path=csv_path)
+    elif mode == 'streaming':
+        database.import_csv_streaming(db_path, csv_path=csv_path)
+    elif mode != 'noop':
+        raise ValueError(f'unknown import mode: {mode!r}')
+    return time.perf_counter() - start, _peak_rss_kib()
+
+
+def _run_in_fresh_process(func: Callable[..., _T], *args: object) -> _T:
+    # peak RSS only ever grows, so each measurement needs its own process
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(func, *args).result()
+
+
+def _load_scaled_demo_db(db_path: str, paths: list[str]) -> None:
+    # demo posts reference a placeholder user, so load tables one by one
+    # (missing keys become warnings) rather than via create_database
+    for path in paths:
+        database.import_csv_streaming(db_path, csv_path=path)
+
+
+def bench_import_rss(*, scale: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale)
+        db_path = os.path.join(tmp, 'bench.db')
+        _load_scaled_demo_db(db_path, paths[:-1])
+        interactions = paths[-1]
+        with open(interactions, encoding='utf-8') as f:
+            n_rows = sum(1 for _ in f) - 1
+
+        _, base_kib = _run_in_fresh_process(_import_child, 'noop', db_path, interactions)
+        results = {
+            mode: _run_in_fresh_process(_import_child, mode, db_path, interactions)
+            for mode in ('eager', 'streaming')
+        }
+
+    print(f'interactions rows: {n_rows} (scale={scale})')
+    print(f'interpreter baseline: peak RSS {base_kib / 1024:.1f} MiB')
+    for mode, (secs, kib) in results.items():
+        print(
+            f'{mode:>9}: {secs:7.2f}s  peak RSS {kib / 1024:8.1f} MiB '
+            f'(+{(kib - base_kib) / 1024:.1f} MiB over baseline)',
+        )
+    eager_kib = results['eager'][1] - base_kib
+    stream_kib = results['streaming'][1] - base_kib
+    saved = eager_kib - stream_kib
+    pct = 100.0 * saved / eager_kib if eager_kib > 0 else 0.0
+    print(f'peak RSS saving: {saved / 1024:.1f} MiB ({pct:.1f}% of the eager import)')
+    return 0
+
+
+def _cleanup_all_tables(db_path: str, *, bulk: bool) -> tuple[float, list[utilities.CleanupReport]]:
+    conn = sqlite3.connect(db_path)
+    try:
+        start = time.perf_counter()
+        reports = [
+            utilities.cleanup_entire_table(conn, table_name, apply=True, bulk=bulk)
+            for table_name in database._RELATIONAL_TABLE_ORDER
+        ]
+        return time.perf_counter() - start, reports
+    finally:
+        conn.close()
+
+
+def _dump_tables(db_path: str) -> dict[str, list[tuple[object, ...]]]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            table_name: conn.execute(f'SELECT * FROM {table_name} ORDER BY 1').fetchall()
+            for table_name in database._RELATIONAL_TABLE_ORDER
+        }
+    finally:
+        conn.close()
+
+
+def bench_cleanup(*, scale: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale)
+        per_row_db = os.path.join(tmp, 'per_row.db')
+        bulk_db = os.path.join(tmp, 'bulk.db')
+        _load_scaled_demo_db(per_row_db, paths)
+        shutil.copyfile(per_row_db, bulk_db)
+
+        per_row_secs, per_row_reports = _cleanup_all_tables(per_row_db, bulk=False)
+        bulk_secs, bulk_reports = _cleanup_all_tables(bulk_db, bulk=True)
+        same_db = _dump_tables(per_row_db) == _dump_tables(bulk_db)
+
+    print(f'scale={scale}')
+    parity = same_db
+    for table_name, old, new in zip(
+            database._RELATIONAL_TABLE_ORDER, per_row_reports, bulk_reports, strict=True,
+    ):
+        same = (old.updates, old.deletes, old.lines) == (new.updates, new.deletes, new.lines)
+        parity = parity and same
+        print(
+            f'{table_name:>13}: updates={new.updates} deletes={new.deletes} '
+            f'report {"matches" if same else "DIFFERS"}',
+        )
+    print(f'final tables {"match" if same_db else "DIFFER"}')
+    speedup = per_row_secs / bulk_secs if bulk_secs > 0 else float('inf')
+    print(f'per-row: {per_row_secs:7.2f}s  bulk: {bulk_secs:7.2f}s  ({speedup:.1f}x)')
+    return 0 if parity else 1
+
+
+def _legacy_exclude_bot_users(*, users_table_alias: str | None) -> str:
+    # the per-row predicate sql_exclude_bot_users used before users.is_bot
+    col = 'account_type' if users_table_alias is None else f'{users_table_alias}.account_type'
+    return f"lower(trim(coalesce({col}, ''))) != 'bot'"
+
+
+def _human_only_toggle_sql(pred: Callable[..., str]) -> dict[str, list[str]]:
+    # what ticking "Human only" runs: the hidden-row count plus the three
+    # filtered tab loads (see ui._count_bot_hidden_rows / _fetch_table_rows_for_treeview)
+    bare = pred(users_table_alias=None)
+    u_pred = pred(users_table_alias='u')
+    return {
+        'hidden-row count': [
+            f'SELECT COUNT(*) FROM users WHERE NOT ({bare})',
+            f'SELECT COUNT(*) FROM posts p INNER JOIN users u ON p.user_id = u.user_id WHERE NOT ({u_pred})',
+            f'SELECT COUNT(*) FROM interactions i INNER JOIN users u ON i.user_id = u.user_id WHERE NOT ({u_pred})',
+        ],
+        'tab loads': [
+            f'SELECT * FROM users WHERE {bare}',
+            f'SELECT p.* FROM posts p INNER JOIN users u ON p.user_id = u.user_id WHERE {u_pred}',
+            f'SELECT i.* FROM interactions i INNER JOIN users u ON i.user_id = u.user_id WHERE {u_pred}',
+        ],
+    }
+
+
+def bench_human_only(*, scale: int, repeat: int) -> int:
+    preds = {
+        'account_type expr': _legacy_exclude_bot_users,
+        'is_bot column': database.sql_exclude_bot_users,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale)
+        db_path = os.path.join(tmp, 'bench.db')
+        _load_scaled_demo_db(db_path, paths)
+        conn = sqlite3.connect(db_path)
+        try:
+            timings: dict[tuple[str, str], float] = {}
+            results: dict[str, list[list[tuple[object, ...]]]] = {}
+            for label, pred in preds.items():
+                results[label] = []
+                for group, sqls in _human_only_toggle_sql(pred).items():
+                    best = float('inf')
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        rows = [conn.execute(sql).fetchall() for sql in sqls]
+                        best = min(best, time.perf_counter() - start)
+                    timings[(label, group)] = best
+                    # join order may differ between the two plans
+                    results[label].extend(sorted(r) for r in rows)
+        finally:
+            conn.close()
+
+    legacy, new = results.values()
+    print(f'scale={scale} (best of {repeat})')
+    for (label, group), secs in timings.items():
+        print(f'{label:>17} {group:>16}: {secs * 1000:8.1f} ms')
+    print(f'results {"match" if legacy == new else "DIFFER"}')
+    return 0 if legacy == new else 1
+
+
+def _legacy_moderation_queries(
+        conn: sqlite3.Connection,
+) -> tuple[int, list[tuple[object, ...]], list[tuple[object, ...]]]:
+    # what run_moderation_effectiveness_analysis ran before the single pass:
+    # a placeholder count, then the same two CTEs for each of two aggregates
+    ua = database.sql_exclude_bot_users(users_table_alias='ua')
+    ur = database.sql_exclude_bot_users(users_table_alias='ur')
+    ph = moderation_effectiveness.PLACEHOLDER_REPORTER_USER_ID
+    ignored = conn.execute(
+        '''
+        SELECT COUNT(*) FROM interactions
+        WHERE lower(trim(coalesce(interaction_type, ''))) = 'report'
+        AND user_id = ?
+        ''',
+        (ph,),
+    ).fetchone()[0]
+    cte = f'''
+    WITH in_scope_posts AS (
+        SELECT p.post_id, t.topic_id, t.topic_name, t.category, t.moderation_level
+        FROM posts p
+        INNER JOIN users ua ON p.user_id = ua.user_id
+        INNER JOIN topics t ON p.topic_id = t.topic_id
+        WHERE {ua} AND p.topic_id IS NOT NULL
+    ),
+    human_reports AS (
+        SELECT i.post_id, COUNT(*) AS cnt
+        FROM interactions i
+        INNER JOIN users ur ON i.user_id = ur.user_id
+        WHERE lower(trim(coalesce(i.interaction_type, ''))) = 'report'
+        AND {ur}
+        AND i.user_id != '{ph}'
+        GROUP BY i.post_id
+    )
+    '''
+    summary = conn.execute(cte + '''
+    SELECT
+        isp.category,
+        isp.moderation_level,
+        COUNT(DISTINCT isp.post_id),
+        SUM(COALESCE(hr.cnt, 0)),
+        (SUM(COALESCE(hr.cnt, 0)) * 1.0 / COUNT(DISTINCT isp.post_id)),
+        (100.0 * SUM(CASE WHEN COALESCE(hr.cnt, 0) > 0 THEN 1 ELSE 0 END)
+            / COUNT(DISTINCT isp.post_id))
+    FROM in_scope_posts isp
+    LEFT JOIN human_reports hr ON hr.post_id = isp.post_id
+    GROUP BY isp.category, isp.moderation_level
+    ORDER BY isp.category, isp.moderation_level
+    ''').fetchall()
+    topics = conn.execute(cte + '''
+    SELECT
+        isp.topic_id, isp.topic_name, isp.category, isp.moderation_level,
+        COUNT(DISTINCT isp.post_id),
+        SUM(COALESCE(hr.cnt, 0))
+    FROM in_scope_posts isp
+    LEFT JOIN human_reports hr ON hr.post_id = isp.post_id
+    GROUP BY isp.topic_id, isp.topic_name, isp.category, isp.moderation_level
+    ORDER BY isp.category, isp.moderation_level, isp.topic_id
+    ''').fetchall()
+    return int(ignored), summary, topics
+
+
+def _table_passes(
+        conn: sqlite3.Connection,
+        table_name: str,
+        run: Callable[[sqlite3.Connection], object],
+) -> int:
+    """How many of the statements ``run`` executes read ``table_name`` (or one of its indexes)."""
+    roots = {
+        r[0] for r in conn.execute(
+            'SELECT rootpage FROM sqlite_master WHERE tbl_name = ? AND rootpage > 0',
+            (table_name,),
+        )
+    }
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    try:
+        run(conn)
+    finally:
+        conn.set_trace_callback(None)
+    passes = 0
+    for sql in statements:
+        # statements on temp tables may not be EXPLAINable once they are dropped
+        if table_name not in sql or sql.lstrip().upper().startswith(('DROP', 'CREATE INDEX')):
+            continue
+        # (addr, opcode, p1, p2, p3, ...): OpenRead p2 = root page, p3 = schema (0 = main)
+        passes += any(
+            row[1] == 'OpenRead' and row[3] in roots and row[4] == 0
+            for row in conn.execute(f'EXPLAIN {sql}')
+        )
+    return passes
+
+
+def bench_moderation(*, scale: int, repeat: int) -> int:
+    def legacy(conn: sqlite3.Connection) -> object:
+        return _legacy_moderation_queries(conn)
+
+    def single_pass(conn: sqlite3.Connection) -> object:
+        r = moderation_effectiveness._compute_moderation_effectiveness(conn)
+        return r.ignored_placeholder_reports, r.summary_rows, r.topic_rows
+
+    runs = {'three-pass (CTE x2)': legacy, 'single pass': single_pass}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale)
+        db_path = os.path.join(tmp, 'bench.db')
+        _load_scaled_demo_db(db_path, paths)
+        conn = sqlite3.connect(db_path)
+        try:
+            n_interactions = conn.execute('SELECT COUNT(*) FROM interactions').fetchone()[0]
+            results = {}
+            for label, run in runs.items():
+                passes = _table_passes(conn, 'interactions', run)
+                best = float('inf')
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    out = run(conn)
+                    best = min(best, time.perf_counter() - start)
+                results[label] = (passes, best, out)
+        finally:
+            conn.close()
+
+    print(f'interactions rows: {n_interactions} (scale={scale}, best of {repeat})')
+    for label, (passes, secs, _) in results.items():
+        print(f'{label:>20}: {passes} statement(s) read interactions  {secs * 1000:9.1f} ms')
+    (_, _, old), (_, _, new) = results.values()
+    print(f'results {"match" if old == new else "DIFFER"}')
+    return 0 if old == new else 1
+
+
+def bench_aggregate_cache(*, scale: int, repeat: int) -> int:
+    queries: dict[str, Callable[[sqlite3.Connection], object]] = {
+        'three-way distribution': lambda conn: categorical_analysis.query_three_way_distribution(
+            conn, human_only=True,
+        ),
+        'hour x topic counts': lambda conn: hour_topic_pivot.query_hour_topic_counts(
+            conn, hour_filter=None, topic_id_filter=None,
+        ),
+        'moderation effectiveness': moderation_effectiveness.run_moderation_effectiveness_analysis,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale)
+        db_path = os.path.join(tmp, 'bench.db')
+        _load_scaled_demo_db(db_path, paths)
+        conn = sqlite3.connect(db_path)
+        try:
+            print(f'scale={scale}, best of {repeat}')
+            for label, run in queries.items():
+                cold = warm = float('inf')
+                for _ in range(repeat):
+                    aggregate_cache.clear()
+                    start = time.perf_counter()
+                    run(conn)
+                    cold = min(cold, time.perf_counter() - start)
+                    start = time.perf_counter()
+                    run(conn)
+                    warm = min(warm, time.perf_counter() - start)
+                print(f'{label:>25}: cold {cold * 1000:9.1f} ms  warm {warm * 1000:7.2f} ms')
+        finally:
+            conn.close()
+    return 0
+
+
+def _import_tables(db_path: str, paths: list[str], *, append: bool) -> float:
+    conn = sqlite3.connect(db_path)
+    try:
+        start = time.perf_counter()
+        for path in paths:
+            table_name = database.table_name_for_csv(path)
+            headers, rows = database.read_csv_rows(path)
+            if append:
+                keys, _ = database.upsert_table_data(
+                    db_path, table_name=table_name, headers=headers, rows=rows, conn=conn,
+                )
+                utilities.cleanup_selection(conn, table_name, keys, apply=True)
+            else:
+                database.replace_table_data(
+                    db_path, table_name=table_name, headers=headers, rows=rows, conn=conn,
+                )
+                utilities.cleanup_entire_table(conn, table_name, apply=True)
+        return time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def bench_append(*, scale: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs = {}
+        for name in ('base', 'full', 'delta'):
+            dirs[name] = os.path.join(tmp, name)
+            os.mkdir(dirs[name])
+        base_paths = write_scaled_demo_csvs(dirs['base'], scale=scale)
+        full_paths = write_scaled_demo_csvs(dirs['full'], scale=scale + 1)
+        delta_paths = write_scaled_demo_csvs(dirs['delta'], scale=1, first_copy=scale)
+        # the base is what earlier uploads left behind: loaded and cleaned up
+        base_db = os.path.join(tmp, 'base.db')
+        _load_scaled_demo_db(base_db, base_paths)
+        _cleanup_all_tables(base_db, bulk=True)
+
+        results = {}
+        for label, paths, append in (
+                ('replace (full files)', full_paths, False),
+                ('append (new rows only)', delta_paths, True),
+        ):
+            db_path = os.path.join(tmp, f'{label.split()[0]}.db')
+            shutil.copy(base_db, db_path)
+            secs = _import_tables(db_path, paths, append=append)
+            results[label] = (secs, _dump_tables(db_path))
+
+    print(f'base: demo x{scale}, upload: demo x1 more (all four tables, each followed by cleanup)')
+    for label, (secs, _) in results.items():
+        print(f'{label:>22}: {secs:8.2f}s')
+    (_, old), (_, new) = results.values()
+    print(f'resulting tables {"match" if old == new else "DIFFER"}')
+    return 0 if old == new else 1
+
+
+def _legacy_missing_fk_keys(conn: sqlite3.Connection, table_name: str) -> dict[str, set[str]]:
+    # how imports found missing parents before database._missing_fk_keys: every
+    # parent key in a Python set, then a strip()/lookup per row and column
+    cols = database._RELATIONAL_INSERT_COLUMNS[table_name]
+    fks = database._RELATIONAL_FOREIGN_KEYS[table_name]
+    parent_keys = {
+        col: {r[0] for r in conn.execute(f'SELECT {key} FROM {parent}').fetchall()}
+        for col, parent, key, _required in fks
+    }
+    checks = [(col, cols.index(col)) for col, _parent, _key, _required in fks]
+    missing: dict[str, set[str]] = {}
+    for row in conn.execute(f'SELECT {", ".join(cols)} FROM {table_name}'):
+        for col, i in checks:
+            value = row[i]
+            if value is None or str(value).strip() == '':
+                continue
+            key = str(value).strip()
+            if key not in parent_keys[col]:
+                missing.setdefault(col, set()).add(key)
+    return missing
+
+
+def bench_fk_validation(*, scale: int) -> int:
+    runs: dict[str, Callable[[sqlite3.Connection, str], dict[str, set[str]]]] = {
+        'python key sets': _legacy_missing_fk_keys,
+        'anti-join': lambda conn, table_name: database._missing_fk_keys(
+            conn, table_name, source=table_name,
+        ),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale)
+        db_path = os.path.join(tmp, 'bench.db')
+        _load_scaled_demo_db(db_path, paths)
+        conn = sqlite3.connect(db_path)
+        try:
+            ok = True
+            print(f'scale={scale}')
+            for table_name in ('posts', 'interactions'):
+                n_rows = conn.execute(f'SELECT COUNT(*) FROM {table_name}').fetchone()[0]
+                results = []
+                for label, run in runs.items():
+                    start = time.perf_counter()
+                    results.append(run(conn, table_name))
+                    secs = time.perf_counter() - start
+                    # separate run: tracing allocations slows the Python loop down
+                    tracemalloc.start()
+                    run(conn, table_name)
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    print(
+                        f'{table_name:>12} ({n_rows} rows) {label:>15}: '
+                        f'{secs:7.2f}s  peak Python memory {peak / 2**20:8.1f} MiB',
+                    )
+                ok = ok and results[0] == results[1]
+        finally:
+            conn.close()
+    print(f'missing keys {"match" if ok else "DIFFER"}')
+    return 0 if ok else 1
+
+
+def _create_database_child(
+        db_path: str,
+        paths: list[str],
+        bulk: bool,
+        workers: int,
+) -> tuple[float, float]:
+    # CPU time of this (the writer) process only, not of its type workers
+    start, start_cpu = time.perf_counter(), time.process_time()
+    database.create_database(db_path, paths, bulk=bulk, workers=workers)
+    return time.perf_counter() - start, time.process_time() - start_cpu
+
+
+def bench_bulk_load(*, scale: int, repeat: int, workers: int) -> int:
+    variants = (
+        ('row-checked', False, 0),
+        ('bulk', True, 0),
+        (f'bulk, {workers} workers', True, workers),
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale, drop_orphans=True)
+        results = {}
+        for i, (label, bulk, n_workers) in enumerate(variants):
+            db_path = os.path.join(tmp, f'{i}.db')
+            secs, cpu = min(
+                _run_in_fresh_process(_create_database_child, db_path, paths, bulk, n_workers)
+                for _ in range(repeat)
+            )
+            results[label] = (secs, cpu, _dump_tables(db_path))
+        n_rows = sum(len(rows) for rows in results['bulk'][2].values())
+
+    print(
+        f'create_database, demo x{scale} without orphans: {n_rows} rows in four tables '
+        f'(best of {repeat}, {os.cpu_count()} CPU(s))',
+    )
+    for label, (secs, cpu, _) in results.items():
+        print(
+            f'{label:>20}: {secs:7.2f}s  {n_rows / secs:10,.0f} rows/s  '
+            f'writer CPU {cpu:7.2f}s',
+        )
+    dumps = [dump for _, _, dump in results.values()]
+    same = all(dump == dumps[0] for dump in dumps)
+    print(f'resulting tables {"match" if same else "DIFFER"}')
+    return 0 if same else 1
+
+
+def bench_row_typing(*, scale: int, repeat: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale)
+        tables = {}
+        for path in paths:
+            table_name = database.table_name_for_csv(path)
+            headers, rows = database._read_csv_rows(path)
+            tables[table_name] = (headers, list(rows))
+    # imports stream their rows; keep the preloaded ones out of the collector
+    gc.collect()
+    gc.freeze()
+
+    size = database.IMPORT_BATCH_SIZE
+    runs: dict[str, Callable[[str, list[str], list[tuple[str, ...]]], list[tuple]]] = {
+        'per row': lambda table_name, headers, batch: [
+            database._relational_insert_tuple(table_name, headers, row) for row in batch
+        ],
+        'columnar': lambda table_name, headers, batch: database._relational_batch_typer(
+            table_name, tuple(headers),
+        )(batch),
+    }
+    ok = True
+    print(f'scale={scale}, batches of {size} (best of {repeat})')
+    for table_name, (headers, rows) in tables.items():
+        batches = [rows[i: i + size] for i in range(0, len(rows), size)]
+        secs = {}
+        for label, run in runs.items():
+            best = float('inf')
+            for _ in range(repeat):
+                # batches are dropped once typed, as they are after executemany
+                start = time.perf_counter()
+                for batch in batches:
+                    run(table_name, headers, batch)
+                best = min(best, time.perf_counter() - start)
+            secs[label] = best
+        old_secs, new_secs = secs.values()
+        speedup = old_secs / new_secs if new_secs > 0 else float('inf')
+        print(
+            f'{table_name:>12} ({len(rows)} rows): per row {old_secs:6.2f}s  '
+            f'columnar {new_secs:6.2f}s  ({speedup:.1f}x)',
+        )
+        ok = ok and all(
+            runs['per row'](table_name, headers, batch) == runs['columnar'](table_name, headers, batch)
+            for batch in batches
+        )
+    print(f'typed rows {"match" if ok else "DIFFER"}')
+    return 0 if ok else 1
+
+
+def _best_of(repeat: int, run: Callable[[], object]) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_posts_paging(*, scale: int, repeat: int) -> int:
+    page_size = ui._FILTER_PAGE_SIZE
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale, drop_orphans=True)
+        db_path = os.path.join(tmp, 'bench.db')
+        database.create_database(db_path, paths)
+        conn = sqlite3.connect(db_path)
+        try:
+            ok = True
+            print(f'scale={scale}, pages of {page_size} (best of {repeat})')
+            for hour in (None, 9):
+                index_sql, index_params = ui._build_filtered_posts_page_index_sql(
+                    hour=hour, topic_id=None, page_size=page_size,
+                )
+                index_secs = _best_of(repeat, lambda: conn.execute(index_sql, index_params).fetchall())
+                starts = conn.execute(index_sql, index_params).fetchall()
+                total = starts[0][2]
+                # the window used to block on this COUNT(*) before showing anything
+                where, params = ui._filtered_posts_where_and_params(hour=hour, topic_id=None)
+                count_sql = (
+                    f'SELECT COUNT(*) FROM posts p INNER JOIN users u ON p.user_id = u.user_id '
+                    f'WHERE {where}'
+                )
+                count_secs = _best_of(repeat, lambda: conn.execute(count_sql, params).fetchone())
+                print(
+                    f'hour={hour}: {total} matches, {len(starts)} pages; up-front COUNT '
+                    f'{count_secs * 1000:.1f} ms, background count + page index '
+                    f'{index_secs * 1000:.1f} ms',
+                )
+                for label, page in (('first', 0), ('middle', len(starts) // 2), ('last', len(starts) - 1)):
+                    key = None if page == 0 else starts[page][:2]
+                    seek_sql, seek_params = ui._build_filtered_posts_select_sql(
+                        hour=hour, topic_id=None, limit=page_size + 1, start_key=key,
+                    )
+                    # the page query the window used to run
+                    offset_sql, offset_params = ui._build_filtered_posts_select_sql(
+                        hour=hour, topic_id=None, limit=page_size,
+                    )
+                    offset_sql = offset_sql.replace('LIMIT ?', 'LIMIT ? OFFSET ?')
+                    offset_params = [*offset_params, page * page_size]
+                    offset_secs = _best_of(repeat, lambda: conn.execute(offset_sql, offset_params).fetchall())
+                    seek_secs = _best_of(repeat, lambda: conn.execute(seek_sql, seek_params).fetchall())
+                    print(
+                        f'  {label:>6} page {page + 1:>5}: OFFSET {offset_secs * 1000:8.2f} ms  '
+                        f'keyset {seek_secs * 1000:6.2f} ms',
+                    )
+                    same = (
+                        conn.execute(offset_sql, offset_params).fetchall()
+                        == conn.execute(seek_sql, seek_params).fetchall()[:page_size]
+                    )
+                    ok = ok and same
+        finally:
+            conn.close()
+    print(f'pages {"match" if ok else "DIFFER"}')
+    return 0 if ok else 1
+
+
+def bench_query_rows(*, scale: int, calls: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale, drop_orphans=True)
+        db_path = os.path.join(tmp, 'bench.db')
+        database.create_database(db_path, paths)
+        conn = sqlite3.connect(db_path)
+        try:
+            post_ids = [r[0] for r in conn.execute('SELECT post_id FROM posts LIMIT ?', (calls,))]
+        finally:
+            conn.close()
+
+        def lookups(db: str | database.ConnectionManager) -> list[list[dict[str, str]]]:
+            return [
+                database.query_rows(db, table_name='posts', filters={'post_id': post_id}, limit=1)
+                for post_id in post_ids
+            ]
+
+        start = time.perf_counter()
+        per_call = lookups(db_path)
+        per_call_secs = time.perf_counter() - start
+        with database.ConnectionManager(db_path) as manager:
+            start = time.perf_counter()
+            managed = lookups(manager)
+            managed_secs = time.perf_counter() - start
+
+    n = len(post_ids)
+    print(f'query_rows by post_id, {n} calls (scale={scale})')
+    print(f'  connection per call: {per_call_secs * 1e6 / n:8.1f} us/call')
+    print(f'   ConnectionManager: {managed_secs * 1e6 / n:8.1f} us/call')
+    print(f'rows {"match" if per_call == managed else "DIFFER"}')
+    return 0 if per_call == managed else 1
+
+
+def bench_snapshot(*, scale: int, repeat: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale, drop_orphans=True)
+        db_path = os.path.join(tmp, 'bench.db')
+        database.create_database(db_path, paths)
+        snap_dir = os.path.join(tmp, 'snapshot')
+        conn = sqlite3.connect(db_path)
+        try:
+            start = time.perf_counter()
+            fmt = snapshot.export_snapshot(conn, snap_dir)
+            export_secs = time.perf_counter() - start
+            snap = snapshot.open_snapshot(snap_dir)
+
+            results = {}
+            for human_only in (False, True):
+                for label, source in (('sqlite', conn), ('snapshot', snap)):
+                    def load() -> tuple[pd.Series, pd.Series]:
+                        df_posts = analysis.fetch_posts_timestamps_df(source, human_only=human_only)
+                        df_int = analysis.fetch_interactions_timestamps_df(source, human_only=human_only)
+                        return analysis.frame_datetimes(df_posts), analysis.frame_datetimes(df_int)
+
+                    secs = _best_of(repeat, load)
+                    posts_dt, int_dt = load()
+                    results[human_only, label] = (
+                        secs,
+                        np.sort(posts_dt.to_numpy('datetime64[s]')),
+                        np.sort(int_dt.to_numpy('datetime64[s]')),
+                    )
+        finally:
+            conn.close()
+
+    ok = True
+    print(f'posts + interactions time bases with parsed datetimes (scale={scale}, best of {repeat})')
+    print(f'  {fmt} snapshot export: {export_secs:8.2f} s (once)')
+    for human_only in (False, True):
+        sql_secs, *sql_cols = results[human_only, 'sqlite']
+        snap_secs, *snap_cols = results[human_only, 'snapshot']
+        same = all(
+            np.array_equal(a, b, equal_nan=True)
+            for a, b in zip(sql_cols, snap_cols)
+        )
+        ok = ok and same
+        print(f'  human_only={human_only!s:5}')
+        print(f'    read_sql_query: {sql_secs * 1e3:8.1f} ms')
+        print(f'          snapshot: {snap_secs * 1e3:8.1f} ms')
+        print(f'    datetimes {"match" if same else "DIFFER"}')
+    return 0 if ok else 1
+
+
+def _legacy_normalize_timestamps(raw: pd.Series) -> pd.Series:
+    s = raw.astype(str).str.strip()
+    s = s.replace({'': pd.NA, 'nan': pd.NA, 'None': pd.NA})
+    s = s.str.replace('/', '-', regex=False)
+    return pd.to_datetime(s, format='mixed', errors='coerce', utc=False)
+
+
+def _demo_like_timestamps(n: int, *, distinct: int) -> pd.Series:
+    """``n`` timestamp strings drawn from ``distinct`` values in the demo's mixed layouts."""
+    rng = np.random.default_rng(0)
+    base = np.datetime64('2023-01-01T00:00:00')
+    seconds = rng.integers(0, 365 * 86400, size=distinct)
+    iso = np.datetime_as_string(base + seconds.astype('timedelta64[s]'), unit='s')
+    layouts = [
+        lambda t: t.replace('T', ' '),
+        lambda t: t.replace('-', '/').replace('T', ' '),
+        lambda t: t,
+        lambda t: t[:16].replace('T', ' '),
+        lambda t: t[:10],
+    ]
+    pool = np.array(
+        [layouts[i % len(layouts)](str(t)) for i, t in enumerate(iso)] + ['', 'bad'],
+        dtype=object,
+    )
+    return pd.Series(pool[rng.integers(0, len(pool), size=n)])
+
+
+def bench_timestamps(*, rows: int, distinct: int) -> int:
+    raw = _demo_like_timestamps(rows, distinct=distinct)
+    start = time.perf_counter()
+    legacy = _legacy_normalize_timestamps(raw)
+    legacy_secs = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = analysis.normalize_sqlite_timestamp_series(raw)
+    fast_secs = time.perf_counter() - start
+
+    same = legacy.astype('datetime64[us]').equals(fast)
+    print(f'normalize_sqlite_timestamp_series, {rows:,} rows / {distinct:,} distinct')
+    print(f"  format='mixed' per row: {legacy_secs:8.2f} s")
+    print(f'  per distinct, by layout: {fast_secs:8.2f} s')
+    print(f'datetimes {"match" if same else "DIFFER"}')
+    return 0 if same else 1
+
+
+def bench_figure_cache(*, scale: int, repeat: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale, drop_orphans=True)
+        db_path = os.path.join(tmp, 'bench.db')
+        database.create_database(db_path, paths)
+        conn = sqlite3.connect(db_path)
+        try:
+            def pivot_figure() -> Figure:
+                matrix, _keys, labels = hour_topic_pivot.build_pivot_matrix(
+                    hour_topic_pivot.query_hour_topic_counts(conn, hour_filter=None, topic_id_filter=None),
+                )
+                return hour_topic_pivot.build_hour_topic_pivot_figure(matrix, labels)
+
+            charts: dict[str, tuple[tuple[str, ...], Callable[[], Figure]]] = {
+                'analysis_charts': (
+                    ui._ANALYSIS_CHARTS_TABLES,
+                    lambda: analysis.build_analysis_figure(conn, human_only=False),
+                ),
+                'categorical_analysis': (
+                    ui._CATEGORICAL_TABLES,
+                    lambda: categorical_analysis.build_categorical_analysis_figure(
+                        categorical_analysis.query_three_way_distribution(conn, human_only=False),
+                    ),
+                ),
+                'hour_topic_pivot': (ui._HOUR_TOPIC_TABLES, pivot_figure),
+                'moderation_effectiveness': (
+                    ui._MODERATION_TABLES,
+                    lambda: moderation_effectiveness.build_moderation_effectiveness_figure(
+                        moderation_effectiveness.run_moderation_effectiveness_analysis(conn),
+                    ),
+                ),
+            }
+            timings = {}
+            for name, (tables, build) in charts.items():
+                start = time.perf_counter()
+                rendered = figure_cache.cached_figure(
+                    conn,
+                    name=name,
+                    tables=tables,
+                    build=lambda: figure_cache.render(build()),
+                )
+                cold = time.perf_counter() - start
+                warm = _best_of(repeat, lambda: figure_cache.lookup(conn, name=name, tables=tables))
+                hit = figure_cache.lookup(conn, name=name, tables=tables) is rendered
+                timings[name] = (cold, warm, hit, rendered.width, rendered.height)
+        finally:
+            conn.close()
+            figure_cache.clear()
+
+    print(f'chart open, build + Agg render vs cached bitmap lookup (scale={scale})')
+    for name, (cold, warm, hit, width, height) in timings.items():
+        print(
+            f'  {name:24} {width}x{height}  cold {cold * 1e3:8.1f} ms'
+            f'  warm {warm * 1e3:6.2f} ms{"" if hit else "  (MISS)"}',
+        )
+    return 0 if all(t[2] for t in timings.values()) else 1
+
+
+def _legacy_plot_daily_post_counts(ax: object, df_posts: pd.DataFrame) -> None:
+    counts = analysis.frame_datetimes(df_posts).dropna().dt.normalize().value_counts().sort_index()
+    x = counts.index.to_numpy()
+    y = counts.to_numpy(dtype=float)
+    ax.plot(x, y, color='tab:blue', linewidth=1.2, marker='o', markersize=3)  # type: ignore[attr-defined]
+    smooth = np.convolve(y, np.ones(7) / 7, mode='valid')
+    ax.plot(x[3: 3 + len(smooth)], smooth, color='tab:orange', linewidth=1.5, alpha=0.85)  # type: ignore[attr-defined]
+
+
+def bench_daily_lod(*, rows: int, years: int, repeat: int) -> int:
+    rng = np.random.default_rng(0)
+    start_epoch = 1262304000  # 2010-01-01
+    df = pd.DataFrame({'ts_epoch': np.sort(rng.integers(start_epoch, start_epoch + years * 365 * 86400, rows))})
+
+    def draw(plot: Callable[[object, pd.DataFrame], None]) -> tuple[Figure, object]:
+        fig = Figure(figsize=(11, 4))
+        ax = fig.add_subplot(1, 1, 1)
+        plot(ax, df)
+        FigureCanvasAgg(fig).draw()
+        return fig, ax
+
+    legacy_secs = _best_of(repeat, lambda: draw(_legacy_plot_daily_post_counts))
+    def plot_lod(ax: object, df_posts: pd.DataFrame) -> None:
+        counts = analysis._daily_counts(analysis.frame_datetimes(df_posts))
+        analysis._plot_daily_post_counts(ax, counts)  # type: ignore[arg-type]
+
+    lod_secs = _best_of(repeat, lambda: draw(plot_lod))
+    legacy_fig, _ = draw(_legacy_plot_daily_post_counts)
+    legacy_redraw_secs = _best_of(repeat, legacy_fig.canvas.draw)
+    fig, ax = draw(plot_lod)
+    lod_redraw_secs = _best_of(repeat, fig.canvas.draw)
+    overview_points = len(ax.lines[0].get_xdata())  # type: ignore[attr-defined]
+    end = np.datetime64(start_epoch + years * 365 * 86400, 's')
+
+    def zoom() -> None:
+        ax.set_xlim(end - np.timedelta64(60, 'D'), end)  # type: ignore[attr-defined]
+        fig.canvas.draw()
+        ax.set_xlim(end - np.timedelta64(years * 365, 'D'), end)  # type: ignore[attr-defined]
+        fig.canvas.draw()
+
+    zoom_secs = _best_of(repeat, zoom) / 2
+
+    print(f'posts per day chart, {rows:,} posts over {years} years: build + Agg draw / redraw only')
+    print(f'  every day, markers:  {legacy_secs * 1e3:8.1f} ms / {legacy_redraw_secs * 1e3:6.1f} ms')
+    print(
+        f'  level of detail:     {lod_secs * 1e3:8.1f} ms / {lod_redraw_secs * 1e3:6.1f} ms'
+        f'  ({overview_points} points at full range)',
+    )
+    print(f'  zoom / unzoom, switching level and redrawing: {zoom_secs * 1e3:6.1f} ms')
+    return 0
+
+
+def _legacy_daily_interaction_counts(conn: sqlite3.Connection, *, human_only: bool) -> pd.DataFrame:
+    df = analysis.fetch_interactions_timestamps_df(conn, human_only=human_only)
+    frame = pd.DataFrame({
+        'day': analysis.frame_datetimes(df).dt.normalize(),
+        'itype': analysis._normalize_interaction_type_labels(df['interaction_type']),
+    }).dropna(subset=['day'])
+    counts = frame.groupby(['day', 'itype']).size().unstack(fill_value=0)
+    return counts.sort_index().asfreq('D', fill_value=0)
+
+
+def bench_daily_interactions(*, scale: int, repeat: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale, drop_orphans=True)
+        db_path = os.path.join(tmp, 'bench.db')
+        database.create_database(db_path, paths)
+        conn = sqlite3.connect(db_path)
+        try:
+            # time the ts_day query, not the rollup (see the ``rollups`` benchmark)
+            database.drop_rollup_triggers(conn)
+            conn.commit()
+            rows = conn.execute('SELECT COUNT(*) FROM interactions').fetchone()[0]
+            timings = {}
+            for human_only in (False, True):
+                legacy = _legacy_daily_interaction_counts(conn, human_only=human_only)
+                fast = analysis.fetch_daily_interaction_counts(conn, human_only=human_only)
+                same = legacy[fast.columns].equals(fast)
+                cells = len(conn.execute(
+                    analysis._daily_interactions_sql(human_only=human_only, rollup=False),
+                ).fetchall())
+                timings[human_only] = (
+                    _best_of(repeat, lambda: _legacy_daily_interaction_counts(conn, human_only=human_only)),
+                    _best_of(repeat, lambda: analysis.fetch_daily_interaction_counts(conn, human_only=human_only)),
+                    cells,
+                    same,
+                )
+        finally:
+            conn.close()
+
+    print(f'interactions per day by type, {rows:,} interactions (scale={scale})')
+    for human_only, (legacy_secs, fast_secs, cells, same) in timings.items():
+        print(
+            f'  human_only={human_only!s:5}  all rows + pandas groupby {legacy_secs * 1e3:8.1f} ms'
+            f'  SQL by ts_day {fast_secs * 1e3:7.1f} ms ({cells:,} cells)'
+            f'{"" if same else "  (DIFFER)"}',
+        )
+    return 0 if all(t[3] for t in timings.values()) else 1
+
+
+def _rollup_reads(conn: sqlite3.Connection) -> dict[str, Callable[[], object]]:
+    # the uncached readers, so every call reaches SQLite
+    reads: dict[str, Callable[[], object]] = {}
+    for human_only in (False, True):
+        suffix = ', human only' if human_only else ''
+        reads[f'posts per day{suffix}'] = functools.partial(
+            analysis.fetch_daily_post_counts, conn, human_only=human_only,
+        )
+        reads[f'interactions per day by type{suffix}'] = functools.partial(
+            analysis.fetch_daily_interaction_counts, conn, human_only=human_only,
+        )
+        reads[f'category x moderation x content type{suffix}'] = lambda human_only=human_only: sorted(
+            categorical_analysis._query_three_way_distribution(conn, human_only=human_only),
+        )
+    reads['hour x topic, human only'] = functools.partial(
+        hour_topic_pivot._query_hour_topic_counts, conn, hour_filter=None, topic_id_filter=None,
+    )
+    return reads
+
+
+def _same_result(a: object, b: object) -> bool:
+    if isinstance(a, (pd.Series, pd.DataFrame)):
+        return a.equals(b)
+    return a == b
+
+
+def bench_rollups(*, scale: int, repeat: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_scaled_demo_csvs(tmp, scale=scale, drop_orphans=True)
+        delta_dir = os.path.join(tmp, 'delta')
+        os.mkdir(delta_dir)
+        delta_paths = write_scaled_demo_csvs(delta_dir, scale=1, first_copy=scale, drop_orphans=True)
+        rollup_db = os.path.join(tmp, 'rollup.db')
+        database.create_database(rollup_db, paths)
+        raw_db = os.path.join(tmp, 'raw.db')
+        shutil.copy(rollup_db, raw_db)
+        with closing(sqlite3.connect(raw_db)) as conn:
+            database.drop_rollup_triggers(conn)
+            conn.commit()
+            posts = conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+            interactions = conn.execute('SELECT COUNT(*) FROM interactions').fetchone()[0]
+            sizes = {
+                rollup: conn.execute(f'SELECT COUNT(*) FROM {rollup}').fetchone()[0]
+                for rollup in database._ROLLUPS
+            }
+
+        ok = True
+        print(f'{posts:,} posts, {interactions:,} interactions (scale={scale}, best of {repeat})')
+        print('  rollup rows: ' + ', '.join(f'{name} {n:,}' for name, n in sizes.items()))
+        with closing(sqlite3.connect(rollup_db)) as rollup_conn, closing(sqlite3.connect(raw_db)) as raw_conn:
+            for (label, read), raw_read in zip(_rollup_reads(rollup_conn).items(), _rollup_reads(raw_conn).values()):
+                same = _same_result(read(), raw_read())
+                ok = ok and same
+                print(
+                    f'  {label:>48}: raw {_best_of(repeat, raw_read) * 1e3:7.1f} ms'
+                    f'  rollup {_best_of(repeat, read) * 1e3:6.1f} ms{"" if same else "  (DIFFER)"}',
+                )
+
+        # uploading one more copy with cleanup: the triggers' cost on appends
+        append_secs = {}
+        for label, db_path in (('with rollup triggers', rollup_db), ('without', raw_db)):
+            append_secs[label] = _import_tables(db_path, delta_paths, append=True)
+        with closing(sqlite3.connect(raw_db)) as conn:
+            start = time.perf_counter()
+            database.ensure_rollups(conn)
+            conn.commit()
+            rebuild_secs = time.perf_counter() - start
+        with closing(sqlite3.connect(rollup_db)) as rollup_conn, closing(sqlite3.connect(raw_db)) as raw_conn:
+            same = all(
+                _same_result(read(), rebuilt())
+                for read, rebuilt in zip(_rollup_reads(rollup_conn).values(), _rollup_reads(raw_conn).values())
+            )
+        ok = ok and same
+
+    print('  append one demo copy + cleanup: ' + ', '.join(f'{k} {v:.2f}s' for k, v in append_secs.items()))
+    print(
+        f'  full rollup rebuild (after a bulk load): {rebuild_secs:.2f}s'
+        f'  incremental and rebuilt rollups {"match" if same else "DIFFER"}',
+    )
+    return 0 if ok else 1
+
+
+def _legacy_build_pivot_matrix(
+        rows: list[tuple[int, str | None, str | None, int]],
+) -> tuple[np.ndarray, list[str], list[str]]:
+    # what build_pivot_matrix did before: dict accumulation, a cell lookup per
+    # hour and topic
+    totals: dict[str, int] = {}
+    cell: dict[tuple[int, str], int] = {}
+    for hod, tid, _tname, cnt in rows:
+        key = hour_topic_pivot._bucket_key(tid)
+        totals[key] = totals.get(key, 0) + cnt
+        cell[(hod, key)] = cell.get((hod, key), 0) + cnt
+    if not totals:
+        return np.zeros((24, 0)), [], []
+    topic_keys = sorted(totals.keys(), key=lambda k: (-totals[k], k))
+    mat = np.zeros((24, len(topic_keys)), dtype=float)
+    for j, key in enumerate(topic_keys):
+        for i in range(24):
+            mat[i, j] = float(cell.get((i, key), 0))
+    labels = ['(no topic)' if k == hour_topic_pivot._NULL_TOPIC_KEY else k for k in topic_keys]
+    return mat, topic_keys, labels
+
+
+def bench_pivot_matrix(*, topics: int, repeat: int) -> int:
+    # one row per non-empty (hour, topic) cell, as query_hour_topic_counts
+    # returns them; a wide topic set active in a few hours each
+    rng = np.random.default_rng(0)
+    rows: list[tuple[int, str | None, str | None, int]] = sorted({
+        (int(h), f'topic_{t:06d}' if t else None, None, int(c))
+        for t, h, c in zip(
+            rng.integers(0, topics, topics * 6),
+            rng.integers(0, 24, topics * 6),
+            rng.integers(1, 50, topics * 6),
+        )
+    }, key=lambda r: (r[0], r[1] or ''))
+    legacy = _legacy_build_pivot_matrix(rows)
+    fast = hour_topic_pivot.build_pivot_matrix(rows)
+    sparse, _keys, _labels = hour_topic_pivot.build_sparse_pivot(rows)
+    same = (
+        np.array_equal(legacy[0], fast[0])
+        and legacy[1:] == fast[1:]
+        and np.array_equal(sparse.toarray(), fast[0])
+    )
+    legacy_secs = _best_of(repeat, lambda: _legacy_build_pivot_matrix(rows))
+    fast_secs = _best_of(repeat, lambda: hour_topic_pivot.build_pivot_matrix(rows))
+    sparse_secs = _best_of(repeat, lambda: hour_topic_pivot.build_sparse_pivot(rows))
+    matrix = fast[0]
+    # the pivot window's numeric grid, one text row per hour
+    legacy_text_secs = _best_of(repeat, lambda: [
+        [str(int(matrix[h, j])) for j in range(matrix.shape[1])] for h in range(24)
+    ])
+    text_secs = _best_of(repeat, lambda: matrix.astype(int).astype(str).tolist())
+
+    n_topics = matrix.shape[1]
+    print(f'hour x topic pivot, {len(rows):,} non-empty cells, {n_topics:,} topics (best of {repeat})')
+    print(f'  dicts + per-cell loop:     {legacy_secs * 1e3:8.1f} ms')
+    print(f'  factorised + bincount:     {fast_secs * 1e3:8.1f} ms ({matrix.nbytes / 1e6:.1f} MB dense)')
+    print(
+        f'  sparse (non-zero cells):   {sparse_secs * 1e3:8.1f} ms '
+        f'({(sparse.hours.nbytes + sparse.columns.nbytes + sparse.counts.nbytes) / 1e6:.1f} MB)',
+    )
+    print(f'  grid text, per cell / astype: {legacy_text_secs * 1e3:6.1f} ms / {text_secs * 1e3:6.1f} ms')
+    print(f'matrices {"match" if same else "DIFFER"}')
+    return 0 if same else 1
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_rss = subparsers.add_parser(
+        'import-rss',
+        help='peak RSS of the eager vs streaming CSV import of interactions',
+    )
+    import_rss.add_argument('--scale', type=int, default=100)
+
+    cleanup = subparsers.add_parser(
+        'cleanup',
+        help='per-row vs bulk cleanup of every table (parity check and timings)',
+    )
+    cleanup.add_argument('--scale', type=int, default=20)
+
+    human_only = subparsers.add_parser(
+        'human-only',
+        help='latency of the human-only toggle queries, account_type expression vs is_bot',
+    )
+    human_only.add_argument('--scale', type=int, default=100)
+    human_only.add_argument('--repeat', type=int, default=5)
+
+    moderation = subparsers.add_parser(
+        'moderation',
+        help='interactions scans and latency of the moderation effectiveness analysis, old vs single pass',
+    )
+    moderation.add_argument('--scale', type=int, default=1000)
+    moderation.add_argument('--repeat', type=int, default=3)
+
+    cache = subparsers.add_parser(
+        'aggregate-cache',
+        help='first (computed) vs repeated (cached) open of the analysis dialogs',
+    )
+    cache.add_argument('--scale', type=int, default=100)
+    cache.add_argument('--repeat', type=int, default=3)
+
+    append = subparsers.add_parser(
+        'append',
+        help='uploading one more demo copy: full table replace vs append of the new rows',
+    )
+    append.add_argument('--scale', type=int, default=100)
+
+    fk_validation = subparsers.add_parser(
+        'fk-validation',
+        help='time and Python memory of the missing-parent check, key sets vs anti-joins',
+    )
+    fk_validation.add_argument('--scale', type=int, default=100)
+
+    bulk_load = subparsers.add_parser(
+        'bulk-load',
+        help='rows/s of create_database: row-checked, bulk, bulk with type workers',
+    )
+    bulk_load.add_argument('--scale', type=int, default=100)
+    bulk_load.add_argument('--repeat', type=int, default=3)
+    bulk_load.add_argument('--workers', type=int, default=2)
+
+    row_typing = subparsers.add_parser(
+        'row-typing',
+        help='CSV row typing for the relational tables, per row vs columnar batches',
+    )
+    row_typing.add_argument('--scale', type=int, default=100)
+    row_typing.add_argument('--repeat', type=int, default=3)
+
+    posts_paging = subparsers.add_parser(
+        'posts-paging',
+        help='filtered-posts pages by LIMIT / OFFSET vs keyset seeks',
+    )
+    posts_paging.add_argument('--scale', type=int, default=100)
+    posts_paging.add_argument('--repeat', type=int, default=5)
+
+    query_rows = subparsers.add_parser(
+        'query-rows',
+        help='query_rows in a loop, a connection per call vs a ConnectionManager',
+    )
+    query_rows.add_argument('--scale', type=int, default=20)
+    query_rows.add_argument('--calls', type=int, default=5000)
+
+    snapshot_cmd = subparsers.add_parser(
+        'snapshot',
+        help='analysis time-base loads from SQLite vs a columnar snapshot',
+    )
+    snapshot_cmd.add_argument('--scale', type=int, default=100)
+    snapshot_cmd.add_argument('--repeat', type=int, default=3)
+
+    timestamps = subparsers.add_parser(
+        'timestamps',
+        help="timestamp text parsing, format='mixed' per row vs per distinct string by layout",
+    )
+    timestamps.add_argument('--rows', type=int, default=10_000_000)
+    timestamps.add_argument('--distinct', type=int, default=500_000)
+
+    figure_cache_cmd = subparsers.add_parser(
+        'figure-cache',
+        help='chart open cost, building and rendering the figure vs reusing its cached bitmap',
+    )
+    figure_cache_cmd.add_argument('--scale', type=int, default=100)
+    figure_cache_cmd.add_argument('--repeat', type=int, default=20)
+
+    daily_lod = subparsers.add_parser(
+        'daily-lod',
+        help='posts per day chart over many years, every day vs week / month level of detail',
+    )
+    daily_lod.add_argument('--rows', type=int, default=2_000_000)
+    daily_lod.add_argument('--years', type=int, default=15)
+    daily_lod.add_argument('--repeat', type=int, default=3)
+
+    daily_interactions = subparsers.add_parser(
+        'daily-interactions',
+        help='interactions per day by type, counted in pandas from every row vs in SQLite by ts_day',
+    )
+    daily_interactions.add_argument('--scale', type=int, default=100)
+    daily_interactions.add_argument('--repeat', type=int, default=3)
+
+    rollups = subparsers.add_parser(
+        'rollups',
+        help='analysis reads from the rollup tables vs the raw tables, and the triggers\' cost on appends',
+    )
+    rollups.add_argument('--scale', type=int, default=100)
+    rollups.add_argument('--repeat', type=int, default=3)
+
+    pivot_matrix = subparsers.add_parser(
+        'pivot-matrix',
+        help='hour x topic pivot for a wide topic set, dict loops vs factorised NumPy (dense and sparse)',
+    )
+    pivot_matrix.add_argument('--topics', type=int, default=5000)
+    pivot_matrix.add_argument('--repeat', type=int, default=3)
+
+    commands: dict[str, Callable[..., int]] = {
+        'import-rss': bench_import_rss,
+        'cleanup': bench_cleanup,
+        'human-only': bench_human_only,
+        'moderation': bench_moderation,
+        'aggregate-cache': bench_aggregate_cache,
+        'append': bench_append,
+        'fk-validation': bench_fk_validation,
+        'bulk-load': bench_bulk_load,
+        'row-typing': bench_row_typing,
+        'posts-paging': bench_posts_paging,
+        'query-rows': bench_query_rows,
+        'snapshot': bench_snapshot,
+        'timestamps': bench_timestamps,
+        'figure-cache': bench_figure_cache,
+        'daily-lod': bench_daily_lod,
+        'daily-interactions': bench_daily_interactions,
+        'rollups': bench_rollups,
+        'pivot-matrix': bench_pivot_matrix,
+    }
+    # every option of a subcommand is a keyword argument of its bench_* function
+    options = vars(parser.parse_args(argv))
+    return commands[options.pop('command')](**options)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
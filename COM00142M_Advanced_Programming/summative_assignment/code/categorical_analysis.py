@@ -12,7 +12,10 @@ from collections import defaultdict
 import numpy as np
 from matplotlib.figure import Figure
 
+from aggregate_cache import cached_aggregate
+from database import rollup_current
 from database import sql_exclude_bot_users
+from database import sql_rollup_authors
 
 _MOD_ORDER = {'low': 0, 'medium': 1, 'high': 2}
 
@@ -41,23 +44,46 @@ def query_three_way_distribution(
     """
     Return rows (category, moderation_level, content_type, count), sorted by count descending.
     Empty strings replace SQL NULLs in the three key columns.
+
+    Cached until ``posts``, ``users`` or ``topics`` change.
     """
-    if human_only:
-        bot = sql_exclude_bot_users(users_table_alias='u')
-        human_clause = f' AND ({bot})'
+    return cached_aggregate(
+        conn,
+        name='three_way_distribution',
+        tables=('posts', 'users', 'topics'),
+        params=(human_only,),
+        compute=lambda: _query_three_way_distribution(conn, human_only=human_only),
+    )
+
+
+def _query_three_way_distribution(
+        conn: sqlite3.Connection,
+        *,
+        human_only: bool,
+) -> list[tuple[str, str, str, int]]:
+    if rollup_current(conn, 'agg_posts_topic_content_type'):
+        source = 'agg_posts_topic_content_type p'
+        human_clause = f' AND {sql_rollup_authors(human_only=human_only, table_alias="p")}'
+        count = 'SUM(p.row_count)'
     else:
-        human_clause = ''
+        source = 'posts p INNER JOIN users u ON p.user_id = u.user_id'
+        if human_only:
+            bot = sql_exclude_bot_users(users_table_alias='u')
+            human_clause = f' AND ({bot})'
+        else:
+            human_clause = ''
+        count = 'COUNT(*)'
     sql = f'''
         SELECT
             COALESCE(t.category, '') AS category,
             COALESCE(t.moderation_level, '') AS moderation_level,
             COALESCE(p.content_type, '') AS content_type,
-            COUNT(*) AS cnt
-        FROM posts p
-        INNER JOIN users u ON p.user_id = u.user_id
+            {count} AS cnt
+        FROM {source}
         INNER JOIN topics t ON p.topic_id = t.topic_id
         WHERE p.topic_id IS NOT NULL{human_clause}
         GROUP BY t.category, t.moderation_level, p.content_type
+        HAVING cnt > 0
         ORDER BY cnt DESC
     '''
     cur = conn.execute(sql)
@@ -1,16 +1,59 @@
 from __future__ import annotations
 
+import codecs
+import collections
 import csv
+import functools
+import io
+import itertools
+import multiprocessing
 import os
 import re
 import sqlite3
+import threading
+from collections.abc import Callable
 from collections.abc import Iterable
+from collections.abc import Iterator
 from collections.abc import Mapping
+from collections.abc import Sequence
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from contextlib import contextmanager
+
+from schema_catalogue import invalidate as invalidate_schema
+from schema_catalogue import table_columns
 
 
 _IDENTIFIER_RE = re.compile(r'[^a-z0-9_]+')
 _LEADING_DIGIT_RE = re.compile(r'^\d')
 
+# Encodings tried (in order) when reading CSV uploads.
+_CSV_ENCODINGS: tuple[str, ...] = ('utf-8', 'utf-8-sig', 'cp1252', 'latin-1')
+# Streaming imports pick the encoding from this many leading bytes.
+_ENCODING_SNIFF_BYTES = 64 * 1024
+# Rows per executemany() call on the streaming import path.
+IMPORT_BATCH_SIZE = 5000
+
+# incoming FK columns of an import, anti-joined against the parent tables
+_FK_STAGING_TABLE = 'temp.import_fk_staging'
+
+# page cache while bulk loading (the default is 2 MiB)
+BULK_LOAD_CACHE_KIB = 256 * 1024
+
+# create_database(workers=None) reads CSVs in worker processes once its
+# relational CSVs add up to this much (below it, starting the workers costs
+# more than it saves)
+PARALLEL_PARSE_MIN_BYTES = 32 * 1024 * 1024
+# bytes of a CSV each worker task reads, decodes and types
+_PARALLEL_CHUNK_BYTES = 1024 * 1024
+# chunks scanned without finding a record boundary (a field quoted across
+# them, or a stray quote that throws the count off for good) before the
+# rest of the CSV is read sequentially in the writer
+_RECORD_SCAN_CHUNKS = 4
+# typed chunks queued per worker ahead of the writer (bounds memory)
+_BATCHES_IN_FLIGHT_PER_WORKER = 2
+
 # Demo CSVs: TOPICS → USERS → POSTS → INTERACTIONS (FK dependency order)
 _RELATIONAL_TABLE_ORDER: tuple[str, ...] = (
     'topics',
@@ -19,6 +62,33 @@ _RELATIONAL_TABLE_ORDER: tuple[str, ...] = (
     'interactions',
 )
 
+# ``timestamp`` text as an ISO-8601 string SQLite's date functions accept:
+# ``YYYY/MM/DD`` and ``...T...`` are normalised, and ``DD-MM-YYYY`` /
+# ``DD/MM/YYYY`` are read day-first like the cleanup rules do (they rewrite
+# such dates day-first after every import). SQLite only reads zero-padded
+# ``YYYY-MM-DD[ HH:MM[:SS[.fff]]]``, so other text ('2024-1-5',
+# '2024-01-05 9:30', 'Jan 5 2024', ...) gets NULL generated columns: the
+# analysis charts parse those rows in Python (analysis.frame_datetimes), the
+# hour x topic pivot and the ts_day rollups leave them out.
+_TIMESTAMP_ISO_SQL = (
+    "CASE WHEN trim(timestamp) GLOB '[0-9][0-9][-/][0-9][0-9][-/][0-9][0-9][0-9][0-9]*' "
+    "THEN substr(trim(timestamp), 7, 4) || '-' || substr(trim(timestamp), 4, 2) || '-' "
+    "|| substr(trim(timestamp), 1, 2) || replace(substr(trim(timestamp), 11), 'T', ' ') "
+    "ELSE replace(replace(trim(timestamp), '/', '-'), 'T', ' ') END"
+)
+
+# Parsed once per row write: seconds since the epoch (naive timestamps taken
+# as UTC), hour of day and calendar day (days since 1970-01-01); NULL when the
+# text does not parse.
+TIMESTAMP_GENERATED_COLUMNS_SQL = (
+    f"ts_epoch INTEGER GENERATED ALWAYS AS "
+    f"(CAST(strftime('%s', {_TIMESTAMP_ISO_SQL}) AS INTEGER)) STORED,\n"
+    f"ts_hour INTEGER GENERATED ALWAYS AS "
+    f"(CAST(strftime('%H', {_TIMESTAMP_ISO_SQL}) AS INTEGER)) STORED,\n"
+    f"ts_day INTEGER GENERATED ALWAYS AS "
+    f"(CAST(julianday(date({_TIMESTAMP_ISO_SQL})) - 2440587.5 AS INTEGER)) STORED"
+)
+
 _RELATIONAL_DDL: dict[str, str] = {
     'topics': '''
         CREATE TABLE topics (
@@ -37,10 +107,13 @@ _RELATIONAL_DDL: dict[str, str] = {
             location TEXT,
             account_type TEXT,
             verified TEXT,
-            followers_count INTEGER
+            followers_count INTEGER,
+            is_bot INTEGER GENERATED ALWAYS AS (
+                lower(trim(coalesce(account_type, ''))) = 'bot'
+            ) STORED
         )
     ''',
-    'posts': '''
+    'posts': f'''
         CREATE TABLE posts (
             post_id TEXT PRIMARY KEY,
             user_id TEXT NOT NULL REFERENCES users (user_id),
@@ -49,21 +122,79 @@ _RELATIONAL_DDL: dict[str, str] = {
             content_preview TEXT,
             has_media TEXT,
             topic_id TEXT REFERENCES topics (topic_id),
-            language TEXT
+            language TEXT,
+            {TIMESTAMP_GENERATED_COLUMNS_SQL}
         )
     ''',
-    'interactions': '''
+    'interactions': f'''
         CREATE TABLE interactions (
             interaction_id TEXT PRIMARY KEY,
             post_id TEXT NOT NULL REFERENCES posts (post_id),
             user_id TEXT NOT NULL REFERENCES users (user_id),
             interaction_type TEXT,
             timestamp TEXT,
-            reaction_type TEXT
+            reaction_type TEXT,
+            {TIMESTAMP_GENERATED_COLUMNS_SQL}
         )
     ''',
 }
 
+# Columns SQLite derives from the others (GENERATED ALWAYS ... STORED): filled
+# in on every INSERT / UPDATE, so imports and cleanup keep them in sync. They
+# are hidden from PRAGMA table_info, i.e. from the UI and CSV-facing helpers.
+_RELATIONAL_GENERATED_COLUMNS: dict[str, tuple[str, ...]] = {
+    'users': ('is_bot',),
+    'posts': ('ts_epoch', 'ts_hour', 'ts_day'),
+    'interactions': ('ts_epoch', 'ts_hour', 'ts_day'),
+}
+
+# Secondary indexes, built after bulk loads (see ensure_relational_indexes).
+# FK columns back every join; the wider ones let the analysis / filtered-posts
+# queries run from the index alone (no table lookup, no temp b-tree sort).
+_RELATIONAL_INDEXES: dict[str, tuple[tuple[str, str], ...]] = {
+    'users': (
+        ('idx_users_username', 'username, user_id'),
+        ('idx_users_is_bot', 'user_id, is_bot'),
+    ),
+    'posts': (
+        ('idx_posts_user_id', 'user_id, topic_id, post_id'),
+        ('idx_posts_topic_id', 'topic_id, timestamp, post_id'),
+        ('idx_posts_timestamp', 'timestamp, post_id'),
+        ('idx_posts_ts_hour', 'ts_hour, timestamp, post_id'),
+        ('idx_posts_ts_epoch', 'ts_epoch'),
+    ),
+    'interactions': (
+        ('idx_interactions_post_id', 'post_id'),
+        ('idx_interactions_user_id', 'user_id'),
+        ('idx_interactions_ts_epoch', 'ts_epoch'),
+        (
+            'idx_interactions_kind',
+            "lower(trim(coalesce(interaction_type, ''))), post_id, user_id",
+        ),
+        ('idx_interactions_ts_day', 'ts_day, interaction_type, user_id'),
+    ),
+}
+
+# Rollups: posts / interactions counted per bucket of the columns one analysis
+# groups by, and per author kind (ROLLUP_HUMAN / ROLLUP_BOT, or ROLLUP_NO_USER
+# when ``user_id`` has no users row). One rollup per grouping: a combined day x
+# hour x topic x content type rollup has about as many rows as posts. Triggers
+# on the source table and on ``users`` apply every insert, update and delete
+# as it happens (imports, appends, cleanup); bulk loads create the triggers
+# afterwards and rebuild the counts in one pass (see ensure_rollups).
+# Replacing a table drops its triggers, so a rollup is only current while all
+# of them exist.
+# rollup table -> (source table, bucket columns)
+_ROLLUPS: dict[str, tuple[str, tuple[str, ...]]] = {
+    'agg_posts_day': ('posts', ('ts_day',)),
+    'agg_posts_hour_topic': ('posts', ('ts_hour', 'topic_id')),
+    'agg_posts_topic_content_type': ('posts', ('topic_id', 'content_type')),
+    'agg_interactions_day_type': ('interactions', ('ts_day', 'interaction_type')),
+}
+ROLLUP_HUMAN = 1
+ROLLUP_BOT = 0
+ROLLUP_NO_USER = -1
+
 # Column order for INSERT (matches demo CSV headers after tidy_header_names)
 _RELATIONAL_INSERT_COLUMNS: dict[str, tuple[str, ...]] = {
     'topics': (
@@ -103,29 +234,145 @@ _RELATIONAL_INSERT_COLUMNS: dict[str, tuple[str, ...]] = {
 }
 
 
-def _connect(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path)
+def _connect(
+        db_path: str,
+        *,
+        cached_statements: int = 128,
+        check_same_thread: bool = True,
+) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        db_path,
+        cached_statements=cached_statements,
+        check_same_thread=check_same_thread,
+    )
     conn.execute('PRAGMA foreign_keys = ON')
     return conn
 
 
+class ConnectionManager:
+    """
+    One connection per thread to ``db_path``, opened on first use and reused.
+
+    Pass it wherever a public function takes ``db_path``. Connections are
+    opened (and their pragmas applied) once per thread instead of once per
+    call, and since they stay open, sqlite3's statement cache hands repeated
+    queries back already prepared. :meth:`close` (or leaving a ``with``
+    block) closes every connection the manager opened.
+    """
+
+    def __init__(self, db_path: str, *, cached_statements: int = 256) -> None:
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened: list[sqlite3.Connection] = []
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # only used by this thread, but close() may run on another one
+            conn = _connect(
+                self.db_path,
+                cached_statements=self.cached_statements,
+                check_same_thread=False,
+            )
+            self._local.conn = conn
+            with self._lock:
+                self._opened.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for conn in opened:
+            conn.close()
+        self._local = threading.local()
+
+    def __enter__(self) -> ConnectionManager:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _database_path(db: str | ConnectionManager) -> str:
+    return db.db_path if isinstance(db, ConnectionManager) else db
+
+
+@contextmanager
+def _connection(
+        db: str | ConnectionManager,
+        *,
+        conn: sqlite3.Connection | None = None,
+        schema_changes: Iterable[str] = (),
+) -> Iterator[sqlite3.Connection]:
+    """
+    A connection to ``db`` that commits on success and rolls back on error.
+
+    ``conn`` (a caller's own connection) or the manager's thread connection
+    is left open; a connection opened from a path is closed afterwards.
+    The cached schema of the ``schema_changes`` tables is invalidated once
+    the transaction has committed or rolled back, so another connection
+    cannot re-cache the old columns in between.
+    """
+    opened = None
+    if conn is None and isinstance(db, ConnectionManager):
+        conn = db.connection()
+    elif conn is None:
+        conn = opened = _connect(db)
+    try:
+        with conn:
+            yield conn
+    finally:
+        for table_name in schema_changes:
+            invalidate_schema(conn, table_name)
+        if opened is not None:
+            opened.close()
+
+
 def sql_exclude_bot_users(*, users_table_alias: str | None) -> str:
     """
     SQL predicate that is true for non-bot accounts (case-insensitive ``account_type``).
 
+    Reads the indexed ``users.is_bot`` generated column rather than re-evaluating
+    the ``account_type`` expression per joined row.
+
     Pass ``users_table_alias`` (e.g. ``'u'``) when qualifying columns from a JOIN;
     pass ``None`` for the bare ``users`` table.
     """
-    col = 'account_type' if users_table_alias is None else f'{users_table_alias}.account_type'
-    return f"lower(trim(coalesce({col}, ''))) != 'bot'"
+    col = 'is_bot' if users_table_alias is None else f'{users_table_alias}.is_bot'
+    return f'{col} = 0'
 
 
-def database_exists(db_path: str) -> bool:
-    if not os.path.isfile(db_path):
+def sql_rollup_authors(*, human_only: bool, table_alias: str | None) -> str:
+    """
+    Rollup predicate keeping the rows an ``INNER JOIN users`` would (and,
+    with ``human_only``, that :func:`sql_exclude_bot_users` would).
+    """
+    col = 'author' if table_alias is None else f'{table_alias}.author'
+    if human_only:
+        return f'{col} = {ROLLUP_HUMAN}'
+    return f'{col} IN ({ROLLUP_HUMAN}, {ROLLUP_BOT})'
+
+
+def sql_column_list(columns: Iterable[str], *, table_alias: str | None) -> str:
+    """
+    Explicit SELECT list for ``columns`` (e.g. from ``PRAGMA table_info``).
+
+    Use instead of ``*`` so generated columns such as ``users.is_bot`` stay out
+    of row tuples / dicts handed to the UI.
+    """
+    prefix = '' if table_alias is None else f'{table_alias}.'
+    return ', '.join(f'{prefix}{_quoted_identifier(c)}' for c in columns)
+
+
+def database_exists(db_path: str | ConnectionManager) -> bool:
+    if not os.path.isfile(_database_path(db_path)):
         return False
 
     try:
-        with _connect(db_path) as db:
+        with _connection(db_path) as db:
             db.execute('SELECT name FROM sqlite_master LIMIT 1')
     except sqlite3.DatabaseError:
         return False
@@ -206,10 +453,12 @@ def _quoted_identifier(identifier: str) -> str:
 def read_csv_rows(
         csv_path: str,
 ) -> tuple[list[str], list[tuple[str, ...]]]:
-    for encoding in ('utf-8', 'utf-8-sig', 'cp1252', 'latin-1'):
+    for encoding in _CSV_ENCODINGS:
         try:
             with open(csv_path, encoding=encoding, newline='') as f:
-                rows = list(csv.reader(f))
+                reader = csv.reader(f)
+                first = next(reader, None)
+                data_rows = [tuple(row) for row in reader]
         except UnicodeDecodeError:
             continue
         else:
@@ -217,12 +466,142 @@ def read_csv_rows(
     else:
         raise ValueError(f'could not decode {csv_path}')
 
-    if not rows:
+    if first is None:
         raise ValueError(f'{csv_path} is empty')
 
-    headers = tidy_header_names(rows[0])
-    data_rows = [tuple(row) for row in rows[1:]]
-    return headers, data_rows
+    return tidy_header_names(first), data_rows
+
+
+def _sniff_csv_encoding(csv_path: str) -> str:
+    """Pick the first of ``_CSV_ENCODINGS`` that decodes the file's leading bytes."""
+    with open(csv_path, 'rb') as f:
+        prefix = f.read(_ENCODING_SNIFF_BYTES)
+
+    for encoding in _CSV_ENCODINGS:
+        # incremental decoder: a multi-byte character cut off at the end of
+        # the prefix is not a decode error
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            decoder.decode(prefix, final=False)
+        except UnicodeDecodeError:
+            continue
+        else:
+            return encoding
+    raise ValueError(f'could not decode {csv_path}')
+
+
+def _read_csv_rows(
+        csv_path: str,
+) -> tuple[list[str], Iterator[tuple[str, ...]]]:
+    """
+    Streaming counterpart of :func:`read_csv_rows`.
+
+    The header row is read eagerly (so empty files fail straight away); data
+    rows are yielded lazily and the file is closed once they are exhausted.
+    The encoding is chosen from a sniffed prefix, so a decode error further
+    into the file is reported as ``ValueError`` mid-stream.
+    """
+    encoding = _sniff_csv_encoding(csv_path)
+    f = open(csv_path, encoding=encoding, newline='')
+    reader = csv.reader(f)
+    try:
+        first = next(reader, None)
+    except UnicodeDecodeError as e:
+        f.close()
+        raise ValueError(f'could not decode {csv_path}') from e
+    if first is None:
+        f.close()
+        raise ValueError(f'{csv_path} is empty')
+
+    def rows() -> Iterator[tuple[str, ...]]:
+        with f:
+            try:
+                for row in reader:
+                    yield tuple(row)
+            except UnicodeDecodeError as e:
+                raise ValueError(
+                    f'could not decode {csv_path} as {encoding} '
+                    f'(line {reader.line_num})',
+                ) from e
+
+    return tidy_header_names(first), rows()
+
+
+def _read_csv_header(csv_path: str) -> tuple[list[str], str]:
+    """The tidied header row of ``csv_path`` and the encoding sniffed for the file."""
+    encoding = _sniff_csv_encoding(csv_path)
+    with open(csv_path, encoding=encoding, newline='') as f:
+        try:
+            first = next(csv.reader(f), None)
+        except UnicodeDecodeError as e:
+            raise ValueError(f'could not decode {csv_path}') from e
+    if first is None:
+        raise ValueError(f'{csv_path} is empty')
+    return tidy_header_names(first), encoding
+
+
+def _csv_record_end(data: bytes, scanned: int = 0, quoted: bool = False) -> tuple[int, bool]:
+    """
+    Offset just past the last newline of ``data[scanned:]`` that ends a CSV
+    record (0 if none does), and whether ``data`` ends inside a quoted field.
+
+    ``data`` starts at a record boundary and ``quoted`` is the state at
+    ``scanned``, so each byte is counted once however often more is appended.
+    A newline ends a record when an even number of quotes precede it (``""``
+    escapes keep the count even). The supported encodings never use the bytes
+    of ``"`` or newline inside a multi-byte character.
+    """
+    at_end = quoted != (data.count(b'"', scanned) % 2 == 1)
+    inside, pos = at_end, len(data)
+    end = data.rfind(b'\n', scanned)
+    while end >= 0:
+        inside = inside != (data.count(b'"', end, pos) % 2 == 1)
+        if not inside:
+            return end + 1, at_end
+        pos = end
+        end = data.rfind(b'\n', scanned, end)
+    return 0, at_end
+
+
+def _csv_record_ranges(
+        csv_path: str,
+        chunk_bytes: int,
+        *,
+        max_scan_chunks: int = _RECORD_SCAN_CHUNKS,
+) -> Iterator[tuple[int, int | None]]:
+    """
+    ``(start, end)`` byte ranges covering ``csv_path``, each about
+    ``chunk_bytes`` of whole records.
+
+    When ``max_scan_chunks`` chunks in a row hold no record boundary the last
+    range is ``(start, None)``: the rest of the file, to be read as one stream.
+    """
+    with open(csv_path, 'rb') as f:
+        start = 0
+        data = b''
+        quoted = False
+        while block := f.read(chunk_bytes):
+            scanned = len(data)
+            data += block
+            cut, quoted = _csv_record_end(data, scanned, quoted)
+            if cut:
+                yield start, start + cut
+                start += cut
+                data = data[cut:]
+            elif len(data) >= max_scan_chunks * chunk_bytes:
+                yield start, None
+                return
+        if data:
+            yield start, start + len(data)
+
+
+def _batched(
+        rows: Iterable[tuple[str, ...]],
+        size: int,
+) -> Iterator[list[tuple[str, ...]]]:
+    it = iter(rows)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
 
 
 def _is_relational_table(table_name: str) -> bool:
@@ -243,12 +622,14 @@ def _drop_all_relational_tables(db: sqlite3.Connection) -> None:
     db.execute('PRAGMA foreign_keys = OFF')
     for name in reversed(_RELATIONAL_TABLE_ORDER):
         db.execute(f'DROP TABLE IF EXISTS {_quoted_identifier(name)}')
+        invalidate_schema(db, name)
     db.execute('PRAGMA foreign_keys = ON')
 
 
 def _create_empty_relational_tables(db: sqlite3.Connection) -> None:
     for name in _RELATIONAL_TABLE_ORDER:
         db.executescript(_RELATIONAL_DDL[name])
+        invalidate_schema(db, name)
 
 
 def migrate_posts_content_preview(conn: sqlite3.Connection) -> bool:
@@ -267,20 +648,340 @@ def migrate_posts_content_preview(conn: sqlite3.Connection) -> bool:
     if 'content_preview' in cols:
         return False
     conn.execute('ALTER TABLE posts RENAME COLUMN text_preview TO content_preview')
+    invalidate_schema(conn, 'posts')
     return True
 
 
-def ensure_relational_schema(db_path: str) -> None:
+def _table_exists(db: sqlite3.Connection, table_name: str) -> bool:
+    row = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+        (table_name,),
+    ).fetchone()
+    return row is not None
+
+
+_TABLE_VERSIONS_DDL = '''
+    CREATE TABLE IF NOT EXISTS table_versions (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+'''
+
+
+def bump_table_versions(db: sqlite3.Connection, table_names: Iterable[str]) -> None:
+    """
+    Record that the rows of ``table_names`` changed.
+
+    Runs in the caller's transaction, so the bump commits (or rolls back) with
+    the change itself. Cached aggregates compare these counters (see
+    :func:`table_versions`) to decide whether they are still valid.
+    """
+    db.execute(_TABLE_VERSIONS_DDL)
+    db.executemany(
+        'INSERT INTO table_versions (table_name, version) VALUES (?, 1) '
+        'ON CONFLICT (table_name) DO UPDATE SET version = version + 1',
+        [(name,) for name in table_names],
+    )
+
+
+def table_versions(db: sqlite3.Connection, table_names: Iterable[str]) -> tuple[int, ...]:
+    """Change counters for ``table_names``, in order (0 for a table never bumped)."""
+    names = tuple(table_names)
+    if not _table_exists(db, 'table_versions'):
+        return (0,) * len(names)
+    placeholders = ', '.join('?' for _ in names)
+    found = dict(
+        db.execute(
+            f'SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})',
+            names,
+        ).fetchall(),
+    )
+    return tuple(found.get(name, 0) for name in names)
+
+
+def _rebuild_relational_table(db: sqlite3.Connection, table_name: str) -> None:
+    """Re-create ``table_name`` from ``_RELATIONAL_DDL``, copying its rows across."""
+    old_cols = {r[1] for r in db.execute(f'PRAGMA table_info({_quoted_identifier(table_name)})')}
+    columns_sql = ', '.join(
+        _quoted_identifier(c)
+        for c in _RELATIONAL_INSERT_COLUMNS[table_name]
+        if c in old_cols
+    )
+    tmp_name = f'_{table_name}_rebuild'
+    ddl = _RELATIONAL_DDL[table_name].replace(
+        f'CREATE TABLE {table_name} ',
+        f'CREATE TABLE {tmp_name} ',
+        1,
+    )
+    # children reference the table by name, so swap it in without FK checks
+    # (the pragma is a no-op inside a transaction)
+    db.commit()
+    db.execute('PRAGMA foreign_keys = OFF')
+    try:
+        drop_rollup_triggers(db)
+        db.execute(f'DROP TABLE IF EXISTS {_quoted_identifier(tmp_name)}')
+        db.executescript(ddl)
+        db.execute(
+            f'INSERT INTO {_quoted_identifier(tmp_name)} ({columns_sql}) '
+            f'SELECT {columns_sql} FROM {_quoted_identifier(table_name)}',
+        )
+        db.execute(f'DROP TABLE {_quoted_identifier(table_name)}')
+        db.execute(
+            f'ALTER TABLE {_quoted_identifier(tmp_name)} '
+            f'RENAME TO {_quoted_identifier(table_name)}',
+        )
+        db.commit()
+    finally:
+        db.execute('PRAGMA foreign_keys = ON')
+        invalidate_schema(db, table_name)
+
+
+def migrate_generated_columns(conn: sqlite3.Connection) -> list[str]:
+    """
+    Add missing generated columns (e.g. ``users.is_bot``) to existing tables.
+
+    Stored generated columns cannot be added with ALTER TABLE, so affected
+    tables are rebuilt (secondary indexes are dropped with them). Idempotent.
+    Returns the names of the rebuilt tables.
+    """
+    rebuilt = []
+    for table_name, generated in _RELATIONAL_GENERATED_COLUMNS.items():
+        if not _table_exists(conn, table_name):
+            continue
+        cols = {
+            r[1]
+            for r in conn.execute(f'PRAGMA table_xinfo({_quoted_identifier(table_name)})')
+        }
+        if all(c in cols for c in generated):
+            continue
+        _rebuild_relational_table(conn, table_name)
+        rebuilt.append(table_name)
+    return rebuilt
+
+
+def ensure_relational_indexes(
+        db: sqlite3.Connection,
+        *,
+        table_names: Iterable[str] = _RELATIONAL_TABLE_ORDER,
+) -> list[str]:
+    """
+    Create any missing secondary index on the given relational tables.
+
+    Tables that gained an index are ``ANALYZE``d so the planner picks them up.
+    Returns the names of the indexes created.
+    """
+    created: list[str] = []
+    for table_name in table_names:
+        if not _table_exists(db, table_name):
+            continue
+        existing = {
+            r[1] for r in db.execute(f'PRAGMA index_list({_quoted_identifier(table_name)})')
+        }
+        new = [
+            (name, columns)
+            for name, columns in _RELATIONAL_INDEXES.get(table_name, ())
+            if name not in existing
+        ]
+        for name, columns in new:
+            db.execute(
+                f'CREATE INDEX {_quoted_identifier(name)} '
+                f'ON {_quoted_identifier(table_name)} ({columns})',
+            )
+            created.append(name)
+        if new:
+            db.execute(f'ANALYZE {_quoted_identifier(table_name)}')
+    return created
+
+
+def drop_relational_indexes(
+        db: sqlite3.Connection,
+        *,
+        table_names: Iterable[str] = _RELATIONAL_TABLE_ORDER,
+) -> None:
+    """Drop the secondary indexes (e.g. before a bulk load into existing tables)."""
+    for table_name in table_names:
+        for name, _ in _RELATIONAL_INDEXES.get(table_name, ()):
+            db.execute(f'DROP INDEX IF EXISTS {_quoted_identifier(name)}')
+
+
+def rebuild_relational_indexes(
+        db: sqlite3.Connection,
+        *,
+        table_names: Iterable[str] = _RELATIONAL_TABLE_ORDER,
+) -> list[str]:
+    """Drop and re-create the secondary indexes, then ``ANALYZE``."""
+    table_names = tuple(table_names)
+    drop_relational_indexes(db, table_names=table_names)
+    return ensure_relational_indexes(db, table_names=table_names)
+
+
+def _rollup_key_sql(buckets: tuple[str, ...]) -> str:
+    # NULL buckets (no topic, unparseable timestamp) meet in the unique index
+    # as x'' (a blob, which no relational column holds)
+    return ', '.join([*(f"ifnull({c}, x'')" for c in buckets), 'author'])
+
+
+def _rollup_upsert_sql(rollup: str, buckets: tuple[str, ...], source_sql: str) -> str:
+    columns_sql = ', '.join((*buckets, 'author', 'row_count'))
+    return (
+        f'INSERT INTO {rollup} ({columns_sql}) {source_sql} '
+        f'ON CONFLICT ({_rollup_key_sql(buckets)}) '
+        f'DO UPDATE SET row_count = row_count + excluded.row_count'
+    )
+
+
+def _rollup_triggers(rollup: str) -> dict[str, str]:
+    """``CREATE TRIGGER`` statements keeping ``rollup`` in step, by trigger name."""
+    source, buckets = _ROLLUPS[rollup]
+    generated = _RELATIONAL_GENERATED_COLUMNS.get(source, ())
+    # generated buckets follow from ``timestamp``
+    watched = ', '.join(dict.fromkeys(
+        ['user_id', 'timestamp', *(c for c in buckets if c not in generated)],
+    ))
+    group_sql = ', '.join(buckets)
+
+    def author(ref: str) -> str:
+        return f'1 - {ref}.is_bot'
+
+    def row(ref: str, sign: int) -> str:
+        values = ', '.join((
+            *(f'{ref}.{c}' for c in buckets),
+            f'coalesce((SELECT 1 - is_bot FROM users WHERE user_id = {ref}.user_id), {ROLLUP_NO_USER})',
+            str(sign),
+        ))
+        return _rollup_upsert_sql(rollup, buckets, f'VALUES ({values})')
+
+    def move(user_id: str, from_author: str, to_author: str) -> str:
+        # every source row of ``user_id`` from one author bucket to another
+        return '; '.join(
+            _rollup_upsert_sql(
+                rollup,
+                buckets,
+                f'SELECT {group_sql}, {bucket}, {sign}COUNT(*) FROM {source} '
+                f'WHERE user_id = {user_id} GROUP BY {group_sql}',
+            )
+            for bucket, sign in ((from_author, '-'), (to_author, ''))
+        )
+
+    no_user = str(ROLLUP_NO_USER)
+    return {
+        f'{rollup}_insert': (
+            f'CREATE TRIGGER {rollup}_insert AFTER INSERT ON {source} '
+            f'BEGIN {row("new", 1)}; END'
+        ),
+        f'{rollup}_delete': (
+            f'CREATE TRIGGER {rollup}_delete AFTER DELETE ON {source} '
+            f'BEGIN {row("old", -1)}; END'
+        ),
+        f'{rollup}_update': (
+            f'CREATE TRIGGER {rollup}_update AFTER UPDATE OF {watched} ON {source} '
+            f'BEGIN {row("old", -1)}; {row("new", 1)}; END'
+        ),
+        f'{rollup}_users_insert': (
+            f'CREATE TRIGGER {rollup}_users_insert AFTER INSERT ON users '
+            f'BEGIN {move("new.user_id", no_user, author("new"))}; END'
+        ),
+        f'{rollup}_users_delete': (
+            f'CREATE TRIGGER {rollup}_users_delete AFTER DELETE ON users '
+            f'BEGIN {move("old.user_id", author("old"), no_user)}; END'
+        ),
+        f'{rollup}_users_update': (
+            f'CREATE TRIGGER {rollup}_users_update AFTER UPDATE OF user_id, account_type ON users '
+            f'WHEN old.user_id IS NOT new.user_id OR old.is_bot IS NOT new.is_bot '
+            f'BEGIN {move("old.user_id", author("old"), no_user)}; '
+            f'{move("new.user_id", no_user, author("new"))}; END'
+        ),
+    }
+
+
+def _existing_triggers(db: sqlite3.Connection) -> set[str]:
+    return {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type='trigger'")}
+
+
+def rollup_current(db: sqlite3.Connection, rollup: str) -> bool:
+    """Whether ``rollup`` exists with all its triggers, i.e. its counts match the tables."""
+    return _table_exists(db, rollup) and set(_rollup_triggers(rollup)) <= _existing_triggers(db)
+
+
+def drop_rollup_triggers(db: sqlite3.Connection) -> None:
+    """
+    Drop every rollup trigger, leaving the rollups stale until
+    :func:`ensure_rollups` (a table their triggers read cannot be renamed).
+    """
+    for rollup in _ROLLUPS:
+        for name in _rollup_triggers(rollup):
+            db.execute(f'DROP TRIGGER IF EXISTS {_quoted_identifier(name)}')
+
+
+def ensure_rollups(db: sqlite3.Connection) -> list[str]:
+    """
+    Rebuild every rollup that is not current and (re-)create its triggers.
+
+    Rollups whose tables do not exist yet are skipped. Runs in the caller's
+    transaction. Returns the names of the rollups rebuilt.
+    """
+    rebuilt: list[str] = []
+    existing = _existing_triggers(db)
+    for rollup, (source, buckets) in _ROLLUPS.items():
+        if not (_table_exists(db, source) and _table_exists(db, 'users')):
+            continue
+        triggers = _rollup_triggers(rollup)
+        if _table_exists(db, rollup) and set(triggers) <= existing:
+            continue
+        buckets_sql = ', '.join(f's.{c}' for c in buckets)
+        db.execute(f'DROP TABLE IF EXISTS {_quoted_identifier(rollup)}')
+        db.execute(
+            f'CREATE TABLE {rollup} '
+            f'({", ".join(buckets)}, author INTEGER NOT NULL, row_count INTEGER NOT NULL)',
+        )
+        db.execute(f'CREATE UNIQUE INDEX {rollup}_key ON {rollup} ({_rollup_key_sql(buckets)})')
+        db.execute(
+            f'INSERT INTO {rollup} ({", ".join(buckets)}, author, row_count) '
+            f'SELECT {buckets_sql}, coalesce(1 - u.is_bot, {ROLLUP_NO_USER}) AS author, COUNT(*) '
+            f'FROM {source} s LEFT JOIN users u ON s.user_id = u.user_id '
+            f'GROUP BY {buckets_sql}, author',
+        )
+        for name, sql in triggers.items():
+            db.execute(f'DROP TRIGGER IF EXISTS {_quoted_identifier(name)}')
+            db.execute(sql)
+        rebuilt.append(rollup)
+    return rebuilt
+
+
+def explain_plan(
+        conn: sqlite3.Connection,
+        sql: str,
+        params: Iterable[object] = (),
+) -> list[str]:
+    """
+    ``EXPLAIN QUERY PLAN`` details for ``sql``, indented by nesting depth.
+
+    Full table scans show up as ``SCAN <table>`` without ``USING ... INDEX``.
+    """
+    rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', tuple(params)).fetchall()
+    depth: dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def ensure_relational_schema(db_path: str | ConnectionManager) -> None:
     """Create demo tables with PK/FK definitions, replacing any legacy stub schema."""
-    parent = os.path.dirname(db_path)
+    parent = os.path.dirname(_database_path(db_path))
     if parent:
         os.makedirs(parent, exist_ok=True)
 
-    with _connect(db_path) as db:
+    with _connection(db_path) as db:
         if not _relational_schema_matches(db):
             _drop_all_relational_tables(db)
             _create_empty_relational_tables(db)
+            bump_table_versions(db, _RELATIONAL_TABLE_ORDER)
         migrate_posts_content_preview(db)
+        migrate_generated_columns(db)
+        ensure_relational_indexes(db)
+        ensure_rollups(db)
 
 
 def _parse_optional_int(value: str) -> int | None:
@@ -327,6 +1028,7 @@ def _relational_insert_tuple(
         headers: list[str],
         row: tuple[str, ...],
 ) -> tuple:
+    """Type one CSV row (the per-row reference for :func:`_relational_batch_typer`)."""
     d = _row_dict(headers, row)
     if table_name == 'topics':
         return (
@@ -369,6 +1071,85 @@ def _relational_insert_tuple(
     raise ValueError(f'unknown relational table: {table_name!r}')
 
 
+# insert columns typed as required keys (kept, stripped, even when blank) and
+# as optional ints; every other column is text with blanks stored as NULL
+_RELATIONAL_KEY_COLUMNS: dict[str, frozenset[str]] = {
+    'topics': frozenset(('topic_id', 'topic_name')),
+    'users': frozenset(('user_id', 'username')),
+    'posts': frozenset(('post_id', 'user_id')),
+    'interactions': frozenset(('interaction_id', 'post_id', 'user_id')),
+}
+_RELATIONAL_INT_COLUMNS: dict[str, frozenset[str]] = {
+    'users': frozenset(('followers_count',)),
+}
+# insert column -> older CSV header used when the column itself is blank
+_RELATIONAL_FALLBACK_HEADERS: dict[tuple[str, str], str] = {
+    ('posts', 'content_preview'): 'text_preview',
+}
+
+
+def _key_column(values: Sequence[str]) -> list[str]:
+    return [v.strip() if v else '' for v in values]
+
+
+def _text_column(values: Sequence[str]) -> list[str | None]:
+    return [(v.strip() or None) if v else None for v in values]
+
+
+def _int_column(values: Sequence[str]) -> list[int | None]:
+    return [_parse_optional_int(v) for v in values]
+
+
+@functools.lru_cache(maxsize=32)
+def _relational_batch_typer(
+        table_name: str,
+        headers: tuple[str, ...],
+) -> Callable[[Sequence[Sequence[str]]], list[tuple]]:
+    """
+    Converter typing whole batches of ``table_name`` rows with ``headers``.
+
+    Header positions and column converters are resolved once per file; a
+    batch is transposed, converted one column at a time and zipped back into
+    ``executemany`` tuples (the same as :func:`_relational_insert_tuple`).
+    """
+    if table_name not in _RELATIONAL_INSERT_COLUMNS:
+        raise ValueError(f'unknown relational table: {table_name!r}')
+    positions = {h: i for i, h in enumerate(headers)}
+    keys = _RELATIONAL_KEY_COLUMNS[table_name]
+    ints = _RELATIONAL_INT_COLUMNS.get(table_name, frozenset())
+    plan = []
+    for column in _RELATIONAL_INSERT_COLUMNS[table_name]:
+        if column in keys:
+            if column not in positions:
+                raise KeyError(column)
+            convert = _key_column
+        elif column in ints:
+            convert = _int_column
+        else:
+            convert = _text_column
+        fallback = _RELATIONAL_FALLBACK_HEADERS.get((table_name, column))
+        sources = [positions[h] for h in (column, fallback) if h in positions]
+        plan.append((sources, convert))
+    width = len(headers)
+
+    def type_batch(batch: Sequence[Sequence[str]]) -> list[tuple]:
+        # rows shorter than the header are padded with blanks, longer ones cut
+        cells = list(itertools.zip_longest(*batch, fillvalue=''))[:width]
+        cells.extend(itertools.repeat(('',) * len(batch), width - len(cells)))
+        out = []
+        for sources, convert in plan:
+            if not sources:
+                out.append([None] * len(batch))
+                continue
+            converted = convert(cells[sources[0]])
+            for i in sources[1:]:
+                converted = [a or b for a, b in zip(converted, convert(cells[i]))]
+            out.append(converted)
+        return list(zip(*out))
+
+    return type_batch
+
+
 def _create_table(
         db: sqlite3.Connection,
         *,
@@ -385,6 +1166,7 @@ def _create_table(
         f'{_quoted_identifier(header)} TEXT'
         for header in headers
     )
+    # the caller invalidates the cached schema once its transaction commits
     db.execute(
         f'{create_table} {_quoted_identifier(table_name)} ({columns_sql})',
     )
@@ -408,143 +1190,294 @@ def _insert_rows(
     )
 
 
-def _validate_relational_import_fk(
+# child table -> (column, parent table, parent key, required) per FK column
+_RELATIONAL_FOREIGN_KEYS: dict[str, tuple[tuple[str, str, str, bool], ...]] = {
+    'posts': (
+        ('user_id', 'users', 'user_id', True),
+        ('topic_id', 'topics', 'topic_id', False),
+    ),
+    'interactions': (
+        ('post_id', 'posts', 'post_id', True),
+        ('user_id', 'users', 'user_id', True),
+    ),
+}
+
+_FK_WARNING_LABELS: dict[str, dict[str, str]] = {
+    'posts': {
+        'user_id': 'user_id(s) not in users table',
+        'topic_id': 'topic_id(s) not in topics table',
+    },
+    'interactions': {
+        'post_id': 'post_id(s) not in posts',
+        'user_id': 'user_id(s) not in users',
+    },
+}
+
+_FK_WARNING_SUFFIX: dict[str, str] = {
+    'posts': (
+        '. Rows were inserted, but some reference missing users/topics. '
+        'Load topics and users CSVs first (in that order) for full consistency.'
+    ),
+    'interactions': (
+        '. Rows were inserted, but some reference missing posts/users. '
+        'Load posts and users before interactions for full consistency.'
+    ),
+}
+
+
+def _missing_fk_keys(
         db: sqlite3.Connection,
         table_name: str,
-        typed_rows: list[tuple],
-) -> str | None:
-    """Return warning message if keys are missing, or raise ValueError if data is invalid."""
-    if table_name == 'posts':
-        cols = _RELATIONAL_INSERT_COLUMNS['posts']
-        i_uid = cols.index('user_id')
-        i_tid = cols.index('topic_id')
-        users = {r[0] for r in db.execute('SELECT user_id FROM users').fetchall()}
-        topics = {r[0] for r in db.execute('SELECT topic_id FROM topics').fetchall()}
-        bad_u: set[str] = set()
-        bad_t: set[str] = set()
-        for row in typed_rows:
-            uid = row[i_uid]
-            if uid is None or str(uid).strip() == '':
-                raise ValueError(
-                    'posts CSV: row with empty user_id. Every post must reference a user in users.',
-                )
-            us = str(uid).strip()
-            if us not in users:
-                bad_u.add(us)
-            tid = row[i_tid]
-            if tid is not None and str(tid).strip() != '':
-                ts = str(tid).strip()
-                if ts not in topics:
-                    bad_t.add(ts)
-        if bad_u or bad_t:
-            parts = []
-            if bad_u:
-                parts.append(
-                    f'user_id(s) not in users table: {", ".join(sorted(bad_u)[:40])}'
-                    + ('…' if len(bad_u) > 40 else ''),
-                )
-            if bad_t:
-                parts.append(
-                    f'topic_id(s) not in topics table: {", ".join(sorted(bad_t)[:40])}'
-                    + ('…' if len(bad_t) > 40 else ''),
-                )
-            return (
-                'posts CSV foreign keys failed validation: '
-                + '; '.join(parts)
-                + '. Rows were inserted, but some reference missing users/topics. '
-                'Load topics and users CSVs first (in that order) for full consistency.'
-            )
-    if table_name == 'interactions':
-        cols = _RELATIONAL_INSERT_COLUMNS['interactions']
-        i_pid = cols.index('post_id')
-        i_uid = cols.index('user_id')
-        posts = {r[0] for r in db.execute('SELECT post_id FROM posts').fetchall()}
-        users = {r[0] for r in db.execute('SELECT user_id FROM users').fetchall()}
-        bad_p: set[str] = set()
-        bad_u: set[str] = set()
-        for row in typed_rows:
-            pid = row[i_pid]
-            uid = row[i_uid]
-            if pid is None or str(pid).strip() == '':
-                raise ValueError(
-                    'interactions CSV: row with empty post_id.',
-                )
-            if uid is None or str(uid).strip() == '':
-                raise ValueError(
-                    'interactions CSV: row with empty user_id.',
-                )
-            ps = str(pid).strip()
-            us = str(uid).strip()
-            if ps not in posts:
-                bad_p.add(ps)
-            if us not in users:
-                bad_u.add(us)
-        if bad_p or bad_u:
-            parts = []
-            if bad_p:
-                parts.append(
-                    f'post_id(s) not in posts: {", ".join(sorted(bad_p)[:40])}'
-                    + ('…' if len(bad_p) > 40 else ''),
-                )
-            if bad_u:
-                parts.append(
-                    f'user_id(s) not in users: {", ".join(sorted(bad_u)[:40])}'
-                    + ('…' if len(bad_u) > 40 else ''),
-                )
-            return (
-                'interactions CSV foreign keys failed validation: '
-                + '; '.join(parts)
-                + '. Rows were inserted, but some reference missing posts/users. '
-                'Load posts and users before interactions for full consistency.'
+        *,
+        source: str,
+) -> dict[str, set[str]]:
+    """
+    Parent keys referenced from ``source`` that have no row in the parent table.
+
+    ``source`` is a table holding (at least) ``table_name``'s FK columns for
+    the incoming rows. Each column is one anti-join against its parent, so
+    no parent key set is loaded into Python. Raises ``ValueError`` if a
+    required key is empty.
+    """
+    missing: dict[str, set[str]] = {}
+    for col, parent, key, required in _RELATIONAL_FOREIGN_KEYS[table_name]:
+        col_sql = _quoted_identifier(col)
+        if required:
+            empty = db.execute(
+                f"SELECT 1 FROM {source} WHERE coalesce(trim({col_sql}), '') = '' LIMIT 1",
+            ).fetchone()
+            if empty is not None:
+                hint = ' Every post must reference a user in users.' if table_name == 'posts' else ''
+                raise ValueError(f'{table_name} CSV: row with empty {col}.{hint}')
+        bad = {
+            r[0]
+            for r in db.execute(
+                f'''
+                SELECT DISTINCT s.{col_sql}
+                FROM {source} s
+                LEFT JOIN {parent} p ON p.{key} = s.{col_sql}
+                WHERE trim(s.{col_sql}) != '' AND p.{key} IS NULL
+                ''',
             )
-    return None
+        }
+        if bad:
+            missing[col] = bad
+    return missing
 
 
-def _insert_relational_rows(
+def _create_fk_staging(db: sqlite3.Connection, table_name: str) -> None:
+    """(Re)create ``temp.import_fk_staging`` with ``table_name``'s FK columns."""
+    columns_sql = ', '.join(
+        f'{_quoted_identifier(col)} TEXT'
+        for col, _parent, _key, _required in _RELATIONAL_FOREIGN_KEYS[table_name]
+    )
+    db.execute(f'DROP TABLE IF EXISTS {_FK_STAGING_TABLE}')
+    db.execute(f'CREATE TEMP TABLE import_fk_staging ({columns_sql})')
+
+
+def _stage_fk_rows(
         db: sqlite3.Connection,
-        *,
         table_name: str,
-        headers: list[str],
-        rows: Iterable[tuple[str, ...]],
+        typed_rows: Iterable[tuple],
+) -> None:
+    cols = _RELATIONAL_INSERT_COLUMNS[table_name]
+    idx = [cols.index(col) for col, _p, _k, _r in _RELATIONAL_FOREIGN_KEYS[table_name]]
+    placeholders = ', '.join('?' for _ in idx)
+    db.executemany(
+        f'INSERT INTO {_FK_STAGING_TABLE} VALUES ({placeholders})',
+        ([row[i] for i in idx] for row in typed_rows),
+    )
+
+
+def _format_fk_warning(
+        table_name: str,
+        missing: dict[str, set[str]],
 ) -> str | None:
+    parts = []
+    for col, _parent, _key, _required in _RELATIONAL_FOREIGN_KEYS[table_name]:
+        bad = missing.get(col)
+        if bad:
+            parts.append(
+                f'{_FK_WARNING_LABELS[table_name][col]}: {", ".join(sorted(bad)[:40])}'
+                + ('…' if len(bad) > 40 else ''),
+            )
+    if not parts:
+        return None
+    return (
+        f'{table_name} CSV foreign keys failed validation: '
+        + '; '.join(parts)
+        + _FK_WARNING_SUFFIX[table_name]
+    )
+
+
+_FK_LOAD_ORDER_HINT = (
+    'Load CSVs in dependency order: topics → users → posts → interactions. '
+    'Each row must use parent keys that already exist in the database '
+    '(e.g. posts need user_id in users and topic_id in topics or NULL; '
+    'interactions need post_id in posts and user_id in users). '
+    'If you replaced a parent table, children may still reference old IDs—'
+    'reload children or the full dataset in order.'
+)
+
+
+def _relational_insert_sql(table_name: str) -> str:
     columns = _RELATIONAL_INSERT_COLUMNS[table_name]
     placeholders = ', '.join('?' for _ in columns)
     columns_sql = ', '.join(_quoted_identifier(c) for c in columns)
-    typed_rows = [
-        _relational_insert_tuple(table_name, headers, row)
-        for row in rows
-    ]
-    warning = None
-    if table_name in ('posts', 'interactions'):
-        warning = _validate_relational_import_fk(db, table_name, typed_rows)
-
-    sql = (
+    return (
         f'INSERT INTO {_quoted_identifier(table_name)} ({columns_sql}) '
         f'VALUES ({placeholders})'
     )
+
+
+def _type_batch(
+        table_name: str,
+        headers: list[str],
+        batch: list[tuple[str, ...]],
+) -> list[tuple]:
+    """Type one batch of CSV rows."""
+    return _relational_batch_typer(table_name, tuple(headers))(batch)
+
+
+def _typed_batches(
+        table_name: str,
+        headers: list[str],
+        rows: Iterable[tuple[str, ...]],
+        *,
+        batch_size: int = IMPORT_BATCH_SIZE,
+) -> Iterator[list[tuple]]:
+    """``rows`` typed for ``table_name``, in batches and in file order."""
+    for batch in _batched(rows, batch_size):
+        yield _type_batch(table_name, headers, batch)
+
+
+def _read_typed_chunk(
+        table_name: str,
+        headers: list[str],
+        csv_path: str,
+        encoding: str,
+        start: int,
+        end: int,
+) -> list[tuple]:
+    """
+    Read, decode, parse and type the records in bytes ``start:end`` of
+    ``csv_path`` (the worker task of :func:`_typed_csv_chunks`); the range
+    at offset 0 starts with the header row, which is skipped.
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
     try:
-        if warning:
-            db.execute('PRAGMA foreign_keys = OFF')
-        db.executemany(sql, typed_rows)
-        if warning:
-            db.execute('PRAGMA foreign_keys = ON')
+        text = data.decode(encoding)
+    except UnicodeDecodeError as e:
+        raise ValueError(f'could not decode {csv_path} as {encoding} (bytes {start}-{end})') from e
+    rows = [tuple(row) for row in csv.reader(io.StringIO(text, newline=''))]
+    return _type_batch(table_name, headers, rows[1:] if start == 0 else rows)
+
+
+def _typed_csv_tail(
+        table_name: str,
+        headers: list[str],
+        csv_path: str,
+        encoding: str,
+        start: int,
+) -> Iterator[list[tuple]]:
+    """
+    The records of ``csv_path`` from byte ``start`` on, read, parsed and typed
+    in this process in batches (skipping the header row at offset 0).
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        reader = csv.reader(io.TextIOWrapper(f, encoding=encoding, newline=''))
+        try:
+            if start == 0:
+                next(reader, None)
+            yield from _typed_batches(table_name, headers, (tuple(row) for row in reader))
+        except UnicodeDecodeError as e:
+            raise ValueError(f'could not decode {csv_path} as {encoding} (from byte {start})') from e
+
+
+def _typed_csv_chunks(
+        table_name: str,
+        headers: list[str],
+        csv_path: str,
+        encoding: str,
+        *,
+        pool: ProcessPoolExecutor,
+        in_flight: int,
+        chunk_bytes: int = _PARALLEL_CHUNK_BYTES,
+) -> Iterator[list[tuple]]:
+    """
+    The data rows of ``csv_path`` typed for ``table_name``, in chunks and in
+    file order.
+
+    This process only finds record boundaries in the raw bytes; the workers
+    read, decode, parse and type upcoming chunks while the caller is still
+    inserting earlier ones. At most ``in_flight`` are outstanding. Once no
+    record boundary can be found (see :func:`_csv_record_ranges`), the rest
+    of the file is read here like the sequential import.
+    """
+    pending: collections.deque[Future[list[tuple]]] = collections.deque()
+    for start, end in _csv_record_ranges(csv_path, chunk_bytes):
+        if end is None:
+            while pending:
+                yield pending.popleft().result()
+            yield from _typed_csv_tail(table_name, headers, csv_path, encoding, start)
+            return
+        pending.append(pool.submit(_read_typed_chunk, table_name, headers, csv_path, encoding, start, end))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _insert_relational_rows(
+        db: sqlite3.Connection,
+        *,
+        table_name: str,
+        headers: list[str],
+        rows: Iterable[tuple[str, ...]],
+        batch_size: int = IMPORT_BATCH_SIZE,
+) -> str | None:
+    """
+    Type and insert ``rows`` into the (new, empty) ``table_name`` in batches
+    of ``batch_size`` (constant memory).
+
+    Once every batch is in, missing parent keys are found by anti-joining the
+    loaded table against its parents and reported as a warning. Outside a
+    transaction, FK enforcement is switched off for the load so such rows are
+    kept (the warning says so); inside one the pragma is a no-op and they fail
+    as an ``IntegrityError``.
+    """
+    sql = _relational_insert_sql(table_name)
+
+    fk_checked = table_name in _RELATIONAL_FOREIGN_KEYS
+    relax_fk = fk_checked and not db.in_transaction
+    if relax_fk:
+        db.execute('PRAGMA foreign_keys = OFF')
+    try:
+        for batch in _batched(rows, batch_size):
+            typed_rows = _type_batch(table_name, headers, batch)
+            db.executemany(sql, typed_rows)
     except sqlite3.IntegrityError as exc:
-        if warning:
-            db.execute('PRAGMA foreign_keys = ON')
         hint = (
             f'Foreign key violation while inserting into {table_name!r}: {exc}. '
-            'Load CSVs in dependency order: topics → users → posts → interactions. '
-            'Each row must use parent keys that already exist in the database '
-            '(e.g. posts need user_id in users and topic_id in topics or NULL; '
-            'interactions need post_id in posts and user_id in users). '
-            'If you replaced a parent table, children may still reference old IDs—'
-            'reload children or the full dataset in order.'
+            + _FK_LOAD_ORDER_HINT
         )
         from audit_log import get_audit_logger
 
         get_audit_logger().error('%s', hint, exc_info=True)
         raise ValueError(hint) from exc
-    return warning
+    finally:
+        if relax_fk:
+            db.execute('PRAGMA foreign_keys = ON')
+
+    if not fk_checked:
+        return None
+    return _format_fk_warning(
+        table_name,
+        _missing_fk_keys(db, table_name, source=_quoted_identifier(table_name)),
+    )
 
 
 def _replace_relational_table(
@@ -553,13 +1486,140 @@ def _replace_relational_table(
         table_name: str,
         headers: list[str],
         rows: Iterable[tuple[str, ...]],
+        batch_size: int = IMPORT_BATCH_SIZE,
 ) -> str | None:
     _validate_relational_headers(table_name, headers)
+    # one transaction from DROP to the last row: a failed or interrupted
+    # import leaves the previous table in place. FKs are off for the load
+    # (missing parents become a warning), and the pragma must be set outside it.
+    db.commit()
     db.execute('PRAGMA foreign_keys = OFF')
-    db.execute(f'DROP TABLE IF EXISTS {_quoted_identifier(table_name)}')
-    db.executescript(_RELATIONAL_DDL[table_name])
-    db.execute('PRAGMA foreign_keys = ON')
-    return _insert_relational_rows(db, table_name=table_name, headers=headers, rows=rows)
+    try:
+        db.execute('BEGIN')
+        try:
+            db.execute(f'DROP TABLE IF EXISTS {_quoted_identifier(table_name)}')
+            db.execute(_RELATIONAL_DDL[table_name])
+            # indexes went with the old table; build them once the rows are in
+            warning = _insert_relational_rows(
+                db,
+                table_name=table_name,
+                headers=headers,
+                rows=rows,
+                batch_size=batch_size,
+            )
+            ensure_relational_indexes(db, table_names=(table_name,))
+            ensure_rollups(db)
+            bump_table_versions(db, (table_name,))
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+    finally:
+        db.execute('PRAGMA foreign_keys = ON')
+        # after the commit or rollback: either way the schema may differ now
+        invalidate_schema(db, table_name)
+    return warning
+
+
+def _upsert_relational_rows(
+        db: sqlite3.Connection,
+        *,
+        table_name: str,
+        headers: list[str],
+        rows: Iterable[tuple[str, ...]],
+        batch_size: int = IMPORT_BATCH_SIZE,
+) -> tuple[list[str], str | None]:
+    """
+    Insert ``rows`` into ``table_name``, updating rows whose primary key exists.
+
+    Returns the primary keys written (in file order) and the missing-FK
+    warning. The new rows' FK columns are staged in a temp table and
+    anti-joined against the parents, so the cost follows the size of the
+    delta, not of the tables. All-or-nothing, with FKs relaxed like
+    :func:`_replace_relational_table`.
+    """
+    _validate_relational_headers(table_name, headers)
+    columns = _RELATIONAL_INSERT_COLUMNS[table_name]
+    pk = columns[0]
+    columns_sql = ', '.join(_quoted_identifier(c) for c in columns)
+    placeholders = ', '.join('?' for _ in columns)
+    updates_sql = ', '.join(
+        f'{_quoted_identifier(c)} = excluded.{_quoted_identifier(c)}'
+        for c in columns[1:]
+    )
+    sql = (
+        f'INSERT INTO {_quoted_identifier(table_name)} ({columns_sql}) '
+        f'VALUES ({placeholders}) '
+        f'ON CONFLICT ({_quoted_identifier(pk)}) DO UPDATE SET {updates_sql}'
+    )
+
+    fk_checked = table_name in _RELATIONAL_FOREIGN_KEYS
+    missing: dict[str, set[str]] = {}
+    keys: list[str] = []
+    db.commit()
+    db.execute('PRAGMA foreign_keys = OFF')
+    try:
+        db.execute('BEGIN')
+        try:
+            if fk_checked:
+                _create_fk_staging(db, table_name)
+            for batch in _batched(rows, batch_size):
+                typed_rows = _type_batch(table_name, headers, batch)
+                if fk_checked:
+                    _stage_fk_rows(db, table_name, typed_rows)
+                db.executemany(sql, typed_rows)
+                keys.extend(row[0] for row in typed_rows)
+            if fk_checked:
+                missing = _missing_fk_keys(db, table_name, source=_FK_STAGING_TABLE)
+                db.execute(f'DROP TABLE {_FK_STAGING_TABLE}')
+            if keys:
+                bump_table_versions(db, (table_name,))
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+    finally:
+        db.execute('PRAGMA foreign_keys = ON')
+    if not fk_checked:
+        return keys, None
+    return keys, _format_fk_warning(table_name, missing)
+
+
+@contextmanager
+def _bulk_load_settings(db: sqlite3.Connection, *, wal: bool = True) -> Iterator[None]:
+    """
+    Tune ``db`` for a large load, restoring the previous settings afterwards.
+
+    Always enlarges the page cache to ``BULK_LOAD_CACHE_KIB``. With ``wal``
+    the journal also goes to WAL with ``synchronous = NORMAL`` (a commit is
+    then one sequential log append). That needs the only open connection to
+    the file, so loads into a database the GUI has open pass ``wal=False``.
+    """
+    cache_size = db.execute('PRAGMA cache_size').fetchone()[0]
+    db.execute(f'PRAGMA cache_size = -{BULK_LOAD_CACHE_KIB}')
+    if wal:
+        journal_mode = db.execute('PRAGMA journal_mode').fetchone()[0]
+        synchronous = db.execute('PRAGMA synchronous').fetchone()[0]
+        db.execute('PRAGMA journal_mode = WAL')
+        db.execute('PRAGMA synchronous = NORMAL')
+    try:
+        yield
+    finally:
+        if wal:
+            db.execute(f'PRAGMA synchronous = {synchronous}')
+            db.execute(f'PRAGMA journal_mode = {journal_mode}')
+        db.execute(f'PRAGMA cache_size = {cache_size}')
+
+
+def _foreign_key_check_error(violations: list[tuple]) -> str:
+    counts: dict[tuple[str, str], int] = {}
+    for table_name, _rowid, parent, _fkid in violations:
+        counts[table_name, parent] = counts.get((table_name, parent), 0) + 1
+    parts = ', '.join(
+        f'{n} {table_name} row(s) without a parent in {parent}'
+        for (table_name, parent), n in sorted(counts.items())
+    )
+    return f'Foreign key check failed after loading: {parts}. {_FK_LOAD_ORDER_HINT}'
 
 
 def _sort_csv_paths_for_fk(csv_paths: Iterable[str]) -> list[str]:
@@ -572,17 +1632,50 @@ def _sort_csv_paths_for_fk(csv_paths: Iterable[str]) -> list[str]:
 
 
 def create_database(
-        db_path: str,
+        db_path: str | ConnectionManager,
         csv_paths: Iterable[str],
+        *,
+        bulk: bool = True,
+        workers: int | None = None,
 ) -> None:
-    parent = os.path.dirname(db_path)
+    """
+    Build the database from ``csv_paths`` (relational tables in FK order).
+
+    ``bulk`` loads everything in one transaction under
+    :func:`_bulk_load_settings`, with FK enforcement off, secondary indexes
+    built once the rows are in, and a single ``PRAGMA foreign_key_check`` at
+    the end; a violation rolls the whole load back as a ``ValueError``.
+    ``bulk=False`` is the original load with FKs checked row by row, kept as
+    the reference.
+
+    In bulk mode, ``workers`` processes can read, decode and type the
+    relational CSVs in chunks while this one does all the inserts, still in
+    dependency order. The default ``None`` uses every CPU once those CSVs
+    reach ``PARALLEL_PARSE_MIN_BYTES`` (and reads in this process on a
+    single CPU); ``0`` always reads and types in this process.
+    """
+    parent = os.path.dirname(_database_path(db_path))
     if parent:
         os.makedirs(parent, exist_ok=True)
 
     sorted_paths = _sort_csv_paths_for_fk(csv_paths)
-    with _connect(db_path) as db:
+    if bulk:
+        if workers is None:
+            cpus = os.cpu_count() or 1
+            size = sum(
+                os.path.getsize(path)
+                for path in sorted_paths
+                if _is_relational_table(table_name_for_csv(path))
+            )
+            workers = cpus if cpus > 1 and size >= PARALLEL_PARSE_MIN_BYTES else 0
+        with _connection(db_path) as db, _bulk_load_settings(db):
+            _bulk_create_database(db, sorted_paths, workers=workers)
+        return
+    table_names = [table_name_for_csv(path) for path in sorted_paths]
+    with _connection(db_path, schema_changes=[*_RELATIONAL_TABLE_ORDER, *table_names]) as db:
         _drop_all_relational_tables(db)
         _create_empty_relational_tables(db)
+        changed = list(_RELATIONAL_TABLE_ORDER)
         for csv_path in sorted_paths:
             table_name = table_name_for_csv(csv_path)
             if not _is_relational_table(table_name):
@@ -590,6 +1683,7 @@ def create_database(
                 headers = prepare_csv_headers_for_import(table_name, headers)
                 _create_table(db, table_name=table_name, headers=headers)
                 _insert_rows(db, table_name=table_name, headers=headers, rows=rows)
+                changed.append(table_name)
                 continue
             headers, rows = _read_csv_rows(csv_path)
             headers = prepare_csv_headers_for_import(table_name, headers)
@@ -600,27 +1694,107 @@ def create_database(
                 headers=headers,
                 rows=rows,
             )
+        ensure_relational_indexes(db)
+        ensure_rollups(db)
+        bump_table_versions(db, changed)
+
+
+def _bulk_create_database(
+        db: sqlite3.Connection,
+        sorted_paths: list[str],
+        *,
+        workers: int,
+) -> None:
+    pool = None
+    if workers:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    db.execute('PRAGMA foreign_keys = OFF')
+    try:
+        db.execute('BEGIN')
+        try:
+            for name in reversed(_RELATIONAL_TABLE_ORDER):
+                db.execute(f'DROP TABLE IF EXISTS {_quoted_identifier(name)}')
+            for name in _RELATIONAL_TABLE_ORDER:
+                db.execute(_RELATIONAL_DDL[name])
+            changed = list(_RELATIONAL_TABLE_ORDER)
+            for csv_path in sorted_paths:
+                table_name = table_name_for_csv(csv_path)
+                if not _is_relational_table(table_name):
+                    headers, rows = _read_csv_rows(csv_path)
+                    headers = prepare_csv_headers_for_import(table_name, headers)
+                    db.execute(f'DROP TABLE IF EXISTS {_quoted_identifier(table_name)}')
+                    _create_table(db, table_name=table_name, headers=headers)
+                    _insert_rows(db, table_name=table_name, headers=headers, rows=rows)
+                    changed.append(table_name)
+                    continue
+                sql = _relational_insert_sql(table_name)
+                if pool is None:
+                    headers, rows = _read_csv_rows(csv_path)
+                    headers = prepare_csv_headers_for_import(table_name, headers)
+                    _validate_relational_headers(table_name, headers)
+                    batches = _typed_batches(table_name, headers, rows)
+                else:
+                    headers, encoding = _read_csv_header(csv_path)
+                    headers = prepare_csv_headers_for_import(table_name, headers)
+                    _validate_relational_headers(table_name, headers)
+                    batches = _typed_csv_chunks(
+                        table_name,
+                        headers,
+                        csv_path,
+                        encoding,
+                        pool=pool,
+                        in_flight=workers * _BATCHES_IN_FLIGHT_PER_WORKER,
+                    )
+                for batch in batches:
+                    db.executemany(sql, batch)
+            ensure_relational_indexes(db)
+            ensure_rollups(db)
+            violations = db.execute('PRAGMA foreign_key_check').fetchall()
+            if violations:
+                raise ValueError(_foreign_key_check_error(violations))
+            bump_table_versions(db, changed)
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+    finally:
+        db.execute('PRAGMA foreign_keys = ON')
+        invalidate_schema(db)
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
 
 
 def replace_table_data(
-        db_path: str,
+        db_path: str | ConnectionManager,
         *,
         table_name: str,
         headers: Iterable[str],
         rows: Iterable[Iterable[str]],
+        conn: sqlite3.Connection | None = None,
 ) -> str | None:
+    """
+    Replace ``table_name`` with ``rows``; returns the missing-FK warning, if any.
+
+    Pass ``conn`` to run on an existing connection instead of opening
+    ``db_path`` (e.g. so a background job can ``interrupt()`` the import).
+    """
     normalized_table_name = tidy_header_name(table_name)
     normalized_headers = prepare_csv_headers_for_import(normalized_table_name, headers)
-    normalized_rows = [tuple(row) for row in rows]
+    normalized_rows = (tuple(row) for row in rows)
 
-    with _connect(db_path) as db:
+    schema_changes = () if _is_relational_table(normalized_table_name) else (normalized_table_name,)
+    with _connection(db_path, conn=conn, schema_changes=schema_changes) as db:
         if _is_relational_table(normalized_table_name):
-            return _replace_relational_table(
-                db,
-                table_name=normalized_table_name,
-                headers=normalized_headers,
-                rows=normalized_rows,
-            )
+            with _bulk_load_settings(db, wal=False):
+                return _replace_relational_table(
+                    db,
+                    table_name=normalized_table_name,
+                    headers=normalized_headers,
+                    rows=normalized_rows,
+                )
 
         db.execute(
             f'DROP TABLE IF EXISTS {_quoted_identifier(normalized_table_name)}',
@@ -636,15 +1810,59 @@ def replace_table_data(
             headers=normalized_headers,
             rows=normalized_rows,
         )
+        bump_table_versions(db, (normalized_table_name,))
         return None
 
 
+def upsert_table_data(
+        db_path: str | ConnectionManager,
+        *,
+        table_name: str,
+        headers: Iterable[str],
+        rows: Iterable[Iterable[str]],
+        conn: sqlite3.Connection | None = None,
+        batch_size: int = IMPORT_BATCH_SIZE,
+) -> tuple[list[str], str | None]:
+    """
+    Append ``rows`` to ``table_name``, updating existing rows with the same key.
+
+    Returns the primary keys written (e.g. for
+    :func:`utilities.cleanup_selection`) and the missing-FK warning, if any.
+    Only the relational tables have a key to merge on.
+    """
+    normalized_table_name = tidy_header_name(table_name)
+    if not _is_relational_table(normalized_table_name):
+        raise ValueError(
+            f'cannot append to {normalized_table_name!r}: only '
+            f'{", ".join(_RELATIONAL_TABLE_ORDER)} have a primary key to merge on',
+        )
+    normalized_headers = prepare_csv_headers_for_import(normalized_table_name, headers)
+
+    with _connection(db_path, conn=conn) as db:
+        keys, warning = _upsert_relational_rows(
+            db,
+            table_name=normalized_table_name,
+            headers=normalized_headers,
+            rows=(tuple(row) for row in rows),
+            batch_size=batch_size,
+        )
+    from audit_log import get_audit_logger
+
+    get_audit_logger().info(
+        'CSV rows merged into database: table=%s row_count=%d',
+        normalized_table_name,
+        len(keys),
+    )
+    return keys, warning
+
+
 def replace_table_data_from_csv(
-        db_path: str,
+        db_path: str | ConnectionManager,
         *,
         csv_path: str,
         table_name: str | None = None,
         preloaded: tuple[list[str], list[tuple[str, ...]]] | None = None,
+        conn: sqlite3.Connection | None = None,
 ) -> tuple[str, list[str], list[tuple[str, ...]], str | None]:
     resolved_table_name = (
         table_name_for_csv(csv_path)
@@ -654,12 +1872,13 @@ def replace_table_data_from_csv(
     if preloaded is not None:
         headers, rows = preloaded
     else:
-        headers, rows = _read_csv_rows(csv_path)
+        headers, rows = read_csv_rows(csv_path)
     warning = replace_table_data(
         db_path,
         table_name=resolved_table_name,
         headers=headers,
         rows=rows,
+        conn=conn,
     )
     final_headers = prepare_csv_headers_for_import(resolved_table_name, headers)
     from audit_log import get_audit_logger
@@ -672,25 +1891,89 @@ def replace_table_data_from_csv(
     return resolved_table_name, final_headers, rows, warning
 
 
-def get_table_columns(
-        db_path: str,
-        table_name: str,
-) -> list[str]:
-    normalized_table_name = tidy_user_header_name(table_name)
+def import_csv_streaming(
+        db_path: str | ConnectionManager,
+        *,
+        csv_path: str,
+        table_name: str | None = None,
+        batch_size: int = IMPORT_BATCH_SIZE,
+) -> tuple[str, list[str], int, str | None]:
+    """
+    Constant-memory variant of :func:`replace_table_data_from_csv`.
+
+    Rows go from the CSV reader to ``executemany`` in batches of
+    ``batch_size`` without the file ever being held in memory, so only the row
+    count (not the rows) is returned.
+    """
+    resolved_table_name = (
+        table_name_for_csv(csv_path)
+        if table_name is None
+        else tidy_header_name(table_name)
+    )
+    headers, rows = _read_csv_rows(csv_path)
+    final_headers = prepare_csv_headers_for_import(resolved_table_name, headers)
+
+    row_count = 0
+
+    def counted() -> Iterator[tuple[str, ...]]:
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
+
+    schema_changes = () if _is_relational_table(resolved_table_name) else (resolved_table_name,)
+    with _connection(db_path, schema_changes=schema_changes) as db:
+        if _is_relational_table(resolved_table_name):
+            with _bulk_load_settings(db, wal=False):
+                warning = _replace_relational_table(
+                    db,
+                    table_name=resolved_table_name,
+                    headers=final_headers,
+                    rows=counted(),
+                    batch_size=batch_size,
+                )
+        else:
+            db.execute(
+                f'DROP TABLE IF EXISTS {_quoted_identifier(resolved_table_name)}',
+            )
+            _create_table(db, table_name=resolved_table_name, headers=final_headers)
+            _insert_rows(
+                db,
+                table_name=resolved_table_name,
+                headers=final_headers,
+                rows=counted(),
+            )
+            bump_table_versions(db, (resolved_table_name,))
+            warning = None
+
+    from audit_log import get_audit_logger
 
-    with _connect(db_path) as db:
-        table_rows = db.execute(
-            f'PRAGMA table_info({_quoted_identifier(normalized_table_name)})',
-        ).fetchall()
+    get_audit_logger().info(
+        'CSV streamed to database: table=%s row_count=%d batch_size=%d',
+        resolved_table_name,
+        row_count,
+        batch_size,
+    )
+    return resolved_table_name, final_headers, row_count, warning
 
-    if not table_rows:
+
+def _table_columns(db: sqlite3.Connection, table_name: str) -> list[str]:
+    columns = table_columns(db, tidy_user_header_name(table_name))
+    if not columns:
         raise ValueError(f'unknown table: {table_name!r}')
+    return columns
 
-    return [row[1] for row in table_rows]
+
+def get_table_columns(
+        db_path: str | ConnectionManager,
+        table_name: str,
+) -> list[str]:
+    with _connection(db_path) as db:
+        return _table_columns(db, table_name)
 
 
 def resolve_user_headers(
-        db_path: str,
+        db_path: str | ConnectionManager,
         *,
         table_name: str,
         headers: Iterable[str],
@@ -709,7 +1992,7 @@ def resolve_user_headers(
 
 
 def query_rows(
-        db_path: str,
+        db_path: str | ConnectionManager,
         *,
         table_name: str,
         filters: Mapping[str, str],
@@ -719,31 +2002,33 @@ def query_rows(
         raise ValueError('limit must be greater than zero')
 
     normalized_table_name = tidy_user_header_name(table_name)
-    columns = get_table_columns(db_path, normalized_table_name)
-    allowed_columns = set(columns)
-
-    where = []
-    params: list[str] = []
-    for key, value in filters.items():
-        column = tidy_user_header_name(key)
-        if column not in allowed_columns:
-            raise ValueError(f'unknown column for {table_name!r}: {key!r}')
-        where.append(f'{_quoted_identifier(column)} = ?')
-        params.append(value)
-
-    limit_param = str(limit)
-
-    with _connect(db_path) as db:
-        db.row_factory = sqlite3.Row
+    with _connection(db_path) as db:
+        columns = _table_columns(db, normalized_table_name)
+        allowed_columns = set(columns)
+
+        where = []
+        params: list[str] = []
+        for key, value in filters.items():
+            column = tidy_user_header_name(key)
+            if column not in allowed_columns:
+                raise ValueError(f'unknown column for {table_name!r}: {key!r}')
+            where.append(f'{_quoted_identifier(column)} = ?')
+            params.append(value)
+
+        limit_param = str(limit)
+
+        # Row on this cursor only: a managed connection is shared
+        cur = db.cursor()
+        cur.row_factory = sqlite3.Row
         if normalized_table_name == 'posts':
             bot = sql_exclude_bot_users(users_table_alias='u')
             cond = [bot]
             if where:
                 cond.extend(f'p.{clause}' for clause in where)
             wh = ' AND '.join(cond)
-            rows = db.execute(
+            rows = cur.execute(
                 (
-                    'SELECT p.* FROM posts p '
+                    f'SELECT {sql_column_list(columns, table_alias="p")} FROM posts p '
                     'INNER JOIN users u ON p.user_id = u.user_id '
                     f'WHERE {wh} '
                     'LIMIT ?'
@@ -756,9 +2041,9 @@ def query_rows(
             if where:
                 cond.extend(f'i.{clause}' for clause in where)
             wh = ' AND '.join(cond)
-            rows = db.execute(
+            rows = cur.execute(
                 (
-                    'SELECT i.* FROM interactions i '
+                    f'SELECT {sql_column_list(columns, table_alias="i")} FROM interactions i '
                     'INNER JOIN users u ON i.user_id = u.user_id '
                     f'WHERE {wh} '
                     'LIMIT ?'
@@ -771,9 +2056,10 @@ def query_rows(
             if where:
                 cond.extend(where)
             wh = ' AND '.join(cond)
-            rows = db.execute(
+            rows = cur.execute(
                 (
-                    f'SELECT * FROM {_quoted_identifier(normalized_table_name)} '
+                    f'SELECT {sql_column_list(columns, table_alias=None)} '
+                    f'FROM {_quoted_identifier(normalized_table_name)} '
                     f'WHERE {wh} LIMIT ?'
                 ),
                 [*params, limit_param],
@@ -784,13 +2070,13 @@ def query_rows(
                 query.append('WHERE ' + ' AND '.join(where))
             query.append('LIMIT ?')
             params.append(limit_param)
-            rows = db.execute(' '.join(query), params).fetchall()
+            rows = cur.execute(' '.join(query), params).fetchall()
 
     return [dict(row) for row in rows]
 
 
 def query_row_numbers(
-        db_path: str,
+        db_path: str | ConnectionManager,
         *,
         table_name: str,
         row_numbers: Iterable[int],
@@ -805,14 +2091,16 @@ def query_row_numbers(
 
     placeholders = ', '.join('?' for _ in normalized_row_numbers)
 
-    with _connect(db_path) as db:
-        db.row_factory = sqlite3.Row
+    with _connection(db_path) as db:
+        columns = _table_columns(db, normalized_table_name)
+        cur = db.cursor()
+        cur.row_factory = sqlite3.Row
         t = normalized_table_name
         if t == 'posts':
             bot = sql_exclude_bot_users(users_table_alias='u')
-            rows = db.execute(
+            rows = cur.execute(
                 (
-                    'SELECT p.rowid AS rowid, p.* FROM posts p '
+                    f'SELECT p.rowid AS rowid, {sql_column_list(columns, table_alias="p")} FROM posts p '
                     'INNER JOIN users u ON p.user_id = u.user_id '
                     f'WHERE {bot} AND p.rowid IN ({placeholders})'
                 ),
@@ -820,9 +2108,10 @@ def query_row_numbers(
             ).fetchall()
         elif t == 'interactions':
             bot = sql_exclude_bot_users(users_table_alias='u')
-            rows = db.execute(
+            rows = cur.execute(
                 (
-                    'SELECT i.rowid AS rowid, i.* FROM interactions i '
+                    f'SELECT i.rowid AS rowid, {sql_column_list(columns, table_alias="i")} '
+                    'FROM interactions i '
                     'INNER JOIN users u ON i.user_id = u.user_id '
                     f'WHERE {bot} AND i.rowid IN ({placeholders})'
                 ),
@@ -830,15 +2119,16 @@ def query_row_numbers(
             ).fetchall()
         elif t == 'users':
             bot = sql_exclude_bot_users(users_table_alias=None)
-            rows = db.execute(
+            rows = cur.execute(
                 (
-                    f'SELECT rowid, * FROM {_quoted_identifier(normalized_table_name)} '
+                    f'SELECT rowid, {sql_column_list(columns, table_alias=None)} '
+                    f'FROM {_quoted_identifier(normalized_table_name)} '
                     f'WHERE {bot} AND rowid IN ({placeholders})'
                 ),
                 normalized_row_numbers,
             ).fetchall()
         else:
-            rows = db.execute(
+            rows = cur.execute(
                 (
                     f'SELECT rowid, * FROM {_quoted_identifier(normalized_table_name)} '
                     f'WHERE rowid IN ({placeholders})'
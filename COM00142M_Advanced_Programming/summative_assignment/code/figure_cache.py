@@ -0,0 +1,121 @@
+"""
+Rendered analysis figures, reused while the data behind them is unchanged.
+
+:func:`render` draws a figure with Agg into an RGB bitmap; it touches no GUI
+state, so jobs call it off the Tk thread and the dialogs only blit the result
+(``tk.PhotoImage`` from the PPM bytes), which takes milliseconds. Only the
+bitmap is kept, not the ``Figure``: a dialog that wants a live canvas (zoom /
+pan) builds a fresh figure, so the budget below covers everything cached and
+one view's zoom never shows up in the next. Entries are
+keyed like :mod:`aggregate_cache` (database file, name, parameters) and are
+valid while the ``table_versions`` counters of the tables the figure reads are
+unchanged. A bitmap is a few MB (far more for a pivot with many topics), so
+only the most recently used, up to ``MAX_BYTES`` in all, are kept, in memory
+only. In-memory databases are never cached.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from database import table_versions
+from schema_catalogue import database_file
+
+MAX_BYTES = 256 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class RenderedFigure:
+    width: int
+    height: int
+    ppm: bytes
+    """Binary PPM (P6) image of the figure, as ``tk.PhotoImage(data=...)`` reads it."""
+    extra: object = None
+    """Anything else the figure builder returned (e.g. a statistic it computed)."""
+
+
+_lock = threading.Lock()
+# (database file, name, params) -> (versions, rendered), least recently used first
+_memory: OrderedDict[tuple[str, str, str], tuple[tuple[int, ...], RenderedFigure]] = OrderedDict()
+
+
+def clear() -> None:
+    with _lock:
+        _memory.clear()
+
+
+def render(fig: Figure, *, extra: object = None) -> RenderedFigure:
+    """Draw ``fig`` with Agg (safe off the Tk thread: no pyplot, no GUI canvas)."""
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    rgba = np.asarray(canvas.buffer_rgba())
+    height, width = rgba.shape[:2]
+    ppm = b'P6 %d %d 255\n' % (width, height) + rgba[:, :, :3].tobytes()
+    return RenderedFigure(width=width, height=height, ppm=ppm, extra=extra)
+
+
+def lookup(
+        conn: sqlite3.Connection,
+        *,
+        name: str,
+        tables: tuple[str, ...],
+        params: tuple[object, ...] = (),
+) -> RenderedFigure | None:
+    """The cached rendering if ``tables`` are unchanged since it was made, else ``None``."""
+    db_file = database_file(conn)
+    if not db_file:
+        return None
+    key = (db_file, name, repr(params))
+    versions = table_versions(conn, tables)
+    with _lock:
+        hit = _memory.get(key)
+        if hit is None or hit[0] != versions:
+            return None
+        _memory.move_to_end(key)
+    return hit[1]
+
+
+def cached_figure(
+        conn: sqlite3.Connection,
+        *,
+        name: str,
+        tables: tuple[str, ...],
+        params: tuple[object, ...] = (),
+        build: Callable[[], RenderedFigure],
+) -> RenderedFigure:
+    """
+    Return ``build()``, reusing a cached rendering while ``tables`` are unchanged.
+
+    ``name`` and ``params`` identify the figure (e.g. the analysis and its
+    ``human_only`` flag and filters); ``tables`` lists every table it reads.
+    """
+    db_file = database_file(conn)
+    if not db_file:
+        return build()
+    key = (db_file, name, repr(params))
+    # versions read before building, so a concurrent write leaves a stale entry unused
+    versions = table_versions(conn, tables)
+    with _lock:
+        hit = _memory.get(key)
+        if hit is not None and hit[0] == versions:
+            _memory.move_to_end(key)
+            return hit[1]
+
+    rendered = build()
+    if len(rendered.ppm) > MAX_BYTES:
+        return rendered
+    with _lock:
+        _memory[key] = (versions, rendered)
+        _memory.move_to_end(key)
+        total = sum(len(entry[1].ppm) for entry in _memory.values())
+        while total > MAX_BYTES:
+            _, (_, evicted) = _memory.popitem(last=False)
+            total -= len(evicted.ppm)
+    return rendered
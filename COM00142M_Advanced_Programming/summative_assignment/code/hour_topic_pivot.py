@@ -8,21 +8,23 @@ When no topic filter is applied, posts with NULL ``topic_id`` are grouped under
 from __future__ import annotations
 
 import sqlite3
-from collections import defaultdict
+from dataclasses import dataclass
 
 import numpy as np
 from matplotlib.figure import Figure
 
+from aggregate_cache import cached_aggregate
+from database import rollup_current
 from database import sql_exclude_bot_users
+from database import sql_rollup_authors
 
 # Sentinel for grouping NULL topic_id in buckets (all-topics mode only).
 _NULL_TOPIC_KEY = '__NULL__'
 
 
 def _hour_expr() -> str:
-    return (
-        "CAST(strftime('%H', replace(replace(p.timestamp, '/', '-'), 'T', ' ')) AS INTEGER)"
-    )
+    # pre-parsed at write time (see database.TIMESTAMP_GENERATED_COLUMNS_SQL)
+    return 'p.ts_hour'
 
 
 def query_hour_topic_counts(
@@ -35,9 +37,29 @@ def query_hour_topic_counts(
     Return rows: (hour_0_23, topic_id or None, topic_name or None, count).
 
     Excludes bot authors. Omits posts whose timestamp does not yield an hour
-    (SQLite ``strftime`` NULL). Respects optional hour/topic filters the same way
-    as filtered post listings.
+    (``ts_hour`` NULL). Respects optional hour/topic filters the same way
+    as filtered post listings. Cached until ``posts``, ``users`` or
+    ``topics`` change.
     """
+    return cached_aggregate(
+        conn,
+        name='hour_topic_counts',
+        tables=('posts', 'users', 'topics'),
+        params=(hour_filter, topic_id_filter),
+        compute=lambda: _query_hour_topic_counts(
+            conn,
+            hour_filter=hour_filter,
+            topic_id_filter=topic_id_filter,
+        ),
+    )
+
+
+def _hour_topic_counts_sql(
+        *,
+        hour_filter: int | None,
+        topic_id_filter: str | None,
+        rollup: bool,
+) -> tuple[str, list[object]]:
     params: list[object] = []
     clauses: list[str] = []
     if hour_filter is not None:
@@ -47,22 +69,45 @@ def query_hour_topic_counts(
         clauses.append('p.topic_id = ?')
         params.append(topic_id_filter)
     where_extra = ' AND '.join(clauses) if clauses else '1 = 1'
-    bot_sql = sql_exclude_bot_users(users_table_alias='u')
+    # the rollup has the hour and topic columns (same names), so the filters
+    # apply to it unchanged
+    if rollup:
+        source = 'agg_posts_hour_topic p'
+        bot_sql = sql_rollup_authors(human_only=True, table_alias='p')
+        count = 'SUM(p.row_count)'
+    else:
+        source = 'posts p INNER JOIN users u ON p.user_id = u.user_id'
+        bot_sql = sql_exclude_bot_users(users_table_alias='u')
+        count = 'COUNT(*)'
     hod = _hour_expr()
     sql = f'''
         SELECT
             {hod} AS hod,
             p.topic_id,
             t.topic_name,
-            COUNT(*) AS cnt
-        FROM posts p
-        INNER JOIN users u ON p.user_id = u.user_id
+            {count} AS cnt
+        FROM {source}
         LEFT JOIN topics t ON p.topic_id = t.topic_id
         WHERE ({where_extra}) AND ({bot_sql})
         AND {hod} IS NOT NULL
         GROUP BY hod, p.topic_id
+        HAVING cnt > 0
         ORDER BY hod, p.topic_id
     '''
+    return sql, params
+
+
+def _query_hour_topic_counts(
+        conn: sqlite3.Connection,
+        *,
+        hour_filter: int | None,
+        topic_id_filter: str | None,
+) -> list[tuple[int, str | None, str | None, int]]:
+    sql, params = _hour_topic_counts_sql(
+        hour_filter=hour_filter,
+        topic_id_filter=topic_id_filter,
+        rollup=rollup_current(conn, 'agg_posts_hour_topic'),
+    )
     cur = conn.execute(sql, params)
     out: list[tuple[int, str | None, str | None, int]] = []
     for row in cur.fetchall():
@@ -82,6 +127,74 @@ def _bucket_key(topic_id: str | None) -> str:
     return str(topic_id)
 
 
+@dataclass(frozen=True)
+class SparsePivot:
+    """Non-zero cells of a (24, n_topics) pivot, as parallel coordinate arrays."""
+    hours: np.ndarray
+    columns: np.ndarray
+    counts: np.ndarray
+    n_topics: int
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (24, self.n_topics)
+
+    def toarray(self) -> np.ndarray:
+        mat = np.zeros(self.shape, dtype=float)
+        mat[self.hours, self.columns] = self.counts
+        return mat
+
+
+def _factorize_pivot_rows(
+        rows: list[tuple[int, str | None, str | None, int]],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+    # per row: hour, column (topics by descending volume, then key) and count;
+    # plus the topic key of each column. Hours outside 0-23 count towards the
+    # topic totals only.
+    hours = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    counts = np.fromiter((r[3] for r in rows), dtype=np.int64, count=len(rows))
+    # factorised by raw topic_id first, so _bucket_key runs once per topic
+    raw_index: dict[str | None, int] = {}
+    raw_codes = np.fromiter(
+        (raw_index.setdefault(r[1], len(raw_index)) for r in rows), dtype=np.int64, count=len(rows),
+    )
+    keys, key_codes = np.unique(np.array([_bucket_key(t) for t in raw_index], dtype=str), return_inverse=True)
+    codes = key_codes[raw_codes]
+    totals = np.bincount(codes, weights=counts, minlength=len(keys))
+    # keys are sorted, so a stable sort keeps them in order among equal totals
+    order = np.argsort(-totals, kind='stable')
+    column_of_code = np.empty_like(order)
+    column_of_code[order] = np.arange(len(order))
+    in_range = (hours >= 0) & (hours < 24)
+    return hours[in_range], column_of_code[codes[in_range]], counts[in_range], keys[order].tolist()
+
+
+def build_sparse_pivot(
+        rows: list[tuple[int, str | None, str | None, int]],
+) -> tuple[SparsePivot, list[str], list[str]]:
+    """
+    Like :func:`build_pivot_matrix`, with only the non-zero cells stored.
+
+    For very wide topic sets, where most (hour, topic) cells are empty.
+    """
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return SparsePivot(hours=empty, columns=empty, counts=empty, n_topics=0), [], []
+    hours, columns, counts, topic_keys = _factorize_pivot_rows(rows)
+    n = len(topic_keys)
+    cells, cell_codes = np.unique(hours * n + columns, return_inverse=True)
+    sums = np.bincount(cell_codes, weights=counts, minlength=len(cells)).astype(np.int64)
+    nonzero = sums != 0
+    pivot = SparsePivot(
+        hours=cells[nonzero] // n,
+        columns=cells[nonzero] % n,
+        counts=sums[nonzero],
+        n_topics=n,
+    )
+    labels = ['(no topic)' if key == _NULL_TOPIC_KEY else key for key in topic_keys]
+    return pivot, topic_keys, labels
+
+
 def build_pivot_matrix(
         rows: list[tuple[int, str | None, str | None, int]],
 ) -> tuple[np.ndarray, list[str], list[str]]:
@@ -92,30 +205,8 @@ def build_pivot_matrix(
     ``topic_column_keys`` match dict keys (_NULL_TOPIC_KEY or real id).
     ``topic_header_labels`` are display strings (IDs; NULL bucket as '(no topic)').
     """
-    totals: dict[str, int] = defaultdict(int)
-    cell: dict[tuple[int, str], int] = defaultdict(int)
-
-    for hod, tid, _tname, cnt in rows:
-        key = _bucket_key(tid)
-        totals[key] += cnt
-        cell[(hod, key)] += cnt
-
-    if not totals:
-        return np.zeros((24, 0)), [], []
-
-    topic_keys = sorted(totals.keys(), key=lambda k: (-totals[k], k))
-    n = len(topic_keys)
-    mat = np.zeros((24, n), dtype=float)
-    labels: list[str] = []
-    for j, key in enumerate(topic_keys):
-        for i in range(24):
-            mat[i, j] = float(cell.get((i, key), 0))
-        if key == _NULL_TOPIC_KEY:
-            labels.append('(no topic)')
-        else:
-            labels.append(key)
-
-    return mat, topic_keys, labels
+    pivot, topic_keys, labels = build_sparse_pivot(rows)
+    return pivot.toarray(), topic_keys, labels
 
 
 def build_hour_topic_pivot_figure(
@@ -0,0 +1,225 @@
+"""
+Run long database jobs on a worker thread so the Tk window stays responsive.
+
+A job is a function taking a :class:`JobContext`. It runs on its own thread
+with its own SQLite connection (connections are never shared across threads)
+and reports progress through the context. Tk is only touched from the main
+thread: the worker posts events to a queue that the runner drains with
+``root.after``, updating the progress bar and finally calling ``on_success``
+or ``on_error``. Cancelling sets a flag checked at every progress report and
+calls ``conn.interrupt()`` so a running statement stops promptly. A job
+submitted with ``cancel_discards_result=True`` (one that only reads, e.g. a CSV
+parse that never touches SQLite) and finishing anyway after a cancel is still
+reported to ``on_error`` as :class:`JobCancelled`; any other job's result,
+which may already be committed, goes to ``on_success``.
+"""
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import tkinter as tk
+from collections.abc import Callable
+from tkinter import ttk
+from typing import Any
+
+from audit_log import get_audit_logger
+
+POLL_MS = 50
+
+
+class JobCancelled(Exception):
+    """The user cancelled the job (raised inside the worker, passed to ``on_error``)."""
+
+
+class JobContext:
+    """Handed to a job function: its private connection plus progress / cancel hooks."""
+
+    def __init__(
+            self,
+            conn: sqlite3.Connection,
+            *,
+            cancelled: threading.Event,
+            events: queue.Queue[tuple[str, Any]],
+    ) -> None:
+        self.conn = conn
+        self._cancelled = cancelled
+        self._events = events
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise JobCancelled
+
+    def status(self, text: str) -> None:
+        """Show ``text`` next to the progress bar (e.g. the current phase)."""
+        self._events.put(('status', text))
+
+    def progress(self, done: int, total: int) -> None:
+        """Report ``done`` of ``total`` units; raises :class:`JobCancelled` once cancelled."""
+        self.check_cancelled()
+        self._events.put(('progress', (done, total)))
+
+
+class JobRunner:
+    """
+    Runs one job at a time off the Tk main thread.
+
+    ``connect`` opens the worker's connection and is called on the worker
+    thread. ``progressbar``, ``status_label`` and ``cancel_button`` (any may be
+    ``None``) are shown only while a job runs.
+    """
+
+    def __init__(
+            self,
+            root: tk.Misc,
+            *,
+            connect: Callable[[], sqlite3.Connection],
+            progressbar: ttk.Progressbar | None = None,
+            status_label: ttk.Label | None = None,
+            cancel_button: ttk.Button | None = None,
+    ) -> None:
+        self.root = root
+        self.connect = connect
+        self.progressbar = progressbar
+        self.status_label = status_label
+        self.cancel_button = cancel_button
+        if cancel_button is not None:
+            cancel_button.configure(command=self.cancel)
+        self.current: str | None = None
+        self._events: queue.Queue[tuple[str, Any]] = queue.Queue()
+        self._cancelled = threading.Event()
+        self._conn_lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._thread: threading.Thread | None = None
+        self._on_success: Callable[[Any], None] | None = None
+        self._on_error: Callable[[BaseException], None] | None = None
+        self._cancel_discards_result = False
+        self._set_idle(True)
+
+    @property
+    def busy(self) -> bool:
+        return self.current is not None
+
+    def submit(
+            self,
+            name: str,
+            work: Callable[[JobContext], Any],
+            *,
+            on_success: Callable[[Any], None],
+            on_error: Callable[[BaseException], None],
+            cancel_discards_result: bool = False,
+    ) -> bool:
+        """
+        Start ``work`` on a worker thread; returns ``False`` if a job is already running.
+
+        With ``cancel_discards_result`` a result that arrives after :meth:`cancel`
+        goes to ``on_error`` as :class:`JobCancelled` instead of ``on_success``.
+        """
+        if self.busy:
+            return False
+        self.current = name
+        self._events = queue.Queue()
+        self._cancelled = threading.Event()
+        self._on_success = on_success
+        self._on_error = on_error
+        self._cancel_discards_result = cancel_discards_result
+        self._set_idle(False)
+        if self.status_label is not None:
+            self.status_label.configure(text=f'{name}…')
+        get_audit_logger().info('Background job started: %s', name)
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(work, self._events, self._cancelled),
+            name=f'job: {name}',
+            daemon=True,
+        )
+        self._thread.start()
+        self.root.after(POLL_MS, self._poll)
+        return True
+
+    def cancel(self) -> None:
+        if not self.busy:
+            return
+        get_audit_logger().info('Background job cancel requested: %s', self.current)
+        self._cancelled.set()
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def _run(
+            self,
+            work: Callable[[JobContext], Any],
+            events: queue.Queue[tuple[str, Any]],
+            cancelled: threading.Event,
+    ) -> None:
+        conn = None
+        try:
+            conn = self.connect()
+            with self._conn_lock:
+                self._conn = conn
+            result = work(JobContext(conn, cancelled=cancelled, events=events))
+            events.put(('done', result))
+        except BaseException as e:
+            if cancelled.is_set() and isinstance(e, sqlite3.OperationalError):
+                e = JobCancelled(str(e))
+            events.put(('error', e))
+        finally:
+            with self._conn_lock:
+                self._conn = None
+            if conn is not None:
+                conn.close()
+
+    def _poll(self) -> None:
+        while True:
+            try:
+                kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'status' and self.status_label is not None:
+                self.status_label.configure(text=payload)
+            elif kind == 'progress' and self.progressbar is not None:
+                done, total = payload
+                self.progressbar.stop()
+                self.progressbar.configure(mode='determinate', maximum=max(total, 1), value=done)
+            elif kind in ('done', 'error'):
+                self._finish(kind, payload)
+                return
+        self.root.after(POLL_MS, self._poll)
+
+    def _finish(self, kind: str, payload: Any) -> None:
+        name = self.current
+        on_success, on_error = self._on_success, self._on_error
+        self.current = None
+        self._on_success = self._on_error = None
+        self._thread = None
+        self._set_idle(True)
+        if kind == 'done' and self._cancel_discards_result and self._cancelled.is_set():
+            kind, payload = 'error', JobCancelled()
+        if kind == 'done':
+            get_audit_logger().info('Background job finished: %s', name)
+            assert on_success is not None
+            on_success(payload)
+        else:
+            if isinstance(payload, JobCancelled):
+                get_audit_logger().info('Background job cancelled: %s', name)
+            else:
+                get_audit_logger().warning('Background job failed: %s: %s', name, payload)
+            assert on_error is not None
+            on_error(payload)
+
+    def _set_idle(self, idle: bool) -> None:
+        if self.progressbar is not None:
+            if idle:
+                self.progressbar.stop()
+                self.progressbar.configure(mode='determinate', value=0)
+            else:
+                self.progressbar.configure(mode='indeterminate', value=0)
+                self.progressbar.start()
+        if self.status_label is not None and idle:
+            self.status_label.configure(text='')
+        if self.cancel_button is not None:
+            self.cancel_button.state(['disabled'] if idle else ['!disabled'])
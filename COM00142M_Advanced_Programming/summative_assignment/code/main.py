@@ -1,9 +1,18 @@
 from __future__ import annotations
 
-from ui import start_gui
+import sys
 
 
 def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    # ``main.py report ...`` runs the analyses headless, without importing Tk
+    if argv[:1] == ['report']:
+        from report import main as report_main
+
+        return report_main(argv[1:])
+
+    from ui import start_gui
+
     start_gui()
     return 0
 
@@ -7,12 +7,14 @@ from counts with a running ignored tally.
 """
 from __future__ import annotations
 
+import itertools
 import sqlite3
 from dataclasses import dataclass
 
 import numpy as np
 from matplotlib.figure import Figure
 
+from aggregate_cache import cached_aggregate
 from database import sql_exclude_bot_users
 
 PLACEHOLDER_REPORTER_USER_ID = 'U9999'
@@ -36,32 +38,76 @@ def _mod_rank(level: str | None) -> int:
     return _MODERATION_ORDER.get(str(level).strip().lower(), 1)
 
 
-def _effectiveness_ctes(*, ua: str, ur: str, ph: str) -> str:
+SUMMARY_COLNAMES = [
+    'category',
+    'moderation_level',
+    'posts_in_group',
+    'reports_in_group',
+    'reports_per_post',
+    'pct_posts_with_reports',
+]
+
+
+def _post_reports_sql(*, ur: str) -> str:
+    # the only pass over interactions: per post, human (non-placeholder)
+    # reports and placeholder reports side by side
     return f'''
-    WITH in_scope_posts AS (
-        SELECT
-            p.post_id,
-            t.topic_id,
-            t.topic_name,
-            t.category,
-            t.moderation_level
-        FROM posts p
-        INNER JOIN users ua ON p.user_id = ua.user_id
-        INNER JOIN topics t ON p.topic_id = t.topic_id
-        WHERE {ua} AND p.topic_id IS NOT NULL
-    ),
-    human_reports AS (
-        SELECT i.post_id, COUNT(*) AS cnt
-        FROM interactions i
-        INNER JOIN users ur ON i.user_id = ur.user_id
-        WHERE lower(trim(coalesce(i.interaction_type, ''))) = 'report'
-        AND {ur}
-        AND i.user_id != '{ph}'
-        GROUP BY i.post_id
-    )
+    CREATE TEMP TABLE moderation_post_reports AS
+    SELECT
+        i.post_id,
+        SUM(i.user_id != :ph AND coalesce({ur}, 0)) AS cnt,
+        SUM(i.user_id = :ph) AS placeholder
+    FROM interactions i
+    LEFT JOIN users ur ON i.user_id = ur.user_id
+    WHERE lower(trim(coalesce(i.interaction_type, ''))) = 'report'
+    GROUP BY i.post_id
+    '''
+
+
+def _topic_aggregate_sql(*, ua: str) -> str:
+    return f'''
+    SELECT
+        t.topic_id,
+        t.topic_name,
+        t.category,
+        t.moderation_level,
+        COUNT(p.post_id) AS post_count,
+        SUM(COALESCE(r.cnt, 0)) AS report_count,
+        SUM(COALESCE(r.cnt, 0) > 0) AS posts_with_reports
+    FROM posts p
+    INNER JOIN users ua ON p.user_id = ua.user_id
+    INNER JOIN topics t ON p.topic_id = t.topic_id
+    LEFT JOIN temp.moderation_post_reports r ON r.post_id = p.post_id
+    WHERE {ua} AND p.topic_id IS NOT NULL
+    GROUP BY t.topic_id
+    ORDER BY t.category, t.moderation_level, t.topic_id
     '''
 
 
+def _summary_from_topics(
+        topic_aggregate: list[tuple[object, ...]],
+) -> list[tuple[object, ...]]:
+    """Roll topic rows (sorted by category, moderation_level) up to :data:`SUMMARY_COLNAMES`."""
+    rows: list[tuple[object, ...]] = []
+    for (category, level), group in itertools.groupby(
+            topic_aggregate, key=lambda r: (r[2], r[3]),
+    ):
+        posts = reports = with_reports = 0
+        for r in group:
+            posts += int(r[4])
+            reports += int(r[5])
+            with_reports += int(r[6])
+        rows.append((
+            category,
+            level,
+            posts,
+            reports,
+            reports * 1.0 / posts,
+            100.0 * with_reports / posts,
+        ))
+    return rows
+
+
 @dataclass(frozen=True)
 class ModerationEffectivenessResult:
     summary_colnames: list[str]
@@ -76,54 +122,47 @@ class ModerationEffectivenessResult:
 def run_moderation_effectiveness_analysis(
         conn: sqlite3.Connection,
 ) -> ModerationEffectivenessResult:
-    ua = sql_exclude_bot_users(users_table_alias='ua')
-    ur = sql_exclude_bot_users(users_table_alias='ur')
-    ph = PLACEHOLDER_REPORTER_USER_ID
+    """
+    One pass over ``interactions`` (into a temp per-post report table), one
+    topic-level aggregate on top of it; the (category, moderation_level)
+    summary is rolled up from the topic rows.
 
-    ignored_row = conn.execute(
-        '''
-        SELECT COUNT(*) FROM interactions
-        WHERE lower(trim(coalesce(interaction_type, ''))) = 'report'
-        AND user_id = ?
-        ''',
-        (ph,),
-    ).fetchone()
-    ignored_placeholder_reports = int(ignored_row[0]) if ignored_row else 0
+    Cached until any of the four tables change.
+    """
+    return cached_aggregate(
+        conn,
+        name='moderation_effectiveness',
+        tables=('posts', 'users', 'topics', 'interactions'),
+        compute=lambda: _compute_moderation_effectiveness(conn),
+        decode=lambda fields: ModerationEffectivenessResult(**fields),
+    )
 
-    cte = _effectiveness_ctes(ua=ua, ur=ur, ph=ph)
 
-    agg_sql = cte + '''
-    SELECT
-        isp.category,
-        isp.moderation_level,
-        COUNT(DISTINCT isp.post_id) AS posts_in_group,
-        SUM(COALESCE(hr.cnt, 0)) AS reports_in_group,
-        (SUM(COALESCE(hr.cnt, 0)) * 1.0 / COUNT(DISTINCT isp.post_id)) AS reports_per_post,
-        (100.0 * SUM(CASE WHEN COALESCE(hr.cnt, 0) > 0 THEN 1 ELSE 0 END)
-            / COUNT(DISTINCT isp.post_id)) AS pct_posts_with_reports
-    FROM in_scope_posts isp
-    LEFT JOIN human_reports hr ON hr.post_id = isp.post_id
-    GROUP BY isp.category, isp.moderation_level
-    ORDER BY isp.category, isp.moderation_level
-    '''
-    cur = conn.execute(agg_sql)
-    summary_colnames = [d[0] for d in cur.description] if cur.description else []
-    summary_rows = cur.fetchall()
+def _compute_moderation_effectiveness(
+        conn: sqlite3.Connection,
+) -> ModerationEffectivenessResult:
+    ua = sql_exclude_bot_users(users_table_alias='ua')
+    ur = sql_exclude_bot_users(users_table_alias='ur')
 
-    topic_sql = cte + '''
-    SELECT
-        isp.topic_id,
-        isp.topic_name,
-        isp.category,
-        isp.moderation_level,
-        COUNT(DISTINCT isp.post_id) AS post_count,
-        SUM(COALESCE(hr.cnt, 0)) AS report_count
-    FROM in_scope_posts isp
-    LEFT JOIN human_reports hr ON hr.post_id = isp.post_id
-    GROUP BY isp.topic_id, isp.topic_name, isp.category, isp.moderation_level
-    ORDER BY isp.category, isp.moderation_level, isp.topic_id
-    '''
-    topic_rows = conn.execute(topic_sql).fetchall()
+    conn.execute('DROP TABLE IF EXISTS temp.moderation_post_reports')
+    conn.execute(_post_reports_sql(ur=ur), {'ph': PLACEHOLDER_REPORTER_USER_ID})
+    try:
+        conn.execute(
+            'CREATE INDEX temp.moderation_post_reports_post_id '
+            'ON moderation_post_reports (post_id)',
+        )
+        ignored_placeholder_reports = int(
+            conn.execute(
+                'SELECT coalesce(SUM(placeholder), 0) FROM temp.moderation_post_reports',
+            ).fetchone()[0],
+        )
+        topic_aggregate = conn.execute(_topic_aggregate_sql(ua=ua)).fetchall()
+    finally:
+        conn.execute('DROP TABLE IF EXISTS temp.moderation_post_reports')
+
+    summary_colnames = list(SUMMARY_COLNAMES)
+    summary_rows = _summary_from_topics(topic_aggregate)
+    topic_rows = [r[:6] for r in topic_aggregate]
 
     stats_lines = _summary_stat_lines(
         summary_rows,
@@ -0,0 +1,277 @@
+"""
+Headless batch reports: every analysis without Tk, for scheduled runs.
+
+Each analysis writes its figures (rendered with Agg) and the tables behind
+them to ``<out_dir>/<analysis>/``. Analyses are independent, so they run in
+parallel worker processes, each on its own read-only connection::
+
+    python report.py social.db reports/ --analysis moderation --format png svg
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import pathlib
+import sqlite3
+import sys
+from collections.abc import Callable
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from analysis import build_analysis_figure
+from analysis import fetch_daily_interaction_counts
+from analysis import fetch_daily_post_counts
+from audit_log import get_audit_logger
+from categorical_analysis import build_categorical_analysis_figure
+from categorical_analysis import query_three_way_distribution
+from hour_topic_pivot import build_hour_topic_pivot_figure
+from hour_topic_pivot import build_pivot_matrix
+from hour_topic_pivot import query_hour_topic_counts
+from moderation_effectiveness import build_moderation_correlation_figure
+from moderation_effectiveness import build_moderation_effectiveness_figure
+from moderation_effectiveness import run_moderation_effectiveness_analysis
+
+FIGURE_FORMATS = ('png', 'svg')
+TABLE_FORMATS = ('csv', 'json')
+
+
+@dataclass(frozen=True)
+class ReportOptions:
+    human_only: bool = False
+    hour: int | None = None
+    topic_id: str | None = None
+
+
+@dataclass
+class AnalysisOutput:
+    figures: dict[str, Figure] = field(default_factory=dict)
+    # name -> (column names, rows)
+    tables: dict[str, tuple[list[str], list[tuple[object, ...]]]] = field(default_factory=dict)
+
+
+def _timeline(conn: sqlite3.Connection, options: ReportOptions) -> AnalysisOutput:
+    out = AnalysisOutput()
+    out.figures['daily_activity'] = build_analysis_figure(conn, human_only=options.human_only)
+    # the counts the figure plots (timestamps only the Python fallback parses
+    # included); days without any are left out
+    posts = fetch_daily_post_counts(conn, human_only=options.human_only)
+    out.tables['daily_posts'] = (
+        ['day', 'posts'],
+        [(day.strftime('%Y-%m-%d'), int(n)) for day, n in posts.items() if n],
+    )
+    # every type, none folded into '(other types)'
+    interactions = fetch_daily_interaction_counts(conn, human_only=options.human_only, top_n=sys.maxsize)
+    cells = interactions.stack().sort_index()
+    out.tables['daily_interactions'] = (
+        ['day', 'interaction_type', 'interactions'],
+        [(day.strftime('%Y-%m-%d'), kind, int(n)) for (day, kind), n in cells.items() if n],
+    )
+    return out
+
+
+def _categorical(conn: sqlite3.Connection, options: ReportOptions) -> AnalysisOutput:
+    rows = query_three_way_distribution(conn, human_only=options.human_only)
+    return AnalysisOutput(
+        figures={'three_way': build_categorical_analysis_figure(rows)},
+        tables={'three_way': (['category', 'moderation_level', 'content_type', 'posts'], list(rows))},
+    )
+
+
+def _hour_topic(conn: sqlite3.Connection, options: ReportOptions) -> AnalysisOutput:
+    rows = query_hour_topic_counts(conn, hour_filter=options.hour, topic_id_filter=options.topic_id)
+    matrix, _topic_keys, topic_labels = build_pivot_matrix(rows)
+    return AnalysisOutput(
+        figures={'pivot': build_hour_topic_pivot_figure(matrix, topic_labels)},
+        tables={'counts': (['hour', 'topic_id', 'topic_name', 'posts'], list(rows))},
+    )
+
+
+def _moderation(conn: sqlite3.Connection, options: ReportOptions) -> AnalysisOutput:
+    result = run_moderation_effectiveness_analysis(conn)
+    fig_corr, r_pearson = build_moderation_correlation_figure(result)
+    return AnalysisOutput(
+        figures={
+            'effectiveness': build_moderation_effectiveness_figure(result),
+            'correlation': fig_corr,
+        },
+        tables={
+            'summary': (list(result.summary_colnames), list(result.summary_rows)),
+            'topics': (
+                ['topic_id', 'topic_name', 'category', 'moderation_level', 'post_count', 'report_count'],
+                list(result.topic_rows),
+            ),
+            'overview': (
+                ['metric', 'value'],
+                [
+                    ('ignored_placeholder_reports', result.ignored_placeholder_reports),
+                    ('pearson_r', r_pearson),
+                    *(('pattern', m) for m in result.pattern_messages),
+                    *(('summary_stat', line) for line in result.summary_stats_lines),
+                ],
+            ),
+        },
+    )
+
+
+ANALYSES: dict[str, Callable[[sqlite3.Connection, ReportOptions], AnalysisOutput]] = {
+    'timeline': _timeline,
+    'categorical': _categorical,
+    'hour_topic': _hour_topic,
+    'moderation': _moderation,
+}
+
+
+def _write_table(path: str, columns: list[str], rows: list[tuple[object, ...]]) -> None:
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([dict(zip(columns, row)) for row in rows], f, indent=1, default=str)
+
+
+def run_analysis(
+        name: str,
+        db_path: str,
+        out_dir: str,
+        *,
+        options: ReportOptions,
+        figure_formats: Sequence[str] = ('png',),
+        table_formats: Sequence[str] = ('csv',),
+) -> list[str]:
+    """Run one analysis against ``db_path`` and write its outputs; returns the paths written."""
+    uri = pathlib.Path(db_path).resolve().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True)
+    try:
+        output = ANALYSES[name](conn, options)
+    finally:
+        conn.close()
+
+    dest = os.path.join(out_dir, name)
+    os.makedirs(dest, exist_ok=True)
+    written = []
+    for fig_name, fig in output.figures.items():
+        FigureCanvasAgg(fig)
+        for fmt in figure_formats:
+            path = os.path.join(dest, f'{fig_name}.{fmt}')
+            fig.savefig(path, format=fmt)
+            written.append(path)
+    for table_name, (columns, rows) in output.tables.items():
+        for fmt in table_formats:
+            path = os.path.join(dest, f'{table_name}.{fmt}')
+            _write_table(path, columns, rows)
+            written.append(path)
+    return written
+
+
+def run_reports(
+        db_path: str,
+        out_dir: str,
+        *,
+        analyses: Sequence[str],
+        options: ReportOptions,
+        figure_formats: Sequence[str] = ('png',),
+        table_formats: Sequence[str] = ('csv',),
+        workers: int | None = None,
+) -> dict[str, list[str] | Exception]:
+    """
+    Run ``analyses`` (names from ``ANALYSES``), in up to ``workers`` processes.
+
+    Returns, per analysis, the paths written or the exception it raised; one
+    failing analysis does not stop the others. ``workers`` of 0 or 1 runs
+    them in this process.
+    """
+    unknown = sorted(set(analyses) - set(ANALYSES))
+    if unknown:
+        raise ValueError(f'unknown analyses: {", ".join(unknown)}')
+    if not os.path.isfile(db_path):
+        raise ValueError(f'database not found: {db_path}')
+    if workers is None:
+        workers = min(len(analyses), os.cpu_count() or 1)
+    kwargs = {'options': options, 'figure_formats': figure_formats, 'table_formats': table_formats}
+
+    results: dict[str, list[str] | Exception] = {}
+    if workers <= 1:
+        for name in analyses:
+            try:
+                results[name] = run_analysis(name, db_path, out_dir, **kwargs)
+            except Exception as e:
+                results[name] = e
+    else:
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            futures = {
+                name: pool.submit(run_analysis, name, db_path, out_dir, **kwargs)
+                for name in analyses
+            }
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = e
+
+    logger = get_audit_logger()
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            logger.error('Report %s failed: %s', name, result)
+        else:
+            logger.info('Report %s: wrote %d files to %s', name, len(result), out_dir)
+    return results
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Write analysis figures and tables without the GUI.')
+    parser.add_argument('db_path')
+    parser.add_argument('out_dir')
+    parser.add_argument(
+        '--analysis',
+        dest='analyses',
+        action='append',
+        choices=tuple(ANALYSES),
+        help='analysis to run (repeatable; default: all)',
+    )
+    parser.add_argument('--human-only', action='store_true')
+    parser.add_argument('--hour', type=int, choices=range(24), metavar='0-23', help='hour_topic filter')
+    parser.add_argument('--topic-id', help='hour_topic filter')
+    parser.add_argument('--format', dest='figure_formats', nargs='+', choices=FIGURE_FORMATS, default=['png'])
+    parser.add_argument('--tables', dest='table_formats', nargs='+', choices=TABLE_FORMATS, default=['csv'])
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        results = run_reports(
+            args.db_path,
+            args.out_dir,
+            analyses=args.analyses or list(ANALYSES),
+            options=ReportOptions(human_only=args.human_only, hour=args.hour, topic_id=args.topic_id),
+            figure_formats=args.figure_formats,
+            table_formats=args.table_formats,
+            workers=args.workers,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    failed = 0
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            failed += 1
+            print(f'{name}: FAILED: {result}')
+        else:
+            print(f'{name}: {len(result)} files')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+"""
+Catalogue of table columns, read once from ``PRAGMA table_info`` and reused.
+
+Entries are keyed by database file and table, so every connection to the
+same file (the UI's, a background job's, a :class:`database.ConnectionManager`
+thread's) shares them. The schema only changes through this app's own DDL in
+:mod:`database`, which calls :func:`invalidate` for the tables it touches; DDL
+run anywhere else must do the same. In-memory databases are never cached.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+_lock = threading.Lock()
+# (database file, table) -> ((column, declared type), ...) in table order
+_tables: dict[tuple[str, str], tuple[tuple[str, str], ...]] = {}
+
+
+def clear() -> None:
+    """Forget every table of every database."""
+    with _lock:
+        _tables.clear()
+
+
+def database_file(conn: sqlite3.Connection) -> str:
+    """Path of ``conn``'s main database file; ``''`` for an in-memory database."""
+    for _, name, path in conn.execute('PRAGMA database_list'):
+        if name == 'main':
+            return path or ''
+    return ''
+
+
+def invalidate(conn: sqlite3.Connection, table_name: str | None = None) -> None:
+    """Drop the entry for ``table_name`` (all tables when ``None``) of ``conn``'s database."""
+    db_file = database_file(conn)
+    with _lock:
+        for key in [k for k in _tables if k[0] == db_file]:
+            if table_name is None or key[1] == table_name:
+                del _tables[key]
+
+
+def _table_info(conn: sqlite3.Connection, table_name: str) -> tuple[tuple[str, str], ...]:
+    db_file = database_file(conn)
+    key = (db_file, table_name)
+    if db_file:
+        with _lock:
+            hit = _tables.get(key)
+        if hit is not None:
+            return hit
+    quoted = '"' + table_name.replace('"', '""') + '"'
+    info = tuple(
+        (row[1], row[2])
+        for row in conn.execute(f'PRAGMA table_info({quoted})')
+    )
+    # a missing table is not cached: it may be created without DDL from here
+    if db_file and info:
+        with _lock:
+            _tables[key] = info
+    return info
+
+
+def table_columns(conn: sqlite3.Connection, table_name: str) -> list[str]:
+    """Column names of ``table_name`` (generated columns excluded); empty if it does not exist."""
+    return [name for name, _ in _table_info(conn, table_name)]
+
+
+def column_types(conn: sqlite3.Connection, table_name: str) -> dict[str, str]:
+    """Declared type of every column of ``table_name``, in table order."""
+    return dict(_table_info(conn, table_name))
@@ -0,0 +1,290 @@
+"""
+Columnar snapshot of the relational tables for repeated pandas analyses.
+
+``export_snapshot`` writes ``topics``, ``users``, ``posts`` and
+``interactions`` to a directory: one Parquet file per table when ``pyarrow``
+is installed, else one NumPy ``.npy`` file per column. Timestamps are stored
+already parsed (``ts_datetime``, ``datetime64[s]``, NaT when unparseable) and
+posts / interactions carry ``author_is_human`` so the "human only" filter
+needs no join. NULL text is stored as ``''``. In ``.npy`` snapshots a text
+column is dictionary-encoded: ``int32`` codes per row plus its distinct values
+as one UTF-8 blob with offsets, so long or repeated strings are not padded to
+the longest one.
+
+``open_snapshot`` memory-maps ``.npy`` columns, so loading a frame reads only
+the columns asked for and numeric / datetime columns are not copied. The
+``analysis`` fetch functions accept a :class:`Snapshot` wherever they take a
+connection. A snapshot does not follow later imports; ``is_current`` tells.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+from collections.abc import Sequence
+from types import ModuleType
+
+import numpy as np
+import pandas as pd
+
+from database import sql_exclude_bot_users
+from database import table_versions
+
+SNAPSHOT_TABLES = ('topics', 'users', 'posts', 'interactions')
+MANIFEST = 'manifest.json'
+
+_HUMAN_SQL = f"COALESCE({sql_exclude_bot_users(users_table_alias='u')}, 0)"
+
+# table -> SELECT producing its snapshot columns
+_EXPORT_SQL: dict[str, str] = {
+    'topics': 'SELECT topic_id, topic_name, category, moderation_level, description FROM topics',
+    'users': '''
+        SELECT
+            user_id, username, join_date, location, account_type, verified,
+            followers_count, is_bot
+        FROM users
+    ''',
+    'posts': f'''
+        SELECT
+            p.post_id, p.user_id, p.timestamp, p.content_type, p.content_preview,
+            p.has_media, p.topic_id, p.language, p.ts_epoch, p.ts_hour,
+            {_HUMAN_SQL} AS author_is_human
+        FROM posts p
+        LEFT JOIN users u ON p.user_id = u.user_id
+    ''',
+    'interactions': f'''
+        SELECT
+            i.interaction_id, i.post_id, i.user_id, i.interaction_type,
+            i.timestamp, i.reaction_type, i.ts_epoch, i.ts_hour,
+            {_HUMAN_SQL} AS author_is_human
+        FROM interactions i
+        LEFT JOIN users u ON i.user_id = u.user_id
+    ''',
+}
+# integer columns that may be NULL: stored as float64 with NaN
+_NULLABLE_INT_COLUMNS = frozenset(('followers_count', 'ts_epoch', 'ts_hour'))
+_BOOL_COLUMNS = frozenset(('is_bot', 'author_is_human'))
+
+
+def _pyarrow() -> tuple[ModuleType, ModuleType] | None:
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow, pyarrow.parquet
+
+
+def _typed_columns(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Snapshot columns of an ``_EXPORT_SQL`` frame; text as ``object`` arrays of ``str``."""
+    out: dict[str, np.ndarray] = {}
+    for name in df.columns:
+        col = df[name]
+        if name in _BOOL_COLUMNS:
+            out[name] = col.fillna(0).to_numpy(dtype=bool)
+        elif name in _NULLABLE_INT_COLUMNS:
+            out[name] = pd.to_numeric(col, errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            out[name] = col.fillna('').astype(str).to_numpy(dtype=object)
+    if 'ts_epoch' in out:
+        epoch = out['ts_epoch']
+        ts = np.full(len(epoch), np.datetime64('NaT'), dtype='datetime64[s]')
+        valid = ~np.isnan(epoch)
+        ts[valid] = epoch[valid].astype(np.int64).astype('datetime64[s]')
+        if 'timestamp' in df.columns:
+            # text SQLite could not parse, read as analysis.frame_datetimes does
+            unparsed = ~valid & df['timestamp'].notna().to_numpy()
+            if unparsed.any():
+                from analysis import normalize_sqlite_timestamp_series
+                parsed = normalize_sqlite_timestamp_series(df['timestamp'][unparsed])
+                ts[unparsed] = parsed.to_numpy().astype('datetime64[s]')
+        out['ts_datetime'] = ts
+    return out
+
+
+def _save_text_column(path: str, values: np.ndarray) -> None:
+    """Write ``values`` as ``<path>.codes.npy``, ``<path>.offsets.npy`` and ``<path>.utf8.npy``."""
+    codes, distinct = pd.factorize(values)
+    encoded = [v.encode('utf-8') for v in distinct]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(f'{path}.codes.npy', codes.astype(np.int32), allow_pickle=False)
+    np.save(f'{path}.offsets.npy', offsets, allow_pickle=False)
+    np.save(f'{path}.utf8.npy', np.frombuffer(b''.join(encoded), dtype=np.uint8), allow_pickle=False)
+
+
+def _load_text_column(path: str) -> np.ndarray:
+    """A column written by :func:`_save_text_column`, as an ``object`` array of ``str``."""
+    codes = np.load(f'{path}.codes.npy', mmap_mode='r', allow_pickle=False)
+    offsets = np.load(f'{path}.offsets.npy', allow_pickle=False).tolist()
+    blob = np.load(f'{path}.utf8.npy', allow_pickle=False).tobytes()
+    distinct = np.empty(len(offsets) - 1, dtype=object)
+    distinct[:] = [blob[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+    return distinct[codes]
+
+
+def export_snapshot(
+        conn: sqlite3.Connection,
+        dest_dir: str,
+        *,
+        fmt: str | None = None,
+) -> str:
+    """
+    Write the snapshot of ``conn``'s database to ``dest_dir``; returns the format.
+
+    ``fmt`` is ``'parquet'`` or ``'npy'``; ``None`` picks Parquet when
+    ``pyarrow`` is installed. The tables and their versions are read in one
+    transaction, so they agree with each other.
+    """
+    arrow = _pyarrow()
+    if fmt is None:
+        fmt = 'npy' if arrow is None else 'parquet'
+    if fmt not in ('parquet', 'npy'):
+        raise ValueError(f'unknown snapshot format: {fmt!r}')
+    if fmt == 'parquet' and arrow is None:
+        raise ValueError('parquet snapshots need pyarrow (pip install pyarrow)')
+
+    os.makedirs(dest_dir, exist_ok=True)
+    tables: dict[str, dict[str, object]] = {}
+    # one read transaction for every table (a caller's open one will do)
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute('BEGIN')
+    try:
+        for table_name in SNAPSHOT_TABLES:
+            columns = _typed_columns(pd.read_sql_query(_EXPORT_SQL[table_name], conn))
+            rows = len(next(iter(columns.values()))) if columns else 0
+            text_columns = [name for name, values in columns.items() if values.dtype == object]
+            if fmt == 'parquet':
+                assert arrow is not None
+                pa, pq = arrow
+                pq.write_table(
+                    pa.table(columns),
+                    os.path.join(dest_dir, f'{table_name}.parquet'),
+                )
+            else:
+                table_dir = os.path.join(dest_dir, table_name)
+                os.makedirs(table_dir, exist_ok=True)
+                for name, values in columns.items():
+                    if name in text_columns:
+                        _save_text_column(os.path.join(table_dir, name), values)
+                    else:
+                        np.save(os.path.join(table_dir, f'{name}.npy'), values, allow_pickle=False)
+            tables[table_name] = {'rows': rows, 'columns': list(columns), 'text_columns': text_columns}
+        versions = table_versions(conn, SNAPSHOT_TABLES)
+    finally:
+        if own_transaction:
+            conn.commit()
+
+    manifest = {
+        'format': fmt,
+        'tables': tables,
+        'versions': list(versions),
+    }
+    with open(os.path.join(dest_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    from audit_log import get_audit_logger
+
+    get_audit_logger().info(
+        'Snapshot exported: path=%s format=%s rows=%s',
+        dest_dir,
+        fmt,
+        {name: t['rows'] for name, t in tables.items()},
+    )
+    return fmt
+
+
+class Snapshot:
+    """A snapshot directory opened for reading (see :func:`open_snapshot`)."""
+
+    def __init__(self, path: str, manifest: dict[str, object]) -> None:
+        self.path = path
+        self.format = str(manifest['format'])
+        self.tables = dict(manifest['tables'])  # type: ignore[call-overload]
+        self.versions = tuple(manifest['versions'])  # type: ignore[call-overload]
+        self._parquet: dict[str, object] = {}
+
+    def columns(self, table_name: str) -> list[str]:
+        return list(self.tables[table_name]['columns'])
+
+    def column(self, table_name: str, name: str) -> np.ndarray:
+        """
+        One column; memory-mapped (read-only) for ``.npy`` snapshots, except
+        text, which is decoded to an ``object`` array.
+        """
+        if name not in self.columns(table_name):
+            raise ValueError(f'unknown snapshot column: {table_name}.{name}')
+        if self.format == 'npy':
+            if name in self.tables[table_name].get('text_columns', ()):
+                return _load_text_column(os.path.join(self.path, table_name, name))
+            return np.load(
+                os.path.join(self.path, table_name, f'{name}.npy'),
+                mmap_mode='r',
+                allow_pickle=False,
+            )
+        arrow = _pyarrow()
+        if arrow is None:
+            raise ValueError('reading a parquet snapshot needs pyarrow (pip install pyarrow)')
+        if table_name not in self._parquet:
+            self._parquet[table_name] = arrow[1].read_table(
+                os.path.join(self.path, f'{table_name}.parquet'),
+                memory_map=True,
+            )
+        table = self._parquet[table_name]
+        return table.column(name).to_numpy()  # type: ignore[attr-defined]
+
+    def frame(
+            self,
+            table_name: str,
+            columns: Sequence[str],
+            *,
+            human_only: bool = False,
+    ) -> pd.DataFrame:
+        """
+        ``columns`` of ``table_name`` as a DataFrame.
+
+        ``human_only`` keeps rows whose author is not a bot, as the SQL
+        ``sql_exclude_bot_users`` joins do (posts / interactions only).
+        """
+        data = {name: self.column(table_name, name) for name in columns}
+        if human_only:
+            mask = np.asarray(self.column(table_name, 'author_is_human'))
+            data = {name: values[mask] for name, values in data.items()}
+        return pd.DataFrame(
+            {name: pd.Series(values, copy=False) for name, values in data.items()},
+            copy=False,
+        )
+
+    def is_current(self, conn: sqlite3.Connection) -> bool:
+        """Whether no snapshot table has changed in ``conn``'s database since the export."""
+        return table_versions(conn, SNAPSHOT_TABLES) == self.versions
+
+
+def open_snapshot(path: str) -> Snapshot:
+    try:
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f'not a snapshot directory (no {MANIFEST}): {path}') from None
+    return Snapshot(path, manifest)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Export a columnar snapshot of the database.')
+    parser.add_argument('db_path')
+    parser.add_argument('dest_dir')
+    parser.add_argument('--format', choices=('parquet', 'npy'), default=None)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db_path)
+    try:
+        fmt = export_snapshot(conn, args.dest_dir, fmt=args.format)
+    finally:
+        conn.close()
+    print(f'{fmt} snapshot written to {args.dest_dir}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
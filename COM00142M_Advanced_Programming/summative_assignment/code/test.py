@@ -1,10 +1,19 @@
 from __future__ import annotations
 
 import csv
+import dataclasses
+import io
+import json
 import logging
+import multiprocessing
+import queue
+import re
 import sqlite3
 import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import closing
 from pathlib import Path
 from unittest import mock
@@ -13,14 +22,22 @@ import numpy as np
 import pandas as pd
 from matplotlib.figure import Figure
 
+import aggregate_cache
 import analysis
 import audit_log
+import benchmark
 import categorical_analysis
 import database
+import figure_cache
 import hour_topic_pivot
+import job_runner
 import moderation_effectiveness
+import report
+import schema_catalogue
+import snapshot
 import ui
 import utilities
+import virtual_treeview
 
 
 class _FakeVar:
@@ -70,7 +87,7 @@ class _FakeWidget:
     def configure(self, **kwargs) -> None:
         self.config.update(kwargs)
 
-    def bind(self, event, callback) -> None:
+    def bind(self, event, callback, add=None) -> None:
         self.bound[event] = callback
 
     def destroy(self) -> None:
@@ -115,8 +132,11 @@ class _FakeWidget:
     def yview_scroll(self, *args, **kwargs) -> None:
         pass
 
-    def yview(self, *args, **kwargs) -> None:
-        pass
+    def yview(self, *args, **kwargs):
+        return (0.0, 1.0)
+
+    def yview_moveto(self, fraction) -> None:
+        self.moved_to = fraction
 
     def xview(self, *args, **kwargs) -> None:
         pass
@@ -130,8 +150,8 @@ class _FakeWidget:
     def column(self, *args, **kwargs) -> None:
         pass
 
-    def insert(self, parent, index, values=()):
-        item_id = f'i{len(self._items) + 1}'
+    def insert(self, parent, index, iid=None, values=()):
+        item_id = iid if iid is not None else f'i{len(self._items) + 1}'
         self._items[item_id] = tuple(values)
         self.children.append(item_id)
         return item_id
@@ -150,6 +170,9 @@ class _FakeWidget:
     def selection(self):
         return tuple(self._selection)
 
+    def selection_set(self, items) -> None:
+        self._selection = list(items)
+
     def item(self, item_id, option=None):
         values = self._items.get(item_id, ())
         if option == 'values':
@@ -159,6 +182,12 @@ class _FakeWidget:
     def state(self, *args, **kwargs) -> None:
         self.last_state = args
 
+    def start(self, *args) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
     def focus(self) -> None:
         self.focused = True
 
@@ -203,6 +232,26 @@ class _FakeText(_FakeWidget):
         self.contents += text
 
 
+class _InlineJobRunner:
+    """Stands in for ``job_runner.JobRunner``: runs each job at once on ``conn``."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.current = None
+        self.names: list[str] = []
+
+    def submit(self, name, work, *, on_success, on_error, cancel_discards_result=False) -> bool:
+        self.names.append(name)
+        job = job_runner.JobContext(self.conn, cancelled=threading.Event(), events=queue.Queue())
+        try:
+            result = work(job)
+        except Exception as e:
+            on_error(e)
+        else:
+            on_success(result)
+        return True
+
+
 class _FakeMplCanvas:
     def __init__(self, fig, master=None):
         self.fig = fig
@@ -228,27 +277,200 @@ class _FakeToolbar:
         pass
 
 
+def _copy_relational_rows(source: sqlite3.Connection, target: sqlite3.Connection) -> None:
+    """Copy a fixture's tables into the real relational tables (the columns both have)."""
+    for table_name, insert_columns in database._RELATIONAL_INSERT_COLUMNS.items():
+        if not database._table_exists(source, table_name):
+            continue
+        present = {r[1] for r in source.execute(f'PRAGMA table_info({table_name})')}
+        cols = ', '.join(c for c in insert_columns if c in present)
+        rows = source.execute(f'SELECT {cols} FROM {table_name}').fetchall()
+        if rows:
+            marks = ', '.join('?' * len(rows[0]))
+            target.executemany(f'INSERT INTO {table_name} ({cols}) VALUES ({marks})', rows)
+
+
+def _stale_rollups(conn: sqlite3.Connection) -> list[str]:
+    """Rollups whose non-zero counts differ from a recount of their source table."""
+    stale = []
+    for rollup, (source, buckets) in database._ROLLUPS.items():
+        cols = ', '.join(f's.{c}' for c in buckets)
+        recount = conn.execute(
+            f'SELECT {cols}, coalesce(1 - u.is_bot, -1) AS a, COUNT(*) '
+            f'FROM {source} s LEFT JOIN users u ON s.user_id = u.user_id GROUP BY {cols}, a',
+        ).fetchall()
+        kept = conn.execute(
+            f'SELECT {", ".join(buckets)}, author, row_count FROM {rollup} WHERE row_count != 0',
+        ).fetchall()
+        if sorted(recount, key=repr) != sorted(kept, key=repr):
+            stale.append(rollup)
+    return stale
+
+
+def _indexed_relational_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(':memory:')
+    database._create_empty_relational_tables(conn)
+    database.ensure_relational_indexes(conn)
+    return conn
+
+
+def _full_scans(conn: sqlite3.Connection, sql: str, params: object = ()) -> list[str]:
+    """Plan lines reading posts (``p``) or interactions (``i``) without any index."""
+    return [line for line in database.explain_plan(conn, sql, params) if re.fullmatch(r'\s*SCAN [pi]', line)]
+
+
+class TestAggregateCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.tmpdir.name) / 'test.db')
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('CREATE TABLE posts (post_id TEXT PRIMARY KEY)')
+        aggregate_cache.clear()
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        aggregate_cache.clear()
+        aggregate_cache.set_persistent(False)
+        self.tmpdir.cleanup()
+
+    def _cached(self, conn: sqlite3.Connection, compute: mock.Mock) -> object:
+        return aggregate_cache.cached_aggregate(
+            conn, name='n', tables=('posts',), params=(1,), compute=compute,
+        )
+
+    def test_set_persistent(self) -> None:
+        aggregate_cache.set_persistent(True)
+        self.assertTrue(aggregate_cache._persistent)
+        aggregate_cache.set_persistent(False)
+        self.assertFalse(aggregate_cache._persistent)
+
+    def test_clear(self) -> None:
+        compute = mock.Mock(return_value=1)
+        self._cached(self.conn, compute)
+        aggregate_cache.clear()
+        self._cached(self.conn, compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test__to_json(self) -> None:
+        self.assertEqual(
+            aggregate_cache._to_json([('a', 2, None), 1.5]),
+            [{'tuple': ['a', 2, None]}, 1.5],
+        )
+        result = moderation_effectiveness.ModerationEffectivenessResult(['c'], [('x', 1)], 0, [], ['m'], [])
+        self.assertEqual(aggregate_cache._to_json(result)['dict']['summary_rows'], [{'tuple': ['x', 1]}])
+        with self.assertRaises(TypeError):
+            aggregate_cache._to_json({1: 'a'})
+        with self.assertRaises(TypeError):
+            aggregate_cache._to_json(object())
+
+    def test__from_json(self) -> None:
+        value = [('a', 2, None), {'k': (1.5, [True])}, 'tuple']
+        self.assertEqual(aggregate_cache._from_json(json.loads(json.dumps(aggregate_cache._to_json(value)))), value)
+
+    def test__load_persisted(self) -> None:
+        def load(stamp: tuple[object, ...]) -> tuple[bool, object]:
+            return aggregate_cache._load_persisted(self.conn, name='n', params='p', stamp=stamp)
+
+        self.assertEqual(load((1,)), (False, None))  # no table yet
+        aggregate_cache._store_persisted(self.conn, name='n', params='p', stamp=(1,), value=[('a', 2)])
+        self.assertEqual(load((1,)), (True, [('a', 2)]))
+        self.assertEqual(load((2,)), (False, None))
+        self.assertEqual(self.conn.execute('SELECT payload FROM aggregate_cache').fetchone(), ('[{"tuple":["a",2]}]',))
+        # e.g. a pickle written by an older version: never unpickled
+        self.conn.execute("UPDATE aggregate_cache SET payload = x'80049505'")
+        with mock.patch.object(aggregate_cache, 'get_audit_logger', return_value=mock.Mock()):
+            self.assertEqual(load((1,)), (False, None))
+
+    def test__store_persisted(self) -> None:
+        self.conn.execute("INSERT INTO posts VALUES ('p1')")  # caller's open transaction
+        aggregate_cache._store_persisted(self.conn, name='n', params='p', stamp=(1,), value=1)
+        self.assertFalse(database._table_exists(self.conn, 'aggregate_cache'))
+        self.conn.commit()
+        aggregate_cache._store_persisted(self.conn, name='n', params='p', stamp=(1,), value=1)
+        aggregate_cache._store_persisted(self.conn, name='n', params='p', stamp=(2,), value=2)
+        self.assertEqual(
+            self.conn.execute('SELECT name, params, versions FROM aggregate_cache').fetchall(),
+            [('n', 'p', '(2,)')],
+        )
+        self.assertFalse(self.conn.in_transaction)
+        with mock.patch.object(aggregate_cache, 'get_audit_logger', return_value=mock.Mock()):
+            aggregate_cache._store_persisted(self.conn, name='n', params='p', stamp=(3,), value=object())
+        self.assertEqual(self.conn.execute('SELECT versions FROM aggregate_cache').fetchall(), [('(2,)',)])
+
+    def test_cached_aggregate(self) -> None:
+        compute = mock.Mock(return_value=['rows'])
+        self.assertEqual(self._cached(self.conn, compute), ['rows'])
+        self.assertEqual(self._cached(self.conn, compute), ['rows'])
+        compute.assert_called_once_with()
+        # other params are a separate entry
+        aggregate_cache.cached_aggregate(self.conn, name='n', tables=('posts',), params=(2,), compute=compute)
+        self.assertEqual(compute.call_count, 2)
+        # a version bump invalidates
+        with self.conn:
+            database.bump_table_versions(self.conn, ('posts',))
+        self._cached(self.conn, compute)
+        self.assertEqual(compute.call_count, 3)
+        # in-memory databases are never cached
+        with closing(sqlite3.connect(':memory:')) as conn:
+            self._cached(conn, compute)
+            self._cached(conn, compute)
+        self.assertEqual(compute.call_count, 5)
+
+    def test_cached_aggregate_persistent(self) -> None:
+        aggregate_cache.set_persistent(True)
+        self._cached(self.conn, mock.Mock(return_value=['rows']))
+        aggregate_cache.clear()  # e.g. the app restarted
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            compute = mock.Mock()
+            self.assertEqual(self._cached(conn, compute), ['rows'])
+            compute.assert_not_called()
+            # a new aggregate version recomputes
+            aggregate_cache.clear()
+            aggregate_cache.cached_aggregate(
+                conn, name='n', tables=('posts',), params=(1,), compute=compute, version=2,
+            )
+            compute.assert_called_once_with()
+            # decode rebuilds values persisted as their fields
+            result = moderation_effectiveness.ModerationEffectivenessResult(['c'], [('x', 1)], 0, [], ['m'], [])
+
+            def cached_result(compute: mock.Mock) -> object:
+                return aggregate_cache.cached_aggregate(
+                    conn,
+                    name='result',
+                    tables=('posts',),
+                    compute=compute,
+                    decode=lambda fields: moderation_effectiveness.ModerationEffectivenessResult(**fields),
+                )
+
+            cached_result(mock.Mock(return_value=result))
+            aggregate_cache.clear()
+            self.assertEqual(cached_result(mock.Mock()), result)
+
+
 class TestAnalysis(unittest.TestCase):
     def setUp(self) -> None:
         self.conn = sqlite3.connect(':memory:')
         self.conn.executescript(
-            '''
+            f'''
             CREATE TABLE users (
                 user_id TEXT PRIMARY KEY,
                 username TEXT NOT NULL,
-                account_type TEXT
+                account_type TEXT,
+                is_bot INTEGER GENERATED ALWAYS AS (lower(trim(coalesce(account_type, ''))) = 'bot') STORED
             );
             CREATE TABLE posts (
                 post_id TEXT PRIMARY KEY,
                 user_id TEXT NOT NULL,
-                timestamp TEXT
+                timestamp TEXT,
+                {database.TIMESTAMP_GENERATED_COLUMNS_SQL}
             );
             CREATE TABLE interactions (
                 interaction_id TEXT PRIMARY KEY,
                 post_id TEXT NOT NULL,
                 user_id TEXT NOT NULL,
                 interaction_type TEXT,
-                timestamp TEXT
+                timestamp TEXT,
+                {database.TIMESTAMP_GENERATED_COLUMNS_SQL}
             );
             INSERT INTO users (user_id, username, account_type) VALUES
                 ('u1', 'alice', 'human'),
@@ -270,41 +492,231 @@ class TestAnalysis(unittest.TestCase):
     def test__posts_timebase_sql(self) -> None:
         self.assertEqual(
             analysis._posts_timebase_sql(human_only=False),
-            'SELECT post_id, timestamp FROM posts',
+            'SELECT post_id, ts_epoch, CASE WHEN ts_epoch IS NULL THEN timestamp END AS timestamp FROM posts',
         )
         sql = analysis._posts_timebase_sql(human_only=True)
         self.assertIn('INNER JOIN users u ON p.user_id = u.user_id', sql)
-        self.assertIn("lower(trim(coalesce(u.account_type, ''))) != 'bot'", sql)
+        self.assertIn('u.is_bot = 0', sql)
 
     def test_fetch_posts_timestamps_df(self) -> None:
         all_rows = analysis.fetch_posts_timestamps_df(self.conn, human_only=False)
         human_rows = analysis.fetch_posts_timestamps_df(self.conn, human_only=True)
         self.assertEqual(list(all_rows['post_id']), ['p1', 'p2', 'p3'])
         self.assertEqual(list(human_rows['post_id']), ['p1', 'p2'])
+        self.assertTrue(all_rows['timestamp'].isna().all())
+        self.conn.execute("INSERT INTO posts (post_id, user_id, timestamp) VALUES ('p4', 'u1', 'Jan 5 2024')")
+        all_rows = analysis.fetch_posts_timestamps_df(self.conn, human_only=False)
+        self.assertEqual(all_rows['timestamp'].notna().tolist(), [False, False, False, True])
+        self.assertEqual(analysis.frame_datetimes(all_rows).iloc[3], pd.Timestamp('2024-01-05'))
+
+    def test_fetch_posts_timestamps_df_from_snapshot(self) -> None:
+        self.conn.execute(
+            "INSERT INTO interactions (interaction_id, post_id, user_id, interaction_type, timestamp) "
+            "VALUES ('i4', 'p1', 'u1', 'Like', '2024-1-2 9:30')",
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = str(Path(tmp) / 'test.db')
+            with closing(sqlite3.connect(db_path)) as conn:
+                database._create_empty_relational_tables(conn)
+                _copy_relational_rows(self.conn, conn)
+                snapshot.export_snapshot(conn, tmp, fmt='npy')
+            snap = snapshot.open_snapshot(tmp)
+            human_rows = analysis.fetch_posts_timestamps_df(snap, human_only=True)
+            self.assertEqual(list(human_rows['post_id']), ['p1', 'p2'])
+            self.assertEqual(
+                analysis.frame_datetimes(human_rows).tolist(),
+                [pd.Timestamp('2024-01-01 09:00:00'), pd.Timestamp('2024-01-01 10:00:00')],
+            )
+            interactions = analysis.fetch_interactions_timestamps_df(snap, human_only=True)
+            self.assertEqual(list(interactions['interaction_id']), ['i1', 'i2', 'i4'])
+            self.assertEqual(interactions['ts_datetime'].iloc[2], pd.Timestamp('2024-01-02 09:30:00'))
+            for human_only in (False, True):
+                pd.testing.assert_frame_equal(
+                    analysis.fetch_daily_interaction_counts(snap, human_only=human_only),
+                    analysis.fetch_daily_interaction_counts(self.conn, human_only=human_only),
+                )
+            fig = analysis.build_analysis_figure(snap, human_only=False)
+            self.assertEqual(len(fig.axes), 2)
+
+    def test__parse_distinct_timestamps(self) -> None:
+        texts = pd.Series([
+            ' 2024/01/01 09:00:00',
+            '2024-01-02T10:30',
+            '2024-01-03',
+            '2024-01-04 10:11:12.5',
+            '2024-13-01',
+            'None',
+        ])
+        got = analysis._parse_distinct_timestamps(texts)
+        self.assertEqual(got.tolist()[:4], [
+            pd.Timestamp('2024-01-01 09:00:00'),
+            pd.Timestamp('2024-01-02 10:30:00'),
+            pd.Timestamp('2024-01-03 00:00:00'),
+            pd.Timestamp('2024-01-04 10:11:12.5'),
+        ])
+        self.assertTrue(got.iloc[4:].isna().all())
+
+    def test__parse_distinct_timestamps_fallback_text(self) -> None:
+        texts = pd.Series(['Thu 2024-01-04', 'Tue, 05 Jan 2024', '2024-01-05T10:30:00Z', '2024-01-05'])
+        got = analysis._parse_distinct_timestamps(texts)
+        self.assertEqual(got.tolist(), [
+            pd.Timestamp('2024-01-04'),
+            pd.Timestamp('2024-01-05'),
+            pd.Timestamp('2024-01-05 10:30:00'),
+            pd.Timestamp('2024-01-05'),
+        ])
+        self.assertEqual(str(got.dtype), 'datetime64[us]')
 
     def test_normalize_sqlite_timestamp_series(self) -> None:
-        raw = pd.Series(['2024/01/01 09:00:00', '2024-01-02 10:00:00', '', 'bad'])
+        raw = pd.Series(
+            ['2024/01/01 09:00:00', '2024-01-02 10:00:00', '', 'bad', None, '2024/01/01 09:00:00'],
+            index=[10, 11, 12, 13, 14, 15],
+            name='timestamp',
+        )
         got = analysis.normalize_sqlite_timestamp_series(raw)
         self.assertEqual(got.dt.strftime('%Y-%m-%d %H:%M:%S').tolist()[:2], [
             '2024-01-01 09:00:00',
             '2024-01-02 10:00:00',
         ])
-        self.assertTrue(pd.isna(got.iloc[2]))
-        self.assertTrue(pd.isna(got.iloc[3]))
+        self.assertTrue(got.iloc[2:5].isna().all())
+        self.assertEqual(got.iloc[5], got.iloc[0])
+        self.assertEqual(list(got.index), [10, 11, 12, 13, 14, 15])
+        self.assertEqual(got.name, 'timestamp')
+
+    def test_frame_datetimes(self) -> None:
+        got = analysis.frame_datetimes(pd.DataFrame({'ts_epoch': [1704099600, None]}))
+        self.assertEqual(got.iloc[0], pd.Timestamp('2024-01-01 09:00:00'))
+        self.assertTrue(pd.isna(got.iloc[1]))
+        got = analysis.frame_datetimes(pd.DataFrame({'timestamp': ['2024/01/01 09:00:00']}))
+        self.assertEqual(got.iloc[0], pd.Timestamp('2024-01-01 09:00:00'))
+        got = analysis.frame_datetimes(pd.DataFrame({
+            'ts_epoch': [1704099600, None, None, None, None],
+            'timestamp': [None, '2024-1-5', '2024-01-05 9:30', 'Jan 5 2024', None],
+        }))
+        self.assertEqual(got.tolist()[:4], [
+            pd.Timestamp('2024-01-01 09:00:00'),
+            pd.Timestamp('2024-01-05 00:00:00'),
+            pd.Timestamp('2024-01-05 09:30:00'),
+            pd.Timestamp('2024-01-05 00:00:00'),
+        ])
+        self.assertTrue(pd.isna(got.iloc[4]))
+
+    def test__daily_counts(self) -> None:
+        dt = pd.Series(pd.to_datetime(['2024-01-01 09:00', '2024-01-03 10:00', '2024-01-03 11:00', None]))
+        got = analysis._daily_counts(dt)
+        self.assertEqual(got.tolist(), [1, 0, 2])
+        self.assertEqual(got.index[0], pd.Timestamp('2024-01-01'))
+        self.assertTrue(analysis._daily_counts(pd.Series([], dtype='datetime64[ns]')).empty)
+
+    def test__daily_posts_sql(self) -> None:
+        self.assertEqual(
+            analysis._daily_posts_sql(human_only=False, rollup=False),
+            'SELECT ts_day, COUNT(*) FROM posts WHERE ts_day IS NOT NULL GROUP BY ts_day',
+        )
+        self.assertIn('u.is_bot = 0', analysis._daily_posts_sql(human_only=True, rollup=False))
+        sql = analysis._daily_posts_sql(human_only=True, rollup=True)
+        self.assertIn('FROM agg_posts_day', sql)
+        self.assertIn('author = 1', sql)
+        self.assertNotIn('author', analysis._daily_posts_sql(human_only=False, rollup=True))
+
+    def test_fetch_daily_post_counts(self) -> None:
+        all_counts = analysis.fetch_daily_post_counts(self.conn, human_only=False)
+        self.assertEqual(all_counts.tolist(), [2, 1])
+        self.assertEqual(all_counts.index[0], pd.Timestamp('2024-01-01'))
+        human_counts = analysis.fetch_daily_post_counts(self.conn, human_only=True)
+        self.assertEqual(human_counts.tolist(), [2])
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            _copy_relational_rows(self.conn, conn)
+            self.assertIn('agg_posts_day', database.ensure_rollups(conn))
+            conn.execute("INSERT INTO posts (post_id, user_id, timestamp) VALUES ('p4', 'u1', '2024-01-04')")
+            self.assertEqual(analysis.fetch_daily_post_counts(conn, human_only=False).tolist(), [2, 1, 0, 1])
+            conn.execute("DELETE FROM posts WHERE post_id = 'p4'")
+            for human_only in (False, True):
+                pd.testing.assert_series_equal(
+                    analysis.fetch_daily_post_counts(conn, human_only=human_only),
+                    analysis.fetch_daily_post_counts(self.conn, human_only=human_only),
+                )
+        self.conn.executemany(
+            'INSERT INTO posts (post_id, user_id, timestamp) VALUES (?, ?, ?)',
+            [
+                ('p5', 'u1', '2024-1-3'),
+                ('p6', 'u1', '2024-01-03 9:30'),
+                ('p7', 'u2', 'Jan 3 2024'),
+                ('p8', 'u1', 'not a date'),
+            ],
+        )
+        self.assertEqual(analysis.fetch_daily_post_counts(self.conn, human_only=False).tolist(), [2, 1, 3])
+        self.assertEqual(analysis.fetch_daily_post_counts(self.conn, human_only=True).tolist(), [2, 0, 2])
+        self.conn.execute('DELETE FROM posts')
+        self.assertTrue(analysis.fetch_daily_post_counts(self.conn, human_only=False).empty)
+
+    def test__daily_levels(self) -> None:
+        days = pd.date_range('2024-01-01', periods=14, freq='D')  # two weeks, Monday first
+        daily = pd.DataFrame({'a': np.arange(14), 'b': np.ones(14)}, index=days)
+        day, week, month = analysis._daily_levels(daily)
+        self.assertEqual(day.name, 'day')
+        np.testing.assert_array_equal(day.mean, np.arange(14) + 1.0)
+        self.assertEqual(day.series.shape, (2, 14))
+        self.assertEqual(week.name, 'week')
+        np.testing.assert_array_equal(week.mean, [4.0, 11.0])
+        np.testing.assert_array_equal(week.low, [1.0, 8.0])
+        np.testing.assert_array_equal(week.high, [7.0, 14.0])
+        np.testing.assert_array_equal(week.series, [[3.0, 10.0], [1.0, 1.0]])
+        self.assertEqual(month.x[0], np.datetime64('2024-01-01'))
+        self.assertEqual(len(month.mean), 1)
+
+    def test__lod_level_for_span(self) -> None:
+        levels = analysis._daily_levels(
+            pd.DataFrame({'n': 0}, index=pd.date_range('2024-01-01', periods=3, freq='D')),
+        )
+        self.assertEqual(analysis._lod_level_for_span(levels, 300).name, 'day')
+        self.assertEqual(analysis._lod_level_for_span(levels, 2000).name, 'week')
+        self.assertEqual(analysis._lod_level_for_span(levels, 5000).name, 'month')
+        self.assertEqual(analysis._lod_level_for_span(levels, 10 ** 6).name, 'month')
+
+    def test__connect_level_of_detail(self) -> None:
+        fig = Figure()
+        ax = fig.add_subplot(1, 1, 1)
+        days = pd.date_range('2020-01-01', '2024-12-31', freq='D')
+        levels = analysis._daily_levels(pd.DataFrame({'n': 1}, index=days))
+        shown: list[str] = []
+        analysis._connect_level_of_detail(ax, levels, lambda level: shown.append(level.name))
+        self.assertEqual(shown, ['week'])
+        ax.set_xlim(np.datetime64('2024-01-01'), np.datetime64('2024-03-01'))
+        self.assertEqual(shown, ['week', 'day'])
+        ax.set_xlim(np.datetime64('2024-01-01'), np.datetime64('2024-02-01'))
+        self.assertEqual(shown, ['week', 'day'])
+
+    def test__moving_average(self) -> None:
+        y = np.array([3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0, 6.0])
+        np.testing.assert_allclose(analysis._moving_average(y, 3), np.convolve(y, np.ones(3) / 3, 'valid'))
 
     def test__plot_daily_post_counts(self) -> None:
         fig = Figure()
         ax = fig.add_subplot(1, 1, 1)
-        df = pd.DataFrame({'timestamp': ['2024-01-01 09:00:00', '2024/01/01 10:00:00']})
-        analysis._plot_daily_post_counts(ax, df)
+        analysis._plot_daily_post_counts(ax, analysis.fetch_daily_post_counts(self.conn, human_only=False))
         self.assertEqual(ax.get_title(), 'Posts per calendar day')
         self.assertEqual(len(ax.lines), 1)
 
+        fig = Figure()
+        ax = fig.add_subplot(1, 1, 1)
+        epochs = np.arange(1577836800, 1735689600, 6 * 3600)  # 2020-01-01 to 2024-12-31, every 6 h
+        dt = analysis.frame_datetimes(pd.DataFrame({'ts_epoch': epochs}))
+        analysis._plot_daily_post_counts(ax, analysis._daily_counts(dt))
+        self.assertEqual(ax.get_title(), 'Posts per calendar day (mean per week)')
+        self.assertEqual(len(ax.collections), 1)
+        self.assertLess(len(ax.lines[0].get_xdata()), 400)
+        ax.set_xlim(np.datetime64('2024-01-01'), np.datetime64('2024-02-01'))
+        self.assertEqual(ax.get_title(), 'Posts per calendar day')
+        self.assertEqual(len(ax.collections), 0)
+        self.assertTrue(ax.lines[1].get_visible())
+
     def test__interactions_timebase_sql(self) -> None:
         self.assertIn('FROM interactions', analysis._interactions_timebase_sql(human_only=False))
         sql = analysis._interactions_timebase_sql(human_only=True)
         self.assertIn('INNER JOIN users u ON i.user_id = u.user_id', sql)
-        self.assertIn("lower(trim(coalesce(u.account_type, ''))) != 'bot'", sql)
+        self.assertIn('u.is_bot = 0', sql)
 
     def test_fetch_interactions_timestamps_df(self) -> None:
         all_rows = analysis.fetch_interactions_timestamps_df(self.conn, human_only=False)
@@ -313,20 +725,80 @@ class TestAnalysis(unittest.TestCase):
         self.assertEqual(list(human_rows['interaction_id']), ['i1', 'i2'])
 
     def test__normalize_interaction_type_labels(self) -> None:
-        got = analysis._normalize_interaction_type_labels(pd.Series([' Like ', '', 'None']))
-        self.assertEqual(got.tolist(), ['like', '(none)', '(none)'])
+        got = analysis._normalize_interaction_type_labels(pd.Series([' Like ', '', 'None', None]))
+        self.assertEqual(got.tolist(), ['like', '(none)', '(none)', '(none)'])
+
+    def test__daily_interactions_sql(self) -> None:
+        sql = analysis._daily_interactions_sql(human_only=False, rollup=False)
+        self.assertIn('GROUP BY ts_day, interaction_type', sql)
+        sql = analysis._daily_interactions_sql(human_only=True, rollup=False)
+        self.assertIn('INNER JOIN users u ON i.user_id = u.user_id', sql)
+        self.assertIn('u.is_bot = 0', sql)
+        sql = analysis._daily_interactions_sql(human_only=True, rollup=True)
+        self.assertIn('FROM agg_interactions_day_type', sql)
+        self.assertIn('author = 1', sql)
+        self.assertNotIn('author', analysis._daily_interactions_sql(human_only=False, rollup=True))
+
+    def test__daily_interaction_matrix(self) -> None:
+        got = analysis._daily_interaction_matrix(
+            np.array([19723, 19723, 19725, 19725, 19725]),
+            np.array(['Like', 'like ', None, 'share', 'save'], dtype=object),
+            np.array([2, 1, 4, 1, 5]),
+            top_n=2,
+        )
+        self.assertEqual(list(got.columns), ['save', '(none)', '(other types)'])
+        self.assertEqual(list(got.index), list(pd.date_range('2024-01-01', '2024-01-03')))
+        self.assertEqual(got['(other types)'].tolist(), [3, 0, 1])
+        self.assertTrue(analysis._daily_interaction_matrix(np.array([]), np.array([]), np.array([]), top_n=2).empty)
+
+    def test_fetch_daily_interaction_counts(self) -> None:
+        all_counts = analysis.fetch_daily_interaction_counts(self.conn, human_only=False)
+        self.assertEqual(sorted(all_counts.columns), ['(none)', 'like', 'share'])
+        self.assertEqual(all_counts.sum().sum(), 3)
+        self.assertEqual(len(all_counts), 3)
+        human_counts = analysis.fetch_daily_interaction_counts(self.conn, human_only=True, top_n=1)
+        self.assertEqual(human_counts.to_dict('list'), {'(none)': [0, 1], '(other types)': [1, 0]})
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            _copy_relational_rows(self.conn, conn)
+            database.ensure_rollups(conn)
+            conn.execute("UPDATE users SET account_type = 'bot' WHERE user_id = 'u1'")
+            conn.execute("UPDATE users SET account_type = 'human' WHERE user_id = 'u1'")
+            self.assertTrue(database.rollup_current(conn, 'agg_interactions_day_type'))
+            for human_only in (False, True):
+                pd.testing.assert_frame_equal(
+                    analysis.fetch_daily_interaction_counts(conn, human_only=human_only),
+                    analysis.fetch_daily_interaction_counts(self.conn, human_only=human_only),
+                )
+        self.conn.execute(
+            "INSERT INTO interactions (interaction_id, post_id, user_id, interaction_type, timestamp) "
+            "VALUES ('i4', 'p1', 'u1', 'Like', 'Jan 3 2024'), ('i5', 'p1', 'u1', 'Like', '2024-1-4')",
+        )
+        got = analysis.fetch_daily_interaction_counts(self.conn, human_only=False)
+        self.assertEqual(got['like'].tolist(), [1, 0, 1, 1])
 
     def test__plot_daily_interactions(self) -> None:
         fig = Figure()
         ax = fig.add_subplot(1, 1, 1)
-        df = pd.DataFrame({
-            'timestamp': ['2024-01-01 12:00:00', '2024/01/02 13:00:00'],
-            'interaction_type': ['Like', 'Share'],
-        })
-        analysis._plot_daily_interactions(ax, df)
+        analysis._plot_daily_interactions(ax, analysis.fetch_daily_interaction_counts(self.conn, human_only=False))
         self.assertEqual(ax.get_title(), 'Interactions per calendar day by type (stacked)')
         self.assertGreater(len(ax.collections), 0)
 
+        fig = Figure()
+        ax = fig.add_subplot(1, 1, 1)
+        analysis._plot_daily_interactions(ax, pd.DataFrame(index=pd.DatetimeIndex([])))
+        self.assertFalse(ax.axison)
+
+        fig = Figure()
+        ax = fig.add_subplot(1, 1, 1)
+        days = pd.date_range('2020-01-01', '2024-12-31', freq='D')
+        analysis._plot_daily_interactions(ax, pd.DataFrame({'like': 4}, index=days))
+        self.assertEqual(ax.get_title(), 'Interactions per calendar day by type (stacked, mean per week)')
+        self.assertEqual(len(ax.collections), 1)
+        ax.set_xlim(np.datetime64('2024-01-01'), np.datetime64('2024-02-01'))
+        self.assertEqual(ax.get_title(), 'Interactions per calendar day by type (stacked)')
+        self.assertEqual(len(ax.collections), 1)
+
     def test_build_analysis_figure(self) -> None:
         fig = analysis.build_analysis_figure(self.conn, human_only=True)
         self.assertIsInstance(fig, Figure)
@@ -372,6 +844,74 @@ class TestAuditLog(unittest.TestCase):
         self.assertTrue(audit_log.LOG_FILE.exists())
 
 
+class TestBenchmark(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tmp = Path(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test__without_orphans(self) -> None:
+        headers = list(database._RELATIONAL_INSERT_COLUMNS['posts'])
+        rows = [
+            ('p1', 'u1', '', '', '', '', 't1', ''),
+            ('p2', 'u1', '', '', '', '', 't9', ''),
+            ('p3', 'u9', '', '', '', '', 't1', ''),
+        ]
+        got = benchmark._without_orphans('posts', headers, rows, {'users': {'u1'}, 'topics': {'t1'}})
+        self.assertEqual(got, [rows[0], ('p2', 'u1', '', '', '', '', '', '')])
+
+    def test_write_scaled_demo_csvs(self) -> None:
+        src = self.tmp / 'src'
+        dest = self.tmp / 'dest'
+        src.mkdir()
+        dest.mkdir()
+        for table_name, cols in database._RELATIONAL_INSERT_COLUMNS.items():
+            row = [f'{c}1' if c in benchmark._KEY_COLUMNS[table_name] else '' for c in cols]
+            with (src / f'{table_name.upper()}.csv').open('w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows([cols, row])
+        paths = benchmark.write_scaled_demo_csvs(str(dest), scale=2, source_dir=str(src))
+        self.assertEqual([Path(p).name for p in paths], ['topics.csv', 'users.csv', 'posts.csv', 'interactions.csv'])
+        headers, rows = database.read_csv_rows(paths[2])
+        self.assertEqual([r[:3] for r in rows], [('post_id1_0', 'user_id1_0', ''), ('post_id1_1', 'user_id1_1', '')])
+        self.assertEqual(rows[0][6], 'topic_id1_0')
+        paths = benchmark.write_scaled_demo_csvs(str(dest), scale=1, first_copy=5, source_dir=str(src))
+        headers, rows = database.read_csv_rows(paths[0])
+        self.assertEqual(rows, [('topic_id1_5', '', '', '', '')])
+
+    def test__import_child(self) -> None:
+        secs, _rss = benchmark._import_child('noop', str(self.tmp / 'x.db'), str(self.tmp / 'x.csv'))
+        self.assertGreaterEqual(secs, 0.0)
+        with self.assertRaises(ValueError):
+            benchmark._import_child('eagre', str(self.tmp / 'x.db'), str(self.tmp / 'x.csv'))
+
+    def test__table_passes(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            conn.executescript(
+                '''
+                CREATE TABLE a (x INTEGER);
+                CREATE TABLE b (x INTEGER);
+                CREATE INDEX idx_a_x ON a (x);
+                ''',
+            )
+
+            def run(c: sqlite3.Connection) -> None:
+                c.execute('SELECT COUNT(*) FROM a').fetchall()
+                c.execute('SELECT * FROM a JOIN a a2 USING (x)').fetchall()
+                c.execute('SELECT * FROM b').fetchall()
+
+            self.assertEqual(benchmark._table_passes(conn, 'a', run), 2)
+            self.assertEqual(benchmark._table_passes(conn, 'b', run), 1)
+
+    def test_main(self) -> None:
+        with mock.patch.object(benchmark, 'bench_pivot_matrix', return_value=0) as bench:
+            self.assertEqual(benchmark.main(['pivot-matrix', '--topics', '7']), 0)
+        bench.assert_called_once_with(topics=7, repeat=3)
+        with mock.patch('sys.stderr', io.StringIO()), self.assertRaises(SystemExit):
+            benchmark.main(['no-such-benchmark'])
+
+
 class TestCategoricalAnalysis(unittest.TestCase):
     def setUp(self) -> None:
         self.conn = sqlite3.connect(':memory:')
@@ -380,7 +920,8 @@ class TestCategoricalAnalysis(unittest.TestCase):
             CREATE TABLE users (
                 user_id TEXT PRIMARY KEY,
                 username TEXT NOT NULL,
-                account_type TEXT
+                account_type TEXT,
+                is_bot INTEGER GENERATED ALWAYS AS (lower(trim(coalesce(account_type, ''))) = 'bot') STORED
             );
             CREATE TABLE topics (
                 topic_id TEXT PRIMARY KEY,
@@ -428,6 +969,21 @@ class TestCategoricalAnalysis(unittest.TestCase):
             ('Safety', 'low', '', 1),
             ('Safety', 'low', 'text', 1),
         ])
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            _copy_relational_rows(self.conn, conn)
+            database.ensure_rollups(conn)
+            conn.execute("DELETE FROM posts WHERE post_id = 'p1'")
+            conn.execute("INSERT INTO posts (post_id, user_id, content_type, topic_id) VALUES ('p1', 'u1', 'text', 't1')")
+            self.assertTrue(database.rollup_current(conn, 'agg_posts_topic_content_type'))
+            self.assertEqual(
+                categorical_analysis.query_three_way_distribution(conn, human_only=False),
+                all_rows,
+            )
+            self.assertEqual(
+                sorted(categorical_analysis.query_three_way_distribution(conn, human_only=True)),
+                human_rows,
+            )
 
     def test_build_categorical_analysis_figure(self) -> None:
         rows = [('Safety', 'low', 'text', 2), ('Policy', 'high', 'image', 1)]
@@ -482,12 +1038,61 @@ class TestDatabase(unittest.TestCase):
         with closing(database._connect(str(self.db_path))) as conn, conn:
             self.assertEqual(conn.execute('PRAGMA foreign_keys').fetchone()[0], 1)
 
+    def test_connection_manager(self) -> None:
+        with database.ConnectionManager(str(self.db_path)) as manager:
+            conn = manager.connection()
+            self.assertIs(manager.connection(), conn)
+            self.assertEqual(conn.execute('PRAGMA foreign_keys').fetchone()[0], 1)
+            other: list[sqlite3.Connection] = []
+            thread = threading.Thread(target=lambda: other.append(manager.connection()))
+            thread.start()
+            thread.join()
+            self.assertIsNot(other[0], conn)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+        with self.assertRaises(sqlite3.ProgrammingError):
+            other[0].execute('SELECT 1')
+
+    def test__database_path(self) -> None:
+        self.assertEqual(database._database_path('a.db'), 'a.db')
+        self.assertEqual(database._database_path(database.ConnectionManager('b.db')), 'b.db')
+
+    def test__connection(self) -> None:
+        with database._connection(str(self.db_path)) as conn:
+            conn.execute('CREATE TABLE x (id TEXT)')
+            conn.execute("INSERT INTO x VALUES ('a')")
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')  # opened from a path: closed
+        with database.ConnectionManager(str(self.db_path)) as manager:
+            with self.assertRaises(ValueError), database._connection(manager) as conn:
+                conn.execute("INSERT INTO x VALUES ('b')")
+                raise ValueError
+            with database._connection(manager) as again:
+                self.assertIs(again, conn)  # kept open for reuse
+                self.assertEqual(again.execute('SELECT id FROM x').fetchall(), [('a',)])
+        # another connection caching the old columns mid-transaction is undone on commit
+        with closing(sqlite3.connect(str(self.db_path))) as reader:
+            with database._connection(str(self.db_path), schema_changes=('x',)) as conn:
+                conn.execute('BEGIN')
+                conn.execute('DROP TABLE x')
+                database._create_table(conn, table_name='x', headers=['id', 'body'])
+                self.assertEqual(database.table_columns(reader, 'x'), ['id'])
+            self.assertEqual(database.table_columns(reader, 'x'), ['id', 'body'])
+
     def test_sql_exclude_bot_users(self) -> None:
         self.assertEqual(
             database.sql_exclude_bot_users(users_table_alias=None),
-            "lower(trim(coalesce(account_type, ''))) != 'bot'",
+            'is_bot = 0',
         )
-        self.assertIn('u.account_type', database.sql_exclude_bot_users(users_table_alias='u'))
+        self.assertEqual(database.sql_exclude_bot_users(users_table_alias='u'), 'u.is_bot = 0')
+
+    def test_sql_rollup_authors(self) -> None:
+        self.assertEqual(database.sql_rollup_authors(human_only=True, table_alias=None), 'author = 1')
+        self.assertEqual(database.sql_rollup_authors(human_only=False, table_alias='p'), 'p.author IN (1, 0)')
+
+    def test_sql_column_list(self) -> None:
+        self.assertEqual(database.sql_column_list(['a', 'b'], table_alias=None), '"a", "b"')
+        self.assertEqual(database.sql_column_list(['a'], table_alias='p'), 'p."a"')
 
     def test_database_exists(self) -> None:
         missing = self.tmp / 'missing.db'
@@ -548,6 +1153,54 @@ class TestDatabase(unittest.TestCase):
         path = self._write_csv('empty.csv', [])
         with self.assertRaisesRegex(ValueError, 'empty'):
             database._read_csv_rows(str(path))
+        path = self._write_csv('users.csv', [['User ID'], ['u1'], ['u2']])
+        headers, rows = database._read_csv_rows(str(path))
+        self.assertEqual(headers, ['user_id'])
+        self.assertEqual(list(rows), [('u1',), ('u2',)])
+
+    def test__sniff_csv_encoding(self) -> None:
+        utf8 = self._write_csv('utf8.csv', [['name'], ['caf\xe9']])
+        cp1252 = self.tmp / 'cp1252.csv'
+        cp1252.write_bytes('name\r\n\u20ac5\r\n'.encode('cp1252'))
+        self.assertEqual(database._sniff_csv_encoding(str(utf8)), 'utf-8')
+        self.assertEqual(database._sniff_csv_encoding(str(cp1252)), 'cp1252')
+
+    def test__read_csv_header(self) -> None:
+        path = self._write_csv('empty.csv', [])
+        with self.assertRaisesRegex(ValueError, 'empty'):
+            database._read_csv_header(str(path))
+        path = self.tmp / 'users.csv'
+        path.write_bytes('User ID,Name\r\nu1,\u20ac\r\n'.encode('cp1252'))
+        self.assertEqual(database._read_csv_header(str(path)), (['user_id', 'name'], 'cp1252'))
+
+    def test__csv_record_end(self) -> None:
+        self.assertEqual(database._csv_record_end(b'a,b\nc,d\ne'), (8, False))
+        # the last newline is inside a quoted field
+        self.assertEqual(database._csv_record_end(b'a,b\nc,"x\ny'), (4, True))
+        self.assertEqual(database._csv_record_end(b'a,"say ""hi""\nthere"\n'), (21, False))
+        self.assertEqual(database._csv_record_end(b'a,"b\nc'), (0, True))
+        # only data[scanned:] is counted, starting from the state carried over
+        self.assertEqual(database._csv_record_end(b'a,"b\nc",d\ne', 6, True), (10, False))
+        self.assertEqual(database._csv_record_end(b'a,"b\nc\nd', 6, True), (0, True))
+
+    def test__csv_record_ranges(self) -> None:
+        path = self._write_csv('notes.csv', [['id', 'body'], ['1', 'line\nbreak'], ['2', 'x' * 20], ['3', '']])
+        raw = path.read_bytes()
+        ranges = list(database._csv_record_ranges(str(path), 8))
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(raw))
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(ranges, ranges[1:])))
+        records = [list(csv.reader(io.StringIO(raw[a:b].decode(), newline=''))) for a, b in ranges]
+        self.assertEqual(sum(records, []), [['id', 'body'], ['1', 'line\nbreak'], ['2', 'x' * 20], ['3', '']])
+        # a stray quote leaves no even-parity newline: the rest is one stream
+        path = self._write_csv('notes.csv', [['id', 'body'], ['1', 'a'], *[[str(i), 'x' * 10] for i in range(50)]])
+        path.write_bytes(path.read_bytes().replace(b'1,a', b'1,5" screen', 1))
+        ranges = list(database._csv_record_ranges(str(path), 16, max_scan_chunks=3))
+        self.assertEqual(ranges, [(0, len(b'id,body\r\n')), (len(b'id,body\r\n'), None)])
+
+    def test__batched(self) -> None:
+        got = list(database._batched(iter([('a',), ('b',), ('c',)]), 2))
+        self.assertEqual(got, [[('a',), ('b',)], [('c',)]])
 
     def test__is_relational_table(self) -> None:
         self.assertTrue(database._is_relational_table('users'))
@@ -581,6 +1234,255 @@ class TestDatabase(unittest.TestCase):
             cols = [r[1] for r in conn.execute('PRAGMA table_info(posts)')]
             self.assertIn('content_preview', cols)
             self.assertFalse(database.migrate_posts_content_preview(conn))
+        with closing(database._connect(str(self.db_path))) as conn:
+            conn.execute('CREATE TABLE posts (post_id TEXT, text_preview TEXT)')
+            self.assertEqual(database.get_table_columns(str(self.db_path), 'posts'), ['post_id', 'text_preview'])
+            database.migrate_posts_content_preview(conn)
+            conn.commit()
+        self.assertEqual(database.get_table_columns(str(self.db_path), 'posts'), ['post_id', 'content_preview'])
+
+    def test__table_exists(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            self.assertFalse(database._table_exists(conn, 'users'))
+            conn.executescript(database._RELATIONAL_DDL['users'])
+            self.assertTrue(database._table_exists(conn, 'users'))
+
+    def test_bump_table_versions(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database.bump_table_versions(conn, ('posts', 'users'))
+            database.bump_table_versions(conn, ('posts',))
+            conn.rollback()
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM table_versions').fetchone()[0], 0)
+            database.bump_table_versions(conn, ('posts', 'users'))
+            database.bump_table_versions(conn, ('posts',))
+            conn.commit()
+            self.assertEqual(
+                conn.execute('SELECT * FROM table_versions ORDER BY 1').fetchall(),
+                [('posts', 2), ('users', 1)],
+            )
+
+    def test_table_versions(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            self.assertEqual(database.table_versions(conn, ('posts', 'users')), (0, 0))
+            database.bump_table_versions(conn, ('users',))
+            self.assertEqual(database.table_versions(conn, ('posts', 'users')), (0, 1))
+
+    def _create_legacy_users_table(self, conn: sqlite3.Connection) -> None:
+        conn.executescript(
+            '''
+            CREATE TABLE users (
+                user_id TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                join_date TEXT,
+                location TEXT,
+                account_type TEXT,
+                verified TEXT,
+                followers_count INTEGER
+            );
+            INSERT INTO users VALUES
+                ('u1', 'alice', NULL, NULL, 'human', NULL, 3),
+                ('u2', 'botty', NULL, NULL, ' BOT ', NULL, NULL);
+            ''',
+        )
+
+    def test_timestamp_generated_columns(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            conn.executemany(
+                'INSERT INTO interactions (interaction_id, post_id, user_id, timestamp) VALUES (?, ?, ?, ?)',
+                [
+                    ('i1', 'p1', 'u1', '2024-01-02 03:04:05'),
+                    ('i2', 'p1', 'u1', ' 2024/01/02T10:00 '),
+                    ('i3', 'p1', 'u1', '08-06-2023 22:15:00'),
+                    ('i4', 'p1', 'u1', '2024-01-02'),
+                    ('i5', 'p1', 'u1', 'bad'),
+                    ('i6', 'p1', 'u1', None),
+                ],
+            )
+            got = conn.execute(
+                "SELECT datetime(ts_epoch, 'unixepoch'), ts_hour, date(ts_day * 86400, 'unixepoch') "
+                'FROM interactions ORDER BY interaction_id',
+            ).fetchall()
+        self.assertEqual(got, [
+            ('2024-01-02 03:04:05', 3, '2024-01-02'),
+            ('2024-01-02 10:00:00', 10, '2024-01-02'),
+            ('2023-06-08 22:15:00', 22, '2023-06-08'),
+            ('2024-01-02 00:00:00', 0, '2024-01-02'),
+            (None, None, None),
+            (None, None, None),
+        ])
+
+    def test__rebuild_relational_table(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            self._create_legacy_users_table(conn)
+            database._rebuild_relational_table(conn, 'users')
+            self.assertEqual(
+                conn.execute('SELECT user_id, followers_count, is_bot FROM users ORDER BY user_id').fetchall(),
+                [('u1', 3, 0), ('u2', None, 1)],
+            )
+            self.assertFalse(database._table_exists(conn, '_users_rebuild'))
+            self.assertFalse(conn.in_transaction)
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            database.ensure_rollups(conn)
+            conn.execute("INSERT INTO posts (post_id, user_id, timestamp) VALUES ('p1', 'u1', '2024-01-01')")
+            conn.commit()
+            # the rollup triggers read users, which could not be renamed under them
+            database._rebuild_relational_table(conn, 'users')
+            self.assertFalse(database.rollup_current(conn, 'agg_posts_day'))
+            database.ensure_rollups(conn)
+            self.assertEqual(_stale_rollups(conn), [])
+
+    def test_migrate_generated_columns(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            self.assertEqual(database.migrate_generated_columns(conn), [])
+            self._create_legacy_users_table(conn)
+            conn.execute("CREATE TABLE posts (post_id TEXT PRIMARY KEY, user_id TEXT, timestamp TEXT)")
+            conn.execute("INSERT INTO posts VALUES ('p1', 'u1', '2024-01-02 05:00:00')")
+            conn.commit()
+            self.assertEqual(database.migrate_generated_columns(conn), ['users', 'posts'])
+            self.assertEqual(conn.execute('SELECT ts_hour FROM posts').fetchone()[0], 5)
+            self.assertEqual(database.migrate_generated_columns(conn), [])
+            conn.execute("UPDATE users SET account_type = 'bot' WHERE user_id = 'u1'")
+            self.assertEqual(conn.execute("SELECT is_bot FROM users WHERE user_id = 'u1'").fetchone()[0], 1)
+
+    def test_ensure_relational_indexes(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            conn.executescript(database._RELATIONAL_DDL['posts'])
+            created = database.ensure_relational_indexes(conn)
+            self.assertEqual(created, [name for name, _ in database._RELATIONAL_INDEXES['posts']])
+            self.assertEqual(database.ensure_relational_indexes(conn), [])
+            self.assertTrue(database._table_exists(conn, 'sqlite_stat1'))
+
+    def test_drop_relational_indexes(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            database.ensure_relational_indexes(conn)
+            database.drop_relational_indexes(conn, table_names=('posts',))
+            names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+            self.assertNotIn('idx_posts_user_id', names)
+            self.assertIn('idx_interactions_post_id', names)
+
+    def test_rebuild_relational_indexes(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            database.ensure_relational_indexes(conn)
+            created = database.rebuild_relational_indexes(conn, table_names=('users',))
+            self.assertEqual(created, [name for name, _ in database._RELATIONAL_INDEXES['users']])
+
+    def test__rollup_key_sql(self) -> None:
+        self.assertEqual(
+            database._rollup_key_sql(('ts_day', 'topic_id')),
+            "ifnull(ts_day, x''), ifnull(topic_id, x''), author",
+        )
+
+    def test__rollup_upsert_sql(self) -> None:
+        sql = database._rollup_upsert_sql('agg_posts_day', ('ts_day',), 'VALUES (1, 1, 1)')
+        self.assertEqual(
+            sql,
+            'INSERT INTO agg_posts_day (ts_day, author, row_count) VALUES (1, 1, 1) '
+            "ON CONFLICT (ifnull(ts_day, x''), author) "
+            'DO UPDATE SET row_count = row_count + excluded.row_count',
+        )
+
+    def test__rollup_triggers(self) -> None:
+        triggers = database._rollup_triggers('agg_posts_hour_topic')
+        self.assertEqual(len(triggers), 6)
+        self.assertIn('AFTER UPDATE OF user_id, timestamp, topic_id ON posts', triggers['agg_posts_hour_topic_update'])
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            database.ensure_rollups(conn)
+            steps = [
+                # posts before their users, then the users arrive
+                "INSERT INTO posts (post_id, user_id, timestamp, topic_id, content_type) VALUES "
+                "('p1', 'u1', '2024-01-01 09:00', 't1', 'text'), ('p2', 'u2', '2024-01-02 10:00', NULL, NULL), "
+                "('p3', 'u1', 'bad', 't1', 'text')",
+                "INSERT INTO interactions (interaction_id, post_id, user_id, interaction_type, timestamp) VALUES "
+                "('i1', 'p1', 'u2', 'like', '2024-01-01'), ('i2', 'p2', 'u3', NULL, NULL)",
+                "INSERT INTO users (user_id, username, account_type) VALUES ('u1', 'a', 'human'), ('u2', 'b', 'bot')",
+                "UPDATE users SET account_type = 'human' WHERE user_id = 'u2'",
+                "UPDATE users SET username = 'c' WHERE user_id = 'u2'",
+                "UPDATE posts SET timestamp = '2024-01-05 23:00', topic_id = 't2' WHERE post_id = 'p3'",
+                "UPDATE posts SET content_type = 'image' WHERE post_id = 'p1'",
+                "UPDATE interactions SET interaction_type = 'share', user_id = 'u1' WHERE interaction_id = 'i2'",
+                "UPDATE users SET user_id = 'u9' WHERE user_id = 'u1'",
+                "DELETE FROM users WHERE user_id = 'u2'",
+                "DELETE FROM posts WHERE post_id = 'p2'",
+                "DELETE FROM interactions",
+            ]
+            for sql in steps:
+                conn.execute(sql)
+                self.assertEqual(_stale_rollups(conn), [], sql)
+
+    def test__existing_triggers(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            self.assertEqual(database._existing_triggers(conn), set())
+            conn.execute('CREATE TABLE t (x)')
+            conn.execute('CREATE TRIGGER t_insert AFTER INSERT ON t BEGIN SELECT 1; END')
+            self.assertEqual(database._existing_triggers(conn), {'t_insert'})
+
+    def test_rollup_current(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            self.assertFalse(database.rollup_current(conn, 'agg_posts_day'))
+            database.ensure_rollups(conn)
+            self.assertTrue(database.rollup_current(conn, 'agg_posts_day'))
+            conn.execute('DROP TRIGGER agg_posts_day_delete')
+            self.assertFalse(database.rollup_current(conn, 'agg_posts_day'))
+            self.assertTrue(database.rollup_current(conn, 'agg_interactions_day_type'))
+
+    def test_drop_rollup_triggers(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            database.ensure_rollups(conn)
+            database.drop_rollup_triggers(conn)
+            self.assertEqual(database._existing_triggers(conn), set())
+            self.assertFalse(any(database.rollup_current(conn, r) for r in database._ROLLUPS))
+
+    def test_ensure_rollups(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            self.assertEqual(database.ensure_rollups(conn), [])
+            database._create_empty_relational_tables(conn)
+            conn.execute("INSERT INTO users (user_id, username, account_type) VALUES ('u1', 'a', 'bot')")
+            conn.execute("INSERT INTO posts (post_id, user_id, timestamp) VALUES ('p1', 'u1', '2024-01-01')")
+            self.assertEqual(database.ensure_rollups(conn), list(database._ROLLUPS))
+            self.assertEqual(database.ensure_rollups(conn), [])
+            self.assertEqual(
+                conn.execute('SELECT ts_day, author, row_count FROM agg_posts_day').fetchall(),
+                [(19723, database.ROLLUP_BOT, 1)],
+            )
+            # replacing a table drops its triggers: only its rollups are rebuilt
+            conn.execute('DROP TABLE interactions')
+            conn.executescript(database._RELATIONAL_DDL['interactions'])
+            conn.execute("INSERT INTO interactions (interaction_id, post_id, user_id) VALUES ('i1', 'p1', 'u2')")
+            self.assertEqual(database.ensure_rollups(conn), ['agg_interactions_day_type'])
+            self.assertEqual(_stale_rollups(conn), [])
+
+    def test_explain_plan(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            sql = 'SELECT post_id FROM posts WHERE topic_id = ?'
+            self.assertEqual(database.explain_plan(conn, sql, ('t1',)), ['SCAN posts'])
+            database.ensure_relational_indexes(conn)
+            plan = database.explain_plan(conn, sql, ('t1',))
+            self.assertEqual(len(plan), 1)
+            self.assertIn('USING COVERING INDEX idx_posts_topic_id', plan[0])
+            nested = database.explain_plan(
+                conn,
+                'SELECT * FROM posts WHERE user_id IN (SELECT user_id FROM users WHERE location = ?)',
+                ('York',),
+            )
+            self.assertTrue(any(line.startswith('  ') for line in nested))
+
+    def test_ensure_relational_schema_migrates_users(self) -> None:
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            self._create_legacy_users_table(conn)
+        database.ensure_relational_schema(str(self.db_path))
+        with closing(database._connect(str(self.db_path))) as conn, conn:
+            bots = conn.execute(
+                f"SELECT user_id FROM users WHERE NOT ({database.sql_exclude_bot_users(users_table_alias=None)})",
+            ).fetchall()
+        self.assertEqual(bots, [('u2',)])
 
     def test_ensure_relational_schema(self) -> None:
         database.ensure_relational_schema(str(self.db_path))
@@ -588,7 +1490,13 @@ class TestDatabase(unittest.TestCase):
             count = conn.execute(
                 "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ('topics','users','posts','interactions')",
             ).fetchone()[0]
+            indexes = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%'",
+            ).fetchone()[0]
         self.assertEqual(count, 4)
+        self.assertEqual(indexes, sum(len(v) for v in database._RELATIONAL_INDEXES.values()))
+        with closing(database._connect(str(self.db_path))) as conn, conn:
+            self.assertTrue(all(database.rollup_current(conn, r) for r in database._ROLLUPS))
 
     def test__parse_optional_int(self) -> None:
         self.assertEqual(database._parse_optional_int(' 7 '), 7)
@@ -619,6 +1527,43 @@ class TestDatabase(unittest.TestCase):
         )
         self.assertEqual(got, ('p1', 'u1', None, 'text', None, 'TRUE', 't1', 'en'))
 
+    def test__key_column(self) -> None:
+        self.assertEqual(database._key_column([' a ', '', None]), ['a', '', ''])
+
+    def test__text_column(self) -> None:
+        self.assertEqual(database._text_column([' a ', ' ', '', None]), ['a', None, None, None])
+
+    def test__int_column(self) -> None:
+        self.assertEqual(database._int_column([' 7 ', '', 'x']), [7, None, None])
+
+    def test__relational_batch_typer(self) -> None:
+        cases = [
+            ('users', list(database._RELATIONAL_INSERT_COLUMNS['users']), [
+                ('u1', ' alice ', '', ' Leeds', 'human', '', ' 12 '),
+                ('u2', 'bob', '', '', '', '', 'many'),
+                ('u3', 'carol'),
+                ('u4', 'dan', '', '', 'bot', 'TRUE', '1', 'extra'),
+            ]),
+            ('posts', ['post_id', 'user_id', 'text_preview', 'content_preview'], [
+                ('p1', 'u1', 'old', ''),
+                ('p2', 'u1', 'old', 'new'),
+                ('p3', 'u1', ' ', ' '),
+            ]),
+            ('topics', ['topic_name', 'topic_id', 'topic_id'], [('a', 't1', 't2')]),
+        ]
+        for table_name, headers, rows in cases:
+            with self.subTest(table_name=table_name):
+                type_batch = database._relational_batch_typer(table_name, tuple(headers))
+                self.assertEqual(
+                    type_batch(rows),
+                    [database._relational_insert_tuple(table_name, headers, row) for row in rows],
+                )
+                self.assertEqual(type_batch([]), [])
+        with self.assertRaises(KeyError):
+            database._relational_batch_typer('users', ('user_id',))
+        with self.assertRaisesRegex(ValueError, 'unknown relational table'):
+            database._relational_batch_typer('notes', ('id',))
+
     def test__create_table(self) -> None:
         with closing(sqlite3.connect(':memory:')) as conn:
             database._create_table(conn, table_name='notes', headers=['id', 'body'])
@@ -630,28 +1575,129 @@ class TestDatabase(unittest.TestCase):
             database._insert_rows(conn, table_name='notes', headers=['id'], rows=[('a',), ('b',)])
             self.assertEqual(conn.execute('SELECT COUNT(*) FROM notes').fetchone()[0], 2)
 
-    def test__validate_relational_import_fk(self) -> None:
+    def test__missing_fk_keys(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            conn.execute("INSERT INTO users (user_id, username) VALUES ('u1', 'alice')")
+            conn.execute("INSERT INTO posts (post_id, user_id) VALUES ('p1', 'u1')")
+            conn.executemany(
+                'INSERT INTO interactions (interaction_id, post_id, user_id) VALUES (?, ?, ?)',
+                [('i1', 'p1', 'u9'), ('i2', 'p9', 'u1'), ('i3', 'p9', 'u9')],
+            )
+            self.assertEqual(
+                database._missing_fk_keys(conn, 'interactions', source='interactions'),
+                {'post_id': {'p9'}, 'user_id': {'u9'}},
+            )
+            conn.execute("INSERT INTO posts (post_id, user_id, topic_id) VALUES ('p2', 'u1', ' ')")
+            # blank optional keys are not missing parents
+            self.assertEqual(database._missing_fk_keys(conn, 'posts', source='posts'), {})
+            conn.execute("INSERT INTO posts (post_id, user_id) VALUES ('p3', ' ')")
+            with self.assertRaisesRegex(ValueError, 'empty user_id'):
+                database._missing_fk_keys(conn, 'posts', source='posts')
+
+    def test__create_fk_staging(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_fk_staging(conn, 'posts')
+            conn.execute("INSERT INTO temp.import_fk_staging VALUES ('u1', 't1')")
+            database._create_fk_staging(conn, 'interactions')
+            self.assertEqual(
+                [r[1] for r in conn.execute('PRAGMA temp.table_info(import_fk_staging)')],
+                ['post_id', 'user_id'],
+            )
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM temp.import_fk_staging').fetchone()[0], 0)
+
+    def test__stage_fk_rows(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_fk_staging(conn, 'posts')
+            database._stage_fk_rows(conn, 'posts', [('p1', 'u1', None, None, None, None, 't1', None)])
+            self.assertEqual(conn.execute('SELECT * FROM temp.import_fk_staging').fetchall(), [('u1', 't1')])
+
+    def test__format_fk_warning(self) -> None:
+        self.assertIsNone(database._format_fk_warning('posts', {}))
+        warn = database._format_fk_warning('posts', {'topic_id': {'t9'}})
+        self.assertEqual(
+            warn,
+            'posts CSV foreign keys failed validation: topic_id(s) not in topics table: t9. '
+            'Rows were inserted, but some reference missing users/topics. '
+            'Load topics and users CSVs first (in that order) for full consistency.',
+        )
+
+    def test__missing_fk_keys_staged(self) -> None:
         with closing(sqlite3.connect(':memory:')) as conn:
             database._create_empty_relational_tables(conn)
             conn.execute("INSERT INTO users VALUES ('u1', 'alice', NULL, NULL, NULL, NULL, NULL)")
             conn.execute("INSERT INTO topics VALUES ('t1', 'Topic 1', NULL, NULL, NULL)")
-            
+            database._create_fk_staging(conn, 'posts')
+            database._stage_fk_rows(conn, 'posts', [('p1', 'missing', None, None, None, None, 't1', None)])
+
             # Missing key should return warning, not raise
-            warn = database._validate_relational_import_fk(
-                conn,
-                'posts',
-                [('p1', 'missing', None, None, None, None, 't1', None)],
-            )
+            missing = database._missing_fk_keys(conn, 'posts', source=database._FK_STAGING_TABLE)
+            warn = database._format_fk_warning('posts', missing)
             self.assertIsInstance(warn, str)
             self.assertIn('foreign keys failed validation', warn)
 
             # Empty user_id should still raise ValueError
+            database._stage_fk_rows(conn, 'posts', [('p2', '', None, None, None, None, 't1', None)])
             with self.assertRaisesRegex(ValueError, 'empty user_id'):
-                database._validate_relational_import_fk(
-                    conn,
-                    'posts',
-                    [('p1', '', None, None, None, None, 't1', None)],
-                )
+                database._missing_fk_keys(conn, 'posts', source=database._FK_STAGING_TABLE)
+
+    def test__type_batch(self) -> None:
+        headers = list(database._RELATIONAL_INSERT_COLUMNS['users'])
+        self.assertEqual(
+            database._type_batch('users', headers, [('u1', 'alice', '', '', 'human', '', '3')]),
+            [('u1', 'alice', None, None, 'human', None, 3)],
+        )
+
+    def test__typed_batches(self) -> None:
+        headers = list(database._RELATIONAL_INSERT_COLUMNS['users'])
+        rows = [(f'u{i}', 'x', '', '', 'human', '', str(i)) for i in range(5)]
+        expected = [
+            database._type_batch('users', headers, rows[0:2]),
+            database._type_batch('users', headers, rows[2:4]),
+            database._type_batch('users', headers, rows[4:5]),
+        ]
+        got = list(database._typed_batches('users', headers, iter(rows), batch_size=2))
+        self.assertEqual(got, expected)
+
+    def test__read_typed_chunk(self) -> None:
+        headers = list(database._RELATIONAL_INSERT_COLUMNS['users'])
+        rows = [headers, ['u1', 'caf\xe9', '', '', 'human', '', '3'], ['u2', 'b', '', '', 'bot', '', '']]
+        path = self._write_csv('users.csv', rows)
+        ranges = list(database._csv_record_ranges(str(path), 40))
+        got = [database._read_typed_chunk('users', headers, str(path), 'utf-8', a, b) for a, b in ranges]
+        self.assertEqual(sum(got, []), database._type_batch('users', headers, [tuple(r) for r in rows[1:]]))
+        with self.assertRaisesRegex(ValueError, 'could not decode'):
+            database._read_typed_chunk('users', headers, str(path), 'ascii', 0, path.stat().st_size)
+
+    def test__typed_csv_tail(self) -> None:
+        headers = list(database._RELATIONAL_INSERT_COLUMNS['users'])
+        rows = [(f'u{i}', 'x', '', '', 'human', '', str(i)) for i in range(5)]
+        path = self._write_csv('users.csv', [headers, *rows])
+        got = list(database._typed_csv_tail('users', headers, str(path), 'utf-8', 0))
+        self.assertEqual(sum(got, []), database._type_batch('users', headers, rows))
+        start = path.read_bytes().index(b'u1,')
+        got = list(database._typed_csv_tail('users', headers, str(path), 'utf-8', start))
+        self.assertEqual(sum(got, []), database._type_batch('users', headers, rows[1:]))
+
+    def test__typed_csv_chunks(self) -> None:
+        headers = list(database._RELATIONAL_INSERT_COLUMNS['users'])
+        rows = [(f'u{i}', 'x', '', '', 'human', '', str(i)) for i in range(50)]
+        path = self._write_csv('users.csv', [headers, *rows])
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=2, mp_context=ctx) as pool:
+            got = list(database._typed_csv_chunks(
+                'users', headers, str(path), 'utf-8', pool=pool, in_flight=2, chunk_bytes=100,
+            ))
+        self.assertGreater(len(got), 2)
+        self.assertEqual(sum(got, []), database._type_batch('users', headers, rows))
+        # a stray quote in an unquoted field: the rest is read in this process
+        rows[3] = ('u3', '5" screen', '', '', 'human', '', '3')
+        path = self._write_csv('users.csv', [headers, *rows])
+        with ProcessPoolExecutor(max_workers=2, mp_context=ctx) as pool:
+            got = list(database._typed_csv_chunks(
+                'users', headers, str(path), 'utf-8', pool=pool, in_flight=2, chunk_bytes=100,
+            ))
+        self.assertEqual(sum(got, []), database._type_batch('users', headers, rows))
 
     def test__insert_relational_rows(self) -> None:
         with closing(sqlite3.connect(':memory:')) as conn:
@@ -665,6 +1711,15 @@ class TestDatabase(unittest.TestCase):
                 rows=[('p1', 'u1', '', 'text', '', '', 't1', 'en')],
             )
             self.assertEqual(conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0], 1)
+            warn = database._insert_relational_rows(
+                conn,
+                table_name='posts',
+                headers=list(database._RELATIONAL_INSERT_COLUMNS['posts']),
+                rows=[('p2', 'u1', '', '', '', '', 't1', ''), ('p3', 'u9', '', '', '', '', '', '')],
+                batch_size=1,
+            )
+            self.assertIn('user_id(s) not in users table: u9', warn)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0], 3)
 
     def test__replace_relational_table(self) -> None:
         with closing(sqlite3.connect(':memory:')) as conn:
@@ -676,6 +1731,97 @@ class TestDatabase(unittest.TestCase):
                 rows=[('u1', 'alice', '', '', 'human', '', '5')],
             )
             self.assertEqual(conn.execute('SELECT username FROM users').fetchone()[0], 'alice')
+            self.assertIn('idx_users_username', {r[1] for r in conn.execute('PRAGMA index_list(users)')})
+
+            def rows():
+                yield ('u2', 'bob', '', '', 'human', '', '1')
+                raise sqlite3.OperationalError('interrupted')
+
+            with self.assertRaises(sqlite3.OperationalError):
+                database._replace_relational_table(
+                    conn,
+                    table_name='users',
+                    headers=list(database._RELATIONAL_INSERT_COLUMNS['users']),
+                    rows=rows(),
+                    batch_size=1,
+                )
+            # the failed load rolled back to the previous table
+            self.assertEqual(conn.execute('SELECT user_id FROM users').fetchall(), [('u1',)])
+            self.assertEqual(conn.execute('PRAGMA foreign_keys').fetchone()[0], 1)
+            self.assertEqual(database.table_versions(conn, ('users',)), (1,))
+            self.assertTrue(all(database.rollup_current(conn, r) for r in database._ROLLUPS))
+
+    def test__upsert_relational_rows(self) -> None:
+        headers = list(database._RELATIONAL_INSERT_COLUMNS['users'])
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            conn.execute("INSERT INTO users (user_id, username, followers_count) VALUES ('u1', 'alice', 1)")
+            conn.commit()
+            keys, warning = database._upsert_relational_rows(
+                conn,
+                table_name='users',
+                headers=headers,
+                rows=[('u1', 'alice', '', '', 'human', '', '5'), ('u2', 'bob', '', '', 'bot', '', '')],
+                batch_size=1,
+            )
+            self.assertEqual((keys, warning), (['u1', 'u2'], None))
+            self.assertEqual(
+                conn.execute('SELECT user_id, followers_count, is_bot FROM users ORDER BY 1').fetchall(),
+                [('u1', 5, 0), ('u2', None, 1)],
+            )
+            self.assertEqual(database.table_versions(conn, ('users',)), (1,))
+
+            keys, warning = database._upsert_relational_rows(
+                conn,
+                table_name='posts',
+                headers=list(database._RELATIONAL_INSERT_COLUMNS['posts']),
+                rows=[('p1', 'u9', '', '', '', '', 't9', '')],
+            )
+            self.assertEqual(keys, ['p1'])
+            self.assertEqual(
+                warning,
+                'posts CSV foreign keys failed validation: user_id(s) not in users table: u9; '
+                'topic_id(s) not in topics table: t9' + database._FK_WARNING_SUFFIX['posts'],
+            )
+            self.assertEqual(conn.execute('PRAGMA foreign_keys').fetchone()[0], 1)
+
+            def rows():
+                yield ('u3', 'carol', '', '', '', '', '')
+                raise sqlite3.OperationalError('interrupted')
+
+            with self.assertRaises(sqlite3.OperationalError):
+                database._upsert_relational_rows(conn, table_name='users', headers=headers, rows=rows(), batch_size=1)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM users').fetchone()[0], 2)
+            self.assertFalse(conn.in_transaction)
+
+    def test__bulk_load_settings(self) -> None:
+        database.ensure_relational_schema(str(self.db_path))
+        with closing(sqlite3.connect(str(self.db_path))) as conn:
+            def settings() -> tuple[object, ...]:
+                return tuple(
+                    conn.execute(f'PRAGMA {name}').fetchone()[0]
+                    for name in ('journal_mode', 'synchronous', 'cache_size')
+                )
+
+            before = settings()
+            with database._bulk_load_settings(conn):
+                self.assertEqual(settings(), ('wal', 1, -database.BULK_LOAD_CACHE_KIB))
+            self.assertEqual(settings(), before)
+            with self.assertRaises(RuntimeError), database._bulk_load_settings(conn, wal=False):
+                self.assertEqual(settings(), (before[0], before[1], -database.BULK_LOAD_CACHE_KIB))
+                raise RuntimeError
+            self.assertEqual(settings(), before)
+
+    def test__foreign_key_check_error(self) -> None:
+        msg = database._foreign_key_check_error([
+            ('interactions', 3, 'posts', 1),
+            ('posts', 1, 'users', 0),
+            ('interactions', 4, 'posts', 1),
+        ])
+        self.assertTrue(msg.startswith(
+            'Foreign key check failed after loading: 2 interactions row(s) without a parent '
+            'in posts, 1 posts row(s) without a parent in users. Load CSVs in dependency order',
+        ))
 
     def test__sort_csv_paths_for_fk(self) -> None:
         got = database._sort_csv_paths_for_fk([
@@ -704,6 +1850,41 @@ class TestDatabase(unittest.TestCase):
         with closing(database._connect(str(self.db_path))) as conn, conn:
             self.assertEqual(conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0], 1)
             self.assertEqual(conn.execute('SELECT COUNT(*) FROM notes').fetchone()[0], 1)
+            self.assertIn('idx_posts_topic_id', {r[1] for r in conn.execute('PRAGMA index_list(posts)')})
+            self.assertEqual(database.table_versions(conn, ('posts', 'notes')), (1, 1))
+            bulk_rows = [conn.execute(f'SELECT * FROM {t} ORDER BY 1').fetchall() for t in ('posts', 'users', 'notes')]
+        reference_path = str(self.tmp / 'reference.db')
+        database.create_database(reference_path, [str(posts), str(notes), str(users), str(topics)], bulk=False)
+        with closing(database._connect(reference_path)) as conn, conn:
+            self.assertEqual(
+                [conn.execute(f'SELECT * FROM {t} ORDER BY 1').fetchall() for t in ('posts', 'users', 'notes')],
+                bulk_rows,
+            )
+        parallel_path = str(self.tmp / 'parallel.db')
+        database.create_database(parallel_path, [str(posts), str(notes), str(users), str(topics)], workers=2)
+        with closing(database._connect(parallel_path)) as conn, conn:
+            self.assertEqual(
+                [conn.execute(f'SELECT * FROM {t} ORDER BY 1').fetchall() for t in ('posts', 'users', 'notes')],
+                bulk_rows,
+            )
+
+    def test_create_database_foreign_key_check(self) -> None:
+        users = self._write_csv('users.csv', [
+            ['user_id', 'username', 'join_date', 'location', 'account_type', 'verified', 'followers_count'],
+            ['u1', 'alice', '', '', 'human', '', '3'],
+        ])
+        posts = self._write_csv('posts.csv', [
+            ['post_id', 'user_id', 'timestamp', 'content_type', 'content_preview', 'has_media', 'topic_id', 'language'],
+            ['p1', 'u9', '2024-01-01', 'text', 'hello', 'FALSE', '', 'en'],
+        ])
+        database.create_database(str(self.db_path), [str(users)])
+        with self.assertRaisesRegex(ValueError, '1 posts row\\(s\\) without a parent in users'):
+            database.create_database(str(self.db_path), [str(users), str(posts)])
+        # rolled back to the previous database, with settings restored
+        with closing(database._connect(str(self.db_path))) as conn:
+            self.assertEqual(conn.execute('SELECT user_id FROM users').fetchall(), [('u1',)])
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0], 0)
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
 
     def test_replace_table_data(self) -> None:
         database.ensure_relational_schema(str(self.db_path))
@@ -722,6 +1903,36 @@ class TestDatabase(unittest.TestCase):
         with closing(database._connect(str(self.db_path))) as conn, conn:
             self.assertEqual(conn.execute('SELECT COUNT(*) FROM notes').fetchone()[0], 1)
             self.assertEqual(conn.execute('SELECT COUNT(*) FROM users').fetchone()[0], 1)
+            # the fresh schema counts as one change, each replace as another
+            self.assertEqual(database.table_versions(conn, ('notes', 'users', 'posts')), (1, 2, 1))
+            database.replace_table_data(
+                '/nonexistent/ignored.db',
+                table_name='users',
+                headers=database._RELATIONAL_INSERT_COLUMNS['users'],
+                rows=[['u2', 'bob', '', '', 'human', '', '2']],
+                conn=conn,
+            )
+            self.assertEqual(conn.execute('SELECT user_id FROM users').fetchall(), [('u2',)])
+
+    def test_upsert_table_data(self) -> None:
+        self._seed_relational_db()
+        with mock.patch('audit_log.get_audit_logger', return_value=mock.Mock()):
+            keys, warning = database.upsert_table_data(
+                str(self.db_path),
+                table_name='Users',
+                headers=['User ID', 'Username', 'Join Date', 'Location', 'Account Type', 'Verified', 'Followers Count'],
+                rows=[['u1', 'alice', '', '', 'bot', '', '9'], ['u3', 'carol', '', '', 'human', '', '']],
+            )
+        self.assertEqual((keys, warning), (['u1', 'u3'], None))
+        with closing(database._connect(str(self.db_path))) as conn, conn:
+            self.assertEqual(
+                conn.execute('SELECT user_id, account_type FROM users ORDER BY 1').fetchall(),
+                [('u1', 'bot'), ('u2', 'bot'), ('u3', 'human')],
+            )
+            # the users' posts are still there (no table replace)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0], 2)
+        with self.assertRaisesRegex(ValueError, 'cannot append'):
+            database.upsert_table_data(str(self.db_path), table_name='notes', headers=['id'], rows=[])
 
     def test_replace_table_data_from_csv(self) -> None:
         path = self._write_csv('notes.csv', [['ID', 'Body'], ['1', 'hello']])
@@ -731,6 +1942,28 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(rows, [('1', 'hello')])
         self.assertIsNone(warning)
 
+    def test_import_csv_streaming(self) -> None:
+        database.ensure_relational_schema(str(self.db_path))
+        users = self._write_csv('users.csv', [
+            ['user_id', 'username', 'join_date', 'location', 'account_type', 'verified', 'followers_count'],
+            ['u1', 'alice', '', '', 'human', '', '3'],
+            ['u2', 'bob', '', '', 'bot', '', ''],
+            ['u3', 'carol', '', '', 'human', '', '7'],
+        ])
+        table_name, headers, row_count, warning = database.import_csv_streaming(
+            str(self.db_path),
+            csv_path=str(users),
+            batch_size=2,
+        )
+        self.assertEqual((table_name, row_count, warning), ('users', 3, None))
+        self.assertEqual(headers, list(database._RELATIONAL_INSERT_COLUMNS['users']))
+        with closing(database._connect(str(self.db_path))) as conn, conn:
+            self.assertEqual(
+                conn.execute('SELECT SUM(followers_count), COUNT(*) FROM users').fetchone(),
+                (10, 3),
+            )
+            self.assertEqual(database.table_versions(conn, ('users',)), (2,))
+
     def test_get_table_columns(self) -> None:
         database.replace_table_data(
             str(self.db_path),
@@ -739,6 +1972,11 @@ class TestDatabase(unittest.TestCase):
             rows=[['1', 'hello']],
         )
         self.assertEqual(database.get_table_columns(str(self.db_path), 'notes'), ['id', 'body'])
+        # replacing the table re-reads its columns
+        database.replace_table_data(str(self.db_path), table_name='notes', headers=['Title'], rows=[['x']])
+        self.assertEqual(database.get_table_columns(str(self.db_path), 'notes'), ['title'])
+        with self.assertRaisesRegex(ValueError, 'unknown table'):
+            database.get_table_columns(str(self.db_path), 'missing')
 
     def test_resolve_user_headers(self) -> None:
         database.replace_table_data(
@@ -764,6 +2002,10 @@ class TestDatabase(unittest.TestCase):
             [r['user_id'] for r in database.query_rows(str(self.db_path), table_name='users', filters={}, limit=10)],
             ['u1'],
         )
+        self.assertEqual(
+            list(database.query_rows(str(self.db_path), table_name='users', filters={}, limit=10)[0]),
+            list(database._RELATIONAL_INSERT_COLUMNS['users']),
+        )
         self.assertEqual(
             database.query_rows(str(self.db_path), table_name='notes', filters={'ID': '1'}, limit=10)[0]['body'],
             'hello',
@@ -776,16 +2018,98 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual([r['post_id'] for r in posts], ['p1'])
         self.assertEqual([r['user_id'] for r in users], ['u1'])
 
+    def test_public_functions_accept_connection_manager(self) -> None:
+        self._seed_relational_db()
+        with database.ConnectionManager(str(self.db_path)) as manager:
+            self.assertTrue(database.database_exists(manager))
+            database.ensure_relational_schema(manager)
+            database.replace_table_data(manager, table_name='notes', headers=['ID', 'Body'], rows=[['1', 'hi']])
+            self.assertEqual(database.get_table_columns(manager, 'notes'), ['id', 'body'])
+            self.assertEqual(database.resolve_user_headers(manager, table_name='notes', headers=['ID']), {'ID': 'id'})
+            self.assertEqual(
+                database.query_rows(manager, table_name='posts', filters={'post_id': 'p1'}),
+                database.query_rows(str(self.db_path), table_name='posts', filters={'post_id': 'p1'}),
+            )
+            self.assertEqual(
+                [r['user_id'] for r in database.query_row_numbers(manager, table_name='users', row_numbers=[1])],
+                ['u1'],
+            )
+            # the shared connection keeps its default row factory
+            self.assertIsNone(manager.connection().row_factory)
+
+
+class TestFigureCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.tmpdir.name) / 'test.db')
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('CREATE TABLE t (x INTEGER)')
+        figure_cache.clear()
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        figure_cache.clear()
+        self.tmpdir.cleanup()
+
+    def _build(self) -> figure_cache.RenderedFigure:
+        fig = Figure(figsize=(2, 1), dpi=50)
+        fig.add_subplot(1, 1, 1).plot([0, 1], [1, 0])
+        return figure_cache.render(fig, extra='r')
+
+    def test_clear(self) -> None:
+        figure_cache.cached_figure(self.conn, name='f', tables=('t',), build=self._build)
+        figure_cache.clear()
+        self.assertEqual(len(figure_cache._memory), 0)
+
+    def test_render(self) -> None:
+        rendered = self._build()
+        self.assertEqual((rendered.width, rendered.height), (100, 50))
+        self.assertTrue(rendered.ppm.startswith(b'P6 100 50 255\n'))
+        self.assertEqual(len(rendered.ppm), len(b'P6 100 50 255\n') + 100 * 50 * 3)
+        self.assertEqual(rendered.extra, 'r')
+
+    def test_lookup(self) -> None:
+        self.assertIsNone(figure_cache.lookup(self.conn, name='f', tables=('t',)))
+        rendered = figure_cache.cached_figure(self.conn, name='f', tables=('t',), params=(True,), build=self._build)
+        self.assertIs(figure_cache.lookup(self.conn, name='f', tables=('t',), params=(True,)), rendered)
+        self.assertIsNone(figure_cache.lookup(self.conn, name='f', tables=('t',), params=(False,)))
+        with self.conn:
+            database.bump_table_versions(self.conn, ['t'])
+        self.assertIsNone(figure_cache.lookup(self.conn, name='f', tables=('t',), params=(True,)))
+
+    def test_cached_figure(self) -> None:
+        build = mock.Mock(side_effect=self._build)
+        first = figure_cache.cached_figure(self.conn, name='f', tables=('t',), build=build)
+        self.assertIs(figure_cache.cached_figure(self.conn, name='f', tables=('t',), build=build), first)
+        self.assertEqual(build.call_count, 1)
+        with self.conn:
+            database.bump_table_versions(self.conn, ['t'])
+        self.assertIsNot(figure_cache.cached_figure(self.conn, name='f', tables=('t',), build=build), first)
+        size = len(first.ppm)
+        with mock.patch.object(figure_cache, 'MAX_BYTES', 2 * size):
+            for i in range(3):
+                figure_cache.cached_figure(self.conn, name=f'g{i}', tables=('t',), build=build)
+            self.assertEqual([key[1] for key in figure_cache._memory], ['g1', 'g2'])
+        with mock.patch.object(figure_cache, 'MAX_BYTES', size - 1):
+            figure_cache.cached_figure(self.conn, name='huge', tables=('t',), build=build)
+            self.assertIsNone(figure_cache.lookup(self.conn, name='huge', tables=('t',)))
+        with closing(sqlite3.connect(':memory:')) as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+            figure_cache.cached_figure(conn, name='m', tables=('t',), build=build)
+            figure_cache.cached_figure(conn, name='m', tables=('t',), build=build)
+        self.assertEqual(build.call_count, 8)
+
 
 class TestHourTopicPivot(unittest.TestCase):
     def setUp(self) -> None:
         self.conn = sqlite3.connect(':memory:')
         self.conn.executescript(
-            '''
+            f'''
             CREATE TABLE users (
                 user_id TEXT PRIMARY KEY,
                 username TEXT NOT NULL,
-                account_type TEXT
+                account_type TEXT,
+                is_bot INTEGER GENERATED ALWAYS AS (lower(trim(coalesce(account_type, ''))) = 'bot') STORED
             );
             CREATE TABLE topics (
                 topic_id TEXT PRIMARY KEY,
@@ -795,7 +2119,8 @@ class TestHourTopicPivot(unittest.TestCase):
                 post_id TEXT PRIMARY KEY,
                 user_id TEXT NOT NULL,
                 timestamp TEXT,
-                topic_id TEXT
+                topic_id TEXT,
+                {database.TIMESTAMP_GENERATED_COLUMNS_SQL}
             );
             INSERT INTO users (user_id, username, account_type) VALUES
                 ('u1', 'alice', 'human'),
@@ -816,9 +2141,20 @@ class TestHourTopicPivot(unittest.TestCase):
         self.conn.close()
 
     def test__hour_expr(self) -> None:
-        expr = hour_topic_pivot._hour_expr()
-        self.assertIn("strftime('%H'", expr)
-        self.assertIn("replace(replace(p.timestamp, '/', '-'), 'T', ' ')", expr)
+        self.assertEqual(hour_topic_pivot._hour_expr(), 'p.ts_hour')
+
+    def test__hour_topic_counts_sql(self) -> None:
+        sql, params = hour_topic_pivot._hour_topic_counts_sql(hour_filter=9, topic_id_filter='t1', rollup=False)
+        self.assertEqual(params, [9, 't1'])
+        self.assertIn('INNER JOIN users u', sql)
+        sql, _params = hour_topic_pivot._hour_topic_counts_sql(hour_filter=None, topic_id_filter=None, rollup=True)
+        self.assertIn('FROM agg_posts_hour_topic p', sql)
+        with closing(_indexed_relational_db()) as conn:
+            for hour_filter, topic_id_filter in ((None, None), (9, None), (None, 't1'), (9, 't1')):
+                sql, params = hour_topic_pivot._hour_topic_counts_sql(
+                    hour_filter=hour_filter, topic_id_filter=topic_id_filter, rollup=False,
+                )
+                self.assertEqual(_full_scans(conn, sql, params), [], (hour_filter, topic_id_filter))
 
     def test_query_hour_topic_counts(self) -> None:
         rows = hour_topic_pivot.query_hour_topic_counts(
@@ -833,12 +2169,59 @@ class TestHourTopicPivot(unittest.TestCase):
         )
         self.assertEqual(rows, [(9, 't1', 'Topic 1', 2), (10, None, None, 1)])
         self.assertEqual(filtered, [(9, 't1', 'Topic 1', 2)])
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            _copy_relational_rows(self.conn, conn)
+            database.ensure_rollups(conn)
+            conn.execute("UPDATE posts SET topic_id = 't2' WHERE post_id = 'p3'")
+            conn.execute("UPDATE posts SET topic_id = NULL WHERE post_id = 'p3'")
+            self.assertTrue(database.rollup_current(conn, 'agg_posts_hour_topic'))
+            self.assertEqual(
+                hour_topic_pivot.query_hour_topic_counts(conn, hour_filter=None, topic_id_filter=None),
+                rows,
+            )
+            self.assertEqual(
+                hour_topic_pivot.query_hour_topic_counts(conn, hour_filter=9, topic_id_filter='t1'),
+                filtered,
+            )
 
     def test__bucket_key(self) -> None:
         self.assertEqual(hour_topic_pivot._bucket_key(None), '__NULL__')
         self.assertEqual(hour_topic_pivot._bucket_key(''), '__NULL__')
         self.assertEqual(hour_topic_pivot._bucket_key('t1'), 't1')
 
+    def test_sparse_pivot(self) -> None:
+        pivot = hour_topic_pivot.SparsePivot(
+            hours=np.array([0, 23]),
+            columns=np.array([1, 0]),
+            counts=np.array([4, 5]),
+            n_topics=2,
+        )
+        self.assertEqual(pivot.shape, (24, 2))
+        dense = pivot.toarray()
+        self.assertEqual((dense[0, 1], dense[23, 0], dense.sum()), (4.0, 5.0, 9.0))
+
+    def test__factorize_pivot_rows(self) -> None:
+        hours, columns, counts, keys = hour_topic_pivot._factorize_pivot_rows([
+            (9, 't2', None, 1),
+            (9, 't1', None, 1),
+            (24, 't3', None, 5),
+        ])
+        self.assertEqual(keys, ['t3', 't1', 't2'])
+        self.assertEqual((hours.tolist(), columns.tolist(), counts.tolist()), ([9, 9], [2, 1], [1, 1]))
+
+    def test_build_sparse_pivot(self) -> None:
+        rows = [(9, 't1', 'Topic 1', 2), (10, '', None, 1), (9, 't1', 'Topic 1', 3), (3, 't2', None, 0)]
+        pivot, keys, labels = hour_topic_pivot.build_sparse_pivot(rows)
+        self.assertEqual(keys, ['t1', '__NULL__', 't2'])
+        self.assertEqual(labels, ['t1', '(no topic)', 't2'])
+        self.assertEqual(
+            list(zip(pivot.hours.tolist(), pivot.columns.tolist(), pivot.counts.tolist())),
+            [(9, 0, 5), (10, 1, 1)],
+        )
+        pivot, keys, labels = hour_topic_pivot.build_sparse_pivot([])
+        self.assertEqual((pivot.shape, keys, labels), ((24, 0), [], []))
+
     def test_build_pivot_matrix(self) -> None:
         matrix, keys, labels = hour_topic_pivot.build_pivot_matrix([
             (9, 't1', 'Topic 1', 2),
@@ -849,6 +2232,10 @@ class TestHourTopicPivot(unittest.TestCase):
         self.assertEqual(labels, ['t1', '(no topic)'])
         self.assertEqual(matrix[9, 0], 2.0)
         self.assertEqual(matrix[10, 1], 1.0)
+        # equal totals: by key
+        _, keys, _ = hour_topic_pivot.build_pivot_matrix([(1, 'b', None, 1), (2, 'a', None, 1)])
+        self.assertEqual(keys, ['a', 'b'])
+        self.assertEqual(hour_topic_pivot.build_pivot_matrix([])[0].shape, (24, 0))
 
     def test_build_hour_topic_pivot_figure(self) -> None:
         fig = hour_topic_pivot.build_hour_topic_pivot_figure(
@@ -861,6 +2248,149 @@ class TestHourTopicPivot(unittest.TestCase):
         self.assertEqual(fig.axes[0].get_title(), 'Pivot')
 
 
+class _FakeRoot:
+    def __init__(self) -> None:
+        self.pending: list = []
+
+    def after(self, ms, callback) -> None:
+        self.pending.append(callback)
+
+
+class TestJobRunner(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = str(Path(self.tmp.name) / 'jobs.db')
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+            conn.executemany('INSERT INTO t VALUES (?)', [(i,) for i in range(10)])
+        self.root = _FakeRoot()
+        self.progressbar = mock.Mock()
+        self.status = mock.Mock()
+        self.cancel_button = mock.Mock()
+        self.runner = job_runner.JobRunner(
+            self.root,
+            connect=lambda: sqlite3.connect(self.db_path),
+            progressbar=self.progressbar,
+            status_label=self.status,
+            cancel_button=self.cancel_button,
+        )
+        self.success = mock.Mock()
+        self.error = mock.Mock()
+
+    def _wait(self) -> None:
+        self.runner._thread.join(timeout=10)
+        while self.root.pending:
+            self.root.pending.pop(0)()
+
+    def test_job_context(self) -> None:
+        events = queue.Queue()
+        cancelled = threading.Event()
+        job = job_runner.JobContext(None, cancelled=cancelled, events=events)
+        job.status('reading')
+        job.progress(1, 4)
+        self.assertEqual([events.get_nowait(), events.get_nowait()], [('status', 'reading'), ('progress', (1, 4))])
+        self.assertFalse(job.cancelled)
+        cancelled.set()
+        self.assertTrue(job.cancelled)
+        with self.assertRaises(job_runner.JobCancelled):
+            job.progress(2, 4)
+
+    def test_submit(self) -> None:
+        def work(job):
+            job.progress(3, 10)
+            return (threading.current_thread().name, job.conn.execute('SELECT SUM(x) FROM t').fetchone()[0])
+
+        self.assertTrue(self.runner.submit('sum', work, on_success=self.success, on_error=self.error))
+        self.assertTrue(self.runner.busy)
+        self.assertFalse(self.runner.submit('other', work, on_success=self.success, on_error=self.error))
+        self._wait()
+        self.success.assert_called_once_with(('job: sum', 45))
+        self.error.assert_not_called()
+        self.assertFalse(self.runner.busy)
+        self.progressbar.configure.assert_any_call(mode='determinate', maximum=10, value=3)
+        self.assertEqual(self.cancel_button.state.call_args.args[0], ['disabled'])
+
+    def test_submit_error(self) -> None:
+        def work(job):
+            raise ValueError('bad csv')
+
+        self.runner.submit('fail', work, on_success=self.success, on_error=self.error)
+        self._wait()
+        self.success.assert_not_called()
+        self.assertIsInstance(self.error.call_args.args[0], ValueError)
+
+    def test_cancel(self) -> None:
+        started = threading.Event()
+
+        def work(job):
+            started.set()
+            return job.conn.execute(
+                'WITH RECURSIVE c(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM c) '
+                'SELECT COUNT(*) FROM c',
+            ).fetchone()
+
+        self.runner.submit('forever', work, on_success=self.success, on_error=self.error)
+        self.assertTrue(started.wait(timeout=10))
+        time.sleep(0.05)
+        self.runner.cancel()
+        self._wait()
+        self.success.assert_not_called()
+        self.assertIsInstance(self.error.call_args.args[0], job_runner.JobCancelled)
+        self.runner.cancel()  # idle: no-op
+
+    def test__run(self) -> None:
+        events = queue.Queue()
+        conns = []
+
+        def work(job):
+            conns.append(job.conn)
+            return 1
+
+        self.runner._run(work, events, threading.Event())
+        self.assertEqual(events.get_nowait(), ('done', 1))
+        # the job's connection is closed once the job ends
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conns[0].execute('SELECT 1')
+
+    def test__poll(self) -> None:
+        self.runner.current = 'job'
+        self.runner._events.put(('status', 'halfway'))
+        self.runner._poll()
+        self.status.configure.assert_called_with(text='halfway')
+        self.assertEqual(len(self.root.pending), 1)
+
+    def test__finish(self) -> None:
+        self.runner.current = 'job'
+        self.runner._on_success, self.runner._on_error = self.success, self.error
+        self.runner._finish('error', job_runner.JobCancelled())
+        self.assertFalse(self.runner.busy)
+        self.assertIsInstance(self.error.call_args.args[0], job_runner.JobCancelled)
+        # a read-only job that ignores the cancel (no SQLite, no progress) still reports it
+        self.runner.current = 'read csv'
+        self.runner._on_success, self.runner._on_error = self.success, self.error
+        self.runner._cancel_discards_result = True
+        self.runner._cancelled.set()
+        self.runner._finish('done', ['rows'])
+        self.success.assert_not_called()
+        self.assertEqual(self.error.call_count, 2)
+        self.assertIsInstance(self.error.call_args.args[0], job_runner.JobCancelled)
+        # any other job's result (e.g. a committed import) is passed through
+        self.runner.current = 'import'
+        self.runner._on_success, self.runner._on_error = self.success, self.error
+        self.runner._cancel_discards_result = False
+        self.runner._finish('done', ['committed'])
+        self.success.assert_called_once_with(['committed'])
+        self.assertEqual(self.error.call_count, 2)
+
+    def test__set_idle(self) -> None:
+        self.runner._set_idle(False)
+        self.progressbar.start.assert_called()
+        self.assertEqual(self.cancel_button.state.call_args.args[0], ['!disabled'])
+        self.runner._set_idle(True)
+        self.status.configure.assert_called_with(text='')
+
+
 class TestModerationEffectiveness(unittest.TestCase):
     def setUp(self) -> None:
         self.conn = sqlite3.connect(':memory:')
@@ -869,7 +2399,8 @@ class TestModerationEffectiveness(unittest.TestCase):
             CREATE TABLE users (
                 user_id TEXT PRIMARY KEY,
                 username TEXT NOT NULL,
-                account_type TEXT
+                account_type TEXT,
+                is_bot INTEGER GENERATED ALWAYS AS (lower(trim(coalesce(account_type, ''))) = 'bot') STORED
             );
             CREATE TABLE topics (
                 topic_id TEXT PRIMARY KEY,
@@ -933,19 +2464,63 @@ class TestModerationEffectiveness(unittest.TestCase):
         self.assertEqual(moderation_effectiveness._mod_rank('HIGH'), 2)
         self.assertEqual(moderation_effectiveness._mod_rank(None), 1)
 
-    def test__effectiveness_ctes(self) -> None:
-        sql = moderation_effectiveness._effectiveness_ctes(ua='ua_pred', ur='ur_pred', ph='U9999')
-        self.assertIn('WITH in_scope_posts AS', sql)
-        self.assertIn('WHERE ua_pred AND p.topic_id IS NOT NULL', sql)
-        self.assertIn("AND i.user_id != 'U9999'", sql)
+    def test__post_reports_sql(self) -> None:
+        ur = database.sql_exclude_bot_users(users_table_alias='ur')
+        self.conn.execute(moderation_effectiveness._post_reports_sql(ur=ur), {'ph': 'U9999'})
+        self.assertEqual(
+            self.conn.execute('SELECT * FROM temp.moderation_post_reports ORDER BY post_id').fetchall(),
+            [('p1', 2, 0), ('p3', 1, 1), ('p4', 0, 0)],
+        )
+        with closing(_indexed_relational_db()) as conn:
+            sql = moderation_effectiveness._post_reports_sql(ur=ur).replace(
+                'CREATE TEMP TABLE moderation_post_reports AS', '',
+            )
+            self.assertEqual(_full_scans(conn, sql, {'ph': 'U9999'}), [])
+
+    def test__topic_aggregate_sql(self) -> None:
+        ur = database.sql_exclude_bot_users(users_table_alias='ur')
+        ua = database.sql_exclude_bot_users(users_table_alias='ua')
+        self.conn.execute(moderation_effectiveness._post_reports_sql(ur=ur), {'ph': 'U9999'})
+        self.assertEqual(
+            self.conn.execute(moderation_effectiveness._topic_aggregate_sql(ua=ua)).fetchall(),
+            [
+                ('t3', 'Topic 3', 'Policy', 'medium', 1, 0, 0),
+                ('t2', 'Topic 2', 'Safety', 'high', 2, 1, 1),
+                ('t1', 'Topic 1', 'Safety', 'low', 2, 2, 1),
+            ],
+        )
+        with closing(_indexed_relational_db()) as conn:
+            conn.execute(moderation_effectiveness._post_reports_sql(ur=ur), {'ph': 'U9999'})
+            conn.execute('CREATE INDEX temp.moderation_post_reports_post_id ON moderation_post_reports (post_id)')
+            self.assertEqual(_full_scans(conn, moderation_effectiveness._topic_aggregate_sql(ua=ua)), [])
+
+    def test__summary_from_topics(self) -> None:
+        rows = moderation_effectiveness._summary_from_topics([
+            ('t1', 'Topic 1', 'Safety', 'low', 2, 2, 1),
+            ('t4', 'Topic 4', 'Safety', 'low', 2, 1, 1),
+            ('t2', 'Topic 2', 'Safety', 'high', 4, 0, 0),
+        ])
+        self.assertEqual(rows, [('Safety', 'low', 4, 3, 0.75, 50.0), ('Safety', 'high', 4, 0, 0.0, 0.0)])
+        self.assertEqual(moderation_effectiveness._summary_from_topics([]), [])
 
     def test_run_moderation_effectiveness_analysis(self) -> None:
         result = moderation_effectiveness.run_moderation_effectiveness_analysis(self.conn)
         self.assertEqual(result.ignored_placeholder_reports, 1)
-        self.assertEqual(result.summary_colnames[:2], ['category', 'moderation_level'])
+        self.assertEqual(result.summary_colnames, moderation_effectiveness.SUMMARY_COLNAMES)
         self.assertEqual(
-            {(r[0], r[1], int(r[2]), int(r[3])) for r in result.summary_rows},
-            {('Policy', 'medium', 1, 0), ('Safety', 'high', 2, 1), ('Safety', 'low', 2, 2)},
+            result.summary_rows,
+            [
+                ('Policy', 'medium', 1, 0, 0.0, 0.0),
+                ('Safety', 'high', 2, 1, 0.5, 50.0),
+                ('Safety', 'low', 2, 2, 1.0, 50.0),
+            ],
+        )
+        self.assertEqual(result.topic_rows[2], ('t1', 'Topic 1', 'Safety', 'low', 2, 2))
+        # the per-post temp table does not outlive the call
+        self.assertIsNone(
+            self.conn.execute(
+                "SELECT name FROM sqlite_temp_master WHERE name = 'moderation_post_reports'",
+            ).fetchone(),
         )
 
     def test__col_index(self) -> None:
@@ -1000,6 +2575,333 @@ class TestModerationEffectiveness(unittest.TestCase):
         self.assertEqual(summary, (result.summary_colnames, result.summary_rows, result.ignored_placeholder_reports))
 
 
+class TestReport(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tmp = Path(self.tmpdir.name)
+        self.db_path = str(self.tmp / 'test.db')
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            database._create_empty_relational_tables(conn)
+            conn.executescript(
+                '''
+                INSERT INTO topics (topic_id, topic_name, category, moderation_level) VALUES
+                    ('t1', 'News', 'news', 'high');
+                INSERT INTO users (user_id, username, account_type) VALUES
+                    ('u1', 'alice', 'human'),
+                    ('u2', 'botty', 'bot');
+                INSERT INTO posts (post_id, user_id, timestamp, content_type, topic_id) VALUES
+                    ('p1', 'u1', '2024-01-01 09:00:00', 'text', 't1'),
+                    ('p2', 'u2', '2024-01-01 10:00:00', 'image', 't1'),
+                    ('p3', 'u1', '2024/01/02 11:00:00', 'text', NULL);
+                INSERT INTO interactions (interaction_id, post_id, user_id, interaction_type, timestamp) VALUES
+                    ('i1', 'p1', 'u1', ' Like', '2024-01-01 12:00:00'),
+                    ('i2', 'p1', 'u2', 'report', '2024-01-01 13:00:00'),
+                    ('i3', 'p2', 'u1', NULL, '2024-01-02 14:00:00');
+                ''',
+            )
+        self.out_dir = str(self.tmp / 'out')
+        aggregate_cache.clear()
+
+    def tearDown(self) -> None:
+        aggregate_cache.clear()
+        self.tmpdir.cleanup()
+
+    def _analysis(self, name: str, **options: object) -> report.AnalysisOutput:
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            return report.ANALYSES[name](conn, report.ReportOptions(**options))  # type: ignore[arg-type]
+
+    def test__timeline(self) -> None:
+        out = self._analysis('timeline')
+        self.assertEqual(list(out.figures), ['daily_activity'])
+        self.assertEqual(out.tables['daily_posts'][1], [('2024-01-01', 2), ('2024-01-02', 1)])
+        self.assertEqual(out.tables['daily_interactions'][1], [
+            ('2024-01-01', 'like', 1),
+            ('2024-01-01', 'report', 1),
+            ('2024-01-02', '(none)', 1),
+        ])
+        out = self._analysis('timeline', human_only=True)
+        self.assertEqual(out.tables['daily_posts'][1], [('2024-01-01', 1), ('2024-01-02', 1)])
+        # timestamps only the Python fallback parses are counted, as in the figure
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            conn.execute("INSERT INTO posts (post_id, user_id, timestamp) VALUES ('p4', 'u1', '2024-1-5')")
+            conn.execute(
+                "INSERT INTO interactions (interaction_id, post_id, user_id, interaction_type, timestamp) "
+                "VALUES ('i4', 'p4', 'u1', 'like', '2024-01-05 9:30')",
+            )
+        out = self._analysis('timeline')
+        self.assertEqual(out.tables['daily_posts'][1][-1], ('2024-01-05', 1))
+        self.assertEqual(out.tables['daily_interactions'][1][-1], ('2024-01-05', 'like', 1))
+
+    def test__categorical(self) -> None:
+        out = self._analysis('categorical', human_only=True)
+        self.assertEqual(out.tables['three_way'][1], [('news', 'high', 'text', 1)])
+
+    def test__hour_topic(self) -> None:
+        out = self._analysis('hour_topic', hour=9)
+        self.assertEqual(out.tables['counts'][1], [(9, 't1', 'News', 1)])
+
+    def test__moderation(self) -> None:
+        out = self._analysis('moderation')
+        self.assertEqual(set(out.figures), {'effectiveness', 'correlation'})
+        self.assertEqual(out.tables['summary'][0], moderation_effectiveness.SUMMARY_COLNAMES)
+        self.assertEqual(out.tables['overview'][1][0], ('ignored_placeholder_reports', 0))
+
+    def test__write_table(self) -> None:
+        csv_path = str(self.tmp / 't.csv')
+        json_path = str(self.tmp / 't.json')
+        report._write_table(csv_path, ['a', 'b'], [(1, None), (2, 'x')])
+        report._write_table(json_path, ['a', 'b'], [(1, None), (2, 'x')])
+        self.assertEqual(Path(csv_path).read_text(encoding='utf-8').splitlines(), ['a,b', '1,', '2,x'])
+        self.assertEqual(
+            json.loads(Path(json_path).read_text(encoding='utf-8')),
+            [{'a': 1, 'b': None}, {'a': 2, 'b': 'x'}],
+        )
+
+    def test_run_analysis(self) -> None:
+        written = report.run_analysis(
+            'hour_topic',
+            self.db_path,
+            self.out_dir,
+            options=report.ReportOptions(),
+            figure_formats=('png', 'svg'),
+            table_formats=('csv', 'json'),
+        )
+        names = sorted(Path(p).name for p in written)
+        self.assertEqual(names, ['counts.csv', 'counts.json', 'pivot.png', 'pivot.svg'])
+        self.assertTrue(Path(self.out_dir, 'hour_topic', 'pivot.png').read_bytes().startswith(b'\x89PNG'))
+
+    def test_run_reports(self) -> None:
+        with self.assertRaises(ValueError):
+            report.run_reports(self.db_path, self.out_dir, analyses=['nope'], options=report.ReportOptions())
+        with self.assertRaises(ValueError):
+            report.run_reports(
+                str(self.tmp / 'missing.db'),
+                self.out_dir,
+                analyses=['timeline'],
+                options=report.ReportOptions(),
+            )
+        with mock.patch.dict(report.ANALYSES, {'timeline': mock.Mock(side_effect=sqlite3.OperationalError('boom'))}):
+            results = report.run_reports(
+                self.db_path,
+                self.out_dir,
+                analyses=['timeline', 'categorical'],
+                options=report.ReportOptions(),
+                workers=1,
+            )
+        self.assertIsInstance(results['timeline'], sqlite3.OperationalError)
+        self.assertEqual(len(results['categorical']), 2)
+        results = report.run_reports(
+            self.db_path,
+            self.out_dir,
+            analyses=['categorical', 'hour_topic'],
+            options=report.ReportOptions(human_only=True),
+            table_formats=('json',),
+            workers=2,
+        )
+        self.assertEqual({name: len(paths) for name, paths in results.items()}, {'categorical': 2, 'hour_topic': 2})
+
+    def test_main(self) -> None:
+        with mock.patch('builtins.print') as printed:
+            rc = report.main([self.db_path, self.out_dir, '--analysis', 'categorical', '--workers', '1'])
+        self.assertEqual(rc, 0)
+        printed.assert_called_once_with('categorical: 2 files')
+
+
+class TestSchemaCatalogue(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.tmpdir.name) / 'test.db')
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('CREATE TABLE notes (id INTEGER, body TEXT)')
+        schema_catalogue.clear()
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        schema_catalogue.clear()
+        self.tmpdir.cleanup()
+
+    def test_clear(self) -> None:
+        schema_catalogue.table_columns(self.conn, 'notes')
+        schema_catalogue.clear()
+        self.assertEqual(schema_catalogue._tables, {})
+
+    def test_database_file(self) -> None:
+        self.assertEqual(schema_catalogue.database_file(self.conn), self.db_path)
+        with closing(sqlite3.connect(':memory:')) as conn:
+            self.assertEqual(schema_catalogue.database_file(conn), '')
+
+    def test_invalidate(self) -> None:
+        self.conn.execute('CREATE TABLE other (id TEXT)')
+        schema_catalogue.table_columns(self.conn, 'notes')
+        schema_catalogue.table_columns(self.conn, 'other')
+        schema_catalogue.invalidate(self.conn, 'notes')
+        self.assertEqual(list(schema_catalogue._tables), [(self.db_path, 'other')])
+        schema_catalogue.invalidate(self.conn)
+        self.assertEqual(schema_catalogue._tables, {})
+
+    def test__table_info(self) -> None:
+        self.assertEqual(
+            schema_catalogue._table_info(self.conn, 'notes'),
+            (('id', 'INTEGER'), ('body', 'TEXT')),
+        )
+        # cached: DDL not announced through invalidate() is not seen
+        self.conn.execute('ALTER TABLE notes ADD COLUMN extra TEXT')
+        self.assertEqual(len(schema_catalogue._table_info(self.conn, 'notes')), 2)
+        self.assertEqual(schema_catalogue._table_info(self.conn, 'missing'), ())
+        self.assertNotIn((self.db_path, 'missing'), schema_catalogue._tables)
+        with closing(sqlite3.connect(':memory:')) as conn:
+            conn.execute('CREATE TABLE notes (id TEXT)')
+            self.assertEqual(schema_catalogue._table_info(conn, 'notes'), (('id', 'TEXT'),))
+        self.assertNotIn(('', 'notes'), schema_catalogue._tables)
+
+    def test_table_columns(self) -> None:
+        with closing(sqlite3.connect(self.db_path)) as other:
+            self.assertEqual(schema_catalogue.table_columns(other, 'notes'), ['id', 'body'])
+        # shared by every connection to the same file: no second PRAGMA
+        self.conn.execute('ALTER TABLE notes ADD COLUMN extra TEXT')
+        self.assertEqual(schema_catalogue.table_columns(self.conn, 'notes'), ['id', 'body'])
+        schema_catalogue.invalidate(self.conn, 'notes')
+        self.assertEqual(schema_catalogue.table_columns(self.conn, 'notes'), ['id', 'body', 'extra'])
+
+    def test_column_types(self) -> None:
+        self.assertEqual(schema_catalogue.column_types(self.conn, 'notes'), {'id': 'INTEGER', 'body': 'TEXT'})
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tmp = Path(self.tmpdir.name)
+        self.conn = sqlite3.connect(str(self.tmp / 'test.db'))
+        database._create_empty_relational_tables(self.conn)
+        self.conn.executescript(
+            '''
+            INSERT INTO topics (topic_id, topic_name) VALUES ('t1', 'News');
+            INSERT INTO users (user_id, username, account_type, followers_count) VALUES
+                ('u1', 'alice', 'human', 10),
+                ('u2', 'botty', 'Bot', NULL);
+            INSERT INTO posts (post_id, user_id, timestamp, topic_id) VALUES
+                ('p1', 'u1', '2024-01-01 09:00:00', 't1'),
+                ('p2', 'u2', '2024/01/02 10:00:00', NULL),
+                ('p3', 'u1', 'bad', NULL);
+            INSERT INTO interactions (interaction_id, post_id, user_id, interaction_type, timestamp) VALUES
+                ('i1', 'p1', 'u2', 'Like', '2024-01-01 12:00:00'),
+                ('i2', 'p2', 'u1', NULL, '2024-01-03 13:00:00');
+            ''',
+        )
+        self.conn.commit()
+        self.dest = str(self.tmp / 'snap')
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def test__typed_columns(self) -> None:
+        df = pd.DataFrame({
+            'post_id': ['p1', None],
+            'ts_epoch': [1704099600, None],
+            'author_is_human': [1, None],
+        })
+        got = snapshot._typed_columns(df)
+        self.assertEqual(got['post_id'].tolist(), ['p1', ''])
+        self.assertEqual(got['post_id'].dtype, object)
+        self.assertEqual(got['author_is_human'].tolist(), [True, False])
+        self.assertTrue(np.isnan(got['ts_epoch'][1]))
+        self.assertEqual(got['ts_datetime'][0], np.datetime64('2024-01-01T09:00:00'))
+        self.assertTrue(np.isnat(got['ts_datetime'][1]))
+        df['timestamp'] = ['2024-01-01 09:00:00', 'Jan 5 2024']
+        got = snapshot._typed_columns(df)
+        self.assertEqual(got['ts_datetime'][1], np.datetime64('2024-01-05T00:00:00'))
+
+    def test__save_text_column(self) -> None:
+        path = str(self.tmp / 'kind')
+        snapshot._save_text_column(path, np.array(['like', 'caf\xe9', 'like', ''], dtype=object))
+        self.assertEqual(np.load(f'{path}.codes.npy').tolist(), [0, 1, 0, 2])
+        self.assertEqual(np.load(f'{path}.offsets.npy').tolist(), [0, 4, 9, 9])
+        self.assertEqual(np.load(f'{path}.utf8.npy').tobytes(), 'likecaf\xe9'.encode())
+
+    def test__load_text_column(self) -> None:
+        path = str(self.tmp / 'kind')
+        values = np.array(['like', 'caf\xe9', 'like', ''], dtype=object)
+        snapshot._save_text_column(path, values)
+        got = snapshot._load_text_column(path)
+        self.assertEqual(got.dtype, object)
+        self.assertEqual(got.tolist(), values.tolist())
+        snapshot._save_text_column(path, np.array([], dtype=object))
+        self.assertEqual(snapshot._load_text_column(path).tolist(), [])
+
+    def test_export_snapshot(self) -> None:
+        self.assertEqual(snapshot.export_snapshot(self.conn, self.dest, fmt='npy'), 'npy')
+        self.assertFalse(self.conn.in_transaction)
+        posts = snapshot._load_text_column(str(Path(self.dest) / 'posts' / 'post_id'))
+        self.assertEqual(posts.tolist(), ['p1', 'p2', 'p3'])
+        human = np.load(str(Path(self.dest) / 'interactions' / 'author_is_human.npy'))
+        self.assertEqual(human.tolist(), [False, True])
+        manifest = json.loads((Path(self.dest) / snapshot.MANIFEST).read_text())
+        self.assertIn('interaction_type', manifest['tables']['interactions']['text_columns'])
+        self.assertNotIn('ts_epoch', manifest['tables']['interactions']['text_columns'])
+        # tables and versions come from one read transaction
+        with mock.patch.object(snapshot, 'table_versions', side_effect=lambda conn, tables: (
+                self.assertTrue(conn.in_transaction) or (0,) * len(tables))):
+            snapshot.export_snapshot(self.conn, self.dest, fmt='npy')
+        # a caller's open transaction is left open
+        self.conn.execute("UPDATE users SET username = 'al' WHERE user_id = 'u1'")
+        snapshot.export_snapshot(self.conn, self.dest, fmt='npy')
+        self.assertTrue(self.conn.in_transaction)
+        self.conn.rollback()
+        with self.assertRaises(ValueError):
+            snapshot.export_snapshot(self.conn, self.dest, fmt='csv')
+        with mock.patch.object(snapshot, '_pyarrow', return_value=None):
+            self.assertEqual(snapshot.export_snapshot(self.conn, self.dest), 'npy')
+            with self.assertRaises(ValueError):
+                snapshot.export_snapshot(self.conn, self.dest, fmt='parquet')
+
+    def test_column(self) -> None:
+        snapshot.export_snapshot(self.conn, self.dest, fmt='npy')
+        snap = snapshot.open_snapshot(self.dest)
+        col = snap.column('users', 'followers_count')
+        self.assertIsInstance(col, np.memmap)
+        self.assertEqual(col[0], 10)
+        self.assertTrue(np.isnan(col[1]))
+        self.assertEqual(snap.column('interactions', 'interaction_type').tolist(), ['Like', ''])
+        with self.assertRaises(ValueError):
+            snap.column('users', 'password')
+
+    def test_frame(self) -> None:
+        snapshot.export_snapshot(self.conn, self.dest, fmt='npy')
+        snap = snapshot.open_snapshot(self.dest)
+        df = snap.frame('posts', ('post_id', 'ts_datetime'))
+        self.assertEqual(df['post_id'].tolist(), ['p1', 'p2', 'p3'])
+        self.assertEqual(df['ts_datetime'].iloc[1], pd.Timestamp('2024-01-02 10:00:00'))
+        self.assertTrue(pd.isna(df['ts_datetime'].iloc[2]))
+        df = snap.frame('posts', ('post_id',), human_only=True)
+        self.assertEqual(df['post_id'].tolist(), ['p1', 'p3'])
+
+    def test_is_current(self) -> None:
+        snapshot.export_snapshot(self.conn, self.dest, fmt='npy')
+        snap = snapshot.open_snapshot(self.dest)
+        self.assertTrue(snap.is_current(self.conn))
+        with self.conn:
+            database.bump_table_versions(self.conn, ['posts'])
+        self.assertFalse(snap.is_current(self.conn))
+
+    def test_open_snapshot(self) -> None:
+        snapshot.export_snapshot(self.conn, self.dest, fmt='npy')
+        snap = snapshot.open_snapshot(self.dest)
+        self.assertEqual(snap.format, 'npy')
+        self.assertEqual(snap.tables['posts']['rows'], 3)
+        self.assertIn('ts_datetime', snap.columns('interactions'))
+        with self.assertRaises(ValueError):
+            snapshot.open_snapshot(str(self.tmp))
+
+    def test_main(self) -> None:
+        self.conn.close()
+        with mock.patch('builtins.print'):
+            rc = snapshot.main([str(self.tmp / 'test.db'), self.dest, '--format', 'npy'])
+        self.conn = sqlite3.connect(str(self.tmp / 'test.db'))
+        self.assertEqual(rc, 0)
+        self.assertEqual(snapshot.open_snapshot(self.dest).tables['users']['rows'], 2)
+
+
 class TestUi(unittest.TestCase):
     def setUp(self) -> None:
         _FakeWidget.reset()
@@ -1008,7 +2910,7 @@ class TestUi(unittest.TestCase):
         _FakeText.reset()
         self.conn = sqlite3.connect(':memory:')
         self.conn.executescript(
-            '''
+            f'''
             CREATE TABLE users (
                 user_id TEXT PRIMARY KEY,
                 username TEXT NOT NULL,
@@ -1016,7 +2918,8 @@ class TestUi(unittest.TestCase):
                 location TEXT,
                 account_type TEXT,
                 verified TEXT,
-                followers_count INTEGER
+                followers_count INTEGER,
+                is_bot INTEGER GENERATED ALWAYS AS (lower(trim(coalesce(account_type, ''))) = 'bot') STORED
             );
             CREATE TABLE topics (
                 topic_id TEXT PRIMARY KEY,
@@ -1033,7 +2936,8 @@ class TestUi(unittest.TestCase):
                 content_preview TEXT,
                 has_media TEXT,
                 topic_id TEXT,
-                language TEXT
+                language TEXT,
+                {database.TIMESTAMP_GENERATED_COLUMNS_SQL}
             );
             CREATE TABLE interactions (
                 interaction_id TEXT PRIMARY KEY,
@@ -1041,7 +2945,8 @@ class TestUi(unittest.TestCase):
                 user_id TEXT NOT NULL,
                 interaction_type TEXT,
                 timestamp TEXT,
-                reaction_type TEXT
+                reaction_type TEXT,
+                {database.TIMESTAMP_GENERATED_COLUMNS_SQL}
             );
             INSERT INTO users VALUES
                 ('u1', 'alice', NULL, NULL, 'human', NULL, 10),
@@ -1073,17 +2978,20 @@ class TestUi(unittest.TestCase):
             ui._ensure_database()
         ensure.assert_called_once_with(ui.DB_PATH)
 
-    def test__get_table_columns(self) -> None:
-        self.assertEqual(
-            ui._get_table_columns(self.conn, 'users')[:3],
-            ['user_id', 'username', 'join_date'],
-        )
+    def _view(self) -> virtual_treeview.VirtualTreeview:
+        return virtual_treeview.VirtualTreeview(_FakeTreeview(), _FakeWidget())
 
-    def test__fetch_table_rows_for_treeview(self) -> None:
-        self.assertEqual(len(ui._fetch_table_rows_for_treeview(self.conn, 'users', human_only=False)), 2)
-        self.assertEqual(len(ui._fetch_table_rows_for_treeview(self.conn, 'users', human_only=True)), 1)
-        self.assertEqual(len(ui._fetch_table_rows_for_treeview(self.conn, 'posts', human_only=True)), 1)
-        self.assertEqual(len(ui._fetch_table_rows_for_treeview(self.conn, 'topics', human_only=True)), 1)
+    def test__treeview_source(self) -> None:
+        def count(table_name: str, human_only: bool) -> int:
+            _, source_sql = ui._treeview_source(table_name, human_only=human_only)
+            return self.conn.execute(f'SELECT COUNT(*) {source_sql}').fetchone()[0]
+
+        self.assertEqual(count('users', False), 2)
+        self.assertEqual(count('users', True), 1)
+        self.assertEqual(count('posts', True), 1)
+        self.assertEqual(count('interactions', True), 1)
+        self.assertEqual(count('topics', True), 1)
+        self.assertEqual(ui._treeview_source('posts', human_only=True)[0], 'p')
 
     def test__human_only_from_state(self) -> None:
         with mock.patch.object(ui.tk, 'BooleanVar', _FakeVar):
@@ -1098,50 +3006,228 @@ class TestUi(unittest.TestCase):
         self.assertEqual(ui._human_only_checkbox_label(self.conn, True), 'Human only (hide bot rows) (3 hidden)')
 
     def test__populate_treeview(self) -> None:
-        tree = _FakeTreeview()
-        ui._populate_treeview(conn=self.conn, table_name='users', treeview=tree, human_only=True)
-        self.assertEqual(tree.config['columns'][0], 'user_id')
-        self.assertEqual(len(tree.get_children()), 1)
+        view = self._view()
+        ui._populate_treeview(conn=self.conn, table_name='users', view=view, human_only=True)
+        self.assertEqual(view.tree.config['columns'][0], 'user_id')
+        self.assertEqual(view.tree.get_children(), ('1',))
+        self.assertEqual(view.total, 1)
 
     def test__refresh_all_treeviews(self) -> None:
         with mock.patch.object(ui, '_populate_treeview') as pop:
             ui._refresh_all_treeviews(
                 conn=self.conn,
-                treeviews={'users': _FakeTreeview(), 'posts': _FakeTreeview()},
+                treeviews={'users': self._view(), 'posts': self._view()},
                 human_only=True,
             )
         self.assertEqual(pop.call_count, 2)
 
+    def test__refresh_when_idle(self) -> None:
+        root = _FakeRoot()
+        runner = mock.Mock(busy=True)
+        refresh = mock.Mock()
+        ui._refresh_when_idle(root, runner, refresh)
+        refresh.assert_not_called()
+        runner.busy = False
+        root.pending.pop()()
+        refresh.assert_called_once_with()
+        self.assertEqual(root.pending, [])
+
     def test__selected_rows(self) -> None:
-        tree = _FakeTreeview()
-        item = tree.insert('', 'end', values=('a', 2))
-        tree._selection = [item]
-        self.assertEqual(ui._selected_rows(tree), [('a', '2')])
+        view = self._view()
+        ui._populate_treeview(conn=self.conn, table_name='users', view=view)
+        view.tree.selection_set(['2'])
+        view._on_select()
+        self.assertEqual(ui._selected_rows(view), [('u2', 'botty', '', '', 'bot', '', '20')])
 
     def test__upload_csv(self) -> None:
         new_conn = sqlite3.connect(':memory:')
         self.addCleanup(new_conn.close)
         report = mock.Mock(updates=1, deletes=0)
-        state = {'sync_human_only_label': mock.Mock()}
+        old_conn = sqlite3.connect(':memory:')
+        state = {'conn': old_conn, 'sync_human_only_label': mock.Mock()}
+        runner = _InlineJobRunner(self.conn)
         with mock.patch.object(ui.filedialog, 'askopenfilename', return_value='users.csv'), \
                 mock.patch.object(ui, 'read_csv_rows', return_value=(['user_id'], [('u1',)])), \
-                mock.patch.object(ui.messagebox, 'askyesno', return_value=True), \
-                mock.patch.object(ui, 'replace_table_data_from_csv', return_value=('users', ['user_id'], [('u1',)])), \
+                mock.patch.object(ui.messagebox, 'askyesnocancel', return_value=False), \
+                mock.patch.object(ui, 'replace_table_data_from_csv', return_value=('users', ['user_id'], [('u1',)], None)) as replace, \
                 mock.patch.object(ui.sqlite3, 'connect', return_value=new_conn), \
                 mock.patch.object(ui, '_refresh_all_treeviews') as refresh, \
-                mock.patch.object(ui, 'cleanup_entire_table', return_value=report), \
+                mock.patch.object(ui, 'cleanup_entire_table', return_value=report) as cleanup, \
                 mock.patch.object(ui, 'format_report_for_dialog', return_value='done'), \
                 mock.patch.object(ui.messagebox, 'showinfo') as showinfo:
             ui._upload_csv(
-                conn=self.conn,
+                runner=runner,
                 state=state,
                 treeviews={'users': _FakeTreeview()},
                 human_only=True,
             )
+        self.assertEqual(runner.names, ['Reading users.csv', 'Importing users'])
+        # the import and cleanup ran on the job's connection, not the GUI's
+        self.assertIs(replace.call_args.kwargs['conn'], self.conn)
+        self.assertIs(cleanup.call_args.args[0], self.conn)
+        self.assertIs(state['conn'], new_conn)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            old_conn.execute('SELECT 1')
         self.assertEqual(state['uploaded_table'], 'users')
         self.assertEqual(state['uploaded_rows'], [['user_id'], ('u1',)])
-        self.assertEqual(refresh.call_count, 2)
-        showinfo.assert_called()
+        self.assertEqual(refresh.call_count, 1)
+        self.assertEqual(showinfo.call_args.args[0], 'Upload complete')
+
+    def test__upload_csv_cancelled(self) -> None:
+        state = {'conn': self.conn}
+        runner = _InlineJobRunner(self.conn)
+        with mock.patch.object(ui.filedialog, 'askopenfilename', return_value='users.csv'), \
+                mock.patch.object(ui, 'read_csv_rows', return_value=(['user_id'], [('u1',)])), \
+                mock.patch.object(ui.messagebox, 'askyesnocancel', return_value=False), \
+                mock.patch.object(ui, 'replace_table_data_from_csv', side_effect=job_runner.JobCancelled), \
+                mock.patch.object(ui, '_refresh_all_treeviews') as refresh, \
+                mock.patch.object(ui.messagebox, 'showinfo') as showinfo:
+            ui._upload_csv(runner=runner, state=state, treeviews={}, human_only=False)
+        refresh.assert_not_called()
+        self.assertEqual(showinfo.call_args.args[0], 'Upload cancelled')
+        self.assertNotIn('uploaded_table', state)
+        with mock.patch.object(ui.filedialog, 'askopenfilename', return_value='users.csv'), \
+                mock.patch.object(ui, 'read_csv_rows', return_value=(['user_id'], [('u1',)])), \
+                mock.patch.object(ui.messagebox, 'askyesnocancel', return_value=None), \
+                mock.patch.object(ui, 'replace_table_data_from_csv') as replace, \
+                mock.patch.object(ui.messagebox, 'showinfo') as showinfo:
+            ui._upload_csv(runner=runner, state=state, treeviews={}, human_only=False)
+        replace.assert_not_called()
+        self.assertEqual(showinfo.call_args.args[0], 'Upload cancelled')
+
+    def test__submit_job(self) -> None:
+        runner = mock.Mock(current='Importing users')
+        runner.submit.return_value = False
+        with mock.patch.object(ui.messagebox, 'showinfo') as showinfo:
+            ui._submit_job(
+                runner=runner,
+                parent=None,
+                name='Analysis charts',
+                work=mock.Mock(),
+                on_success=mock.Mock(),
+                on_error=mock.Mock(),
+            )
+        self.assertIn('Importing users is still running', showinfo.call_args.args[1])
+
+    def test__show_rendered_figure(self) -> None:
+        rendered = figure_cache.render(Figure(figsize=(1, 1), dpi=10))
+        with mock.patch.object(ui.tk, 'PhotoImage', _FakeWidget), \
+                mock.patch.object(ui.ttk, 'Label', _FakeWidget):
+            label = ui._show_rendered_figure(_FakeWidget(), rendered)
+        self.assertEqual(label.kwargs['image'].kwargs['data'], rendered.ppm)
+        self.assertIs(label.image, label.kwargs['image'])
+
+    def test__render_figure_into(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            with closing(sqlite3.connect(str(Path(tmp) / 'test.db'))) as conn:
+                conn.execute('CREATE TABLE posts (x INTEGER)')
+                runner = _InlineJobRunner(conn)
+                build = mock.Mock(side_effect=lambda: Figure(figsize=(1, 1), dpi=10))
+                with mock.patch.object(ui.tk, 'PhotoImage', _FakeWidget), \
+                        mock.patch.object(ui.ttk, 'Label', _FakeWidget):
+                    for _ in range(2):
+                        ui._render_figure_into(
+                            _FakeWidget(),
+                            runner=runner,
+                            conn=conn,
+                            name='chart',
+                            tables=('posts',),
+                            params=(1,),
+                            build=build,
+                            context='Chart',
+                        )
+                    # runner busy: rendered inline
+                    busy = mock.Mock()
+                    busy.submit.return_value = False
+                    ui._render_figure_into(
+                        _FakeWidget(),
+                        runner=busy,
+                        conn=conn,
+                        name='chart',
+                        tables=('posts',),
+                        params=(2,),
+                        build=build,
+                        context='Chart',
+                    )
+                    build.side_effect = ValueError('bad data')
+                    with mock.patch.object(ui, '_log_error') as log_error:
+                        ui._render_figure_into(
+                            _FakeWidget(),
+                            runner=runner,
+                            conn=conn,
+                            name='chart',
+                            tables=('posts',),
+                            params=(3,),
+                            build=build,
+                            context='Chart',
+                        )
+            figure_cache.clear()
+        # the second open was a cache hit: no job, no rebuild
+        self.assertEqual(runner.names, ['Rendering chart (chart)', 'Rendering chart (chart)'])
+        self.assertEqual(build.call_count, 3)
+        log_error.assert_called_once()
+        self.assertEqual(_FakeWidget.instances[-1].config['text'], 'Could not build charts: bad data')
+
+    def test__import_and_clean_csv(self) -> None:
+        job = job_runner.JobContext(self.conn, cancelled=threading.Event(), events=queue.Queue())
+        with mock.patch.object(ui, 'replace_table_data_from_csv', return_value=('users', ['user_id'], [], 'w')), \
+                mock.patch.object(ui, 'cleanup_entire_table', side_effect=sqlite3.OperationalError('boom')):
+            outcome = ui._import_and_clean_csv(job, filename='users.csv', table_name='users', parsed=(['user_id'], []))
+        self.assertEqual(outcome[:4], ('users', ['user_id'], [], 'w'))
+        self.assertIsInstance(outcome[4], sqlite3.OperationalError)
+        job._cancelled.set()
+        with mock.patch.object(ui, 'replace_table_data_from_csv', return_value=('users', ['user_id'], [], None)), \
+                mock.patch.object(ui, 'cleanup_entire_table', side_effect=sqlite3.OperationalError('interrupted')):
+            outcome = ui._import_and_clean_csv(job, filename='users.csv', table_name='users', parsed=(['user_id'], []))
+        self.assertIsInstance(outcome[4], job_runner.JobCancelled)
+
+    def test__import_and_clean_csv_cancelled_during_cleanup(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = str(Path(tmp) / 'jobs.db')
+            runner = job_runner.JobRunner(_FakeRoot(), connect=lambda: sqlite3.connect(db_path))
+            on_success, on_error = mock.Mock(), mock.Mock()
+
+            def cleanup(*args, **kwargs):
+                runner.cancel()
+                raise sqlite3.OperationalError('interrupted')
+
+            with mock.patch.object(ui, 'replace_table_data_from_csv', return_value=('topics', ['topic_id'], [], None)), \
+                    mock.patch.object(ui, 'cleanup_entire_table', side_effect=cleanup):
+                runner.submit(
+                    'Importing topics',
+                    lambda job: ui._import_and_clean_csv(
+                        job, filename='topics.csv', table_name='topics', parsed=(['topic_id'], []),
+                    ),
+                    on_success=on_success,
+                    on_error=on_error,
+                )
+                runner._thread.join(timeout=10)
+                while runner.root.pending:
+                    runner.root.pending.pop(0)()
+        # the import is committed: on_success reports it along with the cancelled cleanup
+        on_error.assert_not_called()
+        outcome = on_success.call_args.args[0]
+        self.assertEqual(outcome[0], 'topics')
+        self.assertIsInstance(outcome[4], job_runner.JobCancelled)
+
+    def test__import_and_clean_csv_append(self) -> None:
+        job = job_runner.JobContext(self.conn, cancelled=threading.Event(), events=queue.Queue())
+        report = utilities.CleanupReport()
+        with mock.patch.object(ui, 'upsert_table_data', return_value=(['u1', 'u2'], None)) as upsert, \
+                mock.patch.object(ui, 'cleanup_selection', return_value=report) as cleanup, \
+                mock.patch.object(ui, 'cleanup_entire_table') as cleanup_all:
+            outcome = ui._import_and_clean_csv(
+                job,
+                filename='users.csv',
+                table_name='users',
+                parsed=(['User ID'], [('u1',), ('u2',)]),
+                append=True,
+            )
+        self.assertEqual(outcome, ('users', ['user_id'], [('u1',), ('u2',)], None, report))
+        self.assertIs(upsert.call_args.kwargs['conn'], self.conn)
+        # only the written keys are cleaned up
+        self.assertEqual(cleanup.call_args.args, (self.conn, 'users', ['u1', 'u2']))
+        cleanup_all.assert_not_called()
 
     def test__close_filter_results_window(self) -> None:
         with mock.patch.object(ui.tk, 'Toplevel', _FakeWidget):
@@ -1161,55 +3247,157 @@ class TestUi(unittest.TestCase):
 
     def test__filtered_posts_where_and_params(self) -> None:
         sql, params = ui._filtered_posts_where_and_params(hour=9, topic_id='t1')
+        self.assertIn('p.ts_hour = ?', sql)
         self.assertIn('p.topic_id = ?', sql)
         self.assertEqual(params, [9, 't1'])
 
-    def test__build_filtered_posts_count_sql(self) -> None:
-        sql, params = ui._build_filtered_posts_count_sql(hour=9, topic_id=None)
-        self.assertIn('SELECT COUNT(*)', sql)
-        self.assertEqual(params, [9])
+    def _add_paging_posts(self) -> None:
+        self.conn.executemany(
+            "INSERT INTO posts VALUES (?, 'u1', ?, 'text', '', 'FALSE', 't1', 'en')",
+            [
+                ('p0', None),
+                ('p3', '2024-01-01 09:00:00'),
+                ('p4', '2024-01-03 08:00:00'),
+                ('p5', '2024-01-03 09:00:00'),
+            ],
+        )
+
+    def test__build_filtered_posts_page_index_sql(self) -> None:
+        self._add_paging_posts()
+        sql, params = ui._build_filtered_posts_page_index_sql(hour=None, topic_id=None, page_size=2)
+        self.assertEqual(
+            self.conn.execute(sql, params).fetchall(),
+            [(None, 'p0', 5), ('2024-01-01 09:00:00', 'p3', 5), ('2024-01-03 09:00:00', 'p5', 5)],
+        )
+        sql, params = ui._build_filtered_posts_page_index_sql(hour=23, topic_id=None, page_size=2)
+        self.assertEqual(self.conn.execute(sql, params).fetchall(), [])
+        with closing(_indexed_relational_db()) as conn:
+            for hour, topic_id in ((None, None), (9, None), (None, 't1'), (9, 't1')):
+                sql, params = ui._build_filtered_posts_page_index_sql(hour=hour, topic_id=topic_id, page_size=50)
+                self.assertEqual(_full_scans(conn, sql, params), [], (hour, topic_id))
 
     def test__build_filtered_posts_select_sql(self) -> None:
-        sql, params = ui._build_filtered_posts_select_sql(hour=None, topic_id='t1', limit=5, offset=10)
-        self.assertIn('LIMIT ? OFFSET ?', sql)
-        self.assertEqual(params, ['t1', 5, 10])
+        sql, params = ui._build_filtered_posts_select_sql(hour=None, topic_id='t1', limit=5)
+        self.assertIn('LIMIT ?', sql)
+        self.assertNotIn('OFFSET', sql)
+        self.assertEqual(params, ['t1', 5])
+
+        self._add_paging_posts()
+        every = [r[0] for r in self.conn.execute(*ui._build_filtered_posts_select_sql(
+            hour=None, topic_id=None, limit=100,
+        ))]
+        self.assertEqual(every, ['p0', 'p1', 'p3', 'p4', 'p5'])
+        for start in range(len(every)):
+            key = None if start == 0 else ui._filtered_post_key(
+                self.conn.execute('SELECT * FROM posts WHERE post_id = ?', (every[start],)).fetchone()[:8],
+            )
+            sql, params = ui._build_filtered_posts_select_sql(hour=None, topic_id=None, limit=2, start_key=key)
+            self.assertEqual([r[0] for r in self.conn.execute(sql, params)], every[start:start + 2])
+        with closing(_indexed_relational_db()) as conn:
+            for hour, topic_id in ((None, None), (9, None), (None, 't1'), (9, 't1')):
+                for key in (None, ('2024-01-01 09:00:00', 'p3'), (None, 'p0')):
+                    sql, params = ui._build_filtered_posts_select_sql(
+                        hour=hour, topic_id=topic_id, limit=50, start_key=key,
+                    )
+                    self.assertEqual(_full_scans(conn, sql, params), [], (hour, topic_id, key))
+
+    def test__filtered_post_key(self) -> None:
+        self.assertEqual(ui._filtered_post_key(('p1', 'u1', '2024-01-01', 'text')), ('2024-01-01', 'p1'))
+
+    def _show_paging_window(self, runner, parent: _FakeRoot | None = None) -> dict[str, object]:
+        parent = parent or _FakeRoot()
+        self._add_paging_posts()
+        variables = []
+
+        def var_factory(value=None):
+            variables.append(_FakeVar(value))
+            return variables[-1]
 
-    def test__show_filtered_posts_window(self) -> None:
         with mock.patch.object(ui.tk, 'Toplevel', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Frame', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Treeview', _FakeTreeview), \
                 mock.patch.object(ui.ttk, 'Scrollbar', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Button', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Label', _FakeWidget), \
-                mock.patch.object(ui.tk, 'StringVar', _FakeVar):
+                mock.patch.object(ui.ttk, 'Entry', _FakeWidget), \
+                mock.patch.object(ui.tk, 'StringVar', side_effect=var_factory):
             state = {}
-            parent = _FakeWidget()
             ui._show_filtered_posts_window(
                 parent=parent,
                 state=state,
                 conn=self.conn,
+                runner=runner,
                 column_names=['post_id'],
                 hour=None,
                 topic_id=None,
-                total_count=1,
-                page_size=50,
+                page_size=2,
             )
         self.assertIsInstance(state['filter_results_window'], _FakeWidget)
+        widgets = {w.text: w for w in _FakeWidget.instances if w.text}
+        widgets['tree'] = _FakeTreeview.instances[-1]
+        widgets['win'] = state['filter_results_window']
+        widgets['status'], widgets['page'] = variables
+        return widgets
+
+    def test__show_filtered_posts_window(self) -> None:
+        runner = _InlineJobRunner(self.conn)
+        widgets = self._show_paging_window(runner)
+        tree = widgets['tree']
+        shown = lambda: [tree.item(i, 'values')[0] for i in tree.get_children()]  # noqa: E731
+        self.assertEqual(runner.names, ['Counting filtered posts'])
+        self.assertEqual(shown(), ['p0', 'p1'])
+        widgets['>'].command()
+        self.assertEqual(shown(), ['p3', 'p4'])
+        widgets['<'].command()
+        self.assertEqual(shown(), ['p0', 'p1'])
+        self.assertIn('Rows 1–2 of 5', widgets['status'].get())
+        # jump straight to the last page, known from the background page index
+        widgets['page'].set('99')
+        widgets['Go'].command()
+        self.assertEqual(shown(), ['p5'])
+        self.assertEqual(widgets['page'].get(), '3')
+        self.assertEqual(widgets['>'].last_state, (['disabled'],))
+
+    def test__show_filtered_posts_window_runner_busy(self) -> None:
+        runner = mock.Mock()
+        runner.submit.return_value = False
+        parent = _FakeRoot()
+        widgets = self._show_paging_window(runner, parent)
+        # not counted inline: retried once the other job is done
+        self.assertEqual(widgets['Go'].last_state, (['disabled'],))
+        self.assertEqual(len(parent.pending), 1)
+        parent.pending.pop()()
+        self.assertEqual(runner.submit.call_count, 2)
+        self.assertEqual(len(parent.pending), 1)
+        runner.submit.return_value = True
+        parent.pending.pop()()
+        self.assertEqual(runner.submit.call_count, 3)
+        self.assertEqual(parent.pending, [])
+
+    def test__show_filtered_posts_window_closed_while_waiting(self) -> None:
+        runner = mock.Mock()
+        runner.submit.return_value = False
+        parent = _FakeRoot()
+        widgets = self._show_paging_window(runner, parent)
+        widgets['win'].destroy()
+        parent.pending.pop()()
+        self.assertEqual(runner.submit.call_count, 1)
+        self.assertEqual(parent.pending, [])
 
     def test__show_hour_topic_pivot_window(self) -> None:
-        fake_backend = mock.Mock(FigureCanvasTkAgg=_FakeMplCanvas)
         with mock.patch.object(ui.tk, 'Toplevel', _FakeWidget), \
+                mock.patch.object(ui.tk, 'PhotoImage', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Frame', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Treeview', _FakeTreeview), \
                 mock.patch.object(ui.ttk, 'Scrollbar', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Button', _FakeWidget), \
-                mock.patch.object(ui.ttk, 'Label', _FakeWidget), \
-                mock.patch.dict('sys.modules', {'matplotlib.backends.backend_tkagg': fake_backend}):
+                mock.patch.object(ui.ttk, 'Label', _FakeWidget):
             state = {}
             ui._show_hour_topic_pivot_window(
                 parent=_FakeWidget(),
                 state=state,
                 conn=self.conn,
+                runner=_InlineJobRunner(self.conn),
                 hour_filter=None,
                 topic_id_filter=None,
             )
@@ -1233,7 +3421,7 @@ class TestUi(unittest.TestCase):
                 mock.patch.object(ui, '_show_filtered_posts_window') as show_posts, \
                 mock.patch.object(ui, '_show_hour_topic_pivot_window') as show_pivot:
             state = {'conn': self.conn, 'filters': {}}
-            ui._open_filters_dialog(parent=_FakeWidget(), state=state)
+            ui._open_filters_dialog(parent=_FakeWidget(), state=state, runner=_InlineJobRunner(self.conn))
             buttons[-1].command()
         self.assertEqual(state['filters'], {'hour_of_day': None, 'topic_id': None})
         show_posts.assert_called_once()
@@ -1264,23 +3452,24 @@ class TestUi(unittest.TestCase):
     def test__show_selected_row_stats(self) -> None:
         notebook = _FakeNotebook()
         notebook.selected = 0
-        tree = _FakeTreeview()
-        item = tree.insert('', 'end', values=('u1', 'alice', '', '', 'human', '', '10'))
-        tree._selection = [item]
+        views = {table_name: self._view() for table_name in ui.TABLE_NAMES}
+        ui._refresh_all_treeviews(conn=self.conn, treeviews=views)
+        views['users'].tree.selection_set(['1'])
+        views['users']._on_select()
         with mock.patch.object(ui.messagebox, 'askyesno', return_value=True), \
                 mock.patch.object(ui.messagebox, 'showinfo') as showinfo:
             ui._show_selected_row_stats(
                 parent=_FakeWidget(),
                 conn=self.conn,
                 notebook=notebook,
-                treeviews={'users': tree, 'posts': _FakeTreeview(), 'topics': _FakeTreeview(), 'interactions': _FakeTreeview()},
+                treeviews=views,
             )
         self.assertIn('followers_count', showinfo.call_args.args[1])
 
     def test__open_moderation_effectiveness_dialog(self) -> None:
         result = moderation_effectiveness.run_moderation_effectiveness_analysis(self.conn)
-        fake_backend = mock.Mock(FigureCanvasTkAgg=_FakeMplCanvas)
         with mock.patch.object(ui.tk, 'Toplevel', _FakeWidget), \
+                mock.patch.object(ui.tk, 'PhotoImage', _FakeWidget), \
                 mock.patch.object(ui.tk, 'Canvas', _FakeWidget), \
                 mock.patch.object(ui.tk, 'Text', _FakeText), \
                 mock.patch.object(ui.ttk, 'Frame', _FakeWidget), \
@@ -1289,9 +3478,18 @@ class TestUi(unittest.TestCase):
                 mock.patch.object(ui.ttk, 'Label', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Treeview', _FakeTreeview), \
                 mock.patch.object(ui, 'run_moderation_effectiveness_analysis', return_value=result), \
-                mock.patch.dict('sys.modules', {'matplotlib.backends.backend_tkagg': fake_backend}):
-            ui._open_moderation_effectiveness_dialog(parent=_FakeWidget(), conn=self.conn)
-        self.assertTrue(_FakeWidget.instances)
+                mock.patch.object(ui, '_show_rendered_figure') as show_figure:
+            ui._open_moderation_effectiveness_dialog(parent=_FakeWidget(), runner=_InlineJobRunner(self.conn))
+        self.assertEqual(show_figure.call_count, 2)
+
+    def test__render_moderation_figures(self) -> None:
+        result = moderation_effectiveness.run_moderation_effectiveness_analysis(self.conn)
+        effectiveness, correlation = ui._render_moderation_figures(self.conn, result)
+        self.assertIsInstance(effectiveness, figure_cache.RenderedFigure)
+        self.assertIsInstance(correlation, figure_cache.RenderedFigure)
+        with mock.patch.object(ui, 'build_moderation_correlation_figure', side_effect=ValueError('no topics')):
+            _, correlation = ui._render_moderation_figures(self.conn, result)
+        self.assertIsInstance(correlation, ValueError)
 
     def test__close_analysis_charts_window(self) -> None:
         with mock.patch.object(ui.tk, 'Toplevel', _FakeWidget):
@@ -1304,61 +3502,80 @@ class TestUi(unittest.TestCase):
         fake_backend = mock.Mock(FigureCanvasTkAgg=_FakeMplCanvas, NavigationToolbar2Tk=_FakeToolbar)
         with mock.patch.dict('sys.modules', {'matplotlib.backends.backend_tkagg': fake_backend}), \
                 mock.patch.object(ui.tk, 'Toplevel', _FakeWidget), \
+                mock.patch.object(ui.tk, 'PhotoImage', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Frame', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Button', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Label', _FakeWidget):
             state = {}
+            runner = _InlineJobRunner(self.conn)
             ui._open_analysis_charts_window(
                 parent=_FakeWidget(),
-                conn=self.conn,
+                runner=runner,
                 human_only=True,
                 state=state,
             )
+            image_label = next(w for w in _FakeWidget.instances if 'image' in w.kwargs)
+            zoom = next(w for w in _FakeWidget.instances if w.text == 'Zoom / pan')
+            with mock.patch.object(_FakeMplCanvas, '__init__', autospec=True,
+                                   side_effect=_FakeMplCanvas.__init__) as canvas_init:
+                zoom.kwargs['command']()
+        self.assertEqual(runner.names, ['Analysis charts', 'Analysis charts (zoom / pan)'])
         self.assertIsInstance(state['analysis_charts_window'], _FakeWidget)
+        self.assertFalse(image_label.exists)
+        # the live canvas gets a figure of its own; the cache holds bitmaps only
+        self.assertIsInstance(canvas_init.call_args.args[1], Figure)
+        self.assertNotIn('figure', {f.name for f in dataclasses.fields(figure_cache.RenderedFigure)})
 
     def test__open_categorical_analysis_dialog(self) -> None:
-        fake_backend = mock.Mock(FigureCanvasTkAgg=_FakeMplCanvas)
         with mock.patch.object(ui.tk, 'Toplevel', _FakeWidget), \
+                mock.patch.object(ui.tk, 'PhotoImage', _FakeWidget), \
                 mock.patch.object(ui.tk, 'Canvas', _FakeWidget), \
                 mock.patch.object(ui.tk, 'Text', _FakeText), \
                 mock.patch.object(ui.ttk, 'Frame', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Scrollbar', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Button', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Label', _FakeWidget), \
-                mock.patch.object(ui.ttk, 'Treeview', _FakeTreeview), \
-                mock.patch.dict('sys.modules', {'matplotlib.backends.backend_tkagg': fake_backend}):
-            ui._open_categorical_analysis_dialog(parent=_FakeWidget(), conn=self.conn, human_only=True)
-        self.assertTrue(_FakeWidget.instances)
+                mock.patch.object(ui.ttk, 'Treeview', _FakeTreeview):
+            runner = _InlineJobRunner(self.conn)
+            ui._open_categorical_analysis_dialog(parent=_FakeWidget(), conn=self.conn, runner=runner, human_only=True)
+        self.assertEqual(runner.names, ['Rendering chart (categorical_analysis)'])
+        self.assertTrue(any('image' in w.kwargs for w in _FakeWidget.instances))
 
     def test__make_table_tab(self) -> None:
         with mock.patch.object(ui.ttk, 'Frame', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Treeview', _FakeTreeview), \
                 mock.patch.object(ui.ttk, 'Scrollbar', _FakeWidget):
             notebook = _FakeNotebook()
-            tree = ui._make_table_tab(
+            view = ui._make_table_tab(
                 notebook=notebook,
                 conn=self.conn,
                 table_name='users',
                 human_only=True,
             )
-        self.assertIsInstance(tree, _FakeTreeview)
+        self.assertIsInstance(view, virtual_treeview.VirtualTreeview)
+        self.assertIsInstance(view.tree, _FakeTreeview)
+        self.assertEqual(view.total, 1)
         self.assertEqual(len(notebook.tabs), 1)
 
     def test_start_gui(self) -> None:
         root = _FakeWidget()
         root.mainloop_called = False
         with mock.patch.object(ui, '_ensure_database'), \
+                mock.patch.object(ui, 'set_aggregate_cache_persistent') as set_persistent, \
                 mock.patch.object(ui.sqlite3, 'connect', return_value=self.conn), \
                 mock.patch.object(ui.tk, 'Tk', return_value=root), \
                 mock.patch.object(ui.tk, 'BooleanVar', _FakeVar), \
                 mock.patch.object(ui.ttk, 'Frame', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Button', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Checkbutton', _FakeWidget), \
+                mock.patch.object(ui.ttk, 'Label', _FakeWidget), \
+                mock.patch.object(ui.ttk, 'Progressbar', _FakeWidget), \
                 mock.patch.object(ui.ttk, 'Notebook', _FakeNotebook), \
-                mock.patch.object(ui, '_make_table_tab', return_value=_FakeTreeview()), \
+                mock.patch.object(ui, '_make_table_tab', return_value=self._view()), \
                 mock.patch.object(ui.messagebox, 'askokcancel', return_value=False):
             ui.start_gui()
         self.assertTrue(root.mainloop_called)
+        set_persistent.assert_called_once_with(True)
 
 
 class TestUtilities(unittest.TestCase):
@@ -1380,7 +3597,8 @@ class TestUtilities(unittest.TestCase):
                 location TEXT,
                 account_type TEXT,
                 verified TEXT,
-                followers_count INTEGER
+                followers_count INTEGER,
+                is_bot INTEGER GENERATED ALWAYS AS (lower(trim(coalesce(account_type, ''))) = 'bot') STORED
             );
             CREATE TABLE posts (
                 post_id TEXT PRIMARY KEY,
@@ -1501,15 +3719,117 @@ class TestUtilities(unittest.TestCase):
         self.assertEqual(row, ('report', '2024-01-05', 'like'))
         self.assertIsNone(self.conn.execute("SELECT 1 FROM interactions WHERE interaction_id = 'i2'").fetchone())
 
+    def _assert_bulk_matches_per_row(self, table_name: str, keys: list[str], *, apply: bool) -> None:
+        per_row_conn = sqlite3.connect(':memory:')
+        self.addCleanup(per_row_conn.close)
+        self.conn.backup(per_row_conn)
+        expected = utilities.CleanupReport()
+        per_row = getattr(utilities, f'_cleanup_{table_name}')
+        per_row(per_row_conn, keys, apply=apply, report=expected)
+
+        report = utilities.CleanupReport()
+        utilities._BULK_CLEANUPS[table_name](self.conn, keys, apply=apply, report=report)
+        self.assertEqual(report, expected)
+        for table in ('topics', 'users', 'posts', 'interactions'):
+            sql = f'SELECT * FROM {table} ORDER BY 1'
+            self.assertEqual(self.conn.execute(sql).fetchall(), per_row_conn.execute(sql).fetchall())
+
+    def test__chunks(self) -> None:
+        keys = [str(i) for i in range(utilities._BULK_CHUNK_SIZE + 1)]
+        self.assertEqual([len(c) for c in utilities._chunks(keys)], [utilities._BULK_CHUNK_SIZE, 1])
+        self.assertEqual(list(utilities._chunks([])), [])
+        seen = []
+        list(utilities._chunks(keys, progress=lambda done, total: seen.append((done, total))))
+        self.assertEqual(seen, [(utilities._BULK_CHUNK_SIZE, len(keys)), (len(keys), len(keys))])
+
+    def test__placeholders(self) -> None:
+        self.assertEqual(utilities._placeholders(['a', 'b', 'c']), '?, ?, ?')
+
+    def test__fetch_many(self) -> None:
+        rows = utilities._fetch_many(self.conn, 'users', 'user_id', ['u1', 'u3', 'missing'])
+        self.assertEqual(sorted(rows), ['u1', 'u3'])
+        self.assertEqual(rows['u1']['location'], ' London ')
+
+    def test__values_changed(self) -> None:
+        self.assertFalse(utilities._values_changed({'a': None, 'b': 1}, {'a': None, 'b': 1}))
+        self.assertTrue(utilities._values_changed({'a': ' x '}, {'a': 'x'}))
+
+    def test__memoised_date_parser(self) -> None:
+        parse_date = utilities._memoised_date_parser()
+        self.assertEqual(parse_date('2024/01/02'), '2024-01-02')
+        self.assertEqual(parse_date('2024/01/02'), '2024-01-02')
+        self.assertEqual(parse_date.cache_info().hits, 1)
+
+    def test__bulk_cleanup_topics(self) -> None:
+        self._assert_bulk_matches_per_row('topics', ['t1', 't2', 't2', 'missing'], apply=True)
+        self.assertIsNone(self.conn.execute("SELECT 1 FROM topics WHERE topic_id = 't2'").fetchone())
+
+    def test__bulk_cleanup_users(self) -> None:
+        self._assert_bulk_matches_per_row('users', ['u2', 'u1', 'u3', 'u1'], apply=True)
+
+    def test__bulk_cleanup_users_dry_run(self) -> None:
+        self._assert_bulk_matches_per_row('users', ['u1', 'u2', 'u2', 'u3'], apply=False)
+
+    def test__bulk_cleanup_users_renamed_keeper(self) -> None:
+        # u0 only becomes 'alice' after normalisation; u1 / u2 then collapse onto it
+        self.conn.execute("INSERT INTO users VALUES ('u0', ' alice ', '', '', '', '', '')")
+        self.conn.commit()
+        self._assert_bulk_matches_per_row('users', ['u0', 'u2', 'u1'], apply=True)
+
+    def test__bulk_cleanup_posts(self) -> None:
+        self._assert_bulk_matches_per_row('posts', ['p1', 'p2', 'p3', 'p2'], apply=True)
+
+    def test__bulk_cleanup_interactions(self) -> None:
+        self._assert_bulk_matches_per_row('interactions', ['i1', 'i2', 'i3'], apply=True)
+
     def test_cleanup_selection(self) -> None:
         with mock.patch.object(utilities, 'get_audit_logger', return_value=mock.Mock()):
             report = utilities.cleanup_selection(self.conn, 'posts', ['p1', 'p2'], apply=True)
         self.assertIn("Table 'posts', 2 row(s), apply=True", report.lines[0])
         self.assertTrue(report.lines[-1].startswith('Summary: '))
 
+    def test_cleanup_selection_bumps_table_versions(self) -> None:
+        tables = ('topics', 'users', 'posts', 'interactions')
+        with mock.patch.object(utilities, 'get_audit_logger', return_value=mock.Mock()):
+            utilities.cleanup_selection(self.conn, 'users', ['u1', 'u2', 'u3'], apply=False)
+            self.assertEqual(database.table_versions(self.conn, tables), (0, 0, 0, 0))
+            report = utilities.cleanup_selection(self.conn, 'users', ['u1', 'u2', 'u3'], apply=True)
+            self.assertTrue(report.updates or report.deletes)
+            self.assertEqual(database.table_versions(self.conn, tables), (0, 1, 1, 1))
+            # nothing left to change: no bump
+            utilities.cleanup_selection(self.conn, 'users', ['u1', 'u2', 'u3'], apply=True)
+        self.assertEqual(database.table_versions(self.conn, tables), (0, 1, 1, 1))
+
+    def test_cleanup_selection_per_row(self) -> None:
+        with mock.patch.object(utilities, 'get_audit_logger', return_value=mock.Mock()):
+            bulk = utilities.cleanup_selection(self.conn, 'users', ['u1', 'u2'], apply=False)
+            per_row = utilities.cleanup_selection(self.conn, 'users', ['u1', 'u2'], apply=False, bulk=False)
+        self.assertEqual(bulk, per_row)
+
     def test_cleanup_entire_table(self) -> None:
         report = utilities.cleanup_entire_table(self.conn, 'interactions', apply=False)
         self.assertIn("Table 'interactions', 3 row(s), apply=False", report.lines[0])
+        progress = mock.Mock()
+        utilities.cleanup_entire_table(self.conn, 'interactions', apply=False, progress=progress)
+        progress.assert_called_once_with(3, 3)
+        # raising from progress aborts and rolls back (how a job is cancelled)
+        before = self.conn.execute('SELECT * FROM users ORDER BY 1').fetchall()
+        with self.assertRaises(RuntimeError):
+            utilities.cleanup_entire_table(self.conn, 'users', apply=True, progress=mock.Mock(side_effect=RuntimeError))
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(self.conn.execute('SELECT * FROM users ORDER BY 1').fetchall(), before)
+
+    def test_cleanup_entire_table_keeps_rollups(self) -> None:
+        with closing(sqlite3.connect(':memory:')) as conn:
+            database._create_empty_relational_tables(conn)
+            _copy_relational_rows(self.conn, conn)
+            database.ensure_rollups(conn)
+            conn.commit()
+            with mock.patch.object(utilities, 'get_audit_logger', return_value=mock.Mock()):
+                for table_name in ('users', 'posts', 'interactions'):
+                    utilities.cleanup_entire_table(conn, table_name, apply=True)
+            self.assertTrue(all(database.rollup_current(conn, r) for r in database._ROLLUPS))
+            self.assertEqual(_stale_rollups(conn), [])
 
     def test_format_report_for_dialog(self) -> None:
         report = utilities.CleanupReport(lines=['a', 'b', 'c'])
@@ -1519,3 +3839,112 @@ class TestUtilities(unittest.TestCase):
 
 if __name__ == '__main__':
     unittest.main()
+
+
+class TestVirtualTreeview(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute('CREATE TABLE t (name TEXT, n INTEGER)')
+        self.conn.executemany(
+            'INSERT INTO t VALUES (?, ?)',
+            [(f'r{i}', None if i % 7 == 0 else i) for i in range(2500)],
+        )
+        # leave gaps so rowid != position
+        self.conn.execute('DELETE FROM t WHERE n % 10 = 3')
+        self.rowids = [r[0] for r in self.conn.execute('SELECT rowid FROM t ORDER BY rowid')]
+        self.tree = _FakeTreeview()
+        self.tree.yview = lambda *args: (0.0, 0.5) if not args else None
+        self.scrollbar = mock.Mock()
+        self.view = virtual_treeview.VirtualTreeview(self.tree, self.scrollbar, read_ahead=20)
+        self.view.load(
+            self.conn,
+            columns=['name', 'n'],
+            alias='t',
+            source_sql='FROM t t WHERE 1 = 1',
+        )
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def test_load(self) -> None:
+        self.assertEqual(self.view.total, len(self.rowids))
+        self.assertEqual(self.view._window_start, 0)
+        self.assertEqual(self.tree.get_children()[0], str(self.rowids[0]))
+        self.assertEqual(self.tree.item(str(self.rowids[0]), 'values'), ('r0', ''))
+        self.assertEqual(self.tree.bound['<<TreeviewSelect>>'], self.view._on_select)
+        self.assertEqual(self.scrollbar.configure.call_args.kwargs['command'], self.view.yview)
+
+    def test__window_size(self) -> None:
+        n = len(self.view._rendered)
+        self.assertEqual(self.view._window_size(), max(round(n / 2), 40) + 40)
+
+    def test__boundaries(self) -> None:
+        self.assertEqual(self.view._boundaries(), self.rowids[::virtual_treeview.BOUNDARY_STEP])
+
+    def test_fetch_window(self) -> None:
+        for start in (0, 990, 1000, 2100, len(self.rowids) - 5):
+            rows = self.view.fetch_window(start, 30)
+            self.assertEqual([r[0] for r in rows], self.rowids[start: start + 30])
+
+    def test__render(self) -> None:
+        self.view._selected = {self.rowids[1500], self.rowids[0]}
+        self.view._render(1500)
+        self.assertEqual(self.view._window_start, 1500)
+        self.assertEqual(self.tree.selection(), (str(self.rowids[1500]),))
+        self.view._render(10 ** 6)
+        self.assertEqual(self.view._rendered[-1], self.rowids[-1])
+
+    def test__update_scrollbar(self) -> None:
+        self.view._update_scrollbar(self.view.total // 2, 0)
+        self.assertEqual(self.scrollbar.set.call_args.args[0], (self.view.total // 2) / self.view.total)
+
+    def test__show_row(self) -> None:
+        self.view._show_row(1200)
+        self.assertEqual(self.view._window_start, 1180)
+        self.assertAlmostEqual(self.tree.moved_to, 20 / len(self.view._rendered))
+        locked = sqlite3.OperationalError('database is locked')
+        with mock.patch.object(self.view, 'fetch_window', side_effect=locked):
+            self.view._show_row(2000)
+        self.assertEqual(self.view._window_start, 1180)
+
+    def test__on_tree_scrolled(self) -> None:
+        n = len(self.view._rendered)
+        self.view._on_tree_scrolled('0.5', '0.6')
+        self.assertEqual(self.view._window_start, 0)
+        self.view._on_tree_scrolled(str((n - 30) / n), '1.0')
+        self.assertEqual(self.view._window_start, n - 30 - 20)
+
+    def test_yview(self) -> None:
+        self.view.yview('moveto', '0.5')
+        top = int(0.5 * self.view.total)
+        self.assertIn(self.rowids[top], self.view._rendered)
+        self.assertEqual(self.view._window_start, top - 20)
+
+    def test__on_select_input(self) -> None:
+        self.view._on_select_input(mock.Mock(state=0x0004))
+        self.assertTrue(self.view._extending)
+        self.view._on_select_input(mock.Mock(state=0x0008))
+        self.assertFalse(self.view._extending)
+
+    def test__on_select(self) -> None:
+        self.view._selected = {self.rowids[2000]}
+        self.tree.selection_set([str(self.rowids[1])])
+        self.view._on_select_input(mock.Mock(state=0x0001))
+        self.view._on_select()
+        self.assertEqual(self.view._selected, {self.rowids[1], self.rowids[2000]})
+        # a plain click replaces the selection, off-window rows included
+        self.tree.selection_set([str(self.rowids[2])])
+        self.view._on_select_input(mock.Mock(state=0))
+        self.view._on_select()
+        self.assertEqual(self.view._selected, {self.rowids[2]})
+
+    def test_selected_rowids(self) -> None:
+        self.view._selected = {5, 2, 9}
+        self.assertEqual(self.view.selected_rowids(), [2, 5, 9])
+
+    def test_selected_rows(self) -> None:
+        self.view._selected = {self.rowids[0], self.rowids[2200]}
+        self.assertEqual(
+            self.view.selected_rows(),
+            [('r0', ''), ('r2407', '2407')],
+        )
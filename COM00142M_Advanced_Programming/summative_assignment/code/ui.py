@@ -4,11 +4,15 @@ import os
 import sqlite3
 import statistics
 import tkinter as tk
+from collections.abc import Callable
 from tkinter import filedialog
 from tkinter import messagebox
 from tkinter import ttk
+from typing import Any
 from typing import cast
+from typing import TYPE_CHECKING
 
+from aggregate_cache import set_persistent as set_aggregate_cache_persistent
 from audit_log import get_audit_logger
 from audit_log import LOG_FILE
 from categorical_analysis import build_categorical_analysis_figure
@@ -16,20 +20,37 @@ from categorical_analysis import INTERPRETATION_TEXT
 from categorical_analysis import query_three_way_distribution
 from database import database_exists
 from database import ensure_relational_schema
+from database import prepare_csv_headers_for_import
 from database import read_csv_rows
 from database import replace_table_data_from_csv
 from database import sql_exclude_bot_users
 from database import table_name_for_csv
+from database import upsert_table_data
+from figure_cache import cached_figure
+from figure_cache import lookup as lookup_figure
+from figure_cache import render as render_figure
+from figure_cache import RenderedFigure
 from hour_topic_pivot import build_hour_topic_pivot_figure
 from hour_topic_pivot import build_pivot_matrix
 from hour_topic_pivot import query_hour_topic_counts
+from job_runner import JobCancelled
+from job_runner import JobContext
+from job_runner import JobRunner
 from moderation_effectiveness import build_moderation_correlation_figure
 from moderation_effectiveness import build_moderation_effectiveness_figure
 from moderation_effectiveness import DEFINITIONS_TEXT
+from moderation_effectiveness import ModerationEffectivenessResult
 from moderation_effectiveness import PLACEHOLDER_REPORTER_USER_ID
 from moderation_effectiveness import run_moderation_effectiveness_analysis
+from schema_catalogue import table_columns
 from utilities import cleanup_entire_table
+from utilities import cleanup_selection
+from utilities import CleanupReport
 from utilities import format_report_for_dialog
+from virtual_treeview import VirtualTreeview
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 
 TABLE_NAMES = (
@@ -40,6 +61,15 @@ TABLE_NAMES = (
 )
 DB_PATH = 'app.db'
 
+# tables each cached chart reads (figure_cache keys)
+_ANALYSIS_CHARTS_TABLES = ('posts', 'users', 'interactions')
+_CATEGORICAL_TABLES = ('posts', 'users', 'topics')
+_HOUR_TOPIC_TABLES = ('posts', 'users', 'topics')
+_MODERATION_TABLES = ('posts', 'users', 'topics', 'interactions')
+
+# how often work deferred until the running job finishes checks again
+_JOB_RETRY_MS = 200
+
 
 def _log_error(context: str, exc: BaseException) -> None:
     """Record failures to log.txt and emit ERROR (and traceback) on stderr only."""
@@ -59,36 +89,19 @@ def _ensure_database() -> None:
     ensure_relational_schema(DB_PATH)
 
 
-def _get_table_columns(conn: sqlite3.Connection, table_name: str) -> list[str]:
-    rows = conn.execute(f'PRAGMA table_info({table_name})').fetchall()
-    return [row[1] for row in rows]
-
-
-def _fetch_table_rows_for_treeview(
-        conn: sqlite3.Connection,
-        table_name: str,
-        *,
-        human_only: bool,
-) -> list[sqlite3.Row | tuple]:
-    if not human_only or table_name == 'topics':
-        return conn.execute(f'SELECT * FROM {table_name}').fetchall()
+def _treeview_source(table_name: str, *, human_only: bool) -> tuple[str, str]:
+    """``(alias, 'FROM ... WHERE ...')`` for the rows shown in a main table tab."""
+    if not human_only or table_name not in ('users', 'posts', 'interactions'):
+        return 't', f'FROM {table_name} t WHERE 1 = 1'
     u_pred = sql_exclude_bot_users(users_table_alias='u')
     if table_name == 'users':
-        bare = sql_exclude_bot_users(users_table_alias=None)
-        return conn.execute(f'SELECT * FROM users WHERE {bare}').fetchall()
-    if table_name == 'posts':
-        return conn.execute(
-            f'SELECT p.* FROM posts p '
-            f'INNER JOIN users u ON p.user_id = u.user_id '
-            f'WHERE {u_pred}',
-        ).fetchall()
-    if table_name == 'interactions':
-        return conn.execute(
-            f'SELECT i.* FROM interactions i '
-            f'INNER JOIN users u ON i.user_id = u.user_id '
-            f'WHERE {u_pred}',
-        ).fetchall()
-    return conn.execute(f'SELECT * FROM {table_name}').fetchall()
+        return 'u', f'FROM users u WHERE {u_pred}'
+    alias = table_name[0]
+    return alias, (
+        f'FROM {table_name} {alias} '
+        f'INNER JOIN users u ON {alias}.user_id = u.user_id '
+        f'WHERE {u_pred}'
+    )
 
 
 def _human_only_from_state(state: dict[str, object]) -> bool:
@@ -130,11 +143,12 @@ def _populate_treeview(
         *,
         conn: sqlite3.Connection,
         table_name: str,
-        treeview: ttk.Treeview,
+        view: VirtualTreeview,
         human_only: bool = False,
 ) -> None:
-    columns = _get_table_columns(conn, table_name)
+    columns = table_columns(conn, table_name)
 
+    treeview = view.tree
     treeview.delete(*treeview.get_children())
     treeview['columns'] = columns
     treeview['show'] = 'headings'
@@ -143,41 +157,144 @@ def _populate_treeview(
         treeview.heading(column, text=column)
         treeview.column(column, width=150, anchor=tk.W, stretch=True)
 
-    rows = _fetch_table_rows_for_treeview(
-        conn, table_name, human_only=human_only,
-    )
-    for row in rows:
-        treeview.insert('', tk.END, values=row)
+    alias, source_sql = _treeview_source(table_name, human_only=human_only)
+    view.load(conn, columns=columns, alias=alias, source_sql=source_sql)
 
 
 def _refresh_all_treeviews(
         *,
         conn: sqlite3.Connection,
-        treeviews: dict[str, ttk.Treeview],
+        treeviews: dict[str, VirtualTreeview],
         human_only: bool = False,
 ) -> None:
-    for table_name, treeview in treeviews.items():
+    for table_name, view in treeviews.items():
         _populate_treeview(
             conn=conn,
             table_name=table_name,
-            treeview=treeview,
+            view=view,
             human_only=human_only,
         )
 
 
-def _selected_rows(treeview: ttk.Treeview) -> list[tuple[str, ...]]:
-    rows = []
-    for item_id in treeview.selection():
-        values = treeview.item(item_id, 'values')
-        rows.append(tuple(str(value) for value in values))
-    return rows
+def _refresh_when_idle(root: tk.Misc, runner: JobRunner, refresh: Callable[[], None]) -> None:
+    """
+    Run ``refresh`` (reads on the main connection) once no job is running: a
+    job may hold the database write lock, and the reads would block the Tk
+    thread for the busy timeout or fail with 'database is locked'.
+    """
+    if runner.busy:
+        root.after(_JOB_RETRY_MS, lambda: _refresh_when_idle(root, runner, refresh))
+        return
+    refresh()
 
 
-def _upload_csv(
+def _selected_rows(view: VirtualTreeview) -> list[tuple[str, ...]]:
+    # selection spans rows paged out of the widget, so re-read it by rowid
+    return view.selected_rows()
+
+
+def _submit_job(
+        *,
+        runner: JobRunner,
+        parent: tk.Misc | None,
+        name: str,
+        work: Callable[[JobContext], Any],
+        on_success: Callable[[Any], None],
+        on_error: Callable[[BaseException], None],
+        cancel_discards_result: bool = False,
+) -> None:
+    if not runner.submit(
+            name,
+            work,
+            on_success=on_success,
+            on_error=on_error,
+            cancel_discards_result=cancel_discards_result,
+    ):
+        messagebox.showinfo(
+            'Busy',
+            f'{runner.current} is still running; wait for it or press Cancel.',
+            parent=parent,
+        )
+
+
+def _show_rendered_figure(master: tk.Misc, rendered: RenderedFigure) -> ttk.Label:
+    """Blit a figure already drawn off the Tk thread (see :mod:`figure_cache`)."""
+    image = tk.PhotoImage(master=master, data=rendered.ppm)
+    label = ttk.Label(master, image=image)
+    label.image = image  # type: ignore[attr-defined]  # Tk drops images Python no longer references
+    label.pack(fill=tk.BOTH, expand=True)
+    return label
+
+
+def _render_figure_into(
+        frame: ttk.Frame,
         *,
+        runner: JobRunner,
         conn: sqlite3.Connection,
+        name: str,
+        tables: tuple[str, ...],
+        params: tuple[object, ...],
+        build: Callable[[], Figure],
+        context: str,
+) -> None:
+    """
+    Show a chart in ``frame``: its cached bitmap at once when the data is
+    unchanged, else a placeholder until a background job has rendered it.
+    """
+    hit = lookup_figure(conn, name=name, tables=tables, params=params)
+    if hit is not None:
+        _show_rendered_figure(frame, hit)
+        return
+
+    placeholder = ttk.Label(frame, text='Rendering chart…')
+    placeholder.pack(anchor='w')
+
+    def render(c: sqlite3.Connection) -> RenderedFigure:
+        return cached_figure(
+            c,
+            name=name,
+            tables=tables,
+            params=params,
+            build=lambda: render_figure(build()),
+        )
+
+    def on_success(rendered: RenderedFigure) -> None:
+        try:
+            if not frame.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        placeholder.destroy()
+        _show_rendered_figure(frame, rendered)
+
+    def on_error(e: BaseException) -> None:
+        if isinstance(e, JobCancelled):
+            placeholder.configure(text='Chart rendering cancelled.')
+            return
+        _log_error(context, e)
+        placeholder.configure(text=f'Could not build charts: {e}')
+
+    if not runner.submit(
+            f'Rendering chart ({name})',
+            lambda job: render(job.conn),
+            on_success=on_success,
+            on_error=on_error,
+            cancel_discards_result=True,
+    ):
+        # another job holds the runner: render here instead
+        try:
+            rendered = render(conn)
+        except Exception as e:
+            on_error(e)
+        else:
+            on_success(rendered)
+
+
+def _upload_csv(
+        *,
+        runner: JobRunner,
         state: dict[str, object],
-        treeviews: dict[str, ttk.Treeview],
+        treeviews: dict[str, VirtualTreeview],
         human_only: bool,
 ) -> None:
     filename = filedialog.askopenfilename(
@@ -207,25 +324,111 @@ def _upload_csv(
         )
         return
 
+    def on_read_error(e: BaseException) -> None:
+        if isinstance(e, JobCancelled):
+            get_audit_logger().info('Upload cancelled while reading file=%s', os.path.basename(filename))
+        elif isinstance(e, ValueError):
+            get_audit_logger().warning('Upload failed reading CSV (ValueError): %s', e)
+            messagebox.showerror('Upload error', str(e))
+        elif isinstance(e, OSError):
+            get_audit_logger().warning('Upload failed reading CSV (OSError): %s', e)
+            messagebox.showerror('Upload error', f'Could not read file: {e}')
+        else:
+            _log_error('Upload CSV / read_csv_rows', e)
+            messagebox.showerror('Upload error', f'Could not read file: {e}')
+
+    _submit_job(
+        runner=runner,
+        parent=None,
+        name=f'Reading {os.path.basename(filename)}',
+        work=lambda job: read_csv_rows(filename),
+        cancel_discards_result=True,
+        on_success=lambda parsed: _confirm_and_import_csv(
+            runner=runner,
+            state=state,
+            treeviews=treeviews,
+            human_only=human_only,
+            filename=filename,
+            table_name=table_name,
+            parsed=parsed,
+        ),
+        on_error=on_read_error,
+    )
+
+
+def _import_and_clean_csv(
+        job: JobContext,
+        *,
+        filename: str,
+        table_name: str,
+        parsed: tuple[list[str], list[tuple[str, ...]]],
+        append: bool = False,
+) -> tuple[str, list[str], list[tuple[str, ...]], str | None, CleanupReport | BaseException]:
+    """
+    Worker half of an upload: the import, then cleanup (whose failure is returned, not raised).
+
+    ``append`` merges the rows by primary key instead of replacing the table,
+    and then cleans up only the rows it wrote.
+    """
+    keys: list[str] | None = None
+    if append:
+        headers, data_rows = parsed
+        keys, warning = upsert_table_data(
+            DB_PATH,
+            table_name=table_name,
+            headers=headers,
+            rows=data_rows,
+            conn=job.conn,
+        )
+        imported_table_name = table_name
+        headers = prepare_csv_headers_for_import(table_name, headers)
+    else:
+        imported_table_name, headers, data_rows, warning = replace_table_data_from_csv(
+            DB_PATH,
+            csv_path=filename,
+            table_name=table_name,
+            preloaded=parsed,
+            conn=job.conn,
+        )
+    # the import is committed from here on; a cancel only stops the cleanup
+    job.status(f'Cleaning up {imported_table_name}…')
+    cleanup: CleanupReport | BaseException
     try:
-        headers, data_rows = read_csv_rows(filename)
-    except ValueError as e:
-        get_audit_logger().warning('Upload failed reading CSV (ValueError): %s', e)
-        messagebox.showerror('Upload error', str(e))
-        return
-    except OSError as e:
-        get_audit_logger().warning('Upload failed reading CSV (OSError): %s', e)
-        messagebox.showerror('Upload error', f'Could not read file: {e}')
-        return
+        if keys is not None:
+            cleanup = cleanup_selection(
+                job.conn, imported_table_name, keys, apply=True, progress=job.progress,
+            )
+        else:
+            cleanup = cleanup_entire_table(
+                job.conn, imported_table_name, apply=True, progress=job.progress,
+            )
+    except Exception as e:
+        cleanup = JobCancelled(str(e)) if job.cancelled else e
+    return imported_table_name, headers, data_rows, warning, cleanup
 
-    confirmed = messagebox.askyesno(
+
+def _confirm_and_import_csv(
+        *,
+        runner: JobRunner,
+        state: dict[str, object],
+        treeviews: dict[str, VirtualTreeview],
+        human_only: bool,
+        filename: str,
+        table_name: str,
+        parsed: tuple[list[str], list[tuple[str, ...]]],
+) -> None:
+    headers, data_rows = parsed
+    append = messagebox.askyesnocancel(
         'Confirm upload',
         (
-            f'Replace the {table_name} table with {len(data_rows)} '
-            f'data rows from:\n{os.path.basename(filename)}'
+            f'{len(data_rows)} data rows from {os.path.basename(filename)} '
+            f'for the {table_name} table.\n\n'
+            'Yes: append them (rows whose key already exists are updated)\n'
+            f'No: replace the whole {table_name} table\n'
+            'Cancel: do not upload'
         ),
     )
-    if not confirmed:
+    if append is None:
         get_audit_logger().info(
             'Upload cancelled by user table=%s file=%s',
             table_name,
@@ -234,74 +437,93 @@ def _upload_csv(
         messagebox.showinfo('Upload cancelled', 'CSV upload was cancelled.')
         return
 
-    try:
-        imported_table_name, headers, data_rows, warning = replace_table_data_from_csv(
-            DB_PATH,
-            csv_path=filename,
-            table_name=table_name,
-            preloaded=(headers, data_rows),
-        )
+    def on_error(e: BaseException) -> None:
+        if isinstance(e, JobCancelled):
+            get_audit_logger().info('Upload cancelled during DB replace table=%s', table_name)
+            messagebox.showinfo(
+                'Upload cancelled',
+                f'CSV upload was cancelled; the {table_name} table was left unchanged.',
+            )
+        elif isinstance(e, ValueError):
+            get_audit_logger().warning('Upload failed during DB replace (ValueError): %s', e)
+            messagebox.showerror('Upload error', str(e))
+        elif isinstance(e, OSError):
+            get_audit_logger().warning('Upload failed during DB replace (OSError): %s', e)
+            messagebox.showerror('Upload error', f'Could not read file: {e}')
+        elif isinstance(e, sqlite3.DatabaseError):
+            _log_error('Upload CSV / replace_table_data_from_csv', e)
+            messagebox.showerror('Upload error', f'Database update failed: {e}')
+        else:
+            _log_error('Upload CSV / replace_table_data_from_csv', e)
+            messagebox.showerror('Upload error', f'Upload failed: {e}')
+
+    def on_success(
+            outcome: tuple[str, list[str], list[tuple[str, ...]], str | None, CleanupReport | BaseException],
+    ) -> None:
+        imported_table_name, headers, data_rows, warning, cleanup = outcome
         if warning:
             get_audit_logger().warning('Upload finished with warnings: %s', warning)
             messagebox.showwarning('Upload warning', warning)
-    except ValueError as e:
-        get_audit_logger().warning('Upload failed during DB replace (ValueError): %s', e)
-        messagebox.showerror('Upload error', str(e))
-        return
-    except OSError as e:
-        get_audit_logger().warning('Upload failed during DB replace (OSError): %s', e)
-        messagebox.showerror('Upload error', f'Could not read file: {e}')
-        return
-    except sqlite3.DatabaseError as e:
-        _log_error('Upload CSV / replace_table_data_from_csv', e)
-        messagebox.showerror('Upload error', f'Database update failed: {e}')
-        return
 
-    conn.close()
-    conn = sqlite3.connect(DB_PATH)
-    state['conn'] = conn
-    state['uploaded_rows'] = [headers, *data_rows]
-    state['uploaded_table'] = imported_table_name
-    _refresh_all_treeviews(conn=conn, treeviews=treeviews, human_only=human_only)
-    sync = state.get('sync_human_only_label')
-    if callable(sync):
-        sync()
+        # the table was rebuilt under the main connection; reopen it
+        cast(sqlite3.Connection, state['conn']).close()
+        conn = sqlite3.connect(DB_PATH)
+        state['conn'] = conn
+        state['uploaded_rows'] = [headers, *data_rows]
+        state['uploaded_table'] = imported_table_name
+        _refresh_all_treeviews(conn=conn, treeviews=treeviews, human_only=human_only)
+        sync = state.get('sync_human_only_label')
+        if callable(sync):
+            sync()
+
+        if isinstance(cleanup, JobCancelled):
+            get_audit_logger().info('Upload cleanup cancelled table=%s', imported_table_name)
+            messagebox.showinfo(
+                'Cleanup cancelled',
+                (
+                    f'Data was loaded into {imported_table_name}, but automatic cleanup was cancelled.\n\n'
+                    'The imported CSV data is still in the database; cleanup was rolled back.'
+                ),
+            )
+            return
+        if isinstance(cleanup, BaseException):
+            _log_error('Upload CSV / cleanup after import', cleanup)
+            messagebox.showerror(
+                'Cleanup error',
+                (
+                    f'Data was loaded into {imported_table_name}, but automatic cleanup failed:\n{cleanup}\n\n'
+                    'The imported CSV data is still in the database; cleanup was rolled back.'
+                ),
+            )
+            return
 
-    try:
-        import time
-        start = time.time()
-        cleanup_report = cleanup_entire_table(conn, imported_table_name, apply=True)
-        print(f"Cleanup time: {(time.time() - start):.6f} secs")
-    except Exception as e:
-        _log_error('Upload CSV / cleanup after import', e)
-        messagebox.showerror(
-            'Cleanup error',
+        cleanup_text = format_report_for_dialog(cleanup, max_lines=45)
+        get_audit_logger().info(
+            'Upload finished: table=%s rows=%d file=%s cleanup_updates=%d cleanup_deletes=%d',
+            imported_table_name,
+            len(data_rows),
+            os.path.basename(filename),
+            cleanup.updates,
+            cleanup.deletes,
+        )
+        messagebox.showinfo(
+            'Upload complete',
             (
-                f'Data was loaded into {imported_table_name}, but automatic cleanup failed:\n{e}\n\n'
-                'The imported CSV data is still in the database; cleanup was rolled back.'
+                f'{"Appended" if append else "Loaded"} {len(data_rows)} data rows '
+                f'into the {imported_table_name} table.\n\n'
+                f'Automatic cleanup:\n{cleanup_text}'
             ),
         )
-        return
 
-    _refresh_all_treeviews(conn=conn, treeviews=treeviews, human_only=human_only)
-    if callable(sync):
-        sync()
-
-    cleanup_text = format_report_for_dialog(cleanup_report, max_lines=45)
-    get_audit_logger().info(
-        'Upload finished: table=%s rows=%d file=%s cleanup_updates=%d cleanup_deletes=%d',
-        imported_table_name,
-        len(data_rows),
-        os.path.basename(filename),
-        cleanup_report.updates,
-        cleanup_report.deletes,
-    )
-    messagebox.showinfo(
-        'Upload complete',
-        (
-            f'Loaded {len(data_rows)} data rows into the {imported_table_name} table.\n\n'
-            f'Automatic cleanup:\n{cleanup_text}'
+    _submit_job(
+        runner=runner,
+        parent=None,
+        name=f'Importing {table_name}',
+        work=lambda job: _import_and_clean_csv(
+            job, filename=filename, table_name=table_name, parsed=parsed, append=append,
         ),
+        on_success=on_success,
+        on_error=on_error,
     )
 
 
@@ -339,9 +561,7 @@ def _filtered_posts_where_and_params(
     params: list[object] = []
     clauses: list[str] = []
     if hour is not None:
-        clauses.append(
-            '(CAST(strftime(\'%H\', replace(replace(p.timestamp, \'/\', \'-\'), \'T\', \' \')) AS INTEGER) = ?)',
-        )
+        clauses.append('p.ts_hour = ?')
         params.append(hour)
     if topic_id:
         clauses.append('p.topic_id = ?')
@@ -352,19 +572,34 @@ def _filtered_posts_where_and_params(
     return full_where, params
 
 
-def _build_filtered_posts_count_sql(
+def _build_filtered_posts_page_index_sql(
         *,
         hour: int | None,
         topic_id: str | None,
+        page_size: int,
 ) -> tuple[str, list[object]]:
+    """
+    ``(timestamp, post_id, total)`` for the first row of every page.
+
+    One pass over the matches gives both the count and the keys to seek to
+    for any page; an empty result means nothing matches.
+    """
     full_where, params = _filtered_posts_where_and_params(hour=hour, topic_id=topic_id)
     sql = f'''
-        SELECT COUNT(*)
-        FROM posts p
-        INNER JOIN users u ON p.user_id = u.user_id
-        WHERE {full_where}
+        SELECT ts, post_id, total FROM (
+            SELECT
+                p.timestamp AS ts,
+                p.post_id AS post_id,
+                row_number() OVER (ORDER BY p.timestamp, p.post_id) - 1 AS rn,
+                COUNT(*) OVER () AS total
+            FROM posts p
+            INNER JOIN users u ON p.user_id = u.user_id
+            WHERE {full_where}
+        )
+        WHERE rn % ? = 0
+        ORDER BY rn
     '''
-    return sql, params
+    return sql, [*params, page_size]
 
 
 def _build_filtered_posts_select_sql(
@@ -372,10 +607,25 @@ def _build_filtered_posts_select_sql(
         hour: int | None,
         topic_id: str | None,
         limit: int,
-        offset: int,
+        start_key: tuple[str | None, str] | None = None,
 ) -> tuple[str, list[object]]:
-    """Posts + topic columns; paginated with LIMIT / OFFSET."""
+    """
+    Posts + topic columns, keyset-paginated on ``(timestamp, post_id)``.
+
+    Rows start at ``start_key`` (inclusive; ``None`` is the first row), so
+    any page is an index seek rather than a scan past the earlier ones.
+    """
     full_where, params = _filtered_posts_where_and_params(hour=hour, topic_id=topic_id)
+    seek_sql = ''
+    if start_key is not None:
+        timestamp, post_id = start_key
+        if timestamp is None:
+            # NULL timestamps sort first and compare to nothing, so seek by id
+            seek_sql = 'AND (p.timestamp IS NOT NULL OR p.post_id >= ?)'
+            params.append(post_id)
+        else:
+            seek_sql = 'AND (p.timestamp, p.post_id) >= (?, ?)'
+            params.extend((timestamp, post_id))
     sql = f'''
         SELECT
             p.post_id,
@@ -392,11 +642,16 @@ def _build_filtered_posts_select_sql(
         FROM posts p
         LEFT JOIN topics t ON p.topic_id = t.topic_id
         INNER JOIN users u ON p.user_id = u.user_id
-        WHERE {full_where}
+        WHERE {full_where} {seek_sql}
         ORDER BY p.timestamp, p.post_id
-        LIMIT ? OFFSET ?
+        LIMIT ?
     '''
-    return sql, [*params, limit, offset]
+    return sql, [*params, limit]
+
+
+def _filtered_post_key(row: tuple[object, ...]) -> tuple[str | None, str]:
+    # (timestamp, post_id) of a row from _build_filtered_posts_select_sql
+    return cast('str | None', row[2]), cast(str, row[0])
 
 
 def _show_filtered_posts_window(
@@ -404,14 +659,20 @@ def _show_filtered_posts_window(
         parent: tk.Tk,
         state: dict[str, object],
         conn: sqlite3.Connection,
+        runner: JobRunner,
         column_names: list[str],
         hour: int | None,
         topic_id: str | None,
-        total_count: int,
         page_size: int,
 ) -> None:
+    """
+    Page through the filtered posts with keyset seeks.
+
+    The first page shows at once; the match count and the page index used
+    by "Go to page" are computed as a background job.
+    """
     win = tk.Toplevel(parent)
-    win.title(f'Filtered posts ({total_count} match{"es" if total_count != 1 else ""})')
+    win.title('Filtered posts (counting…)')
     win.transient(parent)
     win.geometry('1100x480')
 
@@ -440,54 +701,66 @@ def _show_filtered_posts_window(
     nav = ttk.Frame(footer)
     nav.pack(side=tk.LEFT)
     status_var = tk.StringVar(value='')
+    page_var = tk.StringVar(value='1')
+
+    # page number -> (timestamp, post_id) of its first row (None: from the top)
+    page_starts: dict[int, tuple[str | None, str] | None] = {0: None}
+    page: dict[str, int] = {'i': 0, 'shown': 0}
+    count: dict[str, int | None] = {'total': None}
 
-    page: dict[str, int] = {'i': 0}
+    def n_pages() -> int | None:
+        total = count['total']
+        return None if total is None else max(1, -(-total // page_size))
 
     def sync_nav_buttons() -> None:
         idx = page['i']
-        if idx <= 0:
-            btn_prev.state(['disabled'])
-        else:
-            btn_prev.state(['!disabled'])
-        if total_count == 0 or (idx + 1) * page_size >= total_count:
-            btn_next.state(['disabled'])
+        btn_prev.state(['disabled'] if idx <= 0 else ['!disabled'])
+        btn_next.state(['!disabled'] if idx + 1 in page_starts else ['disabled'])
+        btn_go.state(['disabled'] if count['total'] is None else ['!disabled'])
+
+    def update_status() -> None:
+        total = count['total']
+        offset = page['i'] * page_size
+        if total == 0:
+            status_var.set('No rows match this filter.')
+            return
+        end_i = offset + page['shown']
+        if total is None:
+            parts = [f'Rows {offset + 1}–{end_i} (counting matches…)']
         else:
-            btn_next.state(['!disabled'])
+            parts = [
+                f'Rows {offset + 1}–{end_i} of {total}',
+                f'page {page["i"] + 1} of {n_pages()}',
+                f'{max(0, total - end_i)} more row(s) to show (use >)',
+            ]
+        if offset > 0:
+            parts.append(f'{offset} row(s) on earlier pages (<)')
+        status_var.set(' · '.join(parts))
 
     def load_page() -> None:
-        offset = page['i'] * page_size
+        # one extra row: its key starts the next page, if there is one
         sql, params = _build_filtered_posts_select_sql(
             hour=hour,
             topic_id=topic_id,
-            limit=page_size,
-            offset=offset,
+            limit=page_size + 1,
+            start_key=page_starts[page['i']],
         )
         try:
-            cur = conn.execute(sql, params)
-            rows = cur.fetchall()
+            rows = conn.execute(sql, params).fetchall()
         except sqlite3.Error as e:
             _log_error('Filtered posts pagination', e)
             status_var.set(f'Load error: {e}')
             return
+        if len(rows) > page_size:
+            page_starts[page['i'] + 1] = _filtered_post_key(rows[page_size])
+            rows = rows[:page_size]
 
         tree.delete(*tree.get_children())
         for row in rows:
             tree.insert('', tk.END, values=tuple('' if v is None else str(v) for v in row))
-
-        n = len(rows)
-        if total_count == 0:
-            status_var.set('No rows match this filter.')
-        else:
-            start_i = offset + 1
-            end_i = offset + n
-            remaining_after = max(0, total_count - end_i)
-            parts = [
-                f'Rows {start_i}–{end_i} of {total_count}',
-                f'{remaining_after} more row(s) to show (use >)',
-            ]
-            if offset > 0:
-                parts.append(f'{offset} row(s) on earlier pages (<)')
-            status_var.set(' · '.join(parts))
+        page['shown'] = len(rows)
+        page_var.set(str(page['i'] + 1))
+        update_status()
         sync_nav_buttons()
 
     def go_prev() -> None:
@@ -496,19 +769,98 @@ def _show_filtered_posts_window(
             load_page()
 
     def go_next() -> None:
-        if (page['i'] + 1) * page_size < total_count:
+        if page['i'] + 1 in page_starts:
             page['i'] += 1
             load_page()
 
+    def go_to_page() -> None:
+        last = n_pages()
+        if last is None:
+            return
+        try:
+            number = int(page_var.get().strip())
+        except ValueError:
+            number = page['i'] + 1
+        page['i'] = min(max(number, 1), last) - 1
+        load_page()
+
+    def on_counted(rows: list[tuple[object, ...]]) -> None:
+        try:
+            if not win.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        total = cast(int, rows[0][2]) if rows else 0
+        count['total'] = total
+        page_starts.update(
+            (i, (cast('str | None', ts), cast(str, post_id)))
+            for i, (ts, post_id, _) in enumerate(rows)
+            if i
+        )
+        win.title(f'Filtered posts ({total} match{"es" if total != 1 else ""})')
+        get_audit_logger().info(
+            'Filtered posts counted: hour_of_day=%s topic_id=%s total_matches=%d pages=%d',
+            hour,
+            topic_id,
+            total,
+            n_pages(),
+        )
+        update_status()
+        sync_nav_buttons()
+
+    def on_count_error(exc: BaseException) -> None:
+        if not isinstance(exc, JobCancelled):
+            _log_error('Filtered posts count', exc)
+        try:
+            if win.winfo_exists():
+                win.title('Filtered posts (count unavailable)')
+        except tk.TclError:
+            pass
+
     btn_prev = ttk.Button(nav, text='<', width=3, command=go_prev)
     btn_next = ttk.Button(nav, text='>', width=3, command=go_next)
     btn_prev.pack(side=tk.LEFT)
     btn_next.pack(side=tk.LEFT, padx=(4, 0))
+    ttk.Label(nav, text='Page').pack(side=tk.LEFT, padx=(12, 4))
+    ttk.Entry(nav, textvariable=page_var, width=6).pack(side=tk.LEFT)
+    btn_go = ttk.Button(nav, text='Go', width=4, command=go_to_page)
+    btn_go.pack(side=tk.LEFT, padx=(4, 0))
     ttk.Label(footer, textvariable=status_var, wraplength=620).pack(side=tk.LEFT, padx=(12, 0))
     ttk.Button(footer, text='Close', command=win.destroy).pack(side=tk.RIGHT)
 
     load_page()
 
+    index_sql, index_params = _build_filtered_posts_page_index_sql(
+        hour=hour,
+        topic_id=topic_id,
+        page_size=page_size,
+    )
+
+    def count_matches(job: JobContext) -> list[tuple[object, ...]]:
+        return job.conn.execute(index_sql, index_params).fetchall()
+
+    def submit_count() -> None:
+        try:
+            if not win.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        if runner.submit(
+                'Counting filtered posts',
+                count_matches,
+                on_success=on_counted,
+                on_error=on_count_error,
+                cancel_discards_result=True,
+        ):
+            win.title('Filtered posts (counting…)')
+            return
+        # another job holds the runner: the page index is too slow to build
+        # on the Tk thread, so wait for that job
+        win.title('Filtered posts (waiting for the current job…)')
+        parent.after(_JOB_RETRY_MS, submit_count)
+
+    submit_count()
+
     def on_win_destroy(event: tk.Event) -> None:
         if event.widget == win:
             state['filter_results_window'] = None
@@ -522,6 +874,7 @@ def _show_hour_topic_pivot_window(
         parent: tk.Tk,
         state: dict[str, object],
         conn: sqlite3.Connection,
+        runner: JobRunner,
         hour_filter: int | None,
         topic_id_filter: str | None,
 ) -> None:
@@ -576,21 +929,16 @@ def _show_hour_topic_pivot_window(
     ).pack(side=tk.LEFT)
     ttk.Button(footer, text='Close', command=win.destroy).pack(side=tk.RIGHT)
 
-    try:
-        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-        fig = build_hour_topic_pivot_figure(matrix, topic_labels)
-        canvas_mpl = FigureCanvasTkAgg(fig, master=chart_frame)
-        canvas_mpl.draw()
-        canvas_mpl.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-    except ImportError as e:
-        ttk.Label(
-            chart_frame,
-            text=f'Heatmap requires matplotlib. pip install -r requirements.txt\n{e}',
-        ).pack(anchor='w')
-    except Exception as e:
-        _log_error('Hour-topic pivot / chart', e)
-        ttk.Label(chart_frame, text=f'Could not draw heatmap: {e}').pack(anchor='w')
+    _render_figure_into(
+        chart_frame,
+        runner=runner,
+        conn=conn,
+        name='hour_topic_pivot',
+        tables=_HOUR_TOPIC_TABLES,
+        params=(hour_filter, topic_id_filter),
+        build=lambda: build_hour_topic_pivot_figure(matrix, topic_labels),
+        context='Hour-topic pivot / chart',
+    )
 
     cols = ['hour'] + topic_labels
     tree = ttk.Treeview(table_frame, columns=cols, show='headings', height=10)
@@ -603,12 +951,10 @@ def _show_hour_topic_pivot_window(
         tree.heading(lab, text=lab)
         tree.column(lab, width=72, anchor=tk.E, stretch=True)
 
-    n_topics = int(matrix.shape[1]) if matrix.size else 0
+    n_topics = int(matrix.shape[1])
+    cell_text = matrix.astype(int).astype(str).tolist()
     for h in range(24):
-        vals: list[str] = [str(h)]
-        for j in range(n_topics):
-            vals.append(str(int(matrix[h, j])))
-        tree.insert('', tk.END, values=tuple(vals))
+        tree.insert('', tk.END, values=(str(h), *cell_text[h]))
 
     tree.grid(row=0, column=0, sticky='nsew')
     vsb.grid(row=0, column=1, sticky='ns')
@@ -630,7 +976,12 @@ def _show_hour_topic_pivot_window(
     )
 
 
-def _open_filters_dialog(*, parent: tk.Tk, state: dict[str, object]) -> None:
+def _open_filters_dialog(
+        *,
+        parent: tk.Tk,
+        state: dict[str, object],
+        runner: JobRunner,
+) -> None:
     conn = cast(sqlite3.Connection, state['conn'])
     get_audit_logger().info('Filter dialog opened')
     dialog = tk.Toplevel(parent)
@@ -715,15 +1066,12 @@ def _open_filters_dialog(*, parent: tk.Tk, state: dict[str, object]) -> None:
         _close_filter_results_window(state)
         _close_filter_pivot_window(state)
 
-        count_sql, count_params = _build_filtered_posts_count_sql(hour=hour, topic_id=topic_id)
         meta_sql, meta_params = _build_filtered_posts_select_sql(
             hour=hour,
             topic_id=topic_id,
             limit=0,
-            offset=0,
         )
         try:
-            total_count = int(conn.execute(count_sql, count_params).fetchone()[0])
             cur = conn.execute(meta_sql, meta_params)
             colnames = [d[0] for d in cur.description] if cur.description else []
         except sqlite3.Error as e:
@@ -735,24 +1083,24 @@ def _open_filters_dialog(*, parent: tk.Tk, state: dict[str, object]) -> None:
             parent=parent,
             state=state,
             conn=conn,
+            runner=runner,
             column_names=colnames,
             hour=hour,
             topic_id=topic_id,
-            total_count=total_count,
             page_size=_FILTER_PAGE_SIZE,
         )
         _show_hour_topic_pivot_window(
             parent=parent,
             state=state,
             conn=conn,
+            runner=runner,
             hour_filter=hour,
             topic_id_filter=topic_id,
         )
         get_audit_logger().info(
-            'Filters applied: hour_of_day=%s topic_id=%s total_matches=%d page_size=%d',
+            'Filters applied: hour_of_day=%s topic_id=%s page_size=%d',
             hour,
             topic_id,
-            total_count,
             _FILTER_PAGE_SIZE,
         )
 
@@ -784,13 +1132,13 @@ def _user_id_is_bot(
     if user_id in cache:
         return cache[user_id]
     row = conn.execute(
-        'SELECT account_type FROM users WHERE user_id = ?',
+        'SELECT is_bot FROM users WHERE user_id = ?',
         (user_id,),
     ).fetchone()
     if row is None:
         cache[user_id] = False
         return False
-    cache[user_id] = _account_type_is_bot(row[0])
+    cache[user_id] = bool(row[0])
     return cache[user_id]
 
 
@@ -844,13 +1192,11 @@ def _show_selected_row_stats(
         parent: tk.Tk,
         conn: sqlite3.Connection,
         notebook: ttk.Notebook,
-        treeviews: dict[str, ttk.Treeview],
+        treeviews: dict[str, VirtualTreeview],
 ) -> None:
     index = notebook.index(notebook.select())
     table_name = TABLE_NAMES[index]
-    treeview = treeviews[table_name]
-
-    rows = _selected_rows(treeview)
+    rows = _selected_rows(treeviews[table_name])
     if not rows:
         get_audit_logger().warning('Statistics requested with no row selection')
         messagebox.showerror(
@@ -874,7 +1220,7 @@ def _show_selected_row_stats(
         )
         return
 
-    columns = _get_table_columns(conn, table_name)
+    columns = table_columns(conn, table_name)
     records: list[dict[str, str]] = []
     for row in rows:
         rec: dict[str, str] = {}
@@ -949,19 +1295,68 @@ def _show_selected_row_stats(
 def _open_moderation_effectiveness_dialog(
         *,
         parent: tk.Tk,
-        conn: sqlite3.Connection,
+        runner: JobRunner,
 ) -> None:
-    try:
-        result = run_moderation_effectiveness_analysis(conn)
-    except sqlite3.Error as e:
+    def on_error(e: BaseException) -> None:
+        if isinstance(e, JobCancelled):
+            return
         _log_error('Moderation effectiveness analysis', e)
         messagebox.showerror(
             'Moderation effectiveness',
             f'Query failed: {e}',
             parent=parent,
         )
-        return
 
+    def analyse(
+            job: JobContext,
+    ) -> tuple[ModerationEffectivenessResult, RenderedFigure | Exception, RenderedFigure | Exception]:
+        result = run_moderation_effectiveness_analysis(job.conn)
+        return (result, *_render_moderation_figures(job.conn, result))
+
+    _submit_job(
+        runner=runner,
+        parent=parent,
+        name='Moderation effectiveness',
+        work=analyse,
+        on_success=lambda out: _show_moderation_effectiveness_dialog(
+            parent=parent,
+            result=out[0],
+            effectiveness=out[1],
+            correlation=out[2],
+        ),
+        on_error=on_error,
+        cancel_discards_result=True,
+    )
+
+
+def _render_moderation_figures(
+        conn: sqlite3.Connection,
+        result: ModerationEffectivenessResult,
+) -> tuple[RenderedFigure | Exception, RenderedFigure | Exception]:
+    """Both moderation charts, rendered or reused; a chart that fails is returned as its exception."""
+    def correlation() -> RenderedFigure:
+        fig, r_pearson = build_moderation_correlation_figure(result)
+        return render_figure(fig, extra=r_pearson)
+
+    rendered: list[RenderedFigure | Exception] = []
+    for name, build in (
+            ('moderation_effectiveness', lambda: render_figure(build_moderation_effectiveness_figure(result))),
+            ('moderation_correlation', correlation),
+    ):
+        try:
+            rendered.append(cached_figure(conn, name=name, tables=_MODERATION_TABLES, build=build))
+        except Exception as e:  # shown in the dialog in place of the chart
+            rendered.append(e)
+    return rendered[0], rendered[1]
+
+
+def _show_moderation_effectiveness_dialog(
+        *,
+        parent: tk.Tk,
+        result: ModerationEffectivenessResult,
+        effectiveness: RenderedFigure | Exception,
+        correlation: RenderedFigure | Exception,
+) -> None:
     win = tk.Toplevel(parent)
     win.title('Moderation effectiveness')
     win.transient(parent)
@@ -1040,24 +1435,11 @@ def _open_moderation_effectiveness_dialog(
     chart_frame = ttk.Frame(body)
     chart_frame.grid(row=r, column=0, sticky='ew', pady=(0, 8))
     r += 1
-    try:
-        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-        fig = build_moderation_effectiveness_figure(result)
-        mpl_canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-        mpl_canvas.draw()
-        mpl_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-    except ImportError as e:
-        ttk.Label(
-            chart_frame,
-            text=(
-                'Charts require matplotlib. Install with: pip install -r requirements.txt\n'
-                f'Detail: {e}'
-            ),
-        ).pack(anchor='w')
-    except Exception as e:
-        _log_error('Moderation effectiveness / charts', e)
-        ttk.Label(chart_frame, text=f'Could not build charts: {e}').pack(anchor='w')
+    if isinstance(effectiveness, Exception):
+        _log_error('Moderation effectiveness / charts', effectiveness)
+        ttk.Label(chart_frame, text=f'Could not build charts: {effectiveness}').pack(anchor='w')
+    else:
+        _show_rendered_figure(chart_frame, effectiveness)
 
     ttk.Label(
         body,
@@ -1079,13 +1461,12 @@ def _open_moderation_effectiveness_dialog(
     corr_frame = ttk.Frame(body)
     corr_frame.grid(row=r, column=0, sticky='ew', pady=(0, 8))
     r += 1
-    try:
-        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-        fig_corr, r_pearson = build_moderation_correlation_figure(result)
-        corr_canvas = FigureCanvasTkAgg(fig_corr, master=corr_frame)
-        corr_canvas.draw()
-        corr_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    if isinstance(correlation, Exception):
+        _log_error('Moderation effectiveness / correlation charts', correlation)
+        ttk.Label(corr_frame, text=f'Could not build correlation charts: {correlation}').pack(anchor='w')
+    else:
+        _show_rendered_figure(corr_frame, correlation)
+        r_pearson = correlation.extra
         if r_pearson is not None:
             get_audit_logger().info(
                 'Moderation correlation figure: Pearson r (ordinal moderation vs topic report rate) = %.4f',
@@ -1095,14 +1476,6 @@ def _open_moderation_effectiveness_dialog(
             get_audit_logger().info(
                 'Moderation correlation figure: Pearson r not defined (insufficient variation or data)',
             )
-    except ImportError as e:
-        ttk.Label(
-            corr_frame,
-            text=f'Correlation charts need matplotlib.\n{e}',
-        ).pack(anchor='w')
-    except Exception as e:
-        _log_error('Moderation effectiveness / correlation charts', e)
-        ttk.Label(corr_frame, text=f'Could not build correlation charts: {e}').pack(anchor='w')
 
     ttk.Label(body, text='Pattern detection', font=('TkDefaultFont', 10, 'bold')).grid(
         row=r, column=0, sticky='w',
@@ -1180,42 +1553,60 @@ def _close_analysis_charts_window(state: dict[str, object]) -> None:
 def _open_analysis_charts_window(
         *,
         parent: tk.Tk,
-        conn: sqlite3.Connection,
+        runner: JobRunner,
         human_only: bool,
         state: dict[str, object],
 ) -> None:
-    try:
-        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-        from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
-    except ImportError as e:
-        get_audit_logger().warning('Analysis charts unavailable (missing dependency): %s', e)
-        messagebox.showerror(
-            'Analysis charts',
-            (
-                'Matplotlib (and friends) are not installed. '
-                'Install dependencies from requirements.txt, e.g. '
-                '`pip install -r requirements.txt`.\n\n'
-                f'Detail: {e}'
-            ),
-            parent=parent,
-        )
-        return
-
-    _close_analysis_charts_window(state)
-
-    try:
+    def build(job: JobContext) -> RenderedFigure:
         from analysis import build_analysis_figure
 
-        fig = build_analysis_figure(conn, human_only=human_only)
-    except Exception as e:
+        return cached_figure(
+            job.conn,
+            name='analysis_charts',
+            tables=_ANALYSIS_CHARTS_TABLES,
+            params=(human_only,),
+            build=lambda: render_figure(build_analysis_figure(job.conn, human_only=human_only)),
+        )
+
+    def on_error(e: BaseException) -> None:
+        if isinstance(e, JobCancelled):
+            return
         _log_error('Analysis charts / build_analysis_figure', e)
         messagebox.showerror(
             'Analysis charts',
             f'Could not build charts: {e}',
             parent=parent,
         )
-        return
 
+    def on_success(rendered: RenderedFigure) -> None:
+        _close_analysis_charts_window(state)
+        _show_analysis_charts_window(
+            parent=parent,
+            runner=runner,
+            rendered=rendered,
+            human_only=human_only,
+            state=state,
+        )
+
+    _submit_job(
+        runner=runner,
+        parent=parent,
+        name='Analysis charts',
+        work=build,
+        on_success=on_success,
+        on_error=on_error,
+        cancel_discards_result=True,
+    )
+
+
+def _show_analysis_charts_window(
+        *,
+        parent: tk.Tk,
+        runner: JobRunner,
+        rendered: RenderedFigure,
+        human_only: bool,
+        state: dict[str, object],
+) -> None:
     win = tk.Toplevel(parent)
     win.title('Data analysis (time series)')
     win.transient(parent)
@@ -1223,13 +1614,50 @@ def _open_analysis_charts_window(
 
     outer = ttk.Frame(win, padding=8)
     outer.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+    image_label = _show_rendered_figure(outer, rendered)
+
+    def make_interactive() -> None:
+        # the bitmap is instant; a live canvas (zoom / pan) needs a figure of its
+        # own (the cache keeps bitmaps only), built off the Tk thread
+        try:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
+        except ImportError as e:
+            messagebox.showerror('Analysis charts', f'Zoom / pan needs matplotlib\'s Tk backend.\n{e}', parent=win)
+            return
+
+        def build(job: JobContext) -> Figure:
+            from analysis import build_analysis_figure
 
-    canvas = FigureCanvasTkAgg(fig, master=outer)
-    canvas.draw()
-    toolbar = NavigationToolbar2Tk(canvas, outer, pack_toolbar=False)
-    toolbar.update()
-    canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-    toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+            return build_analysis_figure(job.conn, human_only=human_only)
+
+        def on_error(e: BaseException) -> None:
+            if isinstance(e, JobCancelled):
+                return
+            _log_error('Analysis charts / zoom / pan', e)
+            messagebox.showerror('Analysis charts', f'Could not build charts: {e}', parent=parent)
+
+        def on_success(fig: Figure) -> None:
+            if not win.winfo_exists():
+                return
+            image_label.destroy()
+            zoom_button.state(['disabled'])
+            canvas = FigureCanvasTkAgg(fig, master=outer)
+            canvas.draw()
+            toolbar = NavigationToolbar2Tk(canvas, outer, pack_toolbar=False)
+            toolbar.update()
+            canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+            toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+
+        _submit_job(
+            runner=runner,
+            parent=win,
+            name='Analysis charts (zoom / pan)',
+            work=build,
+            on_success=on_success,
+            on_error=on_error,
+            cancel_discards_result=True,
+        )
 
     footer = ttk.Frame(win, padding=(8, 0, 8, 8))
     footer.pack(side=tk.BOTTOM, fill=tk.X)
@@ -1239,6 +1667,8 @@ def _open_analysis_charts_window(
         wraplength=720,
     ).pack(side=tk.LEFT)
     ttk.Button(footer, text='Close', command=win.destroy).pack(side=tk.RIGHT)
+    zoom_button = ttk.Button(footer, text='Zoom / pan', command=make_interactive)
+    zoom_button.pack(side=tk.RIGHT, padx=(0, 8))
 
     def on_win_destroy(event: tk.Event) -> None:
         if event.widget == win:
@@ -1253,6 +1683,7 @@ def _open_categorical_analysis_dialog(
         *,
         parent: tk.Tk,
         conn: sqlite3.Connection,
+        runner: JobRunner,
         human_only: bool,
 ) -> None:
     """Three-way breakdown: category × moderation_level × content_type."""
@@ -1329,21 +1760,16 @@ def _open_categorical_analysis_dialog(
     chart_frame = ttk.Frame(body)
     chart_frame.grid(row=r, column=0, sticky='ew', pady=(0, 8))
     r += 1
-    try:
-        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-        fig = build_categorical_analysis_figure(rows)
-        mpl_canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-        mpl_canvas.draw()
-        mpl_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-    except ImportError as e:
-        ttk.Label(
-            chart_frame,
-            text=f'Charts require matplotlib.\n{e}',
-        ).pack(anchor='w')
-    except Exception as e:
-        _log_error('Categorical analysis / charts', e)
-        ttk.Label(chart_frame, text=f'Could not build charts: {e}').pack(anchor='w')
+    _render_figure_into(
+        chart_frame,
+        runner=runner,
+        conn=conn,
+        name='categorical_analysis',
+        tables=_CATEGORICAL_TABLES,
+        params=(human_only,),
+        build=lambda: build_categorical_analysis_figure(rows),
+        context='Categorical analysis / charts',
+    )
 
     ttk.Label(body, text='Full cell listing (sorted by count)', font=('TkDefaultFont', 10, 'bold')).grid(
         row=r, column=0, sticky='w',
@@ -1395,16 +1821,16 @@ def _make_table_tab(
         conn: sqlite3.Connection,
         table_name: str,
         human_only: bool,
-) -> ttk.Treeview:
+) -> VirtualTreeview:
     frame = ttk.Frame(notebook, padding=8)
     notebook.add(frame, text=table_name.replace('_', ' ').title())
 
     treeview = ttk.Treeview(frame, selectmode='extended')
     treeview.grid(row=0, column=0, sticky='nsew')
 
-    scrollbar = ttk.Scrollbar(frame, orient='vertical', command=treeview.yview)
+    scrollbar = ttk.Scrollbar(frame, orient='vertical')
     scrollbar.grid(row=0, column=1, sticky='ns')
-    treeview.configure(yscrollcommand=scrollbar.set)
+    view = VirtualTreeview(treeview, scrollbar)
 
     frame.columnconfigure(0, weight=1)
     frame.rowconfigure(0, weight=1)
@@ -1412,15 +1838,16 @@ def _make_table_tab(
     _populate_treeview(
         conn=conn,
         table_name=table_name,
-        treeview=treeview,
+        view=view,
         human_only=human_only,
     )
-    return treeview
+    return view
 
 
 def start_gui() -> None:
     get_audit_logger().info('GUI starting database_path=%s log_file=%s', DB_PATH, LOG_FILE)
     _ensure_database()
+    set_aggregate_cache_persistent(True)
     conn = sqlite3.connect(DB_PATH)
     state: dict[str, object] = {
         'conn': conn,
@@ -1448,7 +1875,7 @@ def start_gui() -> None:
     notebook = ttk.Notebook(outer)
     notebook.grid(row=1, column=0, sticky='nsew')
 
-    treeviews: dict[str, ttk.Treeview] = {}
+    treeviews: dict[str, VirtualTreeview] = {}
     for table_name in TABLE_NAMES:
         treeviews[table_name] = _make_table_tab(
             notebook=notebook,
@@ -1468,13 +1895,16 @@ def start_gui() -> None:
 
     state['sync_human_only_label'] = sync_human_only_label
 
-    def _on_human_only_toggle() -> None:
+    def refresh_human_only() -> None:
         _refresh_all_treeviews(
             conn=cast(sqlite3.Connection, state['conn']),
             treeviews=treeviews,
             human_only=human_only_var.get(),
         )
         sync_human_only_label()
+
+    def _on_human_only_toggle() -> None:
+        _refresh_when_idle(root, runner, refresh_human_only)
         get_audit_logger().info(
             'Human only filter toggled: %s',
             human_only_var.get(),
@@ -1488,11 +1918,26 @@ def start_gui() -> None:
     )
     human_only_check.pack(side=tk.LEFT)
 
+    # long jobs (upload, analyses) run on a worker with its own connection
+    cancel_button = ttk.Button(bottom_bar, text='Cancel')
+    cancel_button.pack(side=tk.RIGHT)
+    job_progress = ttk.Progressbar(bottom_bar, length=200)
+    job_progress.pack(side=tk.RIGHT, padx=(8, 8))
+    job_status = ttk.Label(bottom_bar, text='')
+    job_status.pack(side=tk.RIGHT)
+    runner = JobRunner(
+        root,
+        connect=lambda: sqlite3.connect(DB_PATH),
+        progressbar=job_progress,
+        status_label=job_status,
+        cancel_button=cancel_button,
+    )
+
     ttk.Button(
         controls,
         text='Upload CSV',
         command=lambda: _upload_csv(
-            conn=state['conn'],
+            runner=runner,
             state=state,
             treeviews=treeviews,
             human_only=_human_only_from_state(state),
@@ -1501,7 +1946,7 @@ def start_gui() -> None:
     ttk.Button(
         controls,
         text='Apply Filters',
-        command=lambda: _open_filters_dialog(parent=root, state=state),
+        command=lambda: _open_filters_dialog(parent=root, state=state, runner=runner),
     ).grid(row=0, column=1, padx=(0, 8))
     ttk.Button(
         controls,
@@ -1518,7 +1963,7 @@ def start_gui() -> None:
         text='Moderation effectiveness',
         command=lambda: _open_moderation_effectiveness_dialog(
             parent=root,
-            conn=cast(sqlite3.Connection, state['conn']),
+            runner=runner,
         ),
     ).grid(row=0, column=3, padx=(0, 8))
     ttk.Button(
@@ -1526,7 +1971,7 @@ def start_gui() -> None:
         text='Analysis charts',
         command=lambda: _open_analysis_charts_window(
             parent=root,
-            conn=cast(sqlite3.Connection, state['conn']),
+            runner=runner,
             human_only=_human_only_from_state(state),
             state=state,
         ),
@@ -1537,6 +1982,7 @@ def start_gui() -> None:
         command=lambda: _open_categorical_analysis_dialog(
             parent=root,
             conn=cast(sqlite3.Connection, state['conn']),
+            runner=runner,
             human_only=_human_only_from_state(state),
         ),
     ).grid(row=0, column=5)
@@ -1549,6 +1995,7 @@ def start_gui() -> None:
     def on_close() -> None:
         if messagebox.askokcancel('Quit', 'Close the application?'):
             get_audit_logger().info('Application shutdown confirmed by user')
+            runner.cancel()
             _close_filter_results_window(state)
             _close_filter_pivot_window(state)
             _close_analysis_charts_window(state)
@@ -19,15 +19,20 @@
 # renames posts.text_preview -> posts.content_preview on existing SQLite databases.
 from __future__ import annotations
 
+import bisect
+import functools
 import re
 import sqlite3
 import unicodedata
+from collections.abc import Callable
+from collections.abc import Iterator
 from dataclasses import dataclass
 from dataclasses import field
 from datetime import date
 from datetime import datetime
 
 from audit_log import get_audit_logger
+from database import bump_table_versions
 from database import migrate_posts_content_preview as migrate_text_preview_to_content_preview
 
 TABLE_PRIMARY_KEY: dict[str, str] = {
@@ -39,6 +44,19 @@ TABLE_PRIMARY_KEY: dict[str, str] = {
 
 KNOWN_TABLES = frozenset(TABLE_PRIMARY_KEY.keys())
 
+# Tables whose rows a cleanup of the key table can change (nulled topic_ids,
+# cascading deletes); their version counters are bumped on apply.
+_CLEANUP_TOUCHES: dict[str, tuple[str, ...]] = {
+    'topics': ('topics', 'posts'),
+    'users': ('users', 'posts', 'interactions'),
+    'posts': ('posts', 'interactions'),
+    'interactions': ('interactions',),
+}
+
+# Primary keys per round trip in the bulk engine (2x this stays under SQLite's
+# historical 999 bound-parameter limit).
+_BULK_CHUNK_SIZE = 400
+
 
 @dataclass
 class CleanupReport:
@@ -134,13 +152,15 @@ def _fetch_one(
         pk_col: str,
         pk: str,
 ) -> dict[str, object] | None:
-    row = conn.execute(
+    cur = conn.execute(
         f'SELECT * FROM {table} WHERE {_quote_ident(pk_col)} = ?',
         (pk,),
-    ).fetchone()
+    )
+    row = cur.fetchone()
     if row is None:
         return None
-    cols = [d[1] for d in conn.execute(f'PRAGMA table_info({table})').fetchall()]
+    # description (unlike PRAGMA table_info) includes generated columns
+    cols = [d[0] for d in cur.description]
     return dict(zip(cols, row, strict=True))
 
 
@@ -451,12 +471,340 @@ def _cleanup_interactions(
             report.append(f'interactions: update interaction_id={iid!r}')
 
 
+# --- Bulk engine -------------------------------------------------------------
+# Batched per-row processing: the same rules and report lines as the per-row
+# ``_cleanup_*`` functions above, still decided row by row in Python (NFC
+# normalisation and the multi-layout date parser have no SQLite equivalent,
+# and every changed row gets its own report line). What is batched is the I/O:
+# rows are read ``_BULK_CHUNK_SIZE`` keys per SELECT, each chunk's updates go
+# out in one executemany and its deletes (with cascades) in one ``IN (...)``
+# statement per table, and date parsing is memoised per distinct string.
+# Chunks are applied before the next one is read and in-chunk state is
+# mirrored in memory, so repeated keys and duplicate-username collapse behave
+# exactly as in the per-row loop.
+
+
+def _chunks(
+        keys: list[str],
+        *,
+        progress: Callable[[int, int], None] | None = None,
+) -> Iterator[list[str]]:
+    for i in range(0, len(keys), _BULK_CHUNK_SIZE):
+        yield keys[i: i + _BULK_CHUNK_SIZE]
+        if progress is not None:
+            progress(min(i + _BULK_CHUNK_SIZE, len(keys)), len(keys))
+
+
+def _placeholders(values: list[str]) -> str:
+    return ', '.join('?' for _ in values)
+
+
+def _fetch_many(
+        conn: sqlite3.Connection,
+        table: str,
+        pk_col: str,
+        pks: list[str],
+) -> dict[str, dict[str, object]]:
+    cur = conn.execute(
+        f'SELECT * FROM {_quote_ident(table)} '
+        f'WHERE {_quote_ident(pk_col)} IN ({_placeholders(pks)})',
+        pks,
+    )
+    cols = [d[0] for d in cur.description]
+    ret = {}
+    for values in cur:
+        row = dict(zip(cols, values, strict=True))
+        ret[str(row[pk_col])] = row
+    return ret
+
+
+def _values_changed(old_vals: dict[str, object], new_vals: dict[str, object]) -> bool:
+    return any(
+        old_vals[k] != new_vals[k]
+        and not (old_vals[k] is None and new_vals[k] is None)
+        for k in new_vals
+    )
+
+
+def _memoised_date_parser() -> Callable[[str | None], str | None]:
+    # timestamps repeat heavily; cache per cleanup run rather than globally
+    return functools.lru_cache(maxsize=None)(_parse_date_yyyy_mm_dd)
+
+
+def _bulk_cleanup_topics(
+        conn: sqlite3.Connection,
+        topic_ids: list[str],
+        *,
+        apply: bool,
+        report: CleanupReport,
+        progress: Callable[[int, int], None] | None = None,
+) -> None:
+    for chunk in _chunks(topic_ids, progress=progress):
+        rows = _fetch_many(conn, 'topics', 'topic_id', chunk)
+        deletes: list[str] = []
+        updates: list[tuple[object, ...]] = []
+        for tid in chunk:
+            row = rows.get(tid)
+            if row is None:
+                report.append(f'topics: skip {tid!r} (not found)')
+                continue
+            name = _nfc_optional(_cell_str(row, 'topic_name'))
+            if name is None:
+                report.deletes += 1
+                report.append(
+                    f'topics: delete topic_id={tid!r} (empty topic_name); '
+                    f'posts.topic_id references cleared first',
+                )
+                if apply:
+                    deletes.append(tid)
+                    del rows[tid]
+                continue
+            new_vals: dict[str, object] = {
+                'topic_name': name,
+                'category': _nfc_optional(_cell_str(row, 'category')),
+                'moderation_level': _nfc_optional(_cell_str(row, 'moderation_level')),
+                'description': _nfc_optional(_cell_str(row, 'description')),
+            }
+            if _values_changed({k: row[k] for k in new_vals}, new_vals):
+                report.updates += 1
+                report.append(f'topics: update topic_id={tid!r} (normalised text / NULL optional fields)')
+                if apply:
+                    updates.append((*new_vals.values(), tid))
+                    row.update(new_vals)
+
+        if apply and deletes:
+            ph = _placeholders(deletes)
+            conn.execute(f'UPDATE posts SET topic_id = NULL WHERE topic_id IN ({ph})', deletes)
+            conn.execute(f'DELETE FROM topics WHERE topic_id IN ({ph})', deletes)
+        if apply and updates:
+            conn.executemany(
+                'UPDATE topics SET topic_name = ?, category = ?, '
+                'moderation_level = ?, description = ? WHERE topic_id = ?',
+                updates,
+            )
+
+
+def _bulk_cleanup_users(
+        conn: sqlite3.Connection,
+        user_ids: list[str],
+        *,
+        apply: bool,
+        report: CleanupReport,
+        progress: Callable[[int, int], None] | None = None,
+) -> None:
+    # username -> user_ids sorted as ``_user_ids_for_username`` would return
+    # them, kept in step with the deletes / renames applied below
+    by_username: dict[object, list[str]] = {}
+    for uid, username in conn.execute('SELECT user_id, username FROM users ORDER BY user_id'):
+        by_username.setdefault(username, []).append(uid)
+
+    parse_date = _memoised_date_parser()
+
+    for chunk in _chunks(user_ids, progress=progress):
+        rows = _fetch_many(conn, 'users', 'user_id', chunk)
+        deletes: list[str] = []
+        updates: list[tuple[object, ...]] = []
+        for uid in chunk:
+            row = rows.get(uid)
+            if row is None:
+                report.append(f'users: skip {uid!r} (not found)')
+                continue
+            username = _nfc_optional(_cell_str(row, 'username'))
+            if username is None:
+                report.append(f'users: skip {uid!r} (empty username)')
+                continue
+            peers = by_username.get(username)
+            keeper = peers[0] if peers else uid
+            if uid != keeper:
+                report.append(
+                    f'users: delete user_id={uid!r} (duplicate username={username!r}; '
+                    f'keeping {keeper!r})',
+                )
+                report.deletes += 1
+                if apply:
+                    deletes.append(uid)
+                    by_username[row['username']].remove(uid)
+                    del rows[uid]
+                continue
+
+            new_vals: dict[str, object] = {
+                'username': username,
+                'join_date': parse_date(_cell_str(row, 'join_date')),
+                'location': _nfc_optional(_cell_str(row, 'location')),
+                'account_type': _nfc_optional(_cell_str(row, 'account_type')),
+                'verified': _normalise_bool_flag(_cell_str(row, 'verified')),
+                'followers_count': _normalise_optional_int(_cell_str(row, 'followers_count')),
+            }
+            if _values_changed({k: row[k] for k in new_vals}, new_vals):
+                report.updates += 1
+                report.append(f'users: update user_id={uid!r} (dates, flags, optional ints)')
+                if apply:
+                    updates.append((*new_vals.values(), uid))
+                    if row['username'] != username:
+                        by_username[row['username']].remove(uid)
+                        bisect.insort(by_username.setdefault(username, []), uid)
+                    row.update(new_vals)
+
+        if apply and deletes:
+            ph = _placeholders(deletes)
+            conn.execute(
+                f'DELETE FROM interactions WHERE user_id IN ({ph}) OR post_id IN '
+                f'(SELECT post_id FROM posts WHERE user_id IN ({ph}))',
+                [*deletes, *deletes],
+            )
+            conn.execute(f'DELETE FROM posts WHERE user_id IN ({ph})', deletes)
+            conn.execute(f'DELETE FROM users WHERE user_id IN ({ph})', deletes)
+        if apply and updates:
+            conn.executemany(
+                'UPDATE users SET username = ?, join_date = ?, location = ?, '
+                'account_type = ?, verified = ?, followers_count = ? WHERE user_id = ?',
+                updates,
+            )
+
+
+def _bulk_cleanup_posts(
+        conn: sqlite3.Connection,
+        post_ids: list[str],
+        *,
+        apply: bool,
+        report: CleanupReport,
+        progress: Callable[[int, int], None] | None = None,
+) -> None:
+    valid_users = {r[0] for r in conn.execute('SELECT user_id FROM users').fetchall()}
+    valid_topics = {r[0] for r in conn.execute('SELECT topic_id FROM topics').fetchall()}
+    parse_date = _memoised_date_parser()
+
+    for chunk in _chunks(post_ids, progress=progress):
+        rows = _fetch_many(conn, 'posts', 'post_id', chunk)
+        deletes: list[str] = []
+        updates: list[tuple[object, ...]] = []
+        for pid in chunk:
+            row = rows.get(pid)
+            if row is None:
+                report.append(f'posts: skip {pid!r} (not found)')
+                continue
+            uid = _nfc_optional(_cell_str(row, 'user_id'))
+            if uid is None or uid not in valid_users:
+                report.append(
+                    f'posts: delete post_id={pid!r} (missing or unknown user_id={uid!r})',
+                )
+                report.deletes += 1
+                if apply:
+                    deletes.append(pid)
+                    del rows[pid]
+                continue
+
+            topic_key = _nfc_optional(_cell_str(row, 'topic_id'))
+            if topic_key is not None and topic_key not in valid_topics:
+                topic_key = None
+                report.append(f'posts: post_id={pid!r} set topic_id NULL (invalid reference)')
+
+            new_vals: dict[str, object] = {
+                'user_id': uid,
+                'timestamp': parse_date(_cell_str(row, 'timestamp')),
+                'content_type': _nfc_optional(_cell_str(row, 'content_type')),
+                'content_preview': _nfc_optional(_cell_str(row, 'content_preview')),
+                'has_media': _normalise_bool_flag(_cell_str(row, 'has_media')),
+                'topic_id': topic_key,
+                'language': _nfc_optional(_cell_str(row, 'language')),
+            }
+            if _values_changed({k: row[k] for k in new_vals}, new_vals):
+                report.updates += 1
+                report.append(f'posts: update post_id={pid!r}')
+                if apply:
+                    updates.append((*new_vals.values(), pid))
+                    row.update(new_vals)
+
+        if apply and deletes:
+            ph = _placeholders(deletes)
+            conn.execute(f'DELETE FROM interactions WHERE post_id IN ({ph})', deletes)
+            conn.execute(f'DELETE FROM posts WHERE post_id IN ({ph})', deletes)
+        if apply and updates:
+            conn.executemany(
+                'UPDATE posts SET user_id = ?, timestamp = ?, content_type = ?, '
+                'content_preview = ?, has_media = ?, topic_id = ?, language = ? '
+                'WHERE post_id = ?',
+                updates,
+            )
+
+
+def _bulk_cleanup_interactions(
+        conn: sqlite3.Connection,
+        interaction_ids: list[str],
+        *,
+        apply: bool,
+        report: CleanupReport,
+        progress: Callable[[int, int], None] | None = None,
+) -> None:
+    valid_users = {r[0] for r in conn.execute('SELECT user_id FROM users').fetchall()}
+    valid_posts = {r[0] for r in conn.execute('SELECT post_id FROM posts').fetchall()}
+    parse_date = _memoised_date_parser()
+
+    for chunk in _chunks(interaction_ids, progress=progress):
+        rows = _fetch_many(conn, 'interactions', 'interaction_id', chunk)
+        deletes: list[str] = []
+        updates: list[tuple[object, ...]] = []
+        for iid in chunk:
+            row = rows.get(iid)
+            if row is None:
+                report.append(f'interactions: skip {iid!r} (not found)')
+                continue
+            pid = _nfc_optional(_cell_str(row, 'post_id'))
+            uid = _nfc_optional(_cell_str(row, 'user_id'))
+            if pid is None or uid is None or pid not in valid_posts or uid not in valid_users:
+                report.append(
+                    f'interactions: delete interaction_id={iid!r} '
+                    f'(invalid post_id or user_id)',
+                )
+                report.deletes += 1
+                if apply:
+                    deletes.append(iid)
+                    del rows[iid]
+                continue
+
+            new_vals: dict[str, object] = {
+                'post_id': pid,
+                'user_id': uid,
+                'timestamp': parse_date(_cell_str(row, 'timestamp')),
+                'interaction_type': _nfc_optional(_cell_str(row, 'interaction_type')),
+                'reaction_type': _nfc_optional(_cell_str(row, 'reaction_type')),
+            }
+            if _values_changed({k: row[k] for k in new_vals}, new_vals):
+                report.updates += 1
+                report.append(f'interactions: update interaction_id={iid!r}')
+                if apply:
+                    updates.append((*new_vals.values(), iid))
+                    row.update(new_vals)
+
+        if apply and deletes:
+            conn.execute(
+                f'DELETE FROM interactions WHERE interaction_id IN ({_placeholders(deletes)})',
+                deletes,
+            )
+        if apply and updates:
+            conn.executemany(
+                'UPDATE interactions SET post_id = ?, user_id = ?, timestamp = ?, '
+                'interaction_type = ?, reaction_type = ? WHERE interaction_id = ?',
+                updates,
+            )
+
+
+_BULK_CLEANUPS: dict[str, Callable[..., None]] = {
+    'topics': _bulk_cleanup_topics,
+    'users': _bulk_cleanup_users,
+    'posts': _bulk_cleanup_posts,
+    'interactions': _bulk_cleanup_interactions,
+}
+
+
 def cleanup_selection(
         conn: sqlite3.Connection,
         table_name: str,
         selected_primary_keys: list[str],
         *,
         apply: bool,
+        bulk: bool = True,
+        progress: Callable[[int, int], None] | None = None,
 ) -> CleanupReport:
     """
     Run cleanup rules on the given primary keys for one table.
@@ -464,6 +812,12 @@ def cleanup_selection(
     If apply is False, the database is not modified (dry run for preview).
     If apply is True, changes are executed in a single transaction (commit on success).
 
+    ``bulk`` selects the chunked engine (rows still decided one by one, but
+    read and written a chunk per statement); ``bulk=False`` runs the original
+    per-row loop (same report, kept as the reference implementation).
+    The bulk engine calls ``progress(done, total)`` after each chunk; an
+    exception raised from it aborts (and rolls back) the cleanup.
+
     For a full-table pass (e.g. after import), use :func:`cleanup_entire_table`.
     """
     if table_name not in KNOWN_TABLES:
@@ -481,7 +835,11 @@ def cleanup_selection(
         conn.execute('BEGIN')
 
     try:
-        if table_name == 'topics':
+        if bulk:
+            _BULK_CLEANUPS[table_name](
+                conn, keys, apply=apply, report=report, progress=progress,
+            )
+        elif table_name == 'topics':
             _cleanup_topics(conn, keys, apply=apply, report=report)
         elif table_name == 'users':
             _cleanup_users(conn, keys, apply=apply, report=report)
@@ -490,6 +848,8 @@ def cleanup_selection(
         elif table_name == 'interactions':
             _cleanup_interactions(conn, keys, apply=apply, report=report)
         if apply:
+            if report.updates or report.deletes:
+                bump_table_versions(conn, _CLEANUP_TOUCHES[table_name])
             conn.commit()
     except Exception:
         if apply:
@@ -515,6 +875,8 @@ def cleanup_entire_table(
         table_name: str,
         *,
         apply: bool,
+        bulk: bool = True,
+        progress: Callable[[int, int], None] | None = None,
 ) -> CleanupReport:
     """
     Run :func:`cleanup_selection` for every primary key currently in ``table_name``.
@@ -529,7 +891,9 @@ def cleanup_entire_table(
         f'SELECT {_quote_ident(pk_col)} FROM {_quote_ident(table_name)}',
     )
     pks = [str(row[0]) for row in cur.fetchall() if row[0] is not None]
-    return cleanup_selection(conn, table_name, pks, apply=apply)
+    return cleanup_selection(
+        conn, table_name, pks, apply=apply, bulk=bulk, progress=progress,
+    )
 
 
 def format_report_for_dialog(report: CleanupReport, *, max_lines: int = 80) -> str:
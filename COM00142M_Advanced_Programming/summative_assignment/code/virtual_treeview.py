@@ -0,0 +1,240 @@
+"""
+Lazily paged ``ttk.Treeview`` for tables too large to insert in one go.
+
+Only a window of rows around the scroll position is ever inserted into the
+widget (the visible rows plus ``read_ahead`` on either side). Windows are read
+with keyset pagination on ``rowid``: every ``BOUNDARY_STEP``-th rowid of the
+query is sampled once, so reaching row *n* is an index seek to the nearest
+sampled rowid plus an OFFSET below ``BOUNDARY_STEP``. A separate scrollbar
+spans the full row count, and selection is tracked by rowid so it survives
+the window moving.
+"""
+from __future__ import annotations
+
+import sqlite3
+import tkinter as tk
+from tkinter import ttk
+
+BOUNDARY_STEP = 1000
+READ_AHEAD = 100
+VISIBLE_ROWS_GUESS = 40
+
+# rowids per IN (...) when re-reading the selection
+_SELECTION_CHUNK = 500
+
+# Tk ``event.state`` bits of the modifiers that extend a selection (Shift, Control)
+_EXTEND_MODIFIERS = 0x0001 | 0x0004
+
+
+class VirtualTreeview:
+    """
+    Window onto ``SELECT <columns> <source_sql>`` ordered by ``<alias>.rowid``.
+
+    ``source_sql`` is a ``FROM ... WHERE ...`` clause whose rows come from the
+    table aliased ``alias``; item ids in the widget are the rows' rowids.
+    """
+
+    def __init__(
+            self,
+            treeview: ttk.Treeview,
+            scrollbar: ttk.Scrollbar,
+            *,
+            read_ahead: int = READ_AHEAD,
+    ) -> None:
+        self.tree = treeview
+        self.scrollbar = scrollbar
+        self.read_ahead = read_ahead
+        self.conn: sqlite3.Connection | None = None
+        self.columns: list[str] = []
+        self.total = 0
+        self._alias = ''
+        self._source_sql = ''
+        self._params: tuple[object, ...] = ()
+        self._bounds: list[int] | None = None
+        self._window_start = 0
+        self._rendered: list[int] = []
+        self._selected: set[int] = set()
+        self._extending = False
+        self._shifting = False
+
+        treeview.configure(yscrollcommand=self._on_tree_scrolled)
+        scrollbar.configure(command=self.yview)
+        treeview.bind('<<TreeviewSelect>>', self._on_select)
+        # run before the Treeview class bindings that change the selection
+        treeview.bind('<ButtonPress-1>', self._on_select_input, add='+')
+        treeview.bind('<KeyPress>', self._on_select_input, add='+')
+
+    def load(
+            self,
+            conn: sqlite3.Connection,
+            *,
+            columns: list[str],
+            alias: str,
+            source_sql: str,
+            params: tuple[object, ...] = (),
+    ) -> None:
+        """Point the view at a new query and show its first rows."""
+        self.conn = conn
+        self.columns = columns
+        self._alias = alias
+        self._source_sql = source_sql
+        self._params = params
+        self._bounds = None
+        self._selected = set()
+        self.total = int(
+            conn.execute(f'SELECT COUNT(*) {source_sql}', params).fetchone()[0],
+        )
+        self._render(0)
+
+    def _window_size(self) -> int:
+        first, last = (float(f) for f in self.tree.yview())
+        visible = round((last - first) * len(self._rendered)) if self._rendered else 0
+        return max(visible, VISIBLE_ROWS_GUESS) + 2 * self.read_ahead
+
+    def _boundaries(self) -> list[int]:
+        if self._bounds is None:
+            assert self.conn is not None
+            a = self._alias
+            rows = self.conn.execute(
+                f'''
+                SELECT rid FROM (
+                    SELECT {a}.rowid AS rid, row_number() OVER (ORDER BY {a}.rowid) - 1 AS rn
+                    {self._source_sql}
+                )
+                WHERE rn % ? = 0
+                ORDER BY rid
+                ''',
+                (*self._params, BOUNDARY_STEP),
+            ).fetchall()
+            self._bounds = [r[0] for r in rows]
+        return self._bounds
+
+    def fetch_window(self, start: int, count: int) -> list[tuple[object, ...]]:
+        """Rows ``start .. start + count - 1`` as ``(rowid, *columns)`` tuples."""
+        assert self.conn is not None
+        a = self._alias
+        cols = ', '.join(f'{a}."{c}"' for c in self.columns)
+        block = start // BOUNDARY_STEP
+        if block == 0:
+            seek_sql, seek_params = '', ()
+        else:
+            bounds = self._boundaries()
+            block = min(block, len(bounds) - 1)
+            seek_sql, seek_params = f'AND {a}.rowid >= ?', (bounds[block],)
+        return self.conn.execute(
+            f'SELECT {a}.rowid, {cols} {self._source_sql} {seek_sql} '
+            f'ORDER BY {a}.rowid LIMIT ? OFFSET ?',
+            (*self._params, *seek_params, count, start - block * BOUNDARY_STEP),
+        ).fetchall()
+
+    def _render(self, start: int) -> None:
+        size = self._window_size()
+        start = max(0, min(start, self.total - size))
+        rows = self.fetch_window(start, size) if self.total else []
+
+        self._shifting = True
+        try:
+            self.tree.delete(*self.tree.get_children())
+            self._rendered = []
+            for row in rows:
+                rowid = int(row[0])
+                values = tuple('' if v is None else v for v in row[1:])
+                self.tree.insert('', 'end', iid=str(rowid), values=values)
+                self._rendered.append(rowid)
+            self._window_start = start
+            keep = [str(r) for r in self._rendered if r in self._selected]
+            if keep:
+                self.tree.selection_set(keep)
+        finally:
+            self._shifting = False
+        self._update_scrollbar(start, len(self._rendered))
+
+    def _update_scrollbar(self, top: int, visible: int) -> None:
+        if self.total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(top / self.total, min(1.0, (top + visible) / self.total))
+
+    def _show_row(self, top: int) -> None:
+        """Move the window so global row ``top`` is the first one shown."""
+        try:
+            self._render(top - self.read_ahead)
+        except sqlite3.OperationalError:
+            # 'database is locked' while a background job writes: keep the
+            # current window, the next scroll tries again
+            return
+        if self._rendered:
+            self.tree.yview_moveto((top - self._window_start) / len(self._rendered))
+
+    def _on_tree_scrolled(self, first: str, last: str) -> None:
+        n = len(self._rendered)
+        if not n:
+            self._update_scrollbar(0, 0)
+            return
+        local_top = round(float(first) * n)
+        local_bottom = round(float(last) * n)
+        top = self._window_start + local_top
+        self._update_scrollbar(top, local_bottom - local_top)
+        if self._shifting:
+            return
+        near_start = local_top < self.read_ahead // 2 and self._window_start > 0
+        near_end = (
+            n - local_bottom < self.read_ahead // 2
+            and self._window_start + n < self.total
+        )
+        if near_start or near_end:
+            self._shifting = True
+            try:
+                self._show_row(top)
+            finally:
+                self._shifting = False
+
+    def yview(self, *args: str) -> None:
+        """Scrollbar ``command``: ``moveto`` jumps by position in the whole result."""
+        if args and args[0] == 'moveto':
+            top = int(float(args[1]) * self.total)
+            self._shifting = True
+            try:
+                self._show_row(top)
+            finally:
+                self._shifting = False
+        else:
+            self.tree.yview(*args)
+
+    def _on_select_input(self, event: tk.Event) -> None:
+        self._extending = bool(int(event.state) & _EXTEND_MODIFIERS)
+
+    def _on_select(self, event: object = None) -> None:
+        """
+        Track the widget's selection: a Shift / Control click or key keeps the
+        selected rows outside the window, any other selection replaces them.
+        """
+        if self._shifting:
+            return
+        current = {int(iid) for iid in self.tree.selection()}
+        if self._extending:
+            self._selected = (self._selected - set(self._rendered)) | current
+        else:
+            self._selected = current
+
+    def selected_rowids(self) -> list[int]:
+        return sorted(self._selected)
+
+    def selected_rows(self) -> list[tuple[str, ...]]:
+        """Column values (as text) of every selected row, shown or not, in rowid order."""
+        if self.conn is None:
+            return []
+        a = self._alias
+        cols = ', '.join(f'{a}."{c}"' for c in self.columns)
+        rowids = self.selected_rowids()
+        ret = []
+        for i in range(0, len(rowids), _SELECTION_CHUNK):
+            chunk = rowids[i: i + _SELECTION_CHUNK]
+            placeholders = ', '.join('?' for _ in chunk)
+            rows = self.conn.execute(
+                f'SELECT {cols} {self._source_sql} AND {a}.rowid IN ({placeholders}) '
+                f'ORDER BY {a}.rowid',
+                (*self._params, *chunk),
+            ).fetchall()
+            ret.extend(tuple('' if v is None else str(v) for v in row) for row in rows)
+        return ret